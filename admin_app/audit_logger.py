@@ -7,9 +7,11 @@ Features:
 - Логирование всех изменений данных
 - Сохранение состояния до/после изменений
 - IP адрес и hostname администратора
-- Поиск по истории изменений
+- Поиск по истории изменений (FTS5-индекс, синхронизируется триггерами)
 - Фильтрация по дате, администратору, типу действия
-- Экспорт audit логов
+- Буферизованная запись: события фиксируются пачками одной транзакцией
+- Потоковый экспорт audit логов (JSON Lines / CSV / JSON) прямо из курсора
+- Хранение по месяцам: старые месяцы уходят в сжатые архивы, читаются по запросу
 - Отчеты по действиям администратора
 
 Использование:
@@ -39,11 +41,21 @@ Features:
 Дата: 2025-11-24
 """
 
+import atexit
+import csv
+import gzip
 import json
+import os
+import re
 import socket
+import sqlite3
+import threading
+import time
 import logging
+import weakref
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterator, List, Sequence
 from dataclasses import dataclass, asdict
 
 logger = logging.getLogger(__name__)
@@ -90,6 +102,16 @@ class AuditEntry:
         return asdict(self)
 
 
+class _Pending:
+    """Событие в буфере; id появляется после INSERT"""
+
+    __slots__ = ("row", "id")
+
+    def __init__(self, row: tuple):
+        self.row = row
+        self.id: Optional[int] = None
+
+
 # ============================================================================
 # AUDIT LOGGER
 # ============================================================================
@@ -156,23 +178,99 @@ class AuditLogger:
     ENTITY_NOTIFICATION = "NOTIFICATION"
     ENTITY_REPORT = "REPORT"
     
-    def __init__(self, db_connection, admin_email: str):
+    # Колонки полнотекстового индекса audit_log_fts
+    FTS_COLUMNS = (
+        "admin_email", "action", "entity_type", "entity_id",
+        "before_state", "after_state", "error_message",
+    )
+
+    _SELECT = """
+        SELECT
+            a.id, a.timestamp, a.admin_email, a.action, a.entity_type, a.entity_id,
+            a.before_state, a.after_state, a.ip_address, a.hostname, a.success, a.error_message
+    """
+
+    # Сколько несохранённых событий держать при недоступной БД
+    MAX_BUFFER = 10000
+
+    # Поля записи в порядке колонок _SELECT (заголовок CSV, ключи JSON)
+    FIELDS = (
+        "id", "timestamp", "admin_email", "action", "entity_type", "entity_id",
+        "before_state", "after_state", "ip_address", "hostname", "success", "error_message",
+    )
+    EXPORT_FORMATS = ("jsonl", "csv", "json")
+    # Строк на один fetchmany при экспорте и архивации
+    EXPORT_FETCH_ROWS = 1000
+    # Один кодировщик на все строки JSON Lines (json.dumps с параметрами создаёт его на каждый вызов)
+    _JSONL_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+    def __init__(
+        self,
+        db_connection,
+        admin_email: str,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        archive_dir: Optional[str] = None
+    ):
         """
         Инициализация audit logger.
         
         Args:
             db_connection: Соединение с БД
             admin_email: Email текущего администратора
+            batch_size: Событий в одной транзакции (по умолчанию config.AUDIT_BATCH_ROWS)
+            flush_interval_ms: Максимальный возраст буфера (по умолчанию config.AUDIT_FLUSH_MS);
+                по истечении буфер пишет таймер, даже если новых событий нет
+            archive_dir: Каталог архивов старых месяцев (по умолчанию config.AUDIT_ARCHIVE_DIR)
         """
         self.conn = db_connection
         self.admin_email = admin_email
         
+        if batch_size is None or flush_interval_ms is None:
+            try:
+                from config import AUDIT_BATCH_ROWS, AUDIT_FLUSH_MS
+            except Exception:
+                AUDIT_BATCH_ROWS, AUDIT_FLUSH_MS = 50, 1000
+            batch_size = AUDIT_BATCH_ROWS if batch_size is None else batch_size
+            flush_interval_ms = AUDIT_FLUSH_MS if flush_interval_ms is None else flush_interval_ms
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0, int(flush_interval_ms)) / 1000.0
+
+        if archive_dir is None:
+            try:
+                from config import AUDIT_ARCHIVE_DIR as archive_dir
+            except Exception:
+                archive_dir = Path.home() / "WorkTimeTracker" / "audit_archive"
+        self.archive_dir = Path(archive_dir)
+
+        # Буфер событий; id выдаёт SQLite при записи пачки
+        self._buffer: List[_Pending] = []
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+        self._flush_timer: Optional[threading.Timer] = None
+        # Таймер пишет своим соединением к тому же файлу (sqlite3-соединение
+        # привязано к создавшему потоку); у БД в памяти файла нет — без таймера
+        try:
+            self._db_file = self.conn.execute("PRAGMA database_list").fetchone()[2] or None
+        except Exception:
+            self._db_file = None
+        self._fts = False
+        self.stats = {
+            'logged': 0, 'flushes': 0, 'flushed_rows': 0, 'max_batch': 0,
+            'errors': 0, 'fts_queries': 0, 'like_queries': 0,
+            'exported_rows': 0, 'archived_months': 0, 'archived_rows': 0,
+        }
+
         # Создать таблицу audit_log если не существует
         self._ensure_audit_table()
         
         # Кэш для IP и hostname
         self._ip_address: Optional[str] = None
         self._hostname: Optional[str] = None
+
+        # Недописанный буфер сохраняется при выходе из процесса
+        ref = weakref.ref(self)
+        atexit.register(lambda: ref() is not None and ref().flush())
     
     def _ensure_audit_table(self):
         """Создать таблицу audit_log если не существует"""
@@ -194,10 +292,13 @@ class AuditLogger:
                 )
             """)
             
-            # Индексы для быстрого поиска
+            # Индексы для быстрого поиска.
+            # (timestamp, action, entity_type) покрывает статистику за период;
+            # прежний индекс по одному timestamp — его префикс.
+            self.conn.execute("DROP INDEX IF EXISTS idx_audit_timestamp")
             self.conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_audit_timestamp 
-                ON audit_log(timestamp)
+                CREATE INDEX IF NOT EXISTS idx_audit_ts_stats
+                ON audit_log(timestamp, action, entity_type)
             """)
             
             self.conn.execute("""
@@ -205,6 +306,12 @@ class AuditLogger:
                 ON audit_log(admin_email, timestamp)
             """)
             
+            # Фильтр администратор + тип действия + период
+            self.conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_audit_admin_action
+                ON audit_log(admin_email, action, timestamp)
+            """)
+
             self.conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_audit_entity 
                 ON audit_log(entity_type, entity_id, timestamp)
@@ -215,12 +322,77 @@ class AuditLogger:
                 ON audit_log(action, timestamp)
             """)
             
+            # Оглавление архивов: какие месяцы выгружены и в какие файлы
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS audit_archive (
+                    file TEXT PRIMARY KEY,
+                    month TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    first_ts TEXT,
+                    last_ts TEXT,
+                    archived_at TEXT NOT NULL
+                )
+            """)
+
             self.conn.commit()
             logger.debug("Audit log table ensured")
-            
+
         except Exception as e:
             logger.error(f"Failed to create audit_log table: {e}")
             # Не падаем - audit logging не должен ломать основную функциональность
+            return
+
+        self._ensure_fts()
+
+    def _ensure_fts(self):
+        """
+        Полнотекстовый индекс audit_log_fts (FTS5, external content).
+
+        Триггеры держат индекс в синхронизации с audit_log при любых
+        INSERT/UPDATE/DELETE. Если SQLite собран без FTS5 — поиск идёт через LIKE.
+        Токены — буквы и цифры (email и коды действий разбиваются на части);
+        индексы префиксов 2–4 символов: "ivanov@com" не перебирает все слова на "com".
+        """
+        columns = ", ".join(self.FTS_COLUMNS)
+        new_columns = ", ".join(f"new.{c}" for c in self.FTS_COLUMNS)
+        old_columns = ", ".join(f"old.{c}" for c in self.FTS_COLUMNS)
+        try:
+            existed = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'audit_log_fts'"
+            ).fetchone() is not None
+            self.conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS audit_log_fts USING fts5(
+                    {columns},
+                    content='audit_log', content_rowid='id',
+                    tokenize="unicode61 remove_diacritics 2", prefix='2 3 4'
+                )
+            """)
+            self.conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS audit_log_fts_ai AFTER INSERT ON audit_log BEGIN
+                    INSERT INTO audit_log_fts(rowid, {columns}) VALUES (new.id, {new_columns});
+                END
+            """)
+            self.conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS audit_log_fts_ad AFTER DELETE ON audit_log BEGIN
+                    INSERT INTO audit_log_fts(audit_log_fts, rowid, {columns})
+                    VALUES ('delete', old.id, {old_columns});
+                END
+            """)
+            self.conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS audit_log_fts_au AFTER UPDATE ON audit_log BEGIN
+                    INSERT INTO audit_log_fts(audit_log_fts, rowid, {columns})
+                    VALUES ('delete', old.id, {old_columns});
+                    INSERT INTO audit_log_fts(rowid, {columns}) VALUES (new.id, {new_columns});
+                END
+            """)
+            if not existed:
+                # Журнал вёлся до появления индекса — проиндексировать историю
+                self.conn.execute("INSERT INTO audit_log_fts(audit_log_fts) VALUES ('rebuild')")
+            self.conn.commit()
+            self._fts = True
+        except sqlite3.OperationalError as e:
+            self.conn.rollback()
+            logger.warning(f"FTS5 unavailable, audit search falls back to LIKE: {e}")
     
     def _get_ip_address(self) -> str:
         """Получить локальный IP адрес"""
@@ -274,16 +446,13 @@ class AuditLogger:
             error_message: Сообщение об ошибке (если не успешно)
             
         Returns:
-            ID созданной записи или None если не удалось
+            ID записи, если она записана этим же вызовом (пачка набралась
+            или истёк flush_interval); иначе None — событие ждёт в буфере
+            (или записать не удалось). None не означает ошибку: id события
+            из буфера можно узнать только после flush, например через search.
         """
         try:
-            cursor = self.conn.execute("""
-                INSERT INTO audit_log (
-                    timestamp, admin_email, action, entity_type, entity_id,
-                    before_state, after_state, ip_address, hostname,
-                    success, error_message
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            row = (
                 datetime.utcnow().isoformat(),
                 self.admin_email,
                 action,
@@ -295,20 +464,194 @@ class AuditLogger:
                 self._get_hostname(),
                 1 if success else 0,
                 error_message
-            ))
-            
-            self.conn.commit()
-            
-            audit_id = cursor.lastrowid
-            logger.debug(f"Audit log created: {action} on {entity_type}:{entity_id} (id={audit_id})")
-            
-            return audit_id
+            )
+            with self._lock:
+                pending = self._enqueue(row)
+                due = (
+                    len(self._buffer) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval
+                )
+                if not due:
+                    self._schedule_flush()
             
+            logger.debug(f"Audit log queued: {action} on {entity_type}:{entity_id}")
+            if due:
+                self.flush()
+            return pending.id
+
         except Exception as e:
             logger.error(f"Failed to write audit log: {e}")
             # Audit logging не должен ломать основную функциональность
             return None
     
+    def log_actions(self, actions: Sequence[Dict[str, Any]]) -> List[Optional[int]]:
+        """
+        Записать пачку действий одной транзакцией.
+
+        Args:
+            actions: Аргументы log_action для каждого действия (dict)
+
+        Returns:
+            ID записей в том же порядке (None — пачка не записана и осталась
+            в буфере до следующего flush)
+        """
+        ip, host = self._get_ip_address(), self._get_hostname()
+        try:
+            with self._lock:
+                pending = [
+                    self._enqueue((
+                        datetime.utcnow().isoformat(),
+                        self.admin_email,
+                        a["action"],
+                        a["entity_type"],
+                        a.get("entity_id"),
+                        json.dumps(a["before_state"], ensure_ascii=False) if a.get("before_state") else None,
+                        json.dumps(a["after_state"], ensure_ascii=False) if a.get("after_state") else None,
+                        ip,
+                        host,
+                        1 if a.get("success", True) else 0,
+                        a.get("error_message")
+                    ))
+                    for a in actions
+                ]
+                self.flush()
+            return [p.id for p in pending]
+        except Exception as e:
+            logger.error(f"Failed to write audit log batch: {e}")
+            return [None] * len(actions)
+
+    def _enqueue(self, row: tuple) -> _Pending:
+        """Поставить строку в буфер (под self._lock)"""
+        pending = _Pending(row)
+        self._buffer.append(pending)
+        self.stats['logged'] += 1
+        return pending
+
+    def _schedule_flush(self):
+        """Запустить таймер flush_interval для первого события в буфере (под self._lock)"""
+        if self._flush_timer is not None or not self._db_file or not self._buffer:
+            return
+        delay = max(0.0, self.flush_interval - (time.monotonic() - self._last_flush))
+        self._flush_timer = threading.Timer(delay, self._flush_on_timer)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def _flush_on_timer(self):
+        """Сброс по таймеру: отдельное соединение к файлу журнала"""
+        try:
+            # Короткое ожидание блокировки: таймер держит self._lock, а не дождался — допишет следующий flush
+            conn = sqlite3.connect(self._db_file, timeout=1)
+        except Exception as e:
+            logger.error(f"Audit flush timer: cannot open {self._db_file}: {e}")
+            return
+        try:
+            self.flush(conn)
+        finally:
+            conn.close()
+
+    def flush(self, conn: Optional[sqlite3.Connection] = None) -> int:
+        """
+        Зафиксировать буфер одной транзакцией.
+
+        Вызывается автоматически по batch_size, по таймеру flush_interval,
+        перед каждым чтением журнала и при выходе из процесса.
+
+        Args:
+            conn: Соединение для записи (по умолчанию self.conn)
+
+        Returns:
+            Сколько событий записано
+        """
+        conn = conn or self.conn
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._buffer:
+                return 0
+            batch, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            try:
+                self._insert(batch, conn)
+            except Exception as e:
+                return self._requeue(batch, e)
+
+            self.stats['flushes'] += 1
+            self.stats['flushed_rows'] += len(batch)
+            self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+            return len(batch)
+
+    def _insert(self, batch: List[_Pending], conn: Optional[sqlite3.Connection] = None):
+        """Одна транзакция на пачку; id проставляются только после COMMIT"""
+        conn = conn or self.conn
+        ids = []
+        with conn:
+            cur = conn.cursor()
+            for pending in batch:
+                cur.execute("""
+                    INSERT INTO audit_log (
+                        timestamp, admin_email, action, entity_type, entity_id,
+                        before_state, after_state, ip_address, hostname,
+                        success, error_message
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, pending.row)
+                ids.append(cur.lastrowid)
+        for pending, audit_id in zip(batch, ids):
+            pending.id = audit_id
+
+    def _insert_rows(self, rows: List[tuple], conn: Optional[sqlite3.Connection] = None):
+        """Строки audit_log вместе с их id (загрузка архива) — одной транзакцией"""
+        conn = conn or self.conn
+        with conn:
+            conn.executemany("""
+                INSERT INTO audit_log (
+                    id, timestamp, admin_email, action, entity_type, entity_id,
+                    before_state, after_state, ip_address, hostname,
+                    success, error_message
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+    def _requeue(self, batch: List[_Pending], error: Exception) -> int:
+        """Вернуть пачку в буфер (следующий flush повторит); переполнение — отбросить старые"""
+        self.stats['errors'] += 1
+        self._buffer = batch + self._buffer
+        dropped = len(self._buffer) - self.MAX_BUFFER
+        if dropped > 0:
+            del self._buffer[:dropped]
+            logger.error(f"Audit buffer overflow: {dropped} oldest entries dropped")
+        logger.error(f"Failed to write audit log batch ({len(batch)} entries): {error}")
+        return 0
+
+    def close(self):
+        """Записать буфер (соединение остаётся за вызывающим)"""
+        self.flush()
+
+    @staticmethod
+    def _row_to_entry(row) -> AuditEntry:
+        return AuditEntry(
+            id=row[0],
+            timestamp=row[1],
+            admin_email=row[2],
+            action=row[3],
+            entity_type=row[4],
+            entity_id=row[5],
+            before_state=json.loads(row[6]) if row[6] else None,
+            after_state=json.loads(row[7]) if row[7] else None,
+            ip_address=row[8],
+            hostname=row[9],
+            success=bool(row[10]),
+            error_message=row[11]
+        )
+
+    @classmethod
+    def _row_to_dict(cls, row) -> Dict[str, Any]:
+        """Строка audit_log -> dict как AuditEntry.to_dict(), без копирования dataclass"""
+        d = dict(zip(cls.FIELDS, row))
+        d['before_state'] = json.loads(row[6]) if row[6] else None
+        d['after_state'] = json.loads(row[7]) if row[7] else None
+        d['success'] = bool(row[10])
+        return d
+
     def get_entity_history(
         self,
         entity_type: str,
@@ -326,6 +669,7 @@ class AuditLogger:
         Returns:
             Список записей AuditEntry
         """
+        self.flush()
         try:
             cursor = self.conn.execute("""
                 SELECT 
@@ -337,25 +681,7 @@ class AuditLogger:
                 LIMIT ?
             """, (entity_type, entity_id, limit))
             
-            entries = []
-            for row in cursor.fetchall():
-                entry = AuditEntry(
-                    id=row[0],
-                    timestamp=row[1],
-                    admin_email=row[2],
-                    action=row[3],
-                    entity_type=row[4],
-                    entity_id=row[5],
-                    before_state=json.loads(row[6]) if row[6] else None,
-                    after_state=json.loads(row[7]) if row[7] else None,
-                    ip_address=row[8],
-                    hostname=row[9],
-                    success=bool(row[10]),
-                    error_message=row[11]
-                )
-                entries.append(entry)
-            
-            return entries
+            return [self._row_to_entry(row) for row in cursor.fetchall()]
             
         except Exception as e:
             logger.error(f"Failed to get entity history: {e}")
@@ -382,6 +708,7 @@ class AuditLogger:
         Returns:
             Список записей AuditEntry
         """
+        self.flush()
         try:
             # Построить запрос
             query = """
@@ -419,25 +746,7 @@ class AuditLogger:
             # Выполнить запрос
             cursor = self.conn.execute(query, params)
             
-            entries = []
-            for row in cursor.fetchall():
-                entry = AuditEntry(
-                    id=row[0],
-                    timestamp=row[1],
-                    admin_email=row[2],
-                    action=row[3],
-                    entity_type=row[4],
-                    entity_id=row[5],
-                    before_state=json.loads(row[6]) if row[6] else None,
-                    after_state=json.loads(row[7]) if row[7] else None,
-                    ip_address=row[8],
-                    hostname=row[9],
-                    success=bool(row[10]),
-                    error_message=row[11]
-                )
-                entries.append(entry)
-            
-            return entries
+            return [self._row_to_entry(row) for row in cursor.fetchall()]
             
         except Exception as e:
             logger.error(f"Failed to get admin actions: {e}")
@@ -472,6 +781,7 @@ class AuditLogger:
         Returns:
             Словарь со статистикой
         """
+        self.flush()
         try:
             query = "SELECT COUNT(*), action, entity_type FROM audit_log WHERE 1=1"
             params = []
@@ -543,28 +853,175 @@ class AuditLogger:
             
         Returns:
             True если успешно, False если ошибка
+
+        Действия текущего администратора, новые первыми. Массив пишется
+        потоково (см. export), поэтому прежнего ограничения в 10000 записей нет.
+        """
+        return self.export(
+            filepath,
+            fmt="json",
+            admin_email=self.admin_email,
+            start_date=start_date,
+            end_date=end_date,
+            newest_first=True
+        ) is not None
+
+    def export(
+        self,
+        filepath: str,
+        fmt: Optional[str] = None,
+        admin_email: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        action_type: Optional[str] = None,
+        newest_first: bool = False
+    ) -> Optional[int]:
+        """
+        Потоковый экспорт audit логов.
+
+        Args:
+            filepath: Путь к файлу; окончание .gz — сжать gzip
+            fmt: jsonl, csv или json (по умолчанию — по расширению, иначе jsonl)
+            admin_email: Только действия этого администратора (None — всех)
+            start_date: Начальная дата
+            end_date: Конечная дата
+            action_type: Фильтр по типу действия
+            newest_first: Порядок по убыванию времени
+
+        Returns:
+            Количество выгруженных записей или None при ошибке
+
+        Строки читаются из курсора пачками по EXPORT_FETCH_ROWS и сразу
+        пишутся в файл — расход памяти не зависит от объёма журнала.
+        Запись идёт во временный файл рядом, готовый файл появляется целиком.
         """
+        self.flush()
+        where, params = [], []
+        if admin_email:
+            where.append("a.admin_email = ?")
+            params.append(admin_email)
+        if start_date:
+            where.append("a.timestamp >= ?")
+            params.append(start_date.isoformat())
+        if end_date:
+            where.append("a.timestamp <= ?")
+            params.append(end_date.isoformat())
+        if action_type:
+            where.append("a.action = ?")
+            params.append(action_type)
         try:
-            # Получить записи
-            entries = self.get_admin_actions(
-                start_date=start_date,
-                end_date=end_date,
-                limit=10000  # Большой лимит для экспорта
+            count = self._export_query(
+                filepath, self._export_format(filepath, fmt),
+                " AND ".join(where) or "1=1", params,
+                order="DESC" if newest_first else "ASC"
             )
-            
-            # Конвертировать в dict
-            data = [entry.to_dict() for entry in entries]
-            
-            # Сохранить в файл
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"Audit log exported to {filepath}: {len(data)} entries")
-            return True
-            
+            logger.info(f"Audit log exported to {filepath}: {count} entries")
+            return count
         except Exception as e:
             logger.error(f"Failed to export audit log: {e}")
-            return False
+            return None
+
+    def _export_format(self, filepath, fmt: Optional[str]) -> str:
+        if fmt:
+            if fmt not in self.EXPORT_FORMATS:
+                raise ValueError(f"Unknown export format: {fmt}")
+            return fmt
+        name = str(filepath).lower()
+        if name.endswith(".gz"):
+            name = name[:-3]
+        return next((f for f in self.EXPORT_FORMATS if name.endswith("." + f)), "jsonl")
+
+    @staticmethod
+    def _open_text(path, mode: str = "r", compressed: Optional[bool] = None):
+        """Текстовый файл UTF-8; *.gz (или compressed=True) — через gzip"""
+        if str(path).endswith(".gz") if compressed is None else compressed:
+            return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+        return open(path, mode, encoding="utf-8", newline="")
+
+    def _iter_rows(self, sql: str, params: Sequence) -> Iterator[tuple]:
+        """Строки запроса пачками fetchmany — в памяти не больше одной пачки"""
+        cursor = self.conn.execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(self.EXPORT_FETCH_ROWS)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def _export_query(self, filepath, fmt: str, where: str, params: Sequence, order: str = "ASC",
+                      durable: bool = False) -> int:
+        """
+        Выгрузить строки audit_log по условию where; порядок по timestamp (индекс, без сортировки)
+
+        durable: файл и запись о нём в каталоге сброшены на диск (os.fsync) до возврата —
+        для архива, после которого строки удаляются из БД
+        """
+        rows = self._iter_rows(
+            f"{self._SELECT} FROM audit_log a WHERE {where} ORDER BY a.timestamp {order}",
+            params
+        )
+        tmp_path = f"{filepath}.part"
+        try:
+            with self._open_text(tmp_path, "w", compressed=str(filepath).endswith(".gz")) as f:
+                count = self._write_rows(rows, f, fmt)
+            if durable:
+                self._fsync_path(tmp_path)
+            os.replace(tmp_path, filepath)
+            if durable:
+                self._fsync_dir(os.path.dirname(os.path.abspath(filepath)))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.stats['exported_rows'] += count
+        return count
+
+    @staticmethod
+    def _fsync_path(path):
+        """Сбросить содержимое файла на диск (gzip-обёртка fileno не отдаёт — открываем заново)"""
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _fsync_dir(path):
+        """Сбросить каталог (переименование файла); на Windows каталог не открыть — пропускаем"""
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _write_rows(self, rows, f, fmt: str) -> int:
+        count = 0
+        if fmt == "csv":
+            # Как в таблице: состояния — JSON-строкой, success — 0/1
+            writer = csv.writer(f)
+            writer.writerow(self.FIELDS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        elif fmt == "json":
+            # Тот же вид, что json.dump(list, indent=2), но по одной записи
+            f.write("[")
+            for row in rows:
+                text = json.dumps(self._row_to_dict(row), ensure_ascii=False, indent=2)
+                f.write(("\n  " if count == 0 else ",\n  ") + text.replace("\n", "\n  "))
+                count += 1
+            f.write("\n]" if count else "]")
+        else:
+            encode, to_dict = self._JSONL_ENCODER.encode, self._row_to_dict
+            for row in rows:
+                f.write(encode(to_dict(row)))
+                f.write("\n")
+                count += 1
+        return count
     
     def search(
         self,
@@ -579,61 +1036,304 @@ class AuditLogger:
             query: Поисковый запрос
             search_in: Поля для поиска (admin_email, action, entity_id, etc.)
             limit: Максимальное количество результатов
-            
+
         Returns:
-            Список найденных записей
+            Список найденных записей (новые первыми)
+
+        Через FTS5 слова запроса ищутся как начала слов в указанных полях;
+        email, ID и коды действий индексируются по частям ("company.com",
+        "ivanov@comp", "STATUS", "USER_STATUS" найдут ivanov@company.com /
+        UPDATE_USER_STATUS). Если FTS5 ничего не нашёл (подстрока внутри
+        слова: "anov"), нет FTS5 или в запросе нет букв/цифр — подстрока
+        через LIKE (полный просмотр таблицы).
         """
         if not search_in:
             search_in = ['admin_email', 'action', 'entity_type', 'entity_id']
         
+        unknown = [f for f in search_in if f not in self.FTS_COLUMNS + ('ip_address', 'hostname')]
+        if unknown:
+            logger.error(f"Unknown audit search fields: {unknown}")
+            return []
+
+        self.flush()
         try:
-            # Построить WHERE clause
-            conditions = []
-            params = []
-            
-            for field in search_in:
-                conditions.append(f"{field} LIKE ?")
-                params.append(f"%{query}%")
-            
-            where_clause = " OR ".join(conditions)
+            match = self._fts_query(query, search_in) if self._fts else None
+            if match:
+                self.stats['fts_queries'] += 1
+                # rowid растёт вместе с timestamp: обход индекса с конца и LIMIT
+                rows = self.conn.execute(f"""
+                    {self._SELECT}
+                    FROM audit_log_fts
+                    JOIN audit_log a ON a.id = audit_log_fts.rowid
+                    WHERE audit_log_fts MATCH ?
+                    ORDER BY audit_log_fts.rowid DESC
+                    LIMIT ?
+                """, (match, limit)).fetchall()
+                if rows:
+                    return [self._row_to_entry(row) for row in rows]
             
-            sql = f"""
-                SELECT 
-                    id, timestamp, admin_email, action, entity_type, entity_id,
-                    before_state, after_state, ip_address, hostname, success, error_message
-                FROM audit_log
+            self.stats['like_queries'] += 1
+            where_clause = " OR ".join(f"a.{field} LIKE ?" for field in search_in)
+            cursor = self.conn.execute(f"""
+                {self._SELECT}
+                FROM audit_log a
                 WHERE {where_clause}
-                ORDER BY timestamp DESC
+                ORDER BY a.timestamp DESC
                 LIMIT ?
-            """
-            params.append(limit)
-            
-            cursor = self.conn.execute(sql, params)
-            
-            entries = []
-            for row in cursor.fetchall():
-                entry = AuditEntry(
-                    id=row[0],
-                    timestamp=row[1],
-                    admin_email=row[2],
-                    action=row[3],
-                    entity_type=row[4],
-                    entity_id=row[5],
-                    before_state=json.loads(row[6]) if row[6] else None,
-                    after_state=json.loads(row[7]) if row[7] else None,
-                    ip_address=row[8],
-                    hostname=row[9],
-                    success=bool(row[10]),
-                    error_message=row[11]
-                )
-                entries.append(entry)
-            
-            return entries
+            """, [f"%{query}%"] * len(search_in) + [limit])
             
+            return [self._row_to_entry(row) for row in cursor.fetchall()]
+
         except Exception as e:
             logger.error(f"Failed to search audit log: {e}")
             return []
 
+    # Токен как его видит unicode61: буквы и цифры, остальное — разделители
+    _WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+    def _fts_query(self, query: str, fields: Sequence[str]) -> Optional[str]:
+        """
+        Запрос FTS5 MATCH: каждое слово запроса — фраза из его токенов
+        с префиксом на последнем; слова объединяются через AND.
+        "company.com" -> "company com" *, то есть части email/кода подряд.
+        None — если FTS-поиск неприменим (поле вне индекса, нет токенов).
+        """
+        if any(f not in self.FTS_COLUMNS for f in fields):
+            return None
+        phrases = []
+        for chunk in query.split():
+            tokens = self._WORD_RE.findall(chunk.lower())
+            if tokens:
+                phrases.append('"' + " ".join(tokens) + '" *')
+        if not phrases:
+            return None
+        return "{" + " ".join(fields) + "} : (" + " AND ".join(phrases) + ")"
+
+    # ------------------------------------------------------------------
+    # Хранение по месяцам: архив старых месяцев в сжатых файлах
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _month_range(month: str):
+        """'2025-11' -> ('2025-11', '2025-12'): границы для сравнения ISO-строк timestamp"""
+        year, mon = (int(x) for x in month.split("-"))
+        year, mon = (year + 1, 1) if mon == 12 else (year, mon + 1)
+        return month, f"{year:04d}-{mon:02d}"
+
+    @classmethod
+    def _dict_to_row(cls, d: Dict[str, Any]) -> tuple:
+        """Обратно к _row_to_dict: запись архива -> строка audit_log"""
+        row = [d[k] for k in cls.FIELDS]
+        row[6] = json.dumps(row[6], ensure_ascii=False) if row[6] else None
+        row[7] = json.dumps(row[7], ensure_ascii=False) if row[7] else None
+        row[10] = 1 if row[10] else 0
+        return tuple(row)
+
+    def _archive_file_name(self, month: str) -> str:
+        """Свободное имя файла месяца: повторная архивация того же месяца — новая часть"""
+        taken = {r[0] for r in self.conn.execute(
+            "SELECT file FROM audit_archive WHERE month = ?", (month,)
+        )}
+        name, part = f"audit_{month}.jsonl.gz", 1
+        while name in taken:
+            part += 1
+            name = f"audit_{month}.{part}.jsonl.gz"
+        return name
+
+    def archive_month(self, month: str) -> Optional[Dict[str, Any]]:
+        """
+        Выгрузить месяц в архив и удалить его из audit_log.
+
+        Args:
+            month: Месяц 'ГГГГ-ММ' (UTC, как timestamp записей)
+
+        Returns:
+            Строка оглавления архива (file, month, rows, first_ts, last_ts)
+            или None, если за месяц нет записей или произошла ошибка
+
+        Файл пишется потоково, целиком и с fsync до удаления строк; запись в
+        оглавление audit_archive и удаление — одной транзакцией.
+        Индекс поиска чистится триггером audit_log_fts_ad.
+        """
+        self.flush()
+        start, end = self._month_range(month)
+        try:
+            count, max_id, first_ts, last_ts = self.conn.execute(
+                "SELECT COUNT(*), MAX(id), MIN(timestamp), MAX(timestamp) "
+                "FROM audit_log WHERE timestamp >= ? AND timestamp < ?",
+                (start, end)
+            ).fetchone()
+            if not count:
+                return None
+
+            self.archive_dir.mkdir(parents=True, exist_ok=True)
+            name = self._archive_file_name(month)
+            path = self.archive_dir / name
+            # id <= max_id: строки, дописанные в месяц во время выгрузки, останутся до следующего раза
+            where, params = "a.timestamp >= ? AND a.timestamp < ? AND a.id <= ?", (start, end, max_id)
+            # Архив должен пережить сбой питания: строки удаляются сразу следом
+            written = self._export_query(path, "jsonl", where, params, durable=True)
+
+            with self.conn:
+                deleted = self.conn.execute(
+                    "DELETE FROM audit_log WHERE timestamp >= ? AND timestamp < ? AND id <= ?",
+                    params
+                ).rowcount
+                if deleted != written:
+                    raise RuntimeError(f"archived {written} rows, but {deleted} matched for deletion")
+                self.conn.execute(
+                    "INSERT INTO audit_archive (file, month, rows, first_ts, last_ts, archived_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, month, written, first_ts, last_ts, datetime.utcnow().isoformat())
+                )
+        except Exception as e:
+            logger.error(f"Failed to archive audit month {month}: {e}")
+            return None
+
+        self.stats['archived_months'] += 1
+        self.stats['archived_rows'] += written
+        logger.info(f"Audit month {month} archived to {path}: {written} entries")
+        return {'file': name, 'month': month, 'rows': written, 'first_ts': first_ts, 'last_ts': last_ts}
+
+    def run_retention(
+        self,
+        keep_months: Optional[int] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        Перенести в архив месяцы старше срока хранения.
+
+        Args:
+            keep_months: Сколько полных месяцев до текущего оставить в БД
+                (по умолчанию config.AUDIT_RETENTION_MONTHS; 0 — ничего не переносить)
+            now: Текущее время UTC (для тестов)
+
+        Returns:
+            {'cutoff': первый хранимый месяц, 'archived': [строки оглавления], 'rows': всего}
+        """
+        if keep_months is None:
+            try:
+                from config import AUDIT_RETENTION_MONTHS as keep_months
+            except Exception:
+                keep_months = 12
+        result = {'cutoff': None, 'archived': [], 'rows': 0}
+        if keep_months <= 0:
+            return result
+
+        now = now or datetime.utcnow()
+        months = now.year * 12 + now.month - 1 - keep_months
+        cutoff = f"{months // 12:04d}-{months % 12 + 1:02d}"
+        result['cutoff'] = cutoff
+
+        self.flush()
+        while True:
+            # Самая старая запись — по индексу, без просмотра таблицы
+            oldest = self.conn.execute("SELECT MIN(timestamp) FROM audit_log").fetchone()[0]
+            if not oldest or oldest >= cutoff:
+                break
+            info = self.archive_month(oldest[:7])
+            if info is None:
+                break
+            result['archived'].append(info)
+            result['rows'] += info['rows']
+        return result
+
+    def list_archives(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Архивы (строки оглавления), пересекающиеся с периодом, по возрастанию месяца"""
+        query = "SELECT file, month, rows, first_ts, last_ts, archived_at FROM audit_archive WHERE 1=1"
+        params = []
+        if start_date:
+            query += " AND month >= ?"
+            params.append(start_date.isoformat()[:7])
+        if end_date:
+            query += " AND month <= ?"
+            params.append(end_date.isoformat()[:7])
+        query += " ORDER BY month, archived_at"
+        try:
+            cursor = self.conn.execute(query, params)
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Failed to list audit archives: {e}")
+            return []
+
+    def iter_archived(
+        self,
+        admin_email: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        action_type: Optional[str] = None
+    ) -> Iterator[AuditEntry]:
+        """
+        Записи из архивов за период — потоково, файл за файлом.
+
+        Args:
+            admin_email: Только действия этого администратора (None — всех)
+            start_date: Начальная дата
+            end_date: Конечная дата
+            action_type: Фильтр по типу действия
+
+        Читаются только файлы месяцев, попадающих в период.
+        Для полнотекстового поиска и статистики — open_archive.
+        """
+        start = start_date.isoformat() if start_date else None
+        end = end_date.isoformat() if end_date else None
+        for archive in self.list_archives(start_date, end_date):
+            path = self.archive_dir / archive['file']
+            if not path.exists():
+                logger.error(f"Audit archive file is missing: {path}")
+                continue
+            with self._open_text(path) as f:
+                for line in f:
+                    d = json.loads(line)
+                    if ((start and d['timestamp'] < start) or (end and d['timestamp'] > end)
+                            or (admin_email and d['admin_email'] != admin_email)
+                            or (action_type and d['action'] != action_type)):
+                        continue
+                    yield AuditEntry(**d)
+
+    def open_archive(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        db_path: str = ":memory:"
+    ) -> Optional["AuditLogger"]:
+        """
+        Поднять архивные месяцы в отдельную БД для запросов.
+
+        Args:
+            start_date: Начальная дата (по месяцу)
+            end_date: Конечная дата (по месяцу)
+            db_path: Куда загрузить (по умолчанию — в память)
+
+        Returns:
+            AuditLogger над этой БД (search, get_statistics, export...)
+            или None при ошибке. Рабочий audit_log не затрагивается.
+        """
+        try:
+            archive = AuditLogger(
+                sqlite3.connect(db_path), self.admin_email,
+                batch_size=self.EXPORT_FETCH_ROWS, archive_dir=self.archive_dir
+            )
+            batch = []
+            for info in self.list_archives(start_date, end_date):
+                with self._open_text(self.archive_dir / info['file']) as f:
+                    for line in f:
+                        batch.append(self._dict_to_row(json.loads(line)))
+                        if len(batch) >= self.EXPORT_FETCH_ROWS:
+                            archive._insert_rows(batch)
+                            batch = []
+            if batch:
+                archive._insert_rows(batch)
+            return archive
+        except Exception as e:
+            logger.error(f"Failed to open audit archive: {e}")
+            return None
+
 
 # ============================================================================
 # CONTEXT MANAGER
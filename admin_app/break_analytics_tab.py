@@ -9,6 +9,9 @@
 - Статистика
 - Экспорт в Excel
 - Отчёты и графики
+- Табель рабочего времени (admin_app.timesheet через BreakManager.get_timesheet);
+  табель читает все листы WorkLog_*, поэтому строится в AdminDataLoader,
+  а не в GUI-потоке
 """
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
@@ -21,18 +24,29 @@ from PyQt5.QtGui import QFont, QColor
 from datetime import datetime, timedelta, date
 import logging
 
+from admin_app.data_loader import AdminDataLoader
+
 logger = logging.getLogger(__name__)
 
 
 class BreakAnalyticsTab(QWidget):
     """Вкладка аналитики перерывов"""
     
-    def __init__(self, break_manager, parent=None):
+    REPORT_KEY = "analytics_timesheet"   # ключ табеля в AdminDataLoader
+
+    def __init__(self, break_manager, parent=None, loader: AdminDataLoader = None):
         super().__init__(parent)
         self.break_mgr = break_manager
         self.current_violations = []
         self.dashboard_active_breaks_data = []  # Данные для клика
         self.dashboard_over_limit_data = []     # Данные для клика
+
+        # Табель строится в фоне; loader окна общий, иначе свой
+        self.loader = loader if loader is not None else AdminDataLoader(self)
+        self.loader.loaded.connect(self._on_report_loaded)
+        self.loader.failed.connect(self._on_report_failed)
+        self._report_request = None  # (тип, с, по, email) ожидаемого табеля
+
         self._setup_ui()
         
         # Автообновление Dashboard каждые 30 секунд
@@ -329,6 +343,7 @@ class BreakAnalyticsTab(QWidget):
         self.report_type.addItem("Топ нарушителей", "top_violators")
         self.report_type.addItem("Динамика по дням", "dynamics")
         self.report_type.addItem("Детальный отчёт по сотруднику", "employee_detail")
+        self.report_type.addItem("Табель рабочего времени", "timesheet")
         report_type_layout.addWidget(self.report_type)
         
         report_type_layout.addStretch()
@@ -378,7 +393,7 @@ class BreakAnalyticsTab(QWidget):
         self.report_display = QLabel("Выберите тип отчёта и нажмите 'Сгенерировать'")
         self.report_display.setAlignment(Qt.AlignTop | Qt.AlignLeft)
         self.report_display.setWordWrap(True)
-        self.report_display.setStyleSheet("background-color: white; padding: 10px; border: 1px solid #ccc;")
+        self.report_display.setStyleSheet("background-color: white; padding: 10px; border: 1px solid #ccc; font-family: monospace;")
         self.report_display.setMinimumHeight(400)
         layout.addWidget(self.report_display)
         
@@ -497,6 +512,10 @@ class BreakAnalyticsTab(QWidget):
         date_from = self.report_date_from.date().toString("yyyy-MM-dd")
         date_to = self.report_date_to.date().toString("yyyy-MM-dd")
         
+        if report_type in ("employee_detail", "timesheet"):
+            self._request_timesheet(report_type, date_from, date_to)
+            return
+
         try:
             if report_type == "summary":
                 report_text = self._generate_summary_report(date_from, date_to)
@@ -506,8 +525,6 @@ class BreakAnalyticsTab(QWidget):
                 report_text = self._generate_top_violators(date_from, date_to)
             elif report_type == "dynamics":
                 report_text = self._generate_dynamics_report(date_from, date_to)
-            elif report_type == "employee_detail":
-                report_text = self._generate_employee_detail(date_from, date_to)
             else:
                 report_text = "Неизвестный тип отчёта"
             
@@ -517,6 +534,43 @@ class BreakAnalyticsTab(QWidget):
             logger.error(f"Error generating report: {e}")
             self.report_display.setText(f"Ошибка генерации отчёта: {e}")
     
+    def _request_timesheet(self, report_type, date_from, date_to):
+        """Запрашивает табель в фоне; отчёт дорисует _on_report_loaded"""
+        email = self.filter_email.text().strip().lower()
+        if report_type == "employee_detail" and not email:
+            self.report_display.setText("Детальный отчёт по сотруднику\n(Введите email в фильтрах и примените)")
+            return
+        self._report_request = (report_type, date_from, date_to, email)
+        self.report_display.setText("Загрузка табеля…")
+        self.loader.request(
+            self.REPORT_KEY,
+            lambda: self.break_mgr.get_timesheet(date_from, date_to),
+            max_age=0
+        )
+
+    def _on_report_loaded(self, key, data, from_cache):
+        # кэш мог остаться от другого периода — ждём свежий табель
+        if key != self.REPORT_KEY or from_cache or self._report_request is None:
+            return
+        report_type, date_from, date_to, email = self._report_request
+        self._report_request = None
+        try:
+            if report_type == "employee_detail":
+                report_text = self._generate_employee_detail(data, email, date_from, date_to)
+            else:
+                report_text = self._generate_timesheet_report(data, date_from, date_to)
+        except Exception as e:
+            logger.error(f"Error generating report: {e}")
+            report_text = f"Ошибка генерации отчёта: {e}"
+        self.report_display.setText(report_text)
+
+    def _on_report_failed(self, key, error):
+        if key != self.REPORT_KEY or self._report_request is None:
+            return
+        self._report_request = None
+        logger.error(f"Error generating report: {error}")
+        self.report_display.setText(f"Ошибка генерации отчёта: {error}")
+
     def export_report_to_excel(self):
         """Экспортирует текущий отчёт в Excel"""
         QMessageBox.information(self, "В разработке", "Экспорт отчётов в Excel будет добавлен в следующей версии")
@@ -743,9 +797,50 @@ class BreakAnalyticsTab(QWidget):
         """Динамика по дням"""
         return "Динамика нарушений по дням\n(В разработке - требуется построение графика)"
     
-    def _generate_employee_detail(self, date_from, date_to):
-        """Детальный отчёт по сотруднику"""
-        return "Детальный отчёт по сотруднику\n(Введите email в фильтрах и примените)"
+    def _generate_employee_detail(self, sheet, email, date_from, date_to):
+        """Детальный отчёт по сотруднику: табель по дням"""
+        from admin_app.timesheet import format_minutes
+
+        rows = sheet.for_email(email).rows()
+        report = f"ДЕТАЛЬНЫЙ ОТЧЁТ: {email}\nПериод: {date_from} — {date_to}\n\n"
+        if not rows:
+            return report + "За выбранный период рабочего времени нет."
+
+        report += f"{'Дата':10}  {'Приход':6}  {'Уход':6}  {'Работа':>6}  {'Перерывы':>8}  {'Обед':>5}  {'Переработка':>11}\n"
+        for r in rows:
+            report += (
+                f"{r['date']}  {r['first_in'][11:16]:6}  {r['last_out'][11:16]:6}  "
+                f"{format_minutes(r['work_min']):>6}  {format_minutes(r['break_min']):>8}  "
+                f"{format_minutes(r['lunch_min']):>5}  {format_minutes(r['overtime_min']):>11}\n"
+            )
+        total = sum(r["work_min"] for r in rows)
+        overtime = sum(r["overtime_min"] for r in rows)
+        report += f"\nИтого: {len(rows)} дн., работа {format_minutes(total)}, переработка {format_minutes(overtime)}"
+        return report
+
+    def _generate_timesheet_report(self, sheet, date_from, date_to):
+        """Табель рабочего времени по сотрудникам за период"""
+        from admin_app.timesheet import format_minutes
+
+        summary = sheet.by_user()
+        report = f"ТАБЕЛЬ РАБОЧЕГО ВРЕМЕНИ\nПериод: {date_from} — {date_to}\n\n"
+        if not summary:
+            return report + "НЕТ ДАННЫХ\n\nЗа выбранный период рабочего времени нет."
+
+        report += f"{'Сотрудник':30}  {'Дней':>4}  {'Работа':>8}  {'Перерывы':>8}  {'Обед':>7}  {'Переработка':>11}\n"
+        for r in summary:
+            report += (
+                f"{r['email'][:30]:30}  {r['days']:>4}  {format_minutes(r['work_min']):>8}  "
+                f"{format_minutes(r['break_min']):>8}  {format_minutes(r['lunch_min']):>7}  "
+                f"{format_minutes(r['overtime_min']):>11}\n"
+            )
+        report += (
+            f"\nСотрудников: {len(summary)}, работа всего: "
+            f"{format_minutes(sum(r['work_min'] for r in summary))}, переработка: "
+            f"{format_minutes(sum(r['overtime_min'] for r in summary))}\n"
+            "Переработка — работа вне окна назначенной смены."
+        )
+        return report
 
 
     def _on_dashboard_card_click(self, card_id):
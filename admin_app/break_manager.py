@@ -58,6 +58,15 @@ class BreakSchedule:
     windows: List[BreakWindow]
 
 
+@dataclass
+class ScheduleAssignment:
+    """Назначение графика сотруднику (для массового назначения)"""
+    email: str
+    schedule_id: str
+    effective_date: Optional[str] = None  # "YYYY-MM-DD", по умолчанию сегодня
+    end_date: Optional[str] = None        # "YYYY-MM-DD", если в листе есть колонка EndDate
+
+
 class BreakManager:
     """Менеджер системы перерывов v2.0"""
     
@@ -105,6 +114,16 @@ class BreakManager:
             self.SEVERITY_WARNING = "WARNING"
             self.SEVERITY_CRITICAL = "CRITICAL"
     
+    # =================== ГРАФИК СМЕН ===================
+
+    def get_shift_calendar(self, force: bool = False):
+        """
+        Разобранный график смен (ShiftCalendar) из общего с админкой кэша:
+        повторные обращения в пределах TTL не ходят в API.
+        """
+        from admin_app.shift_calendar import get_shift_calendar
+        return get_shift_calendar(self.sheets, force=force)
+
     # =================== УПРАВЛЕНИЕ ШАБЛОНАМИ ===================
     
     def create_schedule(
@@ -131,31 +150,37 @@ class BreakManager:
             True если успешно
         """
         try:
-            ws = self.sheets.get_worksheet(self.SCHEDULES_SHEET)
+            rows = self._build_schedule_rows(schedule_id, name, shift_start, shift_end, limits, windows)
             
-            # Формируем строки для записи
-            rows = []
+            # Одна операция записи; существующий шаблон с тем же ID заменяется
+            self.replace_schedule_block(schedule_id, rows)
             
-            # Для каждого лимита создаём строку
-            for limit in limits:
-                # Находим окна для этого типа перерыва
-                break_windows = [w for w in windows if w.get('break_type') == limit['break_type']]
-                
-                if break_windows:
-                    for window in break_windows:
-                        rows.append([
-                            schedule_id,
-                            name,
-                            shift_start,
-                            shift_end,
-                            limit['break_type'],
-                            str(limit['time_minutes']),
-                            window.get('start', ''),
-                            window.get('end', ''),
-                            str(window.get('priority', 1))
-                        ])
-                else:
-                    # Если нет окон, всё равно создаём строку (окно = весь день)
+            logger.info(f"Created schedule {schedule_id} with {len(rows)} rows")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to create schedule: {e}", exc_info=True)
+            return False
+
+    @staticmethod
+    def _build_schedule_rows(
+        schedule_id: str,
+        name: str,
+        shift_start: str,
+        shift_end: str,
+        limits: List[Dict],
+        windows: List[Dict]
+    ) -> List[List[str]]:
+        """Строки листа шаблона: по одной на пару лимит × окно"""
+        rows = []
+
+        # Для каждого лимита создаём строку
+        for limit in limits:
+            # Находим окна для этого типа перерыва
+            break_windows = [w for w in windows if w.get('break_type') == limit['break_type']]
+
+            if break_windows:
+                for window in break_windows:
                     rows.append([
                         schedule_id,
                         name,
@@ -163,25 +188,145 @@ class BreakManager:
                         shift_end,
                         limit['break_type'],
                         str(limit['time_minutes']),
-                        shift_start,  # Окно = вся смена
-                        shift_end,
-                        "1"
+                        window.get('start', ''),
+                        window.get('end', ''),
+                        str(window.get('priority', 1))
                     ])
-            
-            # Записываем все строки
-            for row in rows:
-                self.sheets._request_with_retry(lambda: ws.append_row(row))
-            
-            logger.info(f"Created schedule {schedule_id} with {len(rows)} rows")
-            
-            # Сбрасываем кэш
-            self._cache.pop(schedule_id, None)
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to create schedule: {e}", exc_info=True)
-            return False
+            else:
+                # Если нет окон, всё равно создаём строку (окно = весь день)
+                rows.append([
+                    schedule_id,
+                    name,
+                    shift_start,
+                    shift_end,
+                    limit['break_type'],
+                    str(limit['time_minutes']),
+                    shift_start,  # Окно = вся смена
+                    shift_end,
+                    "1"
+                ])
+
+        return rows
+
+    def replace_schedule_block(self, schedule_id: str, rows: List[List[str]]) -> Dict[str, int]:
+        """
+        Заменяет строки шаблона schedule_id на rows минимальным набором изменений
+
+        Одно чтение листа, затем, как правило, ОДИН запрос записи:
+        - изменившиеся строки шаблона перезаписываются на месте;
+        - лишние старые строки очищаются (пустые строки _read_table пропускает);
+        - новые строки занимают пустые строки листа, затем строки сетки
+          за последней заполненной; только если сетка кончилась — append_rows.
+        Все перезаписи и очистки уходят одним batch_update, поэтому шаблон
+        не остаётся записанным наполовину. Чистое удаление — один batch_clear.
+
+        Args:
+            schedule_id: ID шаблона
+            rows: Новые строки шаблона ([] — удалить шаблон)
+
+        Returns:
+            {"updated": N, "cleared": N, "appended": N, "unchanged": N, "requests": N}
+        """
+        ws = self.sheets.get_worksheet(self.SCHEDULES_SHEET)
+        values = self.sheets._request_with_retry(ws.get_all_values) or []
+
+        header = values[0] if values else []
+        try:
+            sid_idx = header.index("ScheduleID")
+        except ValueError:
+            sid_idx = 0
+
+        # Номера строк листа (с 1), занятые шаблоном
+        old_rows = [
+            (num, row) for num, row in enumerate(values[1:], start=2)
+            if len(row) > sid_idx and row[sid_idx] == schedule_id
+        ]
+
+        stats = {"updated": 0, "cleared": 0, "appended": 0, "unchanged": 0, "requests": 0}
+        changes: List[Tuple[int, List[str], List[str]]] = []
+
+        for i, (num, old) in enumerate(old_rows):
+            if i < len(rows):
+                new = [str(c) for c in rows[i]]
+                if self._same_row(new, old):
+                    stats["unchanged"] += 1
+                    continue
+                changes.append((num, new, old))
+                stats["updated"] += 1
+            else:
+                changes.append((num, [], old))
+                stats["cleared"] += 1
+
+        extra = [[str(c) for c in r] for r in rows[len(old_rows):]]
+        appended, stats["requests"] = self._write_rows(ws, values, changes, extra, clear=not rows)
+        stats["updated"] += len(extra) - appended
+        stats["appended"] = appended
+
+        # Сбрасываем кэш
+        self._cache.pop(schedule_id, None)
+
+        logger.debug(f"Replaced schedule block {schedule_id}: {stats}")
+        return stats
+
+    @staticmethod
+    def _same_row(new: List[str], old: List[str]) -> bool:
+        """Строки совпадают с точностью до пустых ячеек в конце"""
+        width = max(len(new), len(old))
+        return list(new) + [""] * (width - len(new)) == list(old) + [""] * (width - len(old))
+
+    def _write_rows(
+        self,
+        ws,
+        values: List[List[str]],
+        changes: List[Tuple[int, List[str], List[str]]],
+        new_rows: List[List[str]],
+        clear: bool = False
+    ) -> Tuple[int, int]:
+        """
+        Записывает изменения строк листа минимальным числом запросов
+
+        Args:
+            ws: Лист
+            values: Снимок листа (get_all_values), по нему ищутся свободные строки
+            changes: [(номер строки, новые значения, старые значения), ...] — перезапись на месте
+            new_rows: Новые строки: в пустые строки листа, затем в строки сетки
+                за последней заполненной; остаток — append_rows
+            clear: changes только очищают строки — отправить batch_clear
+
+        Returns:
+            (дописано через append_rows, число запросов записи)
+        """
+        free_rows = [
+            num for num, row in enumerate(values[1:], start=2)
+            if not any((c or "").strip() for c in row)
+        ]
+        # Строки сетки за последней заполненной тоже свободны (без запроса);
+        # на пустом листе это строка 1 — туда ляжет заголовок
+        grid_rows = getattr(ws, "row_count", 0) or 0
+        free_rows.extend(range(len(values) + 1, grid_rows + 1))
+
+        updates: List[Dict] = []
+        placed = [(num, new, []) for num, new in zip(free_rows, new_rows)]
+        for num, new, old in list(changes) + placed:
+            width = max(len(new), len(old), 1)
+            updates.append({
+                "range": f"A{num}:{self._col_letter(width)}{num}",
+                "values": [list(new) + [""] * (width - len(new))],
+            })
+        to_append = new_rows[len(free_rows):]
+
+        requests = 0
+        if updates and clear:
+            # Только удаление: очистить диапазоны
+            self.sheets._request_with_retry(ws.batch_clear, [u["range"] for u in updates])
+            requests += 1
+        elif updates:
+            self.sheets._request_with_retry(ws.batch_update, updates, value_input_option="RAW")
+            requests += 1
+        if to_append:
+            self.sheets._request_with_retry(ws.append_rows, to_append, value_input_option="RAW")
+            requests += 1
+        return len(to_append), requests
     
     def get_schedule(self, schedule_id: str) -> Optional[BreakSchedule]:
         """Получает шаблон графика по ID"""
@@ -273,36 +418,9 @@ class BreakManager:
             return []
     
     def delete_schedule(self, schedule_id: str) -> bool:
-        """Удаляет шаблон графика"""
+        """Удаляет шаблон графика (одним batch_clear его строк)"""
         try:
-            ws = self.sheets.get_worksheet(self.SCHEDULES_SHEET)
-            values = self.sheets._request_with_retry(ws.get_all_values)
-            
-            if not values or len(values) < 2:
-                return False
-            
-            header = values[0]
-            body = values[1:]
-            
-            # Находим индекс колонки ScheduleID
-            try:
-                sid_idx = header.index("ScheduleID")
-            except ValueError:
-                logger.error("Column ScheduleID not found")
-                return False
-            
-            # Фильтруем строки (удаляем те, где ScheduleID совпадает)
-            filtered = [r for r in body if not r or len(r) <= sid_idx or r[sid_idx] != schedule_id]
-            
-            # Очищаем лист и записываем заново
-            ws.clear()
-            ws.append_row(header)
-            for row in filtered:
-                ws.append_row(row)
-            
-            # Сбрасываем кэш
-            self._cache.pop(schedule_id, None)
-            
+            self.replace_schedule_block(schedule_id, [])
             logger.info(f"Deleted schedule: {schedule_id}")
             return True
             
@@ -364,6 +482,144 @@ class BreakManager:
             logger.error(f"Failed to assign schedule: {e}", exc_info=True)
             return False
     
+    ASSIGNMENT_COLUMNS = ["Email", "ScheduleID", "EffectiveDate", "AssignedBy"]
+
+    def assign_schedules_bulk(
+        self,
+        assignments: List[ScheduleAssignment],
+        admin_email: str
+    ) -> List[Dict[str, str]]:
+        """
+        Массовое назначение графиков
+
+        Одно чтение листа шаблонов и одно — листа назначений; все изменения
+        сверяются с этим снимком и уходят одной пакетной записью
+        (batch_update; append_rows — только если в сетке листа нет места).
+
+        Args:
+            assignments: ScheduleAssignment или кортежи (email, schedule_id[, с, по])
+            admin_email: Кто назначает (колонка AssignedBy)
+
+        Returns:
+            Отчёт по каждому элементу, в исходном порядке:
+            {"email", "schedule_id", "status", "message"}, где status —
+            created / updated / unchanged / skipped / error
+        """
+        items = [a if isinstance(a, ScheduleAssignment) else ScheduleAssignment(*a) for a in assignments]
+        report = [
+            {"email": (a.email or "").strip().lower(), "schedule_id": (a.schedule_id or "").strip(),
+             "status": "", "message": ""}
+            for a in items
+        ]
+        if not items:
+            return report
+
+        def fail(i: int, message: str, status: str = "error"):
+            report[i]["status"] = status
+            report[i]["message"] = message
+
+        try:
+            known_ids = {
+                r.get("ScheduleID", "").strip()
+                for r in self.sheets._read_table(self.sheets.get_worksheet(self.SCHEDULES_SHEET))
+            }
+            ws = self.sheets.get_worksheet(self.ASSIGNMENTS_SHEET)
+            values = self.sheets._request_with_retry(ws.get_all_values) or []
+        except Exception as e:
+            logger.error(f"Bulk assign: failed to read sheets: {e}", exc_info=True)
+            for i in range(len(items)):
+                fail(i, f"Не удалось прочитать листы: {e}")
+            return report
+
+        header = values[0] if values else list(self.ASSIGNMENT_COLUMNS)
+        col = {name: idx for idx, name in enumerate(header)}
+        email_idx = col.get("Email", 0)
+        existing: Dict[str, Tuple[int, List[str]]] = {}
+        for num, row in enumerate(values[1:], start=2):
+            if len(row) > email_idx and row[email_idx].strip():
+                existing.setdefault(row[email_idx].strip().lower(), (num, row))
+
+        # Проверка и дедупликация: при повторе email действует последняя запись
+        last_for_email: Dict[str, int] = {}
+        for i, a in enumerate(items):
+            email, sid = report[i]["email"], report[i]["schedule_id"]
+            try:
+                start = datetime.strptime(a.effective_date, "%Y-%m-%d").date() if a.effective_date else None
+                end = datetime.strptime(a.end_date, "%Y-%m-%d").date() if a.end_date else None
+            except ValueError:
+                fail(i, "Дата должна быть в формате YYYY-MM-DD")
+                continue
+            if not email or "@" not in email:
+                fail(i, "Некорректный email")
+            elif sid not in known_ids:
+                fail(i, f"Шаблон {sid or '—'} не найден")
+            elif start and end and end < start:
+                fail(i, "Дата окончания раньше даты начала")
+            else:
+                if email in last_for_email:
+                    fail(last_for_email[email], "Перекрыто более поздней записью пакета", "skipped")
+                last_for_email[email] = i
+
+        today = date.today().isoformat()
+        width = len(header)
+        changes: List[Tuple[int, List[str], List[str]]] = []
+        new_rows: List[List[str]] = []
+        new_items: List[int] = []
+        changed_items: List[int] = []
+
+        for email, i in last_for_email.items():
+            a = items[i]
+            fields = {"Email": email, "ScheduleID": report[i]["schedule_id"]}
+            if a.end_date:
+                if "EndDate" in col:
+                    fields["EndDate"] = a.end_date
+                else:
+                    report[i]["message"] = "В листе нет колонки EndDate — дата окончания не сохранена"
+
+            if email in existing:
+                num, old = existing[email]
+                old = list(old) + [""] * (width - len(old))
+                # Тот же шаблон и те же даты — не пишем (AssignedBy не трогаем)
+                target = dict(fields, EffectiveDate=a.effective_date) if a.effective_date else fields
+                if all(old[col[k]] == v for k, v in target.items() if k in col):
+                    report[i]["status"] = "unchanged"
+                    continue
+                fields["EffectiveDate"] = a.effective_date or today
+                fields["AssignedBy"] = admin_email
+                new = list(old)
+                for k, v in fields.items():
+                    if k in col:
+                        new[col[k]] = v
+                changes.append((num, new, old))
+                changed_items.append(i)
+                report[i]["status"] = "updated"
+            else:
+                fields["EffectiveDate"] = a.effective_date or today
+                fields["AssignedBy"] = admin_email
+                new = [""] * width
+                for k, v in fields.items():
+                    if k in col:
+                        new[col[k]] = v
+                new_rows.append(new)
+                new_items.append(i)
+                report[i]["status"] = "created"
+
+        if changes or new_rows:
+            if not values:
+                new_rows.insert(0, list(header))
+            try:
+                _, requests = self._write_rows(ws, values, changes, new_rows)
+                logger.info(
+                    f"Bulk assign by {admin_email}: {len(new_items)} created, "
+                    f"{len(changed_items)} updated in {requests} write request(s)"
+                )
+            except Exception as e:
+                logger.error(f"Bulk assign write failed: {e}", exc_info=True)
+                for i in changed_items + new_items:
+                    fail(i, f"Ошибка записи: {e}")
+
+        return report
+
     def get_user_schedule(self, email: str) -> Optional[BreakSchedule]:
         """Получает назначенный график пользователя"""
         try:
@@ -918,7 +1174,75 @@ class BreakManager:
         except Exception as e:
             logger.error(f"Failed to get usage stats: {e}")
             return {}
-    
+
+    # =================== ТАБЕЛЬ ===================
+
+    def get_shift_windows(self) -> Dict[str, Tuple[str, str]]:
+        """email -> (ShiftStart, ShiftEnd) по назначенным графикам (один batchGet)"""
+        try:
+            tables = self.sheets._batch_read_tables([self.SCHEDULES_SHEET, self.ASSIGNMENTS_SHEET])
+            return self._shift_windows(tables)
+        except Exception as e:
+            logger.error(f"Failed to get shift windows: {e}")
+            return {}
+
+    def _shift_windows(self, tables: Dict[str, List[Dict]]) -> Dict[str, Tuple[str, str]]:
+        """Окна смен из уже прочитанных листов графиков и назначений"""
+        schedules = {}
+        for row in tables.get(self.SCHEDULES_SHEET, []):
+            sid = row.get("ScheduleID", "").strip()
+            if sid and sid not in schedules and row.get("ShiftStart") and row.get("ShiftEnd"):
+                schedules[sid] = (row["ShiftStart"], row["ShiftEnd"])
+        windows = {}
+        for row in tables.get(self.ASSIGNMENTS_SHEET, []):
+            email = row.get("Email", "").strip().lower()
+            window = schedules.get(row.get("ScheduleID", "").strip())
+            if email and window:
+                windows[email] = window
+        return windows
+
+    def get_worklog_records(self) -> List[List[Dict]]:
+        """Строки всех листов WorkLog_* (по листу на группу) одним batchGet"""
+        titles = [t for t in self.sheets.list_worksheet_titles() if t.startswith("WorkLog")]
+        if not titles:
+            return []
+        tables = self.sheets._batch_read_tables(titles)
+        return [tables.get(t, []) for t in titles]
+
+    def get_timesheet(
+        self,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        default_shift: Optional[Tuple[str, str]] = None
+    ):
+        """
+        Табель рабочего времени (admin_app.timesheet.TimesheetTotals) по
+        листам WorkLog_*: работа, перерывы, обеды, переработка вне окна
+        назначенной смены — по сотрудникам и дням.
+
+        Листы WorkLog_*, графики и назначения читаются одним batchGet;
+        строки вне периода отбрасываются до разбора времени. Вызывать
+        из фонового потока (AdminDataLoader), не из GUI.
+        """
+        from admin_app.timesheet import StatusIntervals, compute_timesheet
+
+        titles = self.sheets.list_worksheet_titles()
+        worklogs = [t for t in titles if t.startswith("WorkLog")]
+        extra = [t for t in (self.SCHEDULES_SHEET, self.ASSIGNMENTS_SHEET) if t in titles]
+        tables = self.sheets._batch_read_tables(worklogs + extra) if worklogs or extra else {}
+
+        parts = [
+            StatusIntervals.from_records(tables[t], date_from=date_from, date_to=date_to)
+            for t in worklogs if tables.get(t)
+        ]
+        return compute_timesheet(
+            StatusIntervals.concat(parts),
+            shifts=self._shift_windows(tables),
+            default_shift=default_shift,
+            date_from=date_from,
+            date_to=date_to
+        )
+
     # =================== МЕТОДЫ ДЛЯ ОБРАТНОЙ СОВМЕСТИМОСТИ ===================
     
     def list_schedule_templates(self) -> List[Dict]:
@@ -996,12 +1320,9 @@ class BreakManager:
         """
         Обновляет шаблон графика (обратная совместимость)
         
-        Фактически удаляет старый и создаёт новый
+        create_schedule заменяет строки шаблона на месте одной записью,
+        отдельное удаление не нужно
         """
-        # Удаляем старый
-        self.delete_schedule(schedule_id)
-        
-        # Создаём новый
         return self.create_schedule_template(
             schedule_id=schedule_id,
             name=name,
@@ -0,0 +1,164 @@
+# admin_app/bulk_assign_dialog.py
+"""
+Диалог массового назначения графика перерывов
+
+Выбор шаблона, периода и списка сотрудников (фильтр по группе и ФИО/email);
+результат — список ScheduleAssignment для BreakManager.assign_schedules_bulk.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import QDate, Qt
+from PyQt5.QtWidgets import (
+    QCheckBox, QComboBox, QDateEdit, QDialog, QHBoxLayout, QLabel, QLineEdit,
+    QListWidget, QListWidgetItem, QMessageBox, QPushButton, QVBoxLayout
+)
+
+from admin_app.break_manager import ScheduleAssignment
+
+ALL_GROUPS = "Все группы"
+
+
+class BulkAssignDialog(QDialog):
+    """Диалог назначения одного шаблона многим сотрудникам"""
+
+    def __init__(
+        self,
+        parent=None,
+        users: Optional[List[Dict[str, str]]] = None,
+        templates: Optional[List[Dict]] = None,
+        groups: Optional[List[str]] = None
+    ):
+        super().__init__(parent)
+        self.users = [u for u in (users or []) if u.get("Email")]
+        self.templates = templates or []
+        self.groups = groups or sorted({u.get("Group", "") for u in self.users if u.get("Group")})
+        self.setWindowTitle("Массовое назначение графика")
+        self.resize(560, 640)
+        self._build_ui()
+        self._apply_filter()
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+
+        # Шаблон
+        template_row = QHBoxLayout()
+        template_row.addWidget(QLabel("Шаблон:"))
+        self.template_combo = QComboBox()
+        for t in self.templates:
+            self.template_combo.addItem(f"{t['schedule_id']} - {t['name']}", t["schedule_id"])
+        template_row.addWidget(self.template_combo, 1)
+        layout.addLayout(template_row)
+
+        # Период
+        dates_row = QHBoxLayout()
+        dates_row.addWidget(QLabel("Действует с:"))
+        self.date_from = QDateEdit(QDate.currentDate())
+        self.date_from.setCalendarPopup(True)
+        self.date_from.setDisplayFormat("yyyy-MM-dd")
+        dates_row.addWidget(self.date_from)
+        self.has_end_chk = QCheckBox("по:")
+        dates_row.addWidget(self.has_end_chk)
+        self.date_to = QDateEdit(QDate.currentDate().addMonths(1))
+        self.date_to.setCalendarPopup(True)
+        self.date_to.setDisplayFormat("yyyy-MM-dd")
+        self.date_to.setEnabled(False)
+        self.has_end_chk.toggled.connect(self.date_to.setEnabled)
+        dates_row.addWidget(self.date_to)
+        dates_row.addStretch()
+        layout.addLayout(dates_row)
+
+        # Фильтр сотрудников
+        filter_row = QHBoxLayout()
+        self.group_combo = QComboBox()
+        self.group_combo.addItem(ALL_GROUPS)
+        self.group_combo.addItems(self.groups)
+        self.group_combo.currentIndexChanged.connect(self._apply_filter)
+        filter_row.addWidget(self.group_combo)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск по ФИО или email")
+        self.search_input.textChanged.connect(self._apply_filter)
+        filter_row.addWidget(self.search_input, 1)
+        layout.addLayout(filter_row)
+
+        # Список сотрудников с отметками
+        self.users_list = QListWidget()
+        for u in self.users:
+            item = QListWidgetItem(f"{u.get('Name', '')} — {u['Email']}")
+            item.setData(Qt.UserRole, u["Email"])
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.users_list.addItem(item)
+        self.users_list.itemChanged.connect(self._update_count)
+        layout.addWidget(self.users_list, 1)
+
+        select_row = QHBoxLayout()
+        btn_all = QPushButton("Отметить видимых")
+        btn_all.clicked.connect(lambda: self._check_visible(Qt.Checked))
+        select_row.addWidget(btn_all)
+        btn_none = QPushButton("Снять видимых")
+        btn_none.clicked.connect(lambda: self._check_visible(Qt.Unchecked))
+        select_row.addWidget(btn_none)
+        select_row.addStretch()
+        self.count_label = QLabel()
+        select_row.addWidget(self.count_label)
+        layout.addLayout(select_row)
+
+        btns = QHBoxLayout()
+        btns.addStretch()
+        btn_ok = QPushButton("Назначить")
+        btn_ok.clicked.connect(self._on_accept)
+        btns.addWidget(btn_ok)
+        btn_cancel = QPushButton("Отмена")
+        btn_cancel.clicked.connect(self.reject)
+        btns.addWidget(btn_cancel)
+        layout.addLayout(btns)
+        self._update_count()
+
+    def _apply_filter(self, *_):
+        group = self.group_combo.currentText()
+        needle = self.search_input.text().strip().lower()
+        for row, u in enumerate(self.users):
+            visible = (group == ALL_GROUPS or u.get("Group", "") == group) and (
+                not needle
+                or needle in u.get("Name", "").lower()
+                or needle in u["Email"].lower()
+            )
+            self.users_list.item(row).setHidden(not visible)
+
+    def _check_visible(self, state):
+        self.users_list.blockSignals(True)
+        for row in range(self.users_list.count()):
+            item = self.users_list.item(row)
+            if not item.isHidden():
+                item.setCheckState(state)
+        self.users_list.blockSignals(False)
+        self._update_count()
+
+    def _update_count(self, *_):
+        self.count_label.setText(f"Выбрано: {len(self.selected_emails())}")
+
+    def selected_emails(self) -> List[str]:
+        return [
+            self.users_list.item(row).data(Qt.UserRole)
+            for row in range(self.users_list.count())
+            if self.users_list.item(row).checkState() == Qt.Checked
+        ]
+
+    def _on_accept(self):
+        if not self.template_combo.currentData():
+            QMessageBox.warning(self, "Ошибка", "Выберите шаблон")
+            return
+        if not self.selected_emails():
+            QMessageBox.warning(self, "Ошибка", "Отметьте хотя бы одного сотрудника")
+            return
+        if self.has_end_chk.isChecked() and self.date_to.date() < self.date_from.date():
+            QMessageBox.warning(self, "Ошибка", "Дата окончания раньше даты начала")
+            return
+        self.accept()
+
+    def get_assignments(self) -> List[ScheduleAssignment]:
+        schedule_id = self.template_combo.currentData()
+        start = self.date_from.date().toString("yyyy-MM-dd")
+        end = self.date_to.date().toString("yyyy-MM-dd") if self.has_end_chk.isChecked() else None
+        return [ScheduleAssignment(email, schedule_id, start, end) for email in self.selected_emails()]
@@ -0,0 +1,235 @@
+# admin_app/data_loader.py
+"""
+Фоновая загрузка данных для AdminWindow.
+
+Запросы к AdminRepo/BreakManager выполняются в QThreadPool, результат
+приходит в GUI-поток сигналом loaded(key, data, from_cache):
+
+    loader = AdminDataLoader(self)
+    loader.loaded.connect(self._on_data_loaded)
+    loader.request("users", self.repo.list_users)
+
+- Ключ — «слот» данных ("users", "violations", ...). Новый запрос по ключу
+  вытесняет предыдущий: результат устаревшего запроса отбрасывается,
+  а ещё не начатая задача снимается с очереди пула.
+- cancel(key) — то же без нового запроса (переключение вкладки/сотрудника).
+- Если по ключу есть кэш, он отдаётся сразу (from_cache=True), а свежие
+  данные приходят следом. Кэш моложе max_age не перезапрашивается.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+logger = logging.getLogger(__name__)
+
+
+class _TaskSignals(QObject):
+    """Сигналы задач; объект живёт в GUI-потоке — доставка через очередь событий"""
+    done = pyqtSignal(str, int, object)   # (key, generation, data)
+    error = pyqtSignal(str, int, str)     # (key, generation, error)
+    skipped = pyqtSignal(str, int)        # отменена до старта
+
+
+class _LoadTask(QRunnable):
+    def __init__(self, loader: "AdminDataLoader", key: str, gen: int, fetch: Callable[[], Any]):
+        super().__init__()
+        self.setAutoDelete(False)  # ссылку держит loader до конца run (и для tryTake)
+        self.loader = loader
+        self.key = key
+        self.gen = gen
+        self.fetch = fetch
+
+    def run(self):
+        signals = self.loader._signals
+        if not self.loader._is_current(self.key, self.gen):
+            signals.skipped.emit(self.key, self.gen)
+            return
+        try:
+            data = self.fetch()
+        except Exception as e:
+            signals.error.emit(self.key, self.gen, str(e))
+        else:
+            signals.done.emit(self.key, self.gen, data)
+
+
+class AdminDataLoader(QObject):
+    """
+    Загрузчик данных админки
+
+    Parameters:
+        parent: Владелец (AdminWindow)
+        max_threads: Размер пула (по умолчанию ADMIN_LOADER_THREADS)
+        default_max_age: Возраст кэша, при котором запрос не нужен
+            (по умолчанию ADMIN_CACHE_TTL_SEC)
+    """
+
+    loaded = pyqtSignal(str, object, bool)   # (key, data, from_cache)
+    failed = pyqtSignal(str, str)            # (key, error)
+    pending_changed = pyqtSignal(int)        # задач в работе
+
+    def __init__(self, parent=None, max_threads: Optional[int] = None,
+                 default_max_age: Optional[float] = None):
+        super().__init__(parent)
+        if max_threads is None or default_max_age is None:
+            try:
+                from config import ADMIN_CACHE_TTL_SEC, ADMIN_LOADER_THREADS
+            except Exception:
+                ADMIN_LOADER_THREADS, ADMIN_CACHE_TTL_SEC = 4, 60
+            max_threads = ADMIN_LOADER_THREADS if max_threads is None else max_threads
+            default_max_age = ADMIN_CACHE_TTL_SEC if default_max_age is None else default_max_age
+        self.default_max_age = default_max_age
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, max_threads))
+        self._signals = _TaskSignals(self)
+        self._signals.done.connect(self._on_done)
+        self._signals.error.connect(self._on_error)
+        self._signals.skipped.connect(self._release)
+
+        # Поколения читаются из рабочих потоков — под локом
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = {}
+        self._tasks: Dict[str, _LoadTask] = {}                  # текущая задача по ключу
+        self._alive: Dict[Tuple[str, int], _LoadTask] = {}      # все задачи до конца run
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+
+        self._stats = {
+            'requested': 0,
+            'completed': 0,
+            'failed': 0,
+            'cache_hits': 0,
+            'skipped_fresh': 0,
+            'stale_dropped': 0,
+            'cancelled': 0,
+        }
+
+    # ---------- API ----------
+    def request(self, key: str, fetch: Callable[[], Any], max_age: Optional[float] = None) -> bool:
+        """
+        Загрузить данные по ключу в фоне.
+
+        Args:
+            key: Слот данных; предыдущий запрос по нему становится устаревшим
+            fetch: Функция без аргументов (выполняется в рабочем потоке)
+            max_age: Не перезапрашивать, если кэш моложе (сек); 0 — всегда
+
+        Returns:
+            True, если кэш был отдан сразу
+        """
+        gen = self._bump(key)
+        self._take_pending(key)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._stats['cache_hits'] += 1
+            self.loaded.emit(key, cached[1], True)
+            max_age = self.default_max_age if max_age is None else max_age
+            if max_age and time.monotonic() - cached[0] < max_age:
+                self._stats['skipped_fresh'] += 1
+                return True
+
+        task = _LoadTask(self, key, gen, fetch)
+        self._tasks[key] = task
+        self._alive[(key, gen)] = task
+        self._stats['requested'] += 1
+        self._pool.start(task)
+        self.pending_changed.emit(len(self._tasks))
+        return cached is not None
+
+    def cancel(self, keys: Iterable[str] | str):
+        """Отменить запросы: результаты не будут доставлены"""
+        if isinstance(keys, str):
+            keys = (keys,)
+        changed = False
+        for key in keys:
+            if key in self._tasks:
+                self._bump(key)
+                self._take_pending(key)
+                self._tasks.pop(key, None)
+                self._stats['cancelled'] += 1
+                changed = True
+                # обновление не дошло — кэш считаем устаревшим
+                if key in self._cache:
+                    self._cache[key] = (float("-inf"), self._cache[key][1])
+        if changed:
+            self.pending_changed.emit(len(self._tasks))
+
+    def cached(self, key: str, default: Any = None) -> Any:
+        """Последние загруженные данные (без запроса)"""
+        entry = self._cache.get(key)
+        return entry[1] if entry is not None else default
+
+    def invalidate(self, key: str):
+        """Сбросить кэш по ключу (следующий request точно пойдёт в сеть)"""
+        self._cache.pop(key, None)
+
+    def is_pending(self, key: str) -> bool:
+        return key in self._tasks
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        stats['pending'] = len(self._tasks)
+        stats['cached_keys'] = len(self._cache)
+        return stats
+
+    def shutdown(self, timeout_ms: int = 3000):
+        """Отменить всё и дождаться рабочих потоков (при закрытии окна)"""
+        self.cancel(list(self._tasks))
+        self._pool.clear()
+        self._pool.waitForDone(timeout_ms)
+
+    # ---------- внутреннее ----------
+    def _bump(self, key: str) -> int:
+        with self._lock:
+            gen = self._generations.get(key, 0) + 1
+            self._generations[key] = gen
+            return gen
+
+    def _is_current(self, key: str, gen: int) -> bool:
+        with self._lock:
+            return self._generations.get(key) == gen
+
+    def _take_pending(self, key: str):
+        """Снять с очереди пула ещё не начатую задачу по ключу"""
+        task = self._tasks.get(key)
+        if task is not None and self._pool.tryTake(task):
+            self._tasks.pop(key, None)
+            self._alive.pop((task.key, task.gen), None)
+
+    def _release(self, key: str, gen: int):
+        self._alive.pop((key, gen), None)
+        # Задачу вытеснил запрос, отданный из свежего кэша: новой задачи по ключу нет,
+        # а эта устарела — иначе is_pending остался бы True навсегда
+        task = self._tasks.get(key)
+        if task is not None and task.gen == gen and not self._is_current(key, gen):
+            self._tasks.pop(key, None)
+            self.pending_changed.emit(len(self._tasks))
+
+    def _finish(self, key: str, gen: int) -> bool:
+        """Снять задачу из учёта; False — результат устарел"""
+        self._release(key, gen)
+        if not self._is_current(key, gen):
+            self._stats['stale_dropped'] += 1
+            return False
+        self._tasks.pop(key, None)
+        self.pending_changed.emit(len(self._tasks))
+        return True
+
+    def _on_done(self, key: str, gen: int, data: Any):
+        if not self._finish(key, gen):
+            return
+        self._cache[key] = (time.monotonic(), data)
+        self._stats['completed'] += 1
+        self.loaded.emit(key, data, False)
+
+    def _on_error(self, key: str, gen: int, error: str):
+        if not self._finish(key, gen):
+            return
+        self._stats['failed'] += 1
+        logger.warning("Загрузка %s не удалась: %s", key, error)
+        self.failed.emit(key, error)
@@ -13,11 +13,11 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QTableWidget, QTableWidgetItem, QCheckBox, QComboBox, QMessageBox,
-    QTabWidget, QGroupBox, QDialog, QToolBar, QAction
+    QTabWidget, QGroupBox, QDialog, QToolBar, QAction, QTableView, QAbstractItemView,
+    QHeaderView
 )
 
 # --- Единое логирование для админки ---
@@ -31,6 +31,10 @@ from config import LOG_DIR
 
 # --- Доменная логика/репозиторий ---
 from admin_app.repo import AdminRepo
+from admin_app.users_model import UsersTableModel
+from admin_app.user_index import UserSearchIndex
+from admin_app.data_loader import AdminDataLoader
+from admin_app.shift_calendar import ShiftCalendar
 
 # --- Панель оповещений ---
 from admin_app.notifications_panel import open_panel as open_notifications_panel
@@ -147,10 +151,23 @@ class AdminWindow(QMainWindow):
         self.users: List[Dict[str, str]] = []
         self._active_cache: Tuple[float, set[str]] = (0.0, set())  # (ts, {emails})
         self._active_ttl_sec = 30.0
+        self._email_by_fio: Dict[str, str] = {}
+        self.shift_calendar = ShiftCalendar(None, [])
+
+        # Фоновая загрузка: запросы к Sheets не блокируют окно
+        self.loader = AdminDataLoader(self)
+        self.loader.loaded.connect(self._on_data_loaded)
+        self.loader.failed.connect(self._on_data_failed)
+        self.loader.pending_changed.connect(self._on_loading_changed)
+        self._shown: Dict[str, object] = {}     # что уже отрисовано по ключу
+        self._visible_keys: set[str] = set()    # данные открытой вкладки
+        self._violations_email: Optional[str] = None
 
         self._build_ui()
         self.refresh_users()
         self.load_shift_calendar()
+        if not self.groups:
+            self.loader.request("groups", self.repo.list_groups_from_sheet)
 
     # ---------- UI ----------
     def _build_ui(self):
@@ -205,12 +222,18 @@ class AdminWindow(QMainWindow):
             top_layout.addWidget(b)
         users_layout.addLayout(top_layout)
 
-        # Таблица пользователей
-        self.users_table = QTableWidget(0, len(FIELDS))
-        self.users_table.setHorizontalHeaderLabels(
-            ["Email", "ФИО", "Телефон", "Должность", "Telegram", "Группа", "Telegram уведомления"]
+        # Таблица пользователей: модель над кэшем self.users, вид рисует только видимые строки
+        self.users_model = UsersTableModel(
+            FIELDS,
+            ["Email", "ФИО", "Телефон", "Должность", "Telegram", "Группа", "Telegram уведомления"],
+            self,
         )
-        self.users_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.users_table = QTableView()
+        self.users_table.setModel(self.users_model)
+        self.users_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.users_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        # фиксированная высота строк — без замера содержимого всех строк
+        self.users_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         users_layout.addWidget(self.users_table)
 
         self.tabs.addTab(self.tab_users, "Сотрудники")
@@ -270,7 +293,7 @@ class AdminWindow(QMainWindow):
         self.violations_tab = self._build_violations_tab()
         self.breaks_tabs.addTab(self.violations_tab, "Нарушения")
         # 4. Аналитика
-        self.analytics_tab = BreakAnalyticsTab(self.break_mgr)
+        self.analytics_tab = BreakAnalyticsTab(self.break_mgr, loader=self.loader)
         self.breaks_tabs.addTab(self.analytics_tab, "📊 Аналитика")
 
 
@@ -285,6 +308,10 @@ class AdminWindow(QMainWindow):
 
         self.setCentralWidget(self.tabs)
 
+        # Данные вкладок грузятся при показе, при уходе с вкладки — отменяются
+        self.tabs.currentChanged.connect(self._on_tab_changed)
+        self.breaks_tabs.currentChanged.connect(self._on_tab_changed)
+
     def _build_templates_tab(self) -> QWidget:
         """Вкладка шаблонов графиков"""
         widget = QWidget()
@@ -313,7 +340,6 @@ class AdminWindow(QMainWindow):
         self.templates_table.setSelectionBehavior(QTableWidget.SelectRows)
         layout.addWidget(self.templates_table)
         
-        self.refresh_templates()
         return widget
 
     def _build_assignments_tab(self) -> QWidget:
@@ -335,12 +361,15 @@ class AdminWindow(QMainWindow):
         
         form_layout.addWidget(QLabel("Шаблон:"))
         self.assign_template_combo = QComboBox()
-        self._refresh_template_combo()
         form_layout.addWidget(self.assign_template_combo)
         
         btn_assign = QPushButton("Назначить")
         btn_assign.clicked.connect(self.on_assign_schedule)
         form_layout.addWidget(btn_assign)
+
+        btn_bulk_assign = QPushButton("Массовое назначение…")
+        btn_bulk_assign.clicked.connect(self.on_bulk_assign_schedule)
+        form_layout.addWidget(btn_bulk_assign)
         form_layout.addStretch()
         
         layout.addLayout(form_layout)
@@ -352,7 +381,6 @@ class AdminWindow(QMainWindow):
         )
         layout.addWidget(self.assignments_table)
         
-        self.refresh_assignments()
         return widget
 
     def _build_violations_tab(self) -> QWidget:
@@ -369,11 +397,15 @@ class AdminWindow(QMainWindow):
             email = u.get("Email", "")
             if email:
                 self.violations_user_combo.addItem(email)
+        self.violations_user_combo.currentIndexChanged.connect(self.refresh_violations)
         filter_layout.addWidget(self.violations_user_combo)
         
         filter_layout.addWidget(QLabel("Статус:"))
         self.violations_status_combo = QComboBox()
         self.violations_status_combo.addItems(["Все", "pending", "reviewed", "resolved"])
+        self.violations_status_combo.currentIndexChanged.connect(
+            lambda _: self._apply_violations(self.loader.cached("violations", []))
+        )
         filter_layout.addWidget(self.violations_status_combo)
         
         btn_refresh = QPushButton("Обновить")
@@ -391,16 +423,85 @@ class AdminWindow(QMainWindow):
         self.violations_table.setSelectionBehavior(QTableWidget.SelectRows)
         layout.addWidget(self.violations_table)
         
-        self.refresh_violations()
         return widget
 
+    # ---------- Фоновая загрузка ----------
+    def _tab_keys(self) -> set[str]:
+        """Ключи данных, нужные открытой вкладке"""
+        current = self.tabs.currentWidget()
+        if current is self.tab_schedule:
+            return {"shift_calendar"}
+        if current is self.tab_breaks:
+            sub = self.breaks_tabs.currentWidget()
+            if sub is self.templates_tab:
+                return {"templates"}
+            if sub is self.assignments_tab:
+                return {"assignments", "templates"}
+            if sub is self.violations_tab:
+                return {"violations"}
+        return set()
+
+    def _on_tab_changed(self, *_):
+        visible = self._tab_keys()
+        # ушли с вкладки — её незавершённые запросы больше не нужны
+        self.loader.cancel(self._visible_keys - visible)
+        self._visible_keys = visible
+        # кэш отрисуется сразу, свежее — если кэш старше ADMIN_CACHE_TTL_SEC
+        if "shift_calendar" in visible:
+            self.loader.request("shift_calendar", self.repo.get_parsed_shift_calendar)
+            self._get_active_emails_cached()  # статус логина на вкладке
+        if "templates" in visible:
+            self.loader.request("templates", self.break_mgr.list_schedule_templates)
+        if "assignments" in visible:
+            self.loader.request("assignments", self._fetch_assignments)
+        if "violations" in visible:
+            self.refresh_violations(max_age=None)
+
+    def _on_data_loaded(self, key: str, data, from_cache: bool):
+        if from_cache and self._shown.get(key) is data:
+            return  # уже на экране
+        if key == "active_sessions":
+            if not from_cache:
+                self._apply_active_sessions(data)
+            return
+        self._shown[key] = data
+        handler = {
+            "users": self._apply_users,
+            "groups": self._apply_groups,
+            "shift_calendar": self._apply_shift_calendar,
+            "templates": self._apply_templates,
+            "assignments": self._apply_assignments,
+            "violations": self._apply_violations,
+            "bulk_assign": self._apply_bulk_assign,
+        }.get(key)
+        if handler is not None:
+            handler(data)
+
+    def _on_data_failed(self, key: str, error: str):
+        self.statusBar().showMessage(f"Не удалось загрузить данные ({key}): {error}", 10000)
+
+    def _on_loading_changed(self, pending: int):
+        if pending:
+            self.statusBar().showMessage(f"Загрузка данных… ({pending})")
+        else:
+            self.statusBar().clearMessage()
+
+    def closeEvent(self, event):
+        self.loader.shutdown()
+        super().closeEvent(event)
+
     # ---------- Helpers ----------
+    def _selected_user(self) -> Optional[Dict[str, str]]:
+        rows = self.users_table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return self.users_model.user_at(rows[0].row())
+    
     def _selected_email(self) -> Optional[str]:
-        items = self.users_table.selectedItems()
-        if not items:
+        user = self._selected_user()
+        if not user:
             return None
-        val = items[0].text().strip()
-        return val[2:] if val.startswith("🟢 ") else val
+        return user.get("Email", "").strip() or None
 
     def _confirm(self, msg: str) -> bool:
         return QMessageBox.question(self, "Подтверждение", msg, QMessageBox.Yes | QMessageBox.No, QMessageBox.No) == QMessageBox.Yes
@@ -412,33 +513,34 @@ class AdminWindow(QMainWindow):
         QMessageBox.warning(self, "Ошибка", msg)
 
     # ---------- Активные сессии (кэш) ----------
-    def _get_active_emails_cached(self) -> set[str]:
+    def _get_active_emails_cached(self, refresh: bool = True) -> set[str]:
+        """Активные e-mail из кэша; устаревший кэш обновляется в фоне (если refresh)"""
         ts, emails = self._active_cache
-        if time.monotonic() - ts < self._active_ttl_sec:
-            return emails
-        try:
-            sessions = self.repo.get_active_sessions()
-            emails = {str(s.get("Email", "")).strip().lower() for s in sessions if str(s.get("Status", "")).strip().lower() == "active"}
-            self._active_cache = (time.monotonic(), emails)
-            return emails
-        except Exception as e:
-            logger.warning("Не удалось получить активные сессии: %s", e)
-            return set()
+        if refresh and time.monotonic() - ts >= self._active_ttl_sec \
+                and not self.loader.is_pending("active_sessions"):
+            self.loader.request("active_sessions", self.repo.get_active_sessions, max_age=0)
+        return emails
+
+    def _apply_active_sessions(self, sessions: List[Dict]):
+        emails = {str(s.get("Email", "")).strip().lower() for s in sessions if str(s.get("Status", "")).strip().lower() == "active"}
+        self._active_cache = (time.monotonic(), emails)
+        if self.only_active_chk.isChecked():
+            self.apply_user_search()
+        self._update_schedule_login_status()
 
     # =================== Таб "Сотрудники" ===================
 
     def refresh_users(self):
-        try:
-            rows = self.repo.list_users()
-        except Exception as e:
-            logger.exception("refresh_users failed: %s", e)
-            rows = []
+        """Перезапросить пользователей (кэш остаётся на экране до ответа)"""
+        self.loader.request("users", self._fetch_users, max_age=0)
 
-        self.users = []
-        for r in rows:
+    def _fetch_users(self) -> Tuple[List[Dict[str, str]], UserSearchIndex]:
+        """Рабочий поток: пользователи + индекс поиска по ним"""
+        users = []
+        for r in self.repo.list_users():
             nt = str(r.get("NotifyTelegram", "")).strip().lower()
             nt_norm = "Yes" if nt in ("yes", "true", "1", "да") else "No"
-            self.users.append({
+            users.append({
                 "Email": str(r.get("Email", "")),
                 "Name": str(r.get("Name", "")),
                 "Phone": str(r.get("Phone", "")),
@@ -447,9 +549,17 @@ class AdminWindow(QMainWindow):
                 "Group": str(r.get("Group", "")),
                 "NotifyTelegram": nt_norm,
             })
+        return users, UserSearchIndex(users)
 
-        # заполняем таблицу
-        self.refresh_users_table()
+    def _apply_users(self, payload: Tuple[List[Dict[str, str]], UserSearchIndex]):
+        self.users, index = payload
+        self._email_by_fio = {}
+        for u in self.users:
+            self._email_by_fio.setdefault(u.get("Name", ""), u.get("Email", ""))
+
+        # заполняем таблицу (индекс поиска уже построен в рабочем потоке)
+        self.users_model.set_users(self.users, index=index)
+        self.apply_user_search()
 
         # и выпадающий список на вкладке "График"
         self.schedule_user_combo.blockSignals(True)
@@ -464,6 +574,32 @@ class AdminWindow(QMainWindow):
         # обновляем список сотрудников на вкладке "Назначения"
         self._refresh_assign_user_combo()
 
+        # и фильтр на вкладке "Нарушения"
+        current = self.violations_user_combo.currentText()
+        self.violations_user_combo.blockSignals(True)
+        self.violations_user_combo.clear()
+        self.violations_user_combo.addItem("Все")
+        for u in self.users:
+            email = u.get("Email", "")
+            if email:
+                self.violations_user_combo.addItem(email)
+        idx = self.violations_user_combo.findText(current)
+        self.violations_user_combo.setCurrentIndex(max(idx, 0))
+        self.violations_user_combo.blockSignals(False)
+
+        # график мог прийти раньше пользователей
+        self.schedule_user_combo.setEnabled(bool(self.users) or bool(self.shift_calendar))
+
+    def _apply_groups(self, groups: List[str]):
+        self.groups = groups
+        current = self.group_filter_combo.currentText()
+        self.group_filter_combo.blockSignals(True)
+        self.group_filter_combo.clear()
+        self.group_filter_combo.addItem("Все группы")
+        self.group_filter_combo.addItems(groups)
+        self.group_filter_combo.setCurrentIndex(max(self.group_filter_combo.findText(current), 0))
+        self.group_filter_combo.blockSignals(False)
+
     def _refresh_assign_user_combo(self):
         """Обновляет выпадающий список сотрудников на вкладке 'Назначения'"""
         if not hasattr(self, "assign_user_combo"):
@@ -478,37 +614,13 @@ class AdminWindow(QMainWindow):
         self.assign_user_combo.blockSignals(False)
 
     def refresh_users_table(self, filter_text: str = ""):
-        self.users_table.setRowCount(0)
         selected_group = self.group_filter_combo.currentText()
         only_active = self.only_active_chk.isChecked()
-        active_emails = self._get_active_emails_cached() if only_active else set()
-
-        for u in self.users:
-            email = u.get("Email", "").strip().lower()
-            group = u.get("Group", "").strip()
-            is_active = email in active_emails
-
-            # поиск
-            if filter_text:
-                q = filter_text.lower()
-                if q not in email and q not in u.get("Name", "").lower():
-                    continue
-            # фильтр по группе
-            if selected_group != "Все группы" and group != selected_group:
-                continue
-            # фильтр активности
-            if only_active and not is_active:
-                continue
-
-            row = self.users_table.rowCount()
-            self.users_table.insertRow(row)
-            for col, key in enumerate(FIELDS):
-                val = u.get(key, "")
-                if key == "Email" and is_active:
-                    val = f"🟢 {val}"
-                item = QTableWidgetItem(str(val))
-                item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsSelectable)
-                self.users_table.setItem(row, col, item)
+        self.users_model.set_filter(
+            filter_text,
+            group=None if selected_group == "Все группы" else selected_group,
+            active_emails=self._get_active_emails_cached() if only_active else None,
+        )
 
     def apply_user_search(self):
         self.refresh_users_table(self.search_input.text())
@@ -526,11 +638,10 @@ class AdminWindow(QMainWindow):
                 self._warn("Ошибка при добавлении пользователя")
 
     def edit_user(self):
-        row = self.users_table.currentRow()
-        if row < 0 or row >= len(self.users):
+        user = self.users_model.user_at(self.users_table.currentIndex().row())
+        if user is None:
             self._warn("Сначала выберите строку для редактирования.")
             return
-        user = self.users[row]
         dlg = UserDialog(self, user=user, groups=self.groups)
         if dlg.exec_():
             data = dlg.get_user()
@@ -559,10 +670,7 @@ class AdminWindow(QMainWindow):
             self._warn("Выберите пользователя из списка.")
             return
         # отображаем ФИО для красоты
-        fio = ""
-        sel = self.users_table.selectedItems()
-        if sel and len(sel) > 1:
-            fio = sel[1].text()
+        fio = (self._selected_user() or {}).get("Name", "")
 
         if not self._confirm(f"Разлогинить {fio or email}?"):
             return
@@ -579,17 +687,14 @@ class AdminWindow(QMainWindow):
     # =================== Таб "График" ===================
 
     def load_shift_calendar(self):
-        """Подтягиваем таблицу графика. Если её нет — отключаем элементы."""
-        try:
-            data = self.repo.get_shift_calendar()
-        except Exception as e:
-            logger.exception("Ошибка при загрузке графика: %s", e)
-            data = []
+        """Подтягиваем разобранный график в фоне (см. _apply_shift_calendar)."""
+        self.loader.request("shift_calendar", self.repo.get_parsed_shift_calendar, max_age=0)
 
-        self.shift_calendar_data: List[List[str]] = data
-        self.shift_headers: List[str] = data[0] if data else []
+    def _apply_shift_calendar(self, calendar: ShiftCalendar):
+        """Если таблицы графика нет — отключаем элементы."""
+        self.shift_calendar = calendar
 
-        if not data:
+        if not calendar:
             self.info_label.setText("Лист графика не найден или пуст.")
             self.login_status_lbl.setText("Залогинен: Нет")
             self.btn_force_logout.setEnabled(False)
@@ -599,10 +704,12 @@ class AdminWindow(QMainWindow):
             return
 
         self.schedule_user_combo.setEnabled(True)
+        if self.schedule_user_combo.currentIndex() > 0:
+            self.on_schedule_user_change()
 
     def on_schedule_user_change(self):
         idx = self.schedule_user_combo.currentIndex()
-        if idx <= 0 or not self.shift_calendar_data:
+        if idx <= 0 or not self.shift_calendar:
             self.schedule_table.setRowCount(0)
             self.schedule_table.setColumnCount(0)
             self.info_label.setText("")
@@ -610,45 +717,41 @@ class AdminWindow(QMainWindow):
             self.btn_force_logout.setEnabled(False)
             return
 
+        # всё из кэшей: смена сотрудника не обращается к API
         fio = self.schedule_user_combo.currentText()
-        email = ""
-        for u in self.users:
-            if u.get("Name", "") == fio:
-                email = u.get("Email", "")
-                break
+        email = self._email_by_fio.get(fio, "")
 
         # статус логина
-        active = self._get_active_emails_cached()
-        is_logged_in = email.strip().lower() in active
-        self.login_status_lbl.setText(f"Залогинен: {'Да' if is_logged_in else 'Нет'}")
-        self.btn_force_logout.setEnabled(is_logged_in)
         self.btn_force_logout.setProperty("user_email", email)
         self.btn_force_logout.setProperty("user_fio", fio)
+        self._update_schedule_login_status(refresh=False)
 
         # инфо по сотруднику
         info_parts = [f"<b>ФИО:</b> {fio}", f"<b>Email:</b> {email}"]
         self.info_label.setText("<br>".join(info_parts))
 
-        # табель по дням (ищем первые числовые заголовки как дни месяца)
-        headers = self.shift_headers
-        row_for_user: Optional[List[str]] = None
-        for r in self.shift_calendar_data[1:]:
-            if r and r[0].strip() == fio:
-                row_for_user = r
-                break
-
-        day_indices = [(i, h) for i, h in enumerate(headers) if str(h).isdigit()]
+        # табель по дням (дневные колонки и строка по ФИО уже разобраны)
+        day_columns = self.shift_calendar.day_columns
         self.schedule_table.setRowCount(0)
-        self.schedule_table.setColumnCount(len(day_indices))
-        self.schedule_table.setHorizontalHeaderLabels([str(h) for _, h in day_indices])
+        self.schedule_table.setColumnCount(len(day_columns))
+        self.schedule_table.setHorizontalHeaderLabels([day for _, day in day_columns])
 
-        if row_for_user:
+        days = self.shift_calendar.days_for(fio)
+        if days:
             self.schedule_table.setRowCount(1)
-            for col, (i, _) in enumerate(day_indices):
-                val = row_for_user[i] if i < len(row_for_user) else ""
+            for col, (_, val) in enumerate(days):
                 self.schedule_table.setItem(0, col, QTableWidgetItem(str(val)))
             self.schedule_table.resizeColumnsToContents()
 
+    def _update_schedule_login_status(self, refresh: bool = True):
+        """Статус логина выбранного на вкладке "График" сотрудника (из кэша сессий)"""
+        if self.schedule_user_combo.currentIndex() <= 0:
+            return
+        email = self.btn_force_logout.property("user_email") or ""
+        is_logged_in = email.strip().lower() in self._get_active_emails_cached(refresh=refresh)
+        self.login_status_lbl.setText(f"Залогинен: {'Да' if is_logged_in else 'Нет'}")
+        self.btn_force_logout.setEnabled(is_logged_in)
+
     def force_logout_from_schedule(self):
         email = self.btn_force_logout.property("user_email")
         fio = self.btn_force_logout.property("user_fio")
@@ -694,8 +797,8 @@ class AdminWindow(QMainWindow):
         from admin_app.break_schedule_dialog import BreakScheduleDialog
         schedule_id = self.templates_table.item(row, 0).text()
 
-        # Получаем текущие данные шаблона
-        all_templates = self.break_mgr.list_schedule_templates()
+        # Получаем текущие данные шаблона (из кэша загрузчика, если есть)
+        all_templates = self.loader.cached("templates") or self.break_mgr.list_schedule_templates()
         current = None
         for t in all_templates:
             if str(t.get("schedule_id")) == str(schedule_id):
@@ -772,11 +875,56 @@ class AdminWindow(QMainWindow):
         else:
             self._warn("Ошибка при назначении графика")
 
+    def on_bulk_assign_schedule(self):
+        """Назначает шаблон сразу многим сотрудникам (одна пакетная запись)"""
+        if self.loader.is_pending("bulk_assign"):
+            self._warn("Предыдущее массовое назначение ещё выполняется")
+            return
+        from admin_app.bulk_assign_dialog import BulkAssignDialog
+        templates = self.loader.cached("templates", [])
+        if not templates:
+            self._warn("Нет шаблонов графиков — создайте или обновите список шаблонов")
+            return
+        dlg = BulkAssignDialog(self, users=self.users, templates=templates, groups=self.groups)
+        if dlg.exec_() != QDialog.Accepted:
+            return
+        assignments = dlg.get_assignments()
+        # отчёт прошлого назначения из кэша не показываем
+        self.loader.invalidate("bulk_assign")
+        self._shown.pop("bulk_assign", None)
+        self.loader.request(
+            "bulk_assign",
+            lambda: self.break_mgr.assign_schedules_bulk(assignments, "admin@system"),
+            max_age=0,
+        )
+        self.statusBar().showMessage(f"Назначение графика: {len(assignments)} сотрудник(ов)…")
+
+    def _apply_bulk_assign(self, report: List[Dict[str, str]]):
+        counts: Dict[str, int] = {}
+        for r in report:
+            counts[r["status"]] = counts.get(r["status"], 0) + 1
+        lines = [
+            f"Назначено: {counts.get('created', 0)}, изменено: {counts.get('updated', 0)}, "
+            f"без изменений: {counts.get('unchanged', 0)}"
+        ]
+        problems = [r for r in report if r["status"] in ("error", "skipped") or r["message"]]
+        if problems:
+            lines.append("")
+            lines.extend(f"{r['email'] or '—'}: {r['message']}" for r in problems[:20])
+            if len(problems) > 20:
+                lines.append(f"… и ещё {len(problems) - 20}")
+        if counts.get("error"):
+            self._warn("\n".join(lines))
+        else:
+            self._info("\n".join(lines))
+        self.refresh_assignments()
+
     def refresh_templates(self):
-        """Обновляет таблицу шаблонов"""
+        """Перезапрашивает шаблоны (таблица и выпадающий список — в _apply_templates)"""
+        self.loader.request("templates", self.break_mgr.list_schedule_templates, max_age=0)
+
+    def _apply_templates(self, templates: List[Dict]):
         self.templates_table.setRowCount(0)
-        templates = self.break_mgr.list_schedule_templates()
-        
         for t in templates:
             row = self.templates_table.rowCount()
             self.templates_table.insertRow(row)
@@ -784,40 +932,49 @@ class AdminWindow(QMainWindow):
             self.templates_table.setItem(row, 1, QTableWidgetItem(t["name"]))
             self.templates_table.setItem(row, 2, QTableWidgetItem(t["shift_start"]))
             self.templates_table.setItem(row, 3, QTableWidgetItem(t["shift_end"]))
+        self._refresh_template_combo()
 
     def refresh_assignments(self):
-        """Обновляет таблицу назначений"""
+        """Перезапрашивает таблицу назначений"""
+        self.loader.request("assignments", self._fetch_assignments, max_age=0)
+
+    def _fetch_assignments(self) -> List[Dict]:
         from config import USER_BREAK_ASSIGNMENTS_SHEET
+        ws = self.repo.sheets.get_worksheet(USER_BREAK_ASSIGNMENTS_SHEET)
+        return self.repo.sheets._read_table(ws)
+
+    def _apply_assignments(self, rows: List[Dict]):
         self.assignments_table.setRowCount(0)
-        
-        try:
-            ws = self.repo.sheets.get_worksheet(USER_BREAK_ASSIGNMENTS_SHEET)
-            rows = self.repo.sheets._read_table(ws)
-            
-            for r in rows:
-                row = self.assignments_table.rowCount()
-                self.assignments_table.insertRow(row)
-                self.assignments_table.setItem(row, 0, QTableWidgetItem(r.get("Email", "")))
-                self.assignments_table.setItem(row, 1, QTableWidgetItem(r.get("ScheduleID", "")))
-                self.assignments_table.setItem(row, 2, QTableWidgetItem(r.get("EffectiveDate", "")))
-                self.assignments_table.setItem(row, 3, QTableWidgetItem(r.get("AssignedBy", "")))
-        except Exception as e:
-            logger.error(f"Failed to refresh assignments: {e}")
-
-    def refresh_violations(self):
-        """Обновляет таблицу нарушений"""
-        self.violations_table.setRowCount(0)
-        
+        for r in rows:
+            row = self.assignments_table.rowCount()
+            self.assignments_table.insertRow(row)
+            self.assignments_table.setItem(row, 0, QTableWidgetItem(r.get("Email", "")))
+            self.assignments_table.setItem(row, 1, QTableWidgetItem(r.get("ScheduleID", "")))
+            self.assignments_table.setItem(row, 2, QTableWidgetItem(r.get("EffectiveDate", "")))
+            self.assignments_table.setItem(row, 3, QTableWidgetItem(r.get("AssignedBy", "")))
+
+    def refresh_violations(self, *_, max_age: Optional[float] = 0):
+        """Перезапрашивает нарушения по выбранному сотруднику (прежний запрос отменяется)"""
         email_filter = self.violations_user_combo.currentText()
         if email_filter == "Все":
             email_filter = None
+        if email_filter != self._violations_email:
+            # другой сотрудник: кэш чужих нарушений не показываем
+            self.loader.invalidate("violations")
+            self._violations_email = email_filter
+        self.loader.request(
+            "violations",
+            lambda: self.break_mgr.get_violations_report(email=email_filter),
+            max_age=max_age,
+        )
+
+    def _apply_violations(self, violations: List[Dict]):
+        self.violations_table.setRowCount(0)
         
         status_filter = self.violations_status_combo.currentText()
         if status_filter == "Все":
             status_filter = None
         
-        violations = self.break_mgr.get_violations_report(email=email_filter)
-        
         for v in violations:
             if status_filter and v.get("Status") != status_filter:
                 continue
@@ -832,12 +989,12 @@ class AdminWindow(QMainWindow):
             self.violations_table.setItem(row, 5, QTableWidgetItem(v.get("SessionID", "")))
 
     def _refresh_template_combo(self):
-        """Обновляет выпадающий список шаблонов"""
+        """Обновляет выпадающий список шаблонов (из последних загруженных)"""
         if not hasattr(self, "assign_template_combo"):
             return
         self.assign_template_combo.blockSignals(True)
         self.assign_template_combo.clear()
-        templates = self.break_mgr.list_schedule_templates()
+        templates = self.loader.cached("templates", [])
         for t in templates:
             self.assign_template_combo.addItem(f"{t['schedule_id']} - {t['name']}")
         self.assign_template_combo.blockSignals(False)
@@ -855,10 +1012,9 @@ def get_available_groups(repo: AdminRepo) -> list[str]:
 def main():
     logger.info("Launching Admin UI...")
     
-    # Получение списка групп
-    repo = AdminRepo()
-    groups = get_available_groups(repo)
-    logger.info("Groups: %s", ", ".join(groups) if groups else "<none>")
+    # Статическая карта групп; иначе окно загрузит группы из листа в фоне
+    groups = sorted(set(GROUP_MAPPING.values())) if GROUP_MAPPING else []
+    logger.info("Groups: %s", ", ".join(groups) if groups else "<from sheet>")
     
     # Запуск GUI с передачей списка групп
     app = QApplication(sys.argv)
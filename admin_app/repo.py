@@ -7,6 +7,13 @@ from typing import List, Dict, Optional
 from datetime import datetime, timezone
 
 from api_adapter import SheetsAPI, SheetsAPIError
+from admin_app.shift_calendar import (
+    CANDIDATE_SCHEDULE_TITLES,
+    ShiftCalendar,
+    get_shift_calendar,
+    get_shift_calendar_cache,
+    pick_schedule_title,
+)
 from config import (
     GOOGLE_SHEET_NAME,
     USERS_SHEET,
@@ -15,9 +22,6 @@ from config import (
 
 logger = logging.getLogger(__name__)
 
-# Возможные названия листа с графиком (по приоритету)
-CANDIDATE_SCHEDULE_TITLES = ["ShiftCalendar", "Schedule", "График"]
-
 
 class AdminRepo:
     """
@@ -203,38 +207,30 @@ class AdminRepo:
         """
         Выбирает название листа графика из известных вариантов.
         """
-        available = set(titles)
-        for cand in CANDIDATE_SCHEDULE_TITLES:
-            if cand in available:
-                return cand
-        return None
+        return pick_schedule_title(titles)
 
-    def get_shift_calendar(self) -> List[List[str]]:
+    def get_parsed_shift_calendar(self, title: Optional[str] = None, force: bool = False) -> ShiftCalendar:
         """
-        Возвращает таблицу графика как список списков:
-        [ [header...], [row1...], ... ]. Если лист отсутствует — [].
+        Разобранный график (индекс ФИО -> строка, дневные колонки) из общего
+        кэша admin_app.shift_calendar — тот же объект видит BreakManager.
+        Если лист отсутствует или недоступен — пустой календарь.
         """
         try:
-            titles = self._list_titles()
-            if not titles:
-                logger.info("В книге '%s' не найдено листов.", GOOGLE_SHEET_NAME)
-                return []
-
-            name = self._pick_schedule_title(titles)
-            if not name:
-                logger.info(
-                    "Лист графика не найден. Ожидались: %s; есть: %s",
-                    ", ".join(CANDIDATE_SCHEDULE_TITLES),
-                    ", ".join(titles),
-                )
-                return []
-
-            ws = self.sheets.get_worksheet(name)
-            values = self.sheets._request_with_retry(ws.get_all_values)
-            return values or []
+            return get_shift_calendar(self.sheets, title=title, force=force, list_titles=self._list_titles)
         except SheetsAPIError as e:
             logger.warning("Ошибка доступа к листу графика: %s", e)
-            return []
+            return ShiftCalendar(title, [])
         except Exception as e:
             logger.exception("get_shift_calendar error: %s", e)
-            return []
\ No newline at end of file
+            return ShiftCalendar(title, [])
+
+    def invalidate_shift_calendar(self):
+        """Сбросить кэш графика (следующее чтение пойдёт в API)"""
+        get_shift_calendar_cache().invalidate()
+
+    def get_shift_calendar(self) -> List[List[str]]:
+        """
+        Возвращает таблицу графика как список списков:
+        [ [header...], [row1...], ... ]. Если лист отсутствует — [].
+        """
+        return self.get_parsed_shift_calendar().values
\ No newline at end of file
@@ -0,0 +1,214 @@
+# admin_app/shift_calendar.py
+"""
+Разобранный график смен и общий кэш для админки и подсистемы перерывов.
+
+Лист графика ("ShiftCalendar"/"Schedule"/"График"): первая строка —
+заголовок, где числовые колонки — дни месяца; первая колонка — ФИО.
+
+ShiftCalendar разбирает сетку один раз:
+- ФИО -> номер строки (dict вместо линейного поиска);
+- список дневных колонок [(индекс, "1"), (индекс, "2"), ...].
+
+Кэш (get_shift_calendar) хранит календари по названию листа:
+- в пределах SHIFT_CALENDAR_TTL_SEC запросов к API нет совсем;
+- по истечении TTL лист перечитывается (время изменения книги в Drive
+  не годится: WorkLog_* и ActiveSessions в той же книге меняются постоянно);
+- force=True / invalidate() — перечитать принудительно (после записи).
+
+Чтение листа идёт без блокировки кэша: пока один поток читает лист,
+остальные получают свежие календари и другие листы сразу.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Возможные названия листа с графиком (по приоритету)
+CANDIDATE_SCHEDULE_TITLES = ["ShiftCalendar", "Schedule", "График"]
+
+
+class ShiftCalendar:
+    """Сетка графика с индексом по ФИО и дневными колонками"""
+
+    __slots__ = ("title", "values", "headers", "day_columns", "loaded_at", "_by_fio")
+
+    def __init__(self, title: Optional[str], values: List[List[str]]):
+        self.title = title
+        self.values = values or []
+        self.headers: List[str] = self.values[0] if self.values else []
+        self.day_columns: List[Tuple[int, str]] = [
+            (i, str(h)) for i, h in enumerate(self.headers) if str(h).isdigit()
+        ]
+        self.loaded_at = time.monotonic()
+        self._by_fio: Dict[str, int] = {}
+        for idx, row in enumerate(self.values[1:], start=1):
+            if row:
+                self._by_fio.setdefault(str(row[0]).strip(), idx)
+
+    def __bool__(self) -> bool:
+        return bool(self.values)
+
+    def __len__(self) -> int:
+        return len(self._by_fio)
+
+    def fios(self) -> List[str]:
+        return list(self._by_fio)
+
+    def row_for(self, fio: str) -> Optional[List[str]]:
+        """Строка сотрудника (первая с таким ФИО) или None"""
+        idx = self._by_fio.get((fio or "").strip())
+        return self.values[idx] if idx is not None else None
+
+    def days_for(self, fio: str) -> List[Tuple[str, str]]:
+        """[(день, значение), ...] по всем дневным колонкам; [] — сотрудника нет"""
+        row = self.row_for(fio)
+        if row is None:
+            return []
+        n = len(row)
+        return [(day, row[i] if i < n else "") for i, day in self.day_columns]
+
+    def shift_on(self, fio: str, day: int) -> Optional[str]:
+        """Значение ячейки графика на день месяца (None — нет сотрудника/дня)"""
+        row = self.row_for(fio)
+        if row is None:
+            return None
+        for i, d in self.day_columns:
+            if d == str(day):
+                return row[i] if i < len(row) else ""
+        return None
+
+
+def pick_schedule_title(titles: List[str]) -> Optional[str]:
+    """Выбирает название листа графика из известных вариантов."""
+    available = set(titles)
+    for cand in CANDIDATE_SCHEDULE_TITLES:
+        if cand in available:
+            return cand
+    return None
+
+
+class ShiftCalendarCache:
+    """
+    Кэш разобранных календарей по названию листа (потокобезопасный)
+
+    Под блокировкой — только чтение и замена записей; load() вызывается вне её. Загрузка, начатая до invalidate(), в кэш не попадает
+    (сменилось поколение ключа или всего кэша), но вызвавшему возвращается.
+
+    Parameters:
+        ttl: Сколько секунд календарь считается свежим без запросов
+    """
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, ShiftCalendar] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._stats = {'hits': 0, 'loads': 0}
+
+    def get(
+        self,
+        key: str,
+        load: Callable[[], ShiftCalendar],
+        force: bool = False,
+    ) -> ShiftCalendar:
+        """
+        Календарь по ключу (названию листа).
+
+        Args:
+            key: Название листа ("" — лист выбирается автоматически)
+            load: Загрузка и разбор листа (вызывается при промахе и по истечении TTL)
+            force: Перечитать независимо от TTL
+        """
+        with self._lock:
+            cal = self._entries.get(key)
+            generation = (self._epoch, self._generations.get(key, 0))
+            if cal is not None and not force and time.monotonic() - cal.loaded_at < self.ttl:
+                self._stats['hits'] += 1
+                return cal
+
+        fresh = load()
+        with self._lock:
+            self._stats['loads'] += 1
+            if (self._epoch, self._generations.get(key, 0)) == generation:
+                self._entries[key] = fresh
+        return fresh
+
+    def peek(self, key: str = "") -> Optional[ShiftCalendar]:
+        """Календарь из кэша без запросов (None — не загружался)"""
+        return self._entries.get(key)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Сбросить один лист или весь кэш"""
+        with self._lock:
+            if key is None:
+                self._epoch += 1
+                self._entries.clear()
+            else:
+                self._generations[key] = self._generations.get(key, 0) + 1
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        stats = dict(self._stats)
+        stats['entries'] = len(self._entries)
+        return stats
+
+
+_cache: Optional[ShiftCalendarCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_shift_calendar_cache() -> ShiftCalendarCache:
+    """Глобальный кэш графиков (singleton; TTL из config.SHIFT_CALENDAR_TTL_SEC)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    from config import SHIFT_CALENDAR_TTL_SEC
+                    ttl = SHIFT_CALENDAR_TTL_SEC
+                except Exception:
+                    ttl = 300
+                _cache = ShiftCalendarCache(ttl=ttl)
+    return _cache
+
+
+def get_shift_calendar(
+    sheets,
+    title: Optional[str] = None,
+    force: bool = False,
+    list_titles: Optional[Callable[[], List[str]]] = None,
+) -> ShiftCalendar:
+    """
+    Разобранный график через общий кэш.
+
+    Args:
+        sheets: SheetsAPI (get_worksheet / _request_with_retry)
+        title: Конкретный лист (например, помесячный); None — из CANDIDATE_SCHEDULE_TITLES
+        force: Перечитать лист
+        list_titles: Как получить список листов (по умолчанию sheets.list_worksheet_titles)
+    """
+    def load() -> ShiftCalendar:
+        name = title
+        if name is None:
+            titles = list(list_titles() if list_titles else sheets.list_worksheet_titles())
+            if not titles:
+                logger.info("В книге не найдено листов.")
+                return ShiftCalendar(None, [])
+            name = pick_schedule_title(titles)
+            if not name:
+                logger.info(
+                    "Лист графика не найден. Ожидались: %s; есть: %s",
+                    ", ".join(CANDIDATE_SCHEDULE_TITLES),
+                    ", ".join(titles),
+                )
+                return ShiftCalendar(None, [])
+        ws = sheets.get_worksheet(name)
+        values = sheets._request_with_retry(ws.get_all_values)
+        return ShiftCalendar(name, values or [])
+
+    return get_shift_calendar_cache().get(title or "", load, force=force)
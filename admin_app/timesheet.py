@@ -0,0 +1,677 @@
+# admin_app/timesheet.py
+"""
+Табель рабочего времени на массивах NumPy.
+
+Раньше длительность работы, перерывов и переработки считалась циклами
+по строкам logs (status_start_time/status_end_time) и словарям WorkLog.
+Здесь статусы загружаются один раз в массивы интервалов
+(пользователь, начало, конец, вид) и дальше обрабатываются целиком:
+
+1. незакрытые статусы закрываются началом следующего статуса того же
+   пользователя (или now, не дальше TIMESHEET_OPEN_STATUS_MAX_HOURS);
+2. пересекающиеся и дублирующиеся интервалы сливаются (сортировка +
+   накопленный максимум конца по пользователю);
+3. интервалы режутся на «рабочие сутки» пользователя: граница суток —
+   середина нерабочего промежутка его смены, поэтому ночная смена
+   20:00–08:00 и задержка после полуночи остаются в дне начала смены
+   (без смены — обычная полночь);
+4. каждый кусок пересекается с окном смены этого дня -> время в смене;
+5. суммы по (пользователь, день) — reduceat/bincount.
+
+Присутствие — объединение всех статусов; перерывы и обеды входят в него,
+работа = присутствие − (перерывы ∪ обеды), переработка = работа вне окна
+смены. Все времена — «наивное» локальное время, как в logs и WorkLog,
+в секундах (int64).
+
+Использование:
+    from admin_app.timesheet import StatusIntervals, compute_timesheet
+
+    intervals = StatusIntervals.from_records(worklog_rows)
+    sheet = compute_timesheet(intervals, shifts={"a@x.ru": ("09:00", "18:00")},
+                              date_from="2025-01-01", date_to="2025-01-31")
+    for row in sheet.by_user():
+        print(row["email"], row["work_min"], row["overtime_min"])
+"""
+from __future__ import annotations
+
+import sqlite3
+import warnings
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    from config import BREAK_TYPE_SHORT, BREAK_TYPE_LUNCH
+except Exception:
+    BREAK_TYPE_SHORT, BREAK_TYPE_LUNCH = "Перерыв", "Обед"
+
+try:
+    from config import TIMESHEET_OPEN_STATUS_MAX_HOURS
+except Exception:
+    TIMESHEET_OPEN_STATUS_MAX_HOURS = 16
+
+DAY = 86400
+NAT = np.iinfo(np.int64).min   # datetime64("NaT") в секундах
+
+# Вид интервала
+KIND_WORK, KIND_BREAK, KIND_LUNCH = 0, 1, 2
+
+# Действия, которые не открывают статус (только закрывают предыдущий)
+CLOSING_ACTIONS = {"LOGOUT", "AUTO_LOGOUT", "FORCE_LOGOUT"}
+
+Shift = Tuple[Union[str, dtime], Union[str, dtime]]
+DateLike = Union[str, date, datetime, None]
+
+
+# ----------------------------------------------------------------------
+# Разбор значений
+# ----------------------------------------------------------------------
+
+def _parse_times(values: Sequence) -> np.ndarray:
+    """
+    ISO-строки/datetime -> секунды (int64), пусто -> NAT.
+
+    Быстрый путь — разбор всего столбца NumPy; строки со смещением
+    (…Z, +03:00) разбираются поштучно и переводятся в локальное время.
+    """
+    arr = np.asarray(values, dtype=object)
+    if not len(arr):
+        return np.empty(0, dtype=np.int64)
+    blank = np.equal(arr, None) | np.equal(arr, "")
+    if blank.any():
+        arr = arr.copy()
+        arr[blank] = "NaT"
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")  # смещение часового пояса -> поштучный разбор
+            return np.array(arr, dtype="datetime64[s]").astype(np.int64)
+    except (ValueError, TypeError, UserWarning, DeprecationWarning):
+        pass
+    out = np.empty(len(arr), dtype=np.int64)
+    for i, v in enumerate(arr):
+        out[i] = _parse_one(v)
+    return out
+
+
+def _parse_one(value) -> int:
+    if value is None or value in ("", "NaT"):
+        return NAT
+    try:
+        dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return NAT
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return int(np.datetime64(dt, "s").astype(np.int64))
+
+
+def _to_seconds(value: Union[datetime, float, int, None]) -> int:
+    """now -> локальные секунды; None — текущее время"""
+    if value is None:
+        value = datetime.now()
+    if isinstance(value, (int, float)):
+        value = datetime.fromtimestamp(value)
+    return _parse_one(value)
+
+
+def _day_number(value: DateLike) -> Optional[int]:
+    """Дата -> номер дня от эпохи (None — без ограничения)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def _period_bounds(date_from: DateLike, date_to: DateLike) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Границы отбора строк за период (ISO-даты для сравнения строк): запас
+    в сутки с обеих сторон — ночная смена относится ко дню своего начала
+    """
+    lo, hi = _day_number(date_from), _day_number(date_to)
+    return (None if lo is None else str(np.datetime64(lo - 1, "D")),
+            None if hi is None else str(np.datetime64(hi + 2, "D")))
+
+
+def _in_period(start, end, lo: Optional[str], hi: Optional[str]) -> bool:
+    """Статус [start, end) задевает период [lo, hi); пустые значения не отсекаются"""
+    start = "" if start is None else str(start)
+    end = "" if end is None else str(end)
+    if lo is not None and end and end < lo:
+        return False
+    return hi is None or not start or start < hi
+
+
+def _shift_seconds(value: Union[str, dtime]) -> int:
+    """"09:00" / time(9) -> секунды от полуночи"""
+    if isinstance(value, dtime):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    parts = str(value).strip().split(":")
+    h, m = int(parts[0]), int(parts[1]) if len(parts) > 1 else 0
+    s = int(parts[2]) if len(parts) > 2 else 0
+    return (h * 3600 + m * 60 + s) % DAY
+
+
+def _lookup(values: Sequence[str], table: Dict[str, int], dtype) -> np.ndarray:
+    """Коды по словарю уникальных значений (поиск — map на C, без цикла Python)"""
+    return np.fromiter(map(table.__getitem__, values), dtype=dtype, count=len(values))
+
+
+def _encode(values: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """Нормализованные email -> (словарь, коды int32) в порядке появления"""
+    raw = dict.fromkeys(values)          # уникальные значения как есть
+    index: Dict[str, int] = {}
+    for v in raw:
+        raw[v] = index.setdefault((v or "").strip().lower(), len(index))
+    return list(index), _lookup(values, raw, np.int32)
+
+
+def _status_kinds(statuses: Sequence[str]) -> np.ndarray:
+    """Статус -> вид интервала (перерыв/обед/работа); разбор только уникальных статусов"""
+    short, lunch = BREAK_TYPE_SHORT.lower(), BREAK_TYPE_LUNCH.lower()
+    kinds = dict.fromkeys(statuses)
+    for status in kinds:
+        s = (status or "").strip().lower()
+        kinds[status] = KIND_BREAK if short in s else KIND_LUNCH if lunch in s else KIND_WORK
+    return _lookup(statuses, kinds, np.int8)
+
+
+# ----------------------------------------------------------------------
+# Операции над интервалами
+# ----------------------------------------------------------------------
+
+def _next_in_user(user: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Для массивов, отсортированных по (user, start): значение следующей
+    строки того же пользователя и маска «следующая строка есть».
+    """
+    n = len(user)
+    nxt = np.full(n, NAT, dtype=np.int64)
+    has = np.zeros(n, dtype=bool)
+    if n > 1:
+        has[:-1] = user[1:] == user[:-1]
+        nxt[:-1] = values[1:]
+    return nxt, has
+
+
+def _close_open(user: np.ndarray, start: np.ndarray, end: np.ndarray,
+                now: int, max_open: int) -> np.ndarray:
+    """
+    Конец для незакрытых статусов (end == NAT), массивы отсортированы
+    по (user, start): начало следующего статуса пользователя, иначе now;
+    в любом случае не дальше start + max_open (упавший клиент).
+    """
+    end = end.copy()
+    is_open = end == NAT
+    if is_open.any():
+        nxt, has = _next_in_user(user, start)
+        closing = np.where(has, nxt, now)
+        end[is_open] = np.minimum(closing[is_open], start[is_open] + max_open)
+    return end
+
+
+def _order(user: np.ndarray, start: np.ndarray) -> np.ndarray:
+    """Перестановка по (user, start): один argsort по составному ключу int64 (быстрее lexsort)"""
+    if not len(start):
+        return np.arange(0)
+    base = start.min()
+    span = int(start.max() - base) + 1
+    return np.argsort(user.astype(np.int64) * span + (start - base), kind="stable")
+
+
+def _is_sorted(user: np.ndarray, start: np.ndarray) -> bool:
+    """Уже упорядочены по (user, start) — StatusIntervals.from_* так и отдают"""
+    du = np.diff(user)
+    return bool(np.all((du > 0) | ((du == 0) & (np.diff(start) >= 0))))
+
+
+def merge_intervals(user: np.ndarray, start: np.ndarray, end: np.ndarray
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Слить пересекающиеся и смежные интервалы каждого пользователя.
+
+    Сортировка по (user, start), затем накопленный максимум конца: чтобы
+    пользователи не влияли друг на друга, ко времени добавляется
+    user × span (span больше любого интервала). Новый отрезок начинается
+    там, где начало больше максимума предыдущих концов.
+
+    Returns:
+        (user, start, end) без пересечений, отсортированные по (user, start)
+    """
+    if not len(start):
+        return user[:0], start[:0], end[:0]
+    if _is_sorted(user, start):
+        u, s, e = user, start, end
+    else:
+        order = _order(user, start)
+        u, s, e = user[order], start[order], end[order]
+    base = s.min()
+    span = int(max(e.max(), s.max()) - base) + 1
+    offset = u.astype(np.int64) * span - base
+    reach = np.maximum.accumulate(e + offset)
+    new = np.empty(len(s), dtype=bool)
+    new[0] = True
+    new[1:] = s[1:] + offset[1:] > reach[:-1]
+    idx = np.flatnonzero(new)
+    return u[idx], s[idx], np.maximum.reduceat(e, idx)
+
+
+def split_days(user: np.ndarray, start: np.ndarray, end: np.ndarray, boundary: np.ndarray
+               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Разрезать интервалы по границам суток пользователя
+    (k × DAY + boundary[user]); интервал через полночь -> два куска.
+
+    Returns:
+        (user, day_k, start, end) — k: номер суток, куски в порядке исходных интервалов
+    """
+    b = boundary[user]
+    first = (start - b) // DAY
+    last = (end - 1 - b) // DAY
+    counts = last - first + 1
+    src = np.repeat(np.arange(len(start)), counts)
+    # номер куска внутри своего интервала
+    pos = np.arange(len(src)) - np.repeat(np.cumsum(counts) - counts, counts)
+    k = first[src] + pos
+    bs = b[src]
+    ps = np.maximum(start[src], k * DAY + bs)
+    pe = np.minimum(end[src], (k + 1) * DAY + bs)
+    return user[src], k, ps, pe
+
+
+# ----------------------------------------------------------------------
+# Данные
+# ----------------------------------------------------------------------
+
+@dataclass
+class StatusIntervals:
+    """Статусы сотрудников как массивы интервалов (секунды локального времени)"""
+    emails: List[str]     # номер пользователя -> email
+    user: np.ndarray      # int32
+    start: np.ndarray     # int64
+    end: np.ndarray       # int64, > start
+    kind: np.ndarray      # int8: KIND_WORK / KIND_BREAK / KIND_LUNCH
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        emails: Sequence[str],
+        statuses: Sequence[str],
+        starts: Sequence,
+        ends: Sequence,
+        now: Union[datetime, float, None] = None,
+        max_open_hours: float = TIMESHEET_OPEN_STATUS_MAX_HOURS
+    ) -> "StatusIntervals":
+        """
+        Строки вида logs: статус с началом и концом (конец может быть пустым —
+        статус ещё идёт или не был закрыт).
+        """
+        names, user = _encode(emails)
+        start = _parse_times(starts)
+        end = _parse_times(ends)
+        kind = _status_kinds(statuses)
+        valid = start != NAT
+        user, start, end, kind = user[valid], start[valid], end[valid], kind[valid]
+        order = _order(user, start)
+        user, start, end, kind = user[order], start[order], end[order], kind[order]
+        end = _close_open(user, start, end, _to_seconds(now), int(max_open_hours * 3600))
+        return cls._finish(names, user, start, end, kind)
+
+    @classmethod
+    def from_events(
+        cls,
+        emails: Sequence[str],
+        statuses: Sequence[str],
+        timestamps: Sequence,
+        actions: Optional[Sequence[str]] = None,
+        now: Union[datetime, float, None] = None,
+        max_open_hours: float = TIMESHEET_OPEN_STATUS_MAX_HOURS
+    ) -> "StatusIntervals":
+        """
+        Журнал событий (WorkLog без начала/конца статуса): статус длится
+        от своего события до следующего события пользователя; LOGOUT
+        только закрывает предыдущий статус.
+        """
+        names, user = _encode(emails)
+        ts = _parse_times(timestamps)
+        kind = _status_kinds(statuses)
+        closing = np.zeros(len(ts), dtype=bool)
+        if actions is not None:
+            closing = np.fromiter(
+                ((a or "").strip().upper() in CLOSING_ACTIONS for a in actions), dtype=bool, count=len(ts)
+            )
+        valid = ts != NAT
+        user, ts, kind, closing = user[valid], ts[valid], kind[valid], closing[valid]
+        order = _order(user, ts)
+        user, ts, kind, closing = user[order], ts[order], kind[order], closing[order]
+        end = _close_open(user, ts, np.full(len(ts), NAT, dtype=np.int64),
+                          _to_seconds(now), int(max_open_hours * 3600))
+        keep = ~closing
+        return cls._finish(names, user[keep], ts[keep], end[keep], kind[keep])
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Sequence[Mapping[str, object]],
+        now: Union[datetime, float, None] = None,
+        max_open_hours: float = TIMESHEET_OPEN_STATUS_MAX_HOURS,
+        date_from: DateLike = None,
+        date_to: DateLike = None
+    ) -> "StatusIntervals":
+        """
+        Словари logs / WorkLog_* (ключи без учёта регистра и «_»): при
+        наличии начала статуса (status_start_time / StatusStartTime) —
+        интервалы, иначе — журнал событий по Timestamp.
+
+        date_from/date_to отбрасывают строки вне периода (с запасом в сутки,
+        как from_local_db) до разбора времени; строки без даты остаются.
+        """
+        if not records:
+            return cls._finish([], *(np.empty(0, dtype=t) for t in (np.int32, np.int64, np.int64, np.int8)))
+        keys = {str(k).replace("_", "").replace(" ", "").lower(): k for k in records[0].keys()}
+
+        def column(*names: str, default=""):
+            for name in names:
+                key = keys.get(name)
+                if key is not None:
+                    return [r.get(key, default) for r in records]
+            return None
+
+        emails = column("email") or [""] * len(records)
+        statuses = column("status") or [""] * len(records)
+        actions = column("actiontype", "action")
+        starts = column("statusstarttime", "statusstart", "starttime")
+        lo, hi = _period_bounds(date_from, date_to)
+        if starts is not None and any(starts):
+            ends = column("statusendtime", "statusend", "endtime") or [""] * len(records)
+            keep = [True] * len(records)
+            if actions is not None:
+                # LOGOUT-строки logs — нулевые интервалы, не статусы
+                keep = [(a or "").strip().upper() not in CLOSING_ACTIONS for a in actions]
+            if lo is not None or hi is not None:
+                keep = [k and _in_period(s, e, lo, hi) for k, s, e in zip(keep, starts, ends)]
+            if not all(keep):
+                emails, statuses, starts, ends = (
+                    [v for v, k in zip(col, keep) if k] for col in (emails, statuses, starts, ends)
+                )
+            return cls.from_arrays(emails, statuses, starts, ends, now=now, max_open_hours=max_open_hours)
+        timestamps = column("timestamp") or [""] * len(records)
+        if lo is not None or hi is not None:
+            keep = [_in_period(t, t, lo, hi) for t in timestamps]
+            if not all(keep):
+                emails, statuses, timestamps = (
+                    [v for v, k in zip(col, keep) if k] for col in (emails, statuses, timestamps)
+                )
+                if actions is not None:
+                    actions = [v for v, k in zip(actions, keep) if k]
+        return cls.from_events(emails, statuses, timestamps, actions, now=now, max_open_hours=max_open_hours)
+
+    @classmethod
+    def from_local_db(
+        cls,
+        db_path: Optional[str] = None,
+        date_from: DateLike = None,
+        date_to: DateLike = None,
+        now: Union[datetime, float, None] = None,
+        max_open_hours: float = TIMESHEET_OPEN_STATUS_MAX_HOURS
+    ) -> "StatusIntervals":
+        """Статусы из таблицы logs локальной БД (только чтение)"""
+        if db_path is None:
+            from config import LOCAL_DB_PATH
+            db_path = str(LOCAL_DB_PATH)
+        where = ["action_type IN ('LOGIN', 'STATUS_CHANGE')", "status_start_time IS NOT NULL"]
+        params: List[str] = []
+        lo, hi = _period_bounds(date_from, date_to)
+        if lo is not None:
+            where.append("(status_end_time IS NULL OR status_end_time >= ?)")
+            params.append(lo)
+        if hi is not None:
+            where.append("status_start_time < ?")
+            params.append(hi)
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT email, status, status_start_time, status_end_time FROM logs WHERE "
+                + " AND ".join(where), params
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return cls.from_records([])
+        emails, statuses, starts, ends = zip(*rows)
+        return cls.from_arrays(emails, statuses, starts, ends, now=now, max_open_hours=max_open_hours)
+
+    @classmethod
+    def concat(cls, parts: Sequence["StatusIntervals"]) -> "StatusIntervals":
+        """Объединить наборы (листы WorkLog_* по группам) в общую нумерацию пользователей"""
+        if not parts:
+            return cls.from_records([])
+        index: Dict[str, int] = {}
+        users = []
+        for part in parts:
+            remap = np.array([index.setdefault(e, len(index)) for e in part.emails], dtype=np.int32)
+            users.append(remap[part.user] if len(part.user) else part.user)
+        return cls(list(index), np.concatenate(users),
+                   *(np.concatenate([getattr(p, f) for p in parts]) for f in ("start", "end", "kind")))
+
+    @classmethod
+    def _finish(cls, names, user, start, end, kind) -> "StatusIntervals":
+        ok = end > start
+        return cls(names, user[ok], start[ok], end[ok], kind[ok])
+
+
+@dataclass
+class TimesheetTotals:
+    """Итоги по (сотрудник, рабочий день); длительности — секунды"""
+    emails: List[str]
+    user: np.ndarray        # int32, номер в emails
+    day: np.ndarray         # datetime64[D] — день начала смены
+    present: np.ndarray     # присутствие (объединение всех статусов)
+    work: np.ndarray        # присутствие без перерывов и обедов
+    breaks: np.ndarray
+    lunch: np.ndarray
+    in_shift: np.ndarray    # работа внутри окна смены
+    overtime: np.ndarray    # работа вне окна смены
+    first_in: np.ndarray    # datetime64[s]
+    last_out: np.ndarray    # datetime64[s]
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    def rows(self) -> List[Dict[str, object]]:
+        """Строки «сотрудник × день» для отчётов (минуты)"""
+        mins = {name: (getattr(self, name) // 60).tolist()
+                for name in ("present", "work", "breaks", "lunch", "in_shift", "overtime")}
+        days = self.day.astype(str).tolist()
+        first = self.first_in.astype(str).tolist()
+        last = self.last_out.astype(str).tolist()
+        out = []
+        for i, uid in enumerate(self.user.tolist()):
+            out.append({
+                "email": self.emails[uid],
+                "date": days[i],
+                "first_in": first[i],
+                "last_out": last[i],
+                "present_min": mins["present"][i],
+                "work_min": mins["work"][i],
+                "break_min": mins["breaks"][i],
+                "lunch_min": mins["lunch"][i],
+                "in_shift_min": mins["in_shift"][i],
+                "overtime_min": mins["overtime"][i],
+            })
+        return out
+
+    def by_user(self) -> List[Dict[str, object]]:
+        """Суммы за период по сотруднику (минуты), по убыванию работы"""
+        n = len(self.emails)
+        days = np.bincount(self.user, minlength=n)
+        sums = {name: np.bincount(self.user, weights=getattr(self, name), minlength=n).astype(np.int64) // 60
+                for name in ("present", "work", "breaks", "lunch", "in_shift", "overtime")}
+        out = []
+        for uid in np.flatnonzero(days)[np.argsort(-sums["work"][days > 0], kind="stable")].tolist():
+            out.append({
+                "email": self.emails[uid],
+                "days": int(days[uid]),
+                "present_min": int(sums["present"][uid]),
+                "work_min": int(sums["work"][uid]),
+                "break_min": int(sums["breaks"][uid]),
+                "lunch_min": int(sums["lunch"][uid]),
+                "in_shift_min": int(sums["in_shift"][uid]),
+                "overtime_min": int(sums["overtime"][uid]),
+            })
+        return out
+
+    def for_email(self, email: str) -> "TimesheetTotals":
+        """Только дни одного сотрудника"""
+        email = (email or "").strip().lower()
+        uid = self.emails.index(email) if email in self.emails else -1
+        return self._take(self.user == uid)
+
+    def _take(self, mask: np.ndarray) -> "TimesheetTotals":
+        return TimesheetTotals(self.emails, *(getattr(self, f)[mask] for f in (
+            "user", "day", "present", "work", "breaks", "lunch", "in_shift",
+            "overtime", "first_in", "last_out")))
+
+
+# ----------------------------------------------------------------------
+# Расчёт
+# ----------------------------------------------------------------------
+
+def _shift_arrays(emails: Sequence[str], shifts: Optional[Mapping[str, Shift]],
+                  default_shift: Optional[Shift]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    По пользователю: граница рабочих суток, начало окна смены
+    (от границы предыдущих суток, может быть ≥ DAY) и длина окна.
+    Без смены — сутки с полуночи, окно на весь день (переработки нет).
+    """
+    n = len(emails)
+    boundary = np.zeros(n, dtype=np.int64)
+    win_start = np.zeros(n, dtype=np.int64)
+    win_len = np.full(n, DAY, dtype=np.int64)
+    lookup = {str(k).strip().lower(): v for k, v in (shifts or {}).items()}
+    for uid, email in enumerate(emails):
+        shift = lookup.get(email, default_shift)
+        if not shift:
+            continue
+        ss, se = _shift_seconds(shift[0]), _shift_seconds(shift[1])
+        length = (se - ss) % DAY or DAY
+        # граница — середина нерабочего промежутка после конца смены
+        b = (ss + length + (DAY - length) // 2) % DAY
+        boundary[uid] = b
+        win_start[uid] = ss if ss >= b else ss + DAY
+        win_len[uid] = length
+    return boundary, win_start, win_len
+
+
+def _pieces(user, start, end, boundary, win_start, win_len):
+    """Куски по суткам: (ключ дня, номер дня, начало, конец, секунд в окне смены)"""
+    u, k, ps, pe = split_days(user, start, end, boundary)
+    w0 = k * DAY + win_start[u]
+    inside = np.clip(np.minimum(pe, w0 + win_len[u]) - np.maximum(ps, w0), 0, None)
+    # день подписывается датой начала смены (окно может начинаться после границы)
+    label = k + win_start[u] // DAY
+    return u, label, ps, pe, inside
+
+
+def compute_timesheet(
+    intervals: StatusIntervals,
+    shifts: Optional[Mapping[str, Shift]] = None,
+    default_shift: Optional[Shift] = None,
+    date_from: DateLike = None,
+    date_to: DateLike = None
+) -> TimesheetTotals:
+    """
+    Табель по сотрудникам и дням.
+
+    Args:
+        intervals: Статусы (StatusIntervals.from_*)
+        shifts: email -> ("09:00", "18:00"); конец ≤ начала — смена через полночь
+        default_shift: Смена для сотрудников без записи в shifts (None — без смены)
+        date_from, date_to: Дни табеля включительно (по дню начала смены)
+    """
+    emails = intervals.emails
+    boundary, win_start, win_len = _shift_arrays(emails, shifts, default_shift)
+    kind = intervals.kind
+
+    # Присутствие и паузы (перерыв ∪ обед) — без пересечений внутри себя
+    pres = merge_intervals(intervals.user, intervals.start, intervals.end)
+    pause_mask = kind != KIND_WORK
+    pause = merge_intervals(intervals.user[pause_mask], intervals.start[pause_mask], intervals.end[pause_mask])
+
+    pu, pk, ps, pe, pin = _pieces(*pres, boundary, win_start, win_len)
+    if not len(pu):
+        return _empty(emails)
+    kmin = int(pk.min())
+    ndays = int(pk.max()) - kmin + 1
+    pkey = pu.astype(np.int64) * ndays + (pk - kmin)
+
+    # Куски присутствия отсортированы по (user, start) и не пересекаются ->
+    # ключи дней неубывающие, суммы по дню — reduceat по границам серий
+    idx = np.flatnonzero(np.r_[True, pkey[1:] != pkey[:-1]])
+    last_idx = np.r_[idx[1:], len(pkey)] - 1
+    cells = pkey[idx]
+    present = np.add.reduceat(pe - ps, idx)
+    present_in = np.add.reduceat(pin, idx)
+
+    def per_cell(user, start, end):
+        """Суммы (всего, в окне смены) по ячейкам присутствия"""
+        if not len(user):
+            zero = np.zeros(len(cells), dtype=np.int64)
+            return zero, zero
+        u, k, s, e, inside = _pieces(user, start, end, boundary, win_start, win_len)
+        pos = np.searchsorted(cells, u.astype(np.int64) * ndays + (k - kmin))
+        total = np.bincount(pos, weights=e - s, minlength=len(cells)).astype(np.int64)
+        within = np.bincount(pos, weights=inside, minlength=len(cells)).astype(np.int64)
+        return total, within
+
+    pause_total, pause_in = per_cell(*pause)
+    brk = merge_intervals(*(a[kind == KIND_BREAK] for a in (intervals.user, intervals.start, intervals.end)))
+    lun = merge_intervals(*(a[kind == KIND_LUNCH] for a in (intervals.user, intervals.start, intervals.end)))
+    breaks, _ = per_cell(*brk)
+    lunch, _ = per_cell(*lun)
+
+    work = present - pause_total
+    in_shift = present_in - pause_in
+    totals = TimesheetTotals(
+        emails=emails,
+        user=(cells // ndays).astype(np.int32),
+        day=(cells % ndays + kmin).astype("datetime64[D]"),
+        present=present,
+        work=work,
+        breaks=breaks,
+        lunch=lunch,
+        in_shift=in_shift,
+        overtime=work - in_shift,
+        first_in=ps[idx].astype("datetime64[s]"),
+        last_out=pe[last_idx].astype("datetime64[s]"),
+    )
+    lo, hi = _day_number(date_from), _day_number(date_to)
+    if lo is None and hi is None:
+        return totals
+    dayno = totals.day.astype(np.int64)
+    mask = np.ones(len(dayno), dtype=bool)
+    if lo is not None:
+        mask &= dayno >= lo
+    if hi is not None:
+        mask &= dayno <= hi
+    return totals._take(mask)
+
+
+def _empty(emails: List[str]) -> TimesheetTotals:
+    z = np.empty(0, dtype=np.int64)
+    return TimesheetTotals(emails, np.empty(0, dtype=np.int32), np.empty(0, dtype="datetime64[D]"),
+                           z, z, z, z, z, z, np.empty(0, dtype="datetime64[s]"), np.empty(0, dtype="datetime64[s]"))
+
+
+def format_minutes(minutes: int) -> str:
+    """125 -> "2:05" """
+    minutes = int(minutes)
+    sign = "-" if minutes < 0 else ""
+    return f"{sign}{abs(minutes) // 60}:{abs(minutes) % 60:02d}"
@@ -0,0 +1,151 @@
+# admin_app/user_index.py
+"""
+Поисковый индекс по сотрудникам для таблицы админки.
+
+Строится один раз на загрузку списка (refresh_users), дальше каждый
+символ в поиске стоит O(совпадений), а не O(всех пользователей):
+
+- n-граммы (1..3 символа) email и ФИО в нижнем регистре -> номера
+  пользователей. Запрос из 1-2 символов — готовый список, из 3+ —
+  самый короткий список среди его триграмм с проверкой подстрокой;
+- инкрементальность: если новый запрос продолжает предыдущий
+  ("ив" -> "ива"), кандидаты берутся из предыдущего результата,
+  если он короче списка по n-грамме;
+- группы -> номера пользователей, активность — по множеству email.
+
+Семантика та же, что у прежнего фильтра: подстрока в email или ФИО
+без учёта регистра. Модуль без Qt — индекс можно тестировать отдельно.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+MAX_GRAM = 3
+
+
+def _grams(text: str) -> set:
+    """Все подстроки длиной 1..MAX_GRAM"""
+    out = set()
+    n = len(text)
+    for size in range(1, MAX_GRAM + 1):
+        for i in range(n - size + 1):
+            out.add(text[i:i + size])
+    return out
+
+
+class UserSearchIndex:
+    """
+    Индекс подстрок по email/ФИО + группы.
+
+    Пользователи адресуются номером в исходном списке; результаты
+    поиска возвращаются в исходном порядке.
+    """
+
+    def __init__(self, users: Sequence[Dict[str, str]] = ()):
+        self.rebuild(users)
+
+    def rebuild(self, users: Sequence[Dict[str, str]]):
+        """Построить индекс заново (после загрузки списка пользователей)"""
+        self._emails: List[str] = []
+        self._names: List[str] = []
+        self._groups: List[str] = []
+        postings: Dict[str, array] = {}
+        by_group: Dict[str, array] = {}
+
+        for uid, user in enumerate(users):
+            email = str(user.get("Email", "")).strip().lower()
+            name = str(user.get("Name", "")).lower()
+            group = str(user.get("Group", "")).strip()
+            self._emails.append(email)
+            self._names.append(name)
+            self._groups.append(group)
+
+            for gram in _grams(email) | _grams(name):
+                lst = postings.get(gram)
+                if lst is None:
+                    lst = postings[gram] = array("i")
+                lst.append(uid)
+            lst = by_group.get(group)
+            if lst is None:
+                lst = by_group[group] = array("i")
+            lst.append(uid)
+
+        self._postings = postings
+        self._by_group = by_group
+        self._last_query = ""
+        self._last_matches: Optional[Sequence[int]] = None
+
+    def __len__(self) -> int:
+        return len(self._emails)
+
+    def email(self, uid: int) -> str:
+        """Email в нижнем регистре (как в множестве активных сессий)"""
+        return self._emails[uid]
+
+    def _match_text(self, query: str) -> Sequence[int]:
+        """Номера пользователей, у которых query — подстрока email или ФИО"""
+        if not query:
+            return range(len(self._emails))
+
+        if len(query) <= MAX_GRAM:
+            # n-грамма целиком = подстрока: список уже точный
+            matches: Sequence[int] = self._postings.get(query, ())
+        else:
+            lists = []
+            for i in range(len(query) - MAX_GRAM + 1):
+                lst = self._postings.get(query[i:i + MAX_GRAM])
+                if lst is None:
+                    return ()
+                lists.append(lst)
+            candidates: Iterable[int] = min(lists, key=len)
+            # Продолжение предыдущего запроса: его результат — тоже кандидаты
+            prev = self._last_matches
+            if prev is not None and self._last_query and query.startswith(self._last_query) \
+                    and len(prev) < len(candidates):
+                candidates = prev
+            emails, names = self._emails, self._names
+            matches = [uid for uid in candidates if query in emails[uid] or query in names[uid]]
+
+        self._last_query, self._last_matches = query, matches
+        return matches
+
+    def search(
+        self,
+        query: str = "",
+        group: Optional[str] = None,
+        active_emails: Optional[set] = None,
+    ) -> List[int]:
+        """
+        Номера подходящих пользователей по порядку.
+
+        Args:
+            query: Подстрока email или ФИО (регистр не важен)
+            group: Только эта группа (None — все)
+            active_emails: Только эти email (None — без фильтра активности)
+        """
+        query = (query or "").strip().lower()
+        if not query and group is not None:
+            # Без текста начинаем с группы — короче полного списка
+            matches: Sequence[int] = self._by_group.get(group, ())
+            group = None
+        else:
+            matches = self._match_text(query)
+
+        if group is None and active_emails is None:
+            return list(matches)
+        groups, emails = self._groups, self._emails
+        return [
+            uid for uid in matches
+            if (group is None or groups[uid] == group)
+            and (active_emails is None or emails[uid] in active_emails)
+        ]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Размер индекса (для логов/диагностики)"""
+        return {
+            'users': len(self._emails),
+            'grams': len(self._postings),
+            'postings': sum(len(lst) for lst in self._postings.values()),
+            'groups': len(self._by_group),
+        }
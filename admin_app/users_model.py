@@ -0,0 +1,113 @@
+# admin_app/users_model.py
+"""
+Модель таблицы сотрудников для QTableView.
+
+Вместо пересоздания QTableWidgetItem на каждый символ поиска:
+- список пользователей и UserSearchIndex строятся один раз (set_users);
+- фильтр (set_filter) — это только пересчёт номеров видимых строк;
+- текст ячеек отдаётся в data() по запросу вида, т.е. только для строк,
+  попавших на экран.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from admin_app.user_index import UserSearchIndex
+
+ACTIVE_MARK = "🟢 "
+
+
+class UsersTableModel(QAbstractTableModel):
+    """Отфильтрованный вид на кэшированный список пользователей"""
+
+    def __init__(self, fields: Sequence[str], headers: Sequence[str], parent=None):
+        super().__init__(parent)
+        self._fields = list(fields)
+        self._headers = list(headers)
+        self._users: List[Dict[str, str]] = []
+        self._index = UserSearchIndex()
+        self._rows: List[int] = []
+        self._active: set = set()
+
+    # ---------- данные ----------
+    def set_users(self, users: Sequence[Dict[str, str]], index: Optional[UserSearchIndex] = None):
+        """
+        Новый список пользователей: сбросить фильтр.
+
+        index — индекс, уже построенный по этому списку (в рабочем потоке);
+        без него индекс строится здесь.
+        """
+        self.beginResetModel()
+        self._users = list(users)
+        if index is not None:
+            self._index = index
+        else:
+            self._index.rebuild(self._users)
+        self._rows = list(range(len(self._users)))
+        self._active = set()
+        self.endResetModel()
+
+    def set_filter(self, text: str = "", group: Optional[str] = None,
+                   active_emails: Optional[set] = None):
+        """
+        Применить фильтр.
+
+        Args:
+            text: Подстрока email или ФИО
+            group: Группа (None — все)
+            active_emails: Только эти email, они же помечаются 🟢 (None — без фильтра)
+        """
+        rows = self._index.search(text, group=group, active_emails=active_emails)
+        self.beginResetModel()
+        self._rows = rows
+        self._active = active_emails or set()
+        self.endResetModel()
+
+    def user_at(self, row: int) -> Optional[Dict[str, str]]:
+        """Пользователь в видимой строке row (None — вне диапазона)"""
+        if 0 <= row < len(self._rows):
+            return self._users[self._rows[row]]
+        return None
+
+    def is_active(self, row: int) -> bool:
+        return 0 <= row < len(self._rows) and self._index.email(self._rows[row]) in self._active
+
+    @property
+    def index_stats(self) -> Dict[str, int]:
+        return self._index.get_stats()
+
+    # ---------- QAbstractTableModel ----------
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._fields)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        user = self.user_at(row)
+        if user is None:
+            return None
+        key = self._fields[col]
+        val = str(user.get(key, ""))
+        if key == "Email" and self.is_active(row):
+            val = ACTIVE_MARK + val
+        return val
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal and 0 <= section < len(self._headers):
+            return self._headers[section]
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
@@ -36,6 +36,9 @@ try:
     # сохраняем прежнее имя переменной для кода ниже
     sheets_api = get_sheets_api()
     from sync.network import is_internet_available, is_internet_available_fast
+    from sync.gateway_client import get_gateway_client, get_routed_api, GatewayUnavailable
+    from shared.resilience.degradation_manager import notify_sync_queue_depth
+    from shared.metrics import get_metrics_registry, families_from_dict, get_tracer, traced
 except ImportError as e:
     logging.error(f"Ошибка импорта модулей: {e}")
     raise
@@ -49,6 +52,11 @@ except Exception:
 
 # Персональные правила теперь обрабатываются через движок уведомлений, прямой импорт не нужен.
 
+_QUEUE_DEPTH = get_metrics_registry().gauge(
+    "wtt_sync_queue_depth", "Несинхронизированных записей в локальной очереди"
+)
+_tracer = get_tracer()
+
 logger = logging.getLogger(__name__)
 
 PING_PORT = 43333
@@ -83,6 +91,7 @@ class SyncManager(QObject):
             'success_rate': 1.0,
             'queue_size': 0
         }
+        get_metrics_registry().register_collector("sync_manager", self._collect_metrics)
         self._last_ping = time.time()
         self._last_loop_started = monotonic()
         self._tick_lock = Lock()  # Защита от перекрытия циклов синхронизации
@@ -166,7 +175,7 @@ class SyncManager(QObject):
         Возвращает: 'active', 'kicked', 'finished', 'expired', 'unknown'
         """
         try:
-            return sheets_api.check_user_session_status(email, session_id)
+            return get_routed_api(sheets_api).check_user_session_status(email, session_id)
         except Exception as e:
             logger.error(f"Ошибка при проверке статуса сессии: {e}")
             return "unknown"
@@ -191,6 +200,7 @@ class SyncManager(QObject):
         s.close()
         logger.info("Ping listener завершен")
 
+    @traced("sync.prepare_batch")
     def _prepare_batch(self, prioritize_fresh: bool = True) -> Optional[Dict[str, List[Dict]]]:
         """
         Подготовка пакета данных для синхронизации.
@@ -254,6 +264,7 @@ class SyncManager(QObject):
                 logger.error(f"Ошибка подготовки пакета: {e}", exc_info=True)
                 return None
 
+    @traced("sync.batch")
     def _sync_batch(self, batch: Dict[str, List[Dict]]) -> bool:
         if not batch:
             logger.debug("Пустой пакет, пропускаем синхронизацию")
@@ -266,6 +277,21 @@ class SyncManager(QObject):
         
         logger.info(f"Начало синхронизации пакета из {total_actions} действий для {len(batch)} пользователей")
         
+        # Шлюз в локальной сети пишет весь пакет за нас (группы знает сам);
+        # не ответил — ниже обычная синхронизация по пользователям
+        gateway = get_gateway_client()
+        if gateway is not None:
+            try:
+                with _tracer.span("sync.gateway", rows=total_actions):
+                    ok, ids = gateway.log_actions([a for actions in batch.values() for a in actions])
+                synced_ids.extend(ids)
+                success_count += len(ids)
+                batch = {}
+                if not ok:
+                    logger.warning(f"Шлюз записал {len(ids)} из {total_actions} действий, остальные — в следующем цикле")
+            except GatewayUnavailable:
+                logger.info("Шлюз синхронизации недоступен — прямая синхронизация")
+
         for email, actions in batch.items():
             logger.debug(f"Синхронизация для пользователя {email}: {len(actions)} действий")
             
@@ -279,7 +305,8 @@ class SyncManager(QObject):
                         return False
                     
                     # Получаем группу пользователя из листа Users
-                    user = sheets_api.get_user_by_email(email)
+                    with _tracer.span("sync.get_user_by_email"):
+                        user = sheets_api.get_user_by_email(email)
                     user_group = user.get("group") if user else None
                     
                     # Готовим список словарей для отправки
@@ -300,11 +327,14 @@ class SyncManager(QObject):
 
                     # Логируем детали перед отправкой
                     logger.info(f"📤 Отправка {len(actions_payload)} действий для {email} в группу {user_group}")
-                    for idx, action in enumerate(actions_payload):
-                        logger.debug(f"  [{idx+1}] {action['status']} at {action['timestamp']} (id={actions[idx]['id']})")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        # Поэлементный вывод только при DEBUG: f-строки в цикле не вычисляются зря
+                        for idx, action in enumerate(actions_payload):
+                            logger.debug(f"  [{idx+1}] {action['status']} at {action['timestamp']} (id={actions[idx]['id']})")
                     
                     # Используем новую сигнатуру API с передачей user_group
-                    result = sheets_api.log_user_actions(actions_payload, email, user_group=user_group)
+                    with _tracer.span("sync.log_user_actions", rows=len(actions_payload)):
+                        result = sheets_api.log_user_actions(actions_payload, email, user_group=user_group)
                     logger.info(f"✅ Результат отправки для {email}: {result}")
                     
                     if result:
@@ -327,7 +357,7 @@ class SyncManager(QObject):
                     
                     # Проверяем Circuit Breaker
                     if hasattr(sheets_api, 'circuit_breaker') and sheets_api.circuit_breaker:
-                        if not sheets_api.circuit_breaker.can_execute():
+                        if not sheets_api.circuit_breaker.allows_requests():
                             logger.error(f"❌ Circuit Breaker ОТКРЫТ для {email}. Прекращаем попытки синхронизации.")
                             break  # Прекращаем повторы если Circuit Breaker открыт
                 
@@ -340,7 +370,8 @@ class SyncManager(QObject):
             with self._db_lock:
                 try:
                     logger.debug(f"Помечаем как синхронизированные {len(synced_ids)} записей: {synced_ids}")
-                    self._db.mark_actions_synced(synced_ids)
+                    with _tracer.span("sync.mark_actions_synced", rows=len(synced_ids)):
+                        self._db.mark_actions_synced(synced_ids)
                     logger.info(f"✅ Успешно синхронизировано и отмечено {len(synced_ids)} записей.")
                 except Exception as e:
                     logger.error(f"Ошибка обновления статуса записей в локальной БД: {e}", exc_info=True)
@@ -357,6 +388,14 @@ class SyncManager(QObject):
         self._update_stats(success_count, total_actions, duration)
         return success_count == total_actions
 
+    def _report_queue_depth(self, depth: int):
+        """Глубина очереди: gauge метрик и событие для DegradationManager"""
+        _QUEUE_DEPTH.set(depth)
+        notify_sync_queue_depth(depth)
+    
+    def _collect_metrics(self):
+        return families_from_dict("wtt_sync", self._stats, counters=('total_synced',))
+    
     def _update_stats(self, success_count: int, total_actions: int, duration: float):
         logger.debug(f"Обновление статистики: success={success_count}, total={total_actions}, duration={duration:.2f}")
         with self._db_lock:
@@ -367,7 +406,8 @@ class SyncManager(QObject):
                 rate = success_count / total_actions
                 self._stats['success_rate'] = 0.9 * self._stats['success_rate'] + 0.1 * rate
             self._stats['queue_size'] = self._db.get_unsynced_count()
-            
+        
+        self._report_queue_depth(self._stats['queue_size'])
         logger.debug(f"Обновленная статистика: {self._stats}")
         if self.signals:
             self.signals.sync_status_updated.emit(self._stats.copy())
@@ -406,12 +446,14 @@ class SyncManager(QObject):
             self._stats['last_sync'] = datetime.now().isoformat(timespec='seconds')
             self._stats['last_duration'] = round(elapsed, 3)
             self._stats['queue_size'] = self._db.get_unsynced_count()
+            self._report_queue_depth(self._stats['queue_size'])
             if ok:
                 self._stats['total_synced'] += 1
             if self.signals:
                 self.signals.sync_status_updated.emit(dict(self._stats))
         return ok
 
+    @traced("sync.cycle")
     def _sync_cycle(self):
         """Один цикл синхронизации с защитой от перекрытия"""
         # Не пускаем второй тик, пока идёт текущий
@@ -478,11 +520,13 @@ class SyncManager(QObject):
             # Выполняем синхронизацию
             # ПРИОРИТЕТНАЯ синхронизация: всегда синхронизируем свежие записи первыми
             self.sync_once(prioritize_fresh=True)
-            self._check_remote_commands()
+            with _tracer.span("sync.check_remote_commands"):
+                self._check_remote_commands()
             
             # Проверяем долгие статусы через Engine
             try:
-                poll_long_running_remote()
+                with _tracer.span("sync.poll_long_running_remote"):
+                    poll_long_running_remote()
             except Exception:
                 logger.debug("long-status monitor skipped", exc_info=True)
             
@@ -532,20 +576,23 @@ class SyncManager(QObject):
             logger.debug("База данных закрыта")
         except Exception as e:
             logger.error(f"Ошибка при закрытии БД: {e}", exc_info=True)
+        _tracer.flush()  # Chrome trace (если задан TRACE_FILE)
         logger.info("Сервис синхронизации остановлен.")
 
 def configure_logging(background_mode: bool):
+    from logging_setup import PIIMaskingFormatter, start_queue_logging
+    
     log_file = 'auto_sync.log' if background_mode else None
     handlers = [logging.StreamHandler()]
     if log_file:
         handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
     
-    # Увеличиваем уровень логирования до DEBUG для более детальной информации
-    logging.basicConfig(
-        level=logging.DEBUG,  # Изменено с INFO на DEBUG
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=handlers
-    )
+    fmt = PIIMaskingFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    for handler in handlers:
+        handler.setFormatter(fmt)
+    # Увеличиваем уровень логирования до DEBUG для более детальной информации.
+    # Запись в файл/консоль — в потоке QueueListener, поток синхронизации только ставит в очередь
+    start_queue_logging(handlers, level=logging.DEBUG)
     
     # Для некоторых библиотеки устанавливаем более высокий уровень, чтобы избежать слишком много логов
     logging.getLogger('urllib3').setLevel(logging.INFO)
@@ -2,39 +2,202 @@
 # logging_setup.py
 from __future__ import annotations
 
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 import sys
 import re
-from typing import Optional, Union
+from typing import Dict, List, Optional, Union
 
 _LOGGING_INITIALIZED = False
 _ROOT_LOGGER_CONFIGURED = False
 
+# Шаблоны PII компилируются один раз (маскирование идёт на каждую запись)
+_EMAIL_RE = re.compile(r'([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+\.[A-Za-z]{2,})')
+_PHONE_RE = re.compile(r'\+?\d[\d\s\-()]{6,}\d')
+
+# Асинхронный конвейер: вызывающий поток только кладёт запись в очередь,
+# форматирование, маскирование и запись на диск — в потоке QueueListener
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_HOT_PATH_LIMIT = 20  # записей INFO/DEBUG в секунду с одного места вызова
+
+_pipeline_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["BoundedQueueHandler"] = None
+_rate_filter: Optional["CallSiteRateLimitFilter"] = None
+_atexit_registered = False
+
 def _mask_pii(msg: str) -> str:
     # простое маскирование email и телефонов
-    msg = re.sub(r'([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+\.[A-Za-z]{2,})', r'***@\2', msg)
-    msg = re.sub(r'\+?\d[\d\s\-()]{6,}\d', '***PHONE***', msg)
-    return msg
+    if "@" in msg:
+        msg = _EMAIL_RE.sub(r'***@\2', msg)
+    return _PHONE_RE.sub('***PHONE***', msg)
 
 class PIIFilter(logging.Filter):
+    """Маскирование в record.msg (синхронно). В конвейере используется PIIMaskingFormatter."""
     def filter(self, record: logging.LogRecord) -> bool:
         if isinstance(record.msg, str):
             record.msg = _mask_pii(record.msg)
         return True
 
-def _configure_root_logger(level: int, handler: logging.Handler) -> None:
-    global _ROOT_LOGGER_CONFIGURED
-    root = logging.getLogger()
-    if _ROOT_LOGGER_CONFIGURED:
-        # избегаем дублирования хендлеров при повторных запусках из CLI
-        for h in list(root.handlers):
-            root.removeHandler(h)
-    root.setLevel(level)
-    root.addHandler(handler)
-    _ROOT_LOGGER_CONFIGURED = True
+class PIIMaskingFormatter(logging.Formatter):
+    """
+    Форматтер с маскированием PII на этапе вывода.
+    
+    Маскируется итоговый текст сообщения (уже с подставленными args),
+    но не asctime/имя логгера. Работает в потоке QueueListener.
+    """
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = _mask_pii(record.message)
+        return super().formatMessage(record)
+
+class CallSiteRateLimitFilter(logging.Filter):
+    """
+    Ограничение частоты записей ниже WARNING с одного места вызова
+    (pathname:lineno) — горячие циклы вроде поэлементного логирования
+    в auto_sync._sync_batch не забивают очередь.
+    
+    Окно — 1 секунда; подавленные записи считаются, первая запись
+    следующего окна получает пометку о числе пропущенных.
+    Счётчики приблизительные (без блокировки): фильтр стоит на
+    вызывающем потоке и должен быть дешёвым.
+    """
+    def __init__(self, per_second: int = DEFAULT_HOT_PATH_LIMIT, level: int = logging.WARNING):
+        super().__init__()
+        self.per_second = per_second
+        self.level = level
+        self.suppressed = 0
+        self._windows: Dict[tuple, list] = {}  # (pathname, lineno) -> [начало окна, записей, подавлено]
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= self.level or self.per_second <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        window = self._windows.get(key)
+        if window is None or record.created - window[0] >= 1.0:
+            if window is not None and window[2] and isinstance(record.msg, str):
+                record.msg = f"{record.msg} [пропущено похожих: {window[2]}]"
+            self._windows[key] = [record.created, 1, 0]
+            return True
+        if window[1] < self.per_second:
+            window[1] += 1
+            return True
+        window[2] += 1
+        self.suppressed += 1
+        return False
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    QueueHandler с ограниченной очередью: при переполнении записи ниже
+    ERROR отбрасываются (счётчик dropped), ERROR и выше ждут место
+    не дольше error_timeout секунд.
+    """
+    def __init__(self, log_queue: queue.Queue, error_timeout: float = 0.05):
+        super().__init__(log_queue)
+        self.error_timeout = error_timeout
+        self.dropped = 0
+        self.enqueued = 0
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if record.levelno >= logging.ERROR:
+                self.queue.put(record, timeout=self.error_timeout)
+            else:
+                self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+def start_queue_logging(handlers: List[logging.Handler],
+                        level: int = logging.INFO,
+                        queue_size: Optional[int] = None,
+                        hot_path_limit: Optional[int] = None) -> BoundedQueueHandler:
+    """
+    Подключить к корневому логгеру асинхронный конвейер:
+    BoundedQueueHandler -> queue.Queue(queue_size) -> QueueListener(handlers).
+    
+    Прежний конвейер (если был) останавливается с дозаписью очереди.
+    Параметры по умолчанию — из config (LOG_QUEUE_SIZE, LOG_HOT_PATH_LIMIT).
+    """
+    global _listener, _queue_handler, _rate_filter, _ROOT_LOGGER_CONFIGURED, _atexit_registered
+    if queue_size is None or hot_path_limit is None:
+        try:
+            from config import LOG_QUEUE_SIZE, LOG_HOT_PATH_LIMIT
+        except Exception:
+            LOG_QUEUE_SIZE, LOG_HOT_PATH_LIMIT = DEFAULT_QUEUE_SIZE, DEFAULT_HOT_PATH_LIMIT
+        queue_size = LOG_QUEUE_SIZE if queue_size is None else queue_size
+        hot_path_limit = LOG_HOT_PATH_LIMIT if hot_path_limit is None else hot_path_limit
+    
+    with _pipeline_lock:
+        stop_queue_logging()
+        log_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        handler = BoundedQueueHandler(log_queue)
+        handler.setLevel(level)
+        rate_filter = CallSiteRateLimitFilter(per_second=hot_path_limit)
+        handler.addFilter(rate_filter)
+        
+        root = logging.getLogger()
+        if _ROOT_LOGGER_CONFIGURED:
+            # избегаем дублирования хендлеров при повторных запусках из CLI
+            for h in list(root.handlers):
+                root.removeHandler(h)
+        root.setLevel(level)
+        root.addHandler(handler)
+        _ROOT_LOGGER_CONFIGURED = True
+        
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        _listener, _queue_handler, _rate_filter = listener, handler, rate_filter
+        if not _atexit_registered:
+            atexit.register(stop_queue_logging)
+            _atexit_registered = True
+    _register_metrics()
+    return handler
+
+def stop_queue_logging() -> None:
+    """Остановить QueueListener, дописав накопленные записи"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    try:
+        listener.stop()
+    except Exception:
+        pass
+    for h in listener.handlers:
+        try:
+            h.flush()
+        except Exception:
+            pass
+
+def get_log_pipeline_stats() -> Dict[str, int]:
+    """Состояние конвейера: глубина очереди, ёмкость, отброшено, подавлено"""
+    handler, rate_filter = _queue_handler, _rate_filter
+    if handler is None:
+        return {'queue_depth': 0, 'queue_capacity': 0, 'enqueued': 0, 'dropped': 0, 'suppressed': 0}
+    return {
+        'queue_depth': handler.queue.qsize(),
+        'queue_capacity': handler.queue.maxsize,
+        'enqueued': handler.enqueued,
+        'dropped': handler.dropped,
+        'suppressed': rate_filter.suppressed if rate_filter else 0,
+    }
+
+def _register_metrics() -> None:
+    """Глубина очереди логов и потери — в реестр метрик (если доступен)"""
+    try:
+        from shared.metrics import get_metrics_registry, families_from_dict
+    except Exception:
+        return
+    get_metrics_registry().register_collector("logging", lambda: families_from_dict(
+        "wtt_log", get_log_pipeline_stats(),
+        counters=("enqueued", "dropped", "suppressed"),
+        help="Асинхронный конвейер логирования",
+    ))
 
 def _setup_logging_impl(app_name: str,
                        log_dir: Union[str, Path],
@@ -66,8 +229,8 @@ def _setup_logging_impl(app_name: str,
         
         _LOGGING_INITIALIZED = True
 
-    # Создаем хендлер для файла
-    fmt = logging.Formatter(
+    # Создаем хендлер для файла (пишет поток QueueListener, PII маскирует форматтер)
+    fmt = PIIMaskingFormatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S"
     )
@@ -80,18 +243,17 @@ def _setup_logging_impl(app_name: str,
     )
     fh.setLevel(level)
     fh.setFormatter(fmt)
-    fh.addFilter(PIIFilter())
+    handlers: List[logging.Handler] = [fh]
     
-    # Добавляем хендлер к корневому логгеру
-    _configure_root_logger(level, fh)
-
     # Консоль — только если переменная окружения DEBUG_CONSOLE=1
     if os.getenv("DEBUG_CONSOLE") == "1":
         ch = logging.StreamHandler(sys.stdout)
         ch.setLevel(level)
         ch.setFormatter(fmt)
-        ch.addFilter(PIIFilter())
-        logging.getLogger().addHandler(ch)
+        handlers.append(ch)
+    
+    # К корневому логгеру подключается только очередь
+    start_queue_logging(handlers, level)
     
     # Получаем и возвращаем логгер для приложения
     logger = logging.getLogger(app_name)
@@ -148,4 +310,8 @@ def get_logger(app_name: str = "wtt-app") -> logging.Logger:
     """
     return logging.getLogger(app_name)
 
-__all__ = ["setup_logging", "setup_logging_compat", "get_logger"]
\ No newline at end of file
+__all__ = [
+    "setup_logging", "setup_logging_compat", "get_logger",
+    "start_queue_logging", "stop_queue_logging", "get_log_pipeline_stats",
+    "PIIMaskingFormatter",
+]
\ No newline at end of file
@@ -2,12 +2,14 @@
 # notifications/engine.py
 from __future__ import annotations
 import logging, sqlite3, time, threading, string
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from typing import Optional, List, Dict, Tuple
 
 from notifications.rules_manager import load_rules, Rule
+from notifications.long_status import LongStatusScheduler, Threshold, limit_thresholds
 from telegram_bot.notifier import TelegramNotifier
-from config import LOCAL_DB_PATH
+from config import LOCAL_DB_PATH, LONG_STATUS_RULES_TTL_SEC
 
 log = logging.getLogger(__name__)
 
@@ -31,23 +33,77 @@ CREATE TABLE IF NOT EXISTS rule_last_sent (
 """
 
 _poller_stop = None
+_timers: Optional[LongStatusScheduler] = None
+# События статусов обрабатываются по порядку и вне потока GUI (пороги читают правила из Sheets)
+_hooks = ThreadPoolExecutor(max_workers=1, thread_name_prefix="long-status")
+_rules_cache: Tuple[float, List[Rule]] = (0.0, [])
 
 def start_background_poller(interval_sec: int = 60):
-    """Запускает фоновый опрос long_status/status_window."""
-    global _poller_stop
+    """
+    Запускает отслеживание длительных статусов.
+
+    Дедлайны ведёт колесо таймеров: текущий статус читается один раз при
+    старте, дальше — события on_status_started/on_status_ended.
+    interval_sec — самая длинная пауза потока колеса.
+    """
+    global _poller_stop, _timers
     if _poller_stop:
         return _poller_stop
-    _poller_stop = threading.Event()
-    def _loop():
-        while not _poller_stop.is_set():
-            try:
-                poll_long_running_remote()
-            except Exception:
-                log.exception("Long-status poll failed")
-            _poller_stop.wait(interval_sec)
-    threading.Thread(target=_loop, daemon=True).start()
+    _timers = LongStatusScheduler(
+        fire=long_status_check, thresholds=long_status_thresholds, max_sleep=interval_sec
+    )
+    _poller_stop = _timers.stop_event
+    _timers.start()
+    _hooks.submit(_seed_current_status)
     return _poller_stop
 
+def on_status_started(email: str, status_name: str, started_at) -> None:
+    """Пользователь перешёл в статус: переставить дедлайн длительного статуса."""
+    if _timers is not None:
+        _hooks.submit(_timers.status_started, email, status_name, started_at)
+
+def on_status_ended(email: str) -> None:
+    """Смена завершена: снять дедлайн."""
+    if _timers is not None:
+        _hooks.submit(_timers.status_ended, email)
+
+def _seed_current_status() -> None:
+    try:
+        from user_app import session as session_state
+        email = (session_state.get_user_email() or "").strip().lower()
+        current = _current_status(email) if email else None
+        if current:
+            _timers.status_started(email, *current)
+    except Exception:
+        log.exception("Long-status timers: initial status lookup failed")
+
+def _long_status_rules() -> List[Rule]:
+    """Правила long_status; лист NotificationRules перечитывается не чаще LONG_STATUS_RULES_TTL_SEC"""
+    global _rules_cache
+    loaded_at, rules = _rules_cache
+    if not loaded_at or time.monotonic() - loaded_at >= LONG_STATUS_RULES_TTL_SEC:
+        rules = [r for r in load_rules() if r.kind == "long_status"]
+        _rules_cache = (time.monotonic(), rules)
+    return rules
+
+def long_status_thresholds(status_name: str) -> List[Threshold]:
+    """Пороги статуса: лимиты перерыва/обеда и long_status-правила (повтор — по RateLimitSec)."""
+    from config import BREAK_LIMIT_MINUTES, LUNCH_LIMIT_MINUTES
+    thresholds = limit_thresholds(status_name, BREAK_LIMIT_MINUTES, LUNCH_LIMIT_MINUTES)
+    s_lc = (status_name or "").strip().lower()
+    try:
+        rules = _long_status_rules()
+    except Exception:
+        log.debug("long_status rules unavailable", exc_info=True)
+        rules = []
+    for rule in rules:
+        if rule.statuses and s_lc not in [x.lower() for x in rule.statuses]:
+            continue
+        if (rule.min_duration_min or 0) > 0:
+            # прежний опрос повторял не чаще раза в минуту
+            thresholds.append(Threshold(rule.min_duration_min, max(60, rule.rate_limit_sec)))
+    return thresholds
+
 def _open_db() -> sqlite3.Connection:
     con = sqlite3.connect(LOCAL_DB_PATH)
     con.execute("PRAGMA journal_mode=WAL;")
@@ -283,22 +339,52 @@ def long_status_check(email: str, status_name: str, started_dt: datetime, elapse
 def poll_long_running_remote() -> None:
     """
     Периодический бэкграунд-чек «длительных статусов» для текущего пользователя.
-    1) Берём последний статус по (email, session_id) из локальной БД (без IS NULL).
-    2) Если локально ничего нет — читаем ActiveSessions (только чтение).
-    3) Считаем длительность с учётом локальной TZ → UTC и применяем long_status-правила.
+    Если запущено колесо таймеров (start_background_poller) — ничего не делает:
+    дедлайны уже стоят. Иначе (отдельный сервис синхронизации):
+    находит текущий статус (_current_status) и применяет long_status-правила.
     """
     logger = logging.getLogger(__name__)
+    if _timers is not None and _timers.running:
+        return
     try:
         from user_app import session as session_state
-        from user_app.db_local import LocalDB
     except Exception:
-        logger.debug("poll_long_running_remote: session/LocalDB not available")
+        logger.debug("poll_long_running_remote: session not available")
         return
 
     email = (session_state.get_user_email() or "").strip().lower()
     if not email:
         return
 
+    current = _current_status(email)
+    if not current:
+        return
+    status_name, started_utc = current
+    elapsed_min = max(0, int((datetime.now(timezone.utc) - started_utc).total_seconds() // 60))
+    try:
+        long_status_check(
+            email=email,
+            status_name=status_name,
+            started_dt=started_utc,
+            elapsed_min=elapsed_min,
+        )
+    except Exception:
+        logger.exception("poll_long_running_remote: long_status_check failed")
+
+def _current_status(email: str) -> Optional[Tuple[str, datetime]]:
+    """
+    Текущий статус пользователя и его начало (UTC).
+    1) Берём последний статус по (email, session_id) из локальной БД (без IS NULL).
+    2) Если локально ничего нет — читаем ActiveSessions (только чтение).
+    3) Время с учётом локальной TZ → UTC.
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        from user_app.db_local import LocalDB
+    except Exception:
+        logger.debug("_current_status: LocalDB not available")
+        return None
+
     db = LocalDB()
     sess = db.get_active_session(email)
     if not sess:
@@ -352,35 +438,26 @@ def poll_long_running_remote() -> None:
             logger.debug("ActiveSessions fallback failed: %s", e)
 
     if not status_name or not started_iso:
-        return
+        return None
 
     # 3) Парсим время: если «наивное» — трактуем как локальное и конвертируем в UTC
     try:
         parsed = datetime.fromisoformat(started_iso.replace("Z", "+00:00"))
     except Exception:
-        logger.debug("poll_long_running_remote: bad started_iso=%r", started_iso)
-        return
+        logger.debug("_current_status: bad started_iso=%r", started_iso)
+        return None
     if parsed.tzinfo is None:
         local_tz = datetime.now().astimezone().tzinfo or timezone.utc
         started_dt = parsed.replace(tzinfo=local_tz)
     else:
         started_dt = parsed
     started_utc = started_dt.astimezone(timezone.utc)
-    elapsed_min = max(0, int((datetime.now(timezone.utc) - started_utc).total_seconds() // 60))
 
     logger.debug(
-        "long-status poll: status=%s started_local=%s started_utc=%s elapsed_min=%d",
-        status_name, started_dt.isoformat(), started_utc.isoformat(), elapsed_min
+        "long-status: status=%s started_local=%s started_utc=%s",
+        status_name, started_dt.isoformat(), started_utc.isoformat()
     )
-    try:
-        long_status_check(
-            email=email,
-            status_name=status_name,
-            started_dt=started_utc,
-            elapsed_min=elapsed_min,
-        )
-    except Exception:
-        logger.exception("poll_long_running_remote: long_status_check failed")
+    return status_name, started_utc
 
 # === helpers ===
 def _ratelimit_ok(con: sqlite3.Connection, rule: Rule, email: Optional[str], context: str) -> bool:
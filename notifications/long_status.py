@@ -0,0 +1,236 @@
+# notifications/long_status.py
+"""
+Дедлайны «длительных статусов» на колесе таймеров
+
+Вместо ежеминутного опроса (поднять LocalDB, найти текущий статус,
+пересчитать длительность) каждый пользователь держит в колесе ровно
+один таймер — на ближайший порог своего текущего статуса:
+- смена статуса снимает таймер и ставит новый;
+- таймер срабатывает точно на пороге и вызывает fire(...), после чего
+  ставится следующий порог или повтор (антиспам правила);
+- завершение смены снимает таймер.
+Работа пропорциональна числу смен статусов, а не пользователям × минутам.
+
+Использование:
+    from notifications.long_status import LongStatusScheduler, Threshold
+
+    timers = LongStatusScheduler(fire=long_status_check,
+                                 thresholds=lambda status: [Threshold(16, 1800)])
+    timers.start()
+    timers.status_started(email, "Перерыв", started_at)
+    timers.status_ended(email)
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from notifications.timer_wheel import HierarchicalTimerWheel, TimerHandle
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Threshold:
+    """Порог длительности статуса"""
+    minutes: int          # elapsed_min, с которого срабатывает
+    repeat_sec: int = 0   # повтор, пока статус не сменится (0 — один раз)
+
+
+@dataclass
+class _Tracked:
+    status: str
+    started: float                  # unix-время начала статуса
+    thresholds: Sequence[Threshold]
+    handle: Optional[TimerHandle] = None
+
+
+def _to_timestamp(value: Union[datetime, float, int, str]) -> float:
+    """Начало статуса -> unix-время; «наивное» время — локальное, как в логах LocalDB"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return value.timestamp()
+
+
+class LongStatusScheduler:
+    """
+    Точные уведомления о длительных статусах.
+
+    Args:
+        fire: fire(email, status, started_dt_utc, elapsed_min) — на каждом пороге
+        thresholds: thresholds(status) -> пороги статуса (пусто — не отслеживать)
+        clock: Источник времени (unix-секунды); в тестах — симулированный
+        tick: Шаг колеса, секунды
+        max_sleep: Самая длинная пауза потока (подхватывает переводы системных часов)
+        late_after: Колесо отстало от часов больше чем на столько секунд (сон машины) —
+            длительность считается по часам, пропущенные повторы не догоняются
+    """
+
+    def __init__(
+        self,
+        fire: Callable[[str, str, datetime, int], None],
+        thresholds: Callable[[str], Sequence[Threshold]],
+        clock: Callable[[], float] = time.time,
+        tick: float = 1.0,
+        max_sleep: float = 60.0,
+        late_after: float = 60.0
+    ):
+        self.fire = fire
+        self.thresholds = thresholds
+        self.clock = clock
+        self.max_sleep = max_sleep
+        self.late_after = late_after
+        self.wheel = HierarchicalTimerWheel(tick=tick, start=clock())
+        self._tracked: Dict[str, _Tracked] = {}
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self.stop_event = threading.Event()  # set() — остановить поток
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'started': 0, 'ended': 0, 'armed': 0, 'fired': 0, 'errors': 0}
+
+    def __len__(self) -> int:
+        return len(self._tracked)
+
+    # ------------------------------------------------------------------
+    # События статусов
+    # ------------------------------------------------------------------
+
+    def status_started(self, email: str, status: str, started_at: Union[datetime, float, str]) -> Optional[float]:
+        """
+        Пользователь перешёл в статус: прежний дедлайн снимается, ставится новый.
+
+        Returns:
+            Время срабатывания (unix) или None, если у статуса нет порогов
+        """
+        email = (email or "").strip().lower()
+        if not email:
+            return None
+        thresholds = sorted(self.thresholds(status or "") or (), key=lambda t: t.minutes)
+        with self._lock:
+            self._untrack(email)
+            self.stats['started'] += 1
+            if not thresholds:
+                return None
+            tracked = _Tracked(status, _to_timestamp(started_at), thresholds)
+            self._tracked[email] = tracked
+            return self._arm(email, tracked, after=None)
+
+    def status_ended(self, email: str) -> bool:
+        """Смена завершена (LOGOUT): дедлайн снимается"""
+        with self._lock:
+            self.stats['ended'] += 1
+            return self._untrack((email or "").strip().lower())
+
+    def deadline_for(self, email: str) -> Optional[float]:
+        """Когда сработает таймер пользователя (unix) или None"""
+        tracked = self._tracked.get((email or "").strip().lower())
+        return tracked.handle.deadline if tracked and tracked.handle else None
+
+    def _untrack(self, email: str) -> bool:
+        tracked = self._tracked.pop(email, None)
+        if tracked and tracked.handle:
+            tracked.handle.cancel()
+        return tracked is not None
+
+    def _next_deadline(self, tracked: _Tracked, after: Optional[float]) -> Optional[float]:
+        """Ближайший порог или повтор позже момента after (None — первый порог)"""
+        best = None
+        for th in tracked.thresholds:
+            at = tracked.started + th.minutes * 60
+            if after is not None and at <= after:
+                if th.repeat_sec <= 0:
+                    continue
+                at += (int((after - at) // th.repeat_sec) + 1) * th.repeat_sec
+            if best is None or at < best:
+                best = at
+        return best
+
+    def _arm(self, email: str, tracked: _Tracked, after: Optional[float]) -> Optional[float]:
+        deadline = self._next_deadline(tracked, after)
+        if deadline is None:
+            self._tracked.pop(email, None)
+            return None
+        tracked.handle = self.wheel.schedule_at(deadline, self._on_deadline, email, tracked)
+        self.stats['armed'] += 1
+        self._wakeup.set()
+        return deadline
+
+    def _on_deadline(self, email: str, tracked: _Tracked):
+        with self._lock:
+            if self._tracked.get(email) is not tracked:
+                return  # статус сменился, пока таймер ждал вызова
+            # Колесо идёт по тикам; если оно догоняет часы после сна машины —
+            # одно уведомление с фактической длительностью вместо пачки повторов
+            now = max(tracked.handle.deadline, self.wheel.now)
+            real = self.clock()
+            if real - now > self.late_after:
+                now = real
+            tracked.handle = None
+            self._arm(email, tracked, after=now)
+        elapsed_min = int((now - tracked.started + 1e-6) // 60)
+        started_utc = datetime.fromtimestamp(tracked.started, tz=timezone.utc)
+        self.stats['fired'] += 1
+        try:
+            self.fire(email, tracked.status, started_utc, elapsed_min)
+        except Exception:
+            self.stats['errors'] += 1
+            log.exception("Long-status notification failed for %s", email)
+
+    # ------------------------------------------------------------------
+    # Ход времени
+    # ------------------------------------------------------------------
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Вызвать наступившие дедлайны; возвращает число сработавших таймеров"""
+        return self.wheel.advance(self.clock() if now is None else now)
+
+    def start(self) -> "LongStatusScheduler":
+        """Фоновый поток: спит до ближайшего дедлайна (не дольше max_sleep)"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self.stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="LongStatusTimers", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.advance()
+            except Exception:
+                log.exception("Long-status timer wheel failed")
+            nxt = self.wheel.next_deadline()
+            pause = self.max_sleep if nxt is None else min(self.max_sleep, max(0.0, nxt - self.clock()))
+            self._wakeup.wait(pause)
+            self._wakeup.clear()
+
+
+def limit_thresholds(status: str, break_limit_min: int, lunch_limit_min: int,
+                     repeat_sec: int = 1800) -> List[Threshold]:
+    """
+    Порог превышения лимита перерыва/обеда: check_limit_exceeded
+    срабатывает при elapsed_min > лимита и повторяет не чаще раза в 30 мин.
+    """
+    s = (status or "").strip().lower()
+    if "перерыв" in s:
+        return [Threshold(break_limit_min + 1, repeat_sec)]
+    if "обед" in s:
+        return [Threshold(lunch_limit_min + 1, repeat_sec)]
+    return []
@@ -0,0 +1,231 @@
+# notifications/timer_wheel.py
+"""
+Иерархическое колесо таймеров (Varghese & Lauck)
+
+Таймер кладётся в корзину уровня, чей шаг соответствует оставшемуся
+времени: уровень 0 — по тику, уровень 1 — по slots[0] тиков и т.д.
+Когда время доходит до корзины верхнего уровня, её таймеры
+перекладываются ниже, пока не окажутся в корзине своего тика.
+
+- schedule / cancel — O(1), без кучи и без перебора таймеров
+- advance — перескакивает пустые участки: стоимость зависит от числа
+  сработавших и переложенных таймеров, а не от прошедшего времени
+- часы внешние (clock), поэтому колесо детерминированно в тестах
+
+Использование:
+    wheel = HierarchicalTimerWheel(tick=1.0, start=time.time())
+    handle = wheel.schedule_at(deadline_ts, callback, arg)
+    handle.cancel()
+    wheel.advance(time.time())   # вызывает наступившие callback
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from typing import Any, Callable, List, Optional, Sequence, Set
+
+log = logging.getLogger(__name__)
+
+
+class TimerHandle:
+    """Запланированный вызов; cancel() снимает его из колеса"""
+    __slots__ = ("deadline", "expires", "callback", "args", "_wheel", "_bucket", "_level")
+
+    def __init__(self, wheel: "HierarchicalTimerWheel", deadline: float, expires: int,
+                 callback: Callable[..., Any], args: tuple):
+        self.deadline = deadline    # запрошенное время
+        self.expires = expires      # номер тика, на котором сработает
+        self.callback = callback
+        self.args = args
+        self._wheel = wheel
+        self._bucket: Optional[Set["TimerHandle"]] = None
+        self._level = -1
+
+    @property
+    def active(self) -> bool:
+        return self._bucket is not None
+
+    def cancel(self) -> bool:
+        """True — таймер был в колесе и снят"""
+        return self._wheel.cancel(self)
+
+    def __repr__(self):
+        return f"TimerHandle(deadline={self.deadline}, active={self.active})"
+
+
+class HierarchicalTimerWheel:
+    """
+    Колесо таймеров с уровнями по slots (по умолчанию 4 × 64).
+
+    При tick=1с уровни покрывают 64с, ~68мин, ~73ч и ~194 суток;
+    более дальние дедлайны лежат в списке переполнения и
+    перекладываются при обороте верхнего уровня.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: Sequence[int] = (64, 64, 64, 64), start: float = 0.0):
+        if tick <= 0 or not slots or any(n < 2 for n in slots):
+            raise ValueError("tick must be > 0 and every level needs at least 2 slots")
+        self.tick = float(tick)
+        self.slots = tuple(int(n) for n in slots)
+        # spans[i] — сколько тиков покрывает одна корзина уровня i
+        self.spans = [1]
+        for n in self.slots:
+            self.spans.append(self.spans[-1] * n)
+        self._levels: List[List[Set[TimerHandle]]] = [[set() for _ in range(n)] for n in self.slots]
+        self._counts = [0] * len(self.slots)
+        self._overflow: Set[TimerHandle] = set()
+        self._current = self._to_tick(start)  # последний обработанный тик
+        self._lock = threading.RLock()
+        self.stats = {'scheduled': 0, 'cancelled': 0, 'fired': 0, 'cascaded': 0, 'errors': 0}
+
+    def __len__(self) -> int:
+        return sum(self._counts) + len(self._overflow)
+
+    def _to_tick(self, ts: float) -> int:
+        return math.floor(ts / self.tick)
+
+    @property
+    def now(self) -> float:
+        """Время последнего обработанного тика"""
+        return self._current * self.tick
+
+    # ------------------------------------------------------------------
+    # Постановка и снятие
+    # ------------------------------------------------------------------
+
+    def schedule_at(self, deadline: float, callback: Callable[..., Any], *args) -> TimerHandle:
+        """Вызвать callback(*args) на первом тике не раньше deadline"""
+        with self._lock:
+            # Срабатывание не раньше дедлайна: тик округляется вверх
+            expires = max(math.ceil(deadline / self.tick), self._current + 1)
+            handle = TimerHandle(self, deadline, expires, callback, args)
+            self._place(handle)
+            self.stats['scheduled'] += 1
+            return handle
+
+    def schedule(self, delay: float, callback: Callable[..., Any], *args) -> TimerHandle:
+        """Вызвать callback(*args) через delay секунд от текущего тика"""
+        return self.schedule_at(self.now + delay, callback, *args)
+
+    def cancel(self, handle: TimerHandle) -> bool:
+        with self._lock:
+            bucket = handle._bucket
+            if bucket is None:
+                return False
+            bucket.discard(handle)
+            if handle._level >= 0:
+                self._counts[handle._level] -= 1
+            handle._bucket, handle._level = None, -1
+            self.stats['cancelled'] += 1
+            return True
+
+    def _place(self, handle: TimerHandle):
+        delta = handle.expires - self._current
+        for level, n in enumerate(self.slots):
+            if delta < self.spans[level + 1]:
+                bucket = self._levels[level][(handle.expires // self.spans[level]) % n]
+                bucket.add(handle)
+                handle._bucket, handle._level = bucket, level
+                self._counts[level] += 1
+                return
+        self._overflow.add(handle)
+        handle._bucket, handle._level = self._overflow, -1
+
+    # ------------------------------------------------------------------
+    # Ход времени
+    # ------------------------------------------------------------------
+
+    def advance(self, now: float) -> int:
+        """
+        Довести колесо до времени now и вызвать наступившие таймеры.
+
+        Returns:
+            Сколько таймеров сработало
+        """
+        target = self._to_tick(now)
+        fired = 0
+        while True:
+            with self._lock:
+                due = self._advance_to(target)
+            if not due:
+                return fired
+            # callback вызываются вне блокировки: могут ставить новые таймеры
+            due.sort(key=lambda h: (h.expires, h.deadline))
+            for handle in due:
+                try:
+                    handle.callback(*handle.args)
+                except Exception:
+                    self.stats['errors'] += 1
+                    log.exception("Timer callback failed")
+            fired += len(due)
+
+    def _advance_to(self, target: int) -> List[TimerHandle]:
+        """Шагать по тикам до target; вернуть таймеры первого непустого тика"""
+        while self._current < target:
+            step = self._next_tick(target)
+            self._current = step
+            for level in range(len(self.slots) - 1, 0, -1):
+                if step % self.spans[level] == 0:
+                    self._cascade(level, step)
+            if step % self.spans[-1] == 0 and self._overflow:
+                self._cascade_overflow()
+            bucket = self._levels[0][step % self.slots[0]]
+            if bucket:
+                due = list(bucket)
+                bucket.clear()
+                self._counts[0] -= len(due)
+                for handle in due:
+                    handle._bucket, handle._level = None, -1
+                self.stats['fired'] += len(due)
+                return due
+        return []
+
+    def _next_tick(self, target: int) -> int:
+        """Следующий тик, на котором что-то может произойти (пустые участки пропускаются)"""
+        step = self._current + 1
+        for level, count in enumerate(self._counts):
+            if count:
+                if level == 0:
+                    return step
+                # Ниже пусто — до ближайшей границы корзины этого уровня ничего не случится
+                boundary = -(-step // self.spans[level]) * self.spans[level]
+                return min(boundary, target)
+        if self._overflow:
+            boundary = -(-step // self.spans[-1]) * self.spans[-1]
+            return min(boundary, target)
+        return target
+
+    def _cascade(self, level: int, step: int):
+        bucket = self._levels[level][(step // self.spans[level]) % self.slots[level]]
+        if not bucket:
+            return
+        moved = list(bucket)
+        bucket.clear()
+        self._counts[level] -= len(moved)
+        for handle in moved:
+            self._place(handle)
+        self.stats['cascaded'] += len(moved)
+
+    def _cascade_overflow(self):
+        moved = list(self._overflow)
+        self._overflow.clear()
+        for handle in moved:
+            self._place(handle)
+        self.stats['cascaded'] += len(moved)
+
+    def next_deadline(self) -> Optional[float]:
+        """
+        Когда колесу в следующий раз есть что делать (сработать или
+        переложить корзину); None — таймеров нет. Для выбора паузы потока.
+        """
+        with self._lock:
+            if not len(self):
+                return None
+            step = self._current + 1
+            if self._counts[0]:
+                n0 = self.slots[0]
+                for i in range(n0):
+                    if self._levels[0][(step + i) % n0]:
+                        return (step + i) * self.tick
+            return self._next_tick(step + self.spans[-1]) * self.tick
@@ -20,24 +20,16 @@ logger = logging.getLogger(__name__)
 
 def check_internet_available() -> bool:
     """
-    Быстрая проверка доступности интернета (только DNS, без подключения).
+    Быстрая проверка доступности интернета (закэшированный флаг
+    ReachabilityMonitor, без DNS-запроса на каждый вызов).
     
     Returns:
-        True если интернет доступен И DNS работает
+        True если интернет доступен
     """
     try:
-        import socket
-        
-        # Только DNS резолв, БЕЗ подключения - очень быстро!
-        socket.setdefaulttimeout(0.5)
-        addr_info = socket.getaddrinfo('sheets.googleapis.com', 443, socket.AF_INET, socket.SOCK_STREAM)
-        socket.setdefaulttimeout(None)
-        return bool(addr_info)
-    except (socket.gaierror, OSError):
-        socket.setdefaulttimeout(None)
-        return False
+        from sync.network import is_internet_available_fast
+        return is_internet_available_fast(timeout=0.5)
     except Exception:
-        socket.setdefaulttimeout(None)
         return False
 
 
@@ -46,7 +46,9 @@ class ConnectionPool:
         db_path: str,
         pool_size: int = 10,
         timeout: float = 5.0,
-        check_same_thread: bool = False
+        check_same_thread: bool = False,
+        read_only: bool = False,
+        row_factory=sqlite3.Row
     ):
         """
         Инициализация пула соединений
@@ -56,11 +58,16 @@ class ConnectionPool:
             pool_size: Размер пула (для 200 users рекомендуется 10)
             timeout: Таймаут при получении соединения (секунды)
             check_same_thread: Проверка потока (False для multi-threading)
+            read_only: Пул читателей (PRAGMA query_only=ON) — в WAL режиме
+                       читают параллельно с писателем, не блокируя его
+            row_factory: Фабрика строк (None — обычные tuple)
         """
         self.db_path = Path(db_path)
         self.pool_size = pool_size
         self.timeout = timeout
         self.check_same_thread = check_same_thread
+        self.read_only = read_only
+        self.row_factory = row_factory
         
         # Очередь доступных соединений
         self.pool = Queue(maxsize=pool_size)
@@ -73,7 +80,11 @@ class ConnectionPool:
             'created': 0,
             'reused': 0,
             'wait_time_total': 0,
-            'wait_count': 0
+            'wait_count': 0,
+            'max_wait_time': 0,
+            'hold_time_total': 0,
+            'hold_count': 0,
+            'max_hold_time': 0
         }
         self.stats_lock = threading.Lock()
         
@@ -117,9 +128,11 @@ class ConnectionPool:
         conn.execute("PRAGMA temp_store=MEMORY")       # Temp tables in memory
         conn.execute("PRAGMA busy_timeout=5000")       # 5s wait on lock
         conn.execute("PRAGMA mmap_size=268435456")     # 256MB mmap
+        if self.read_only:
+            conn.execute("PRAGMA query_only=ON")       # только чтение
         
         # Row factory для dict-like доступа
-        conn.row_factory = sqlite3.Row
+        conn.row_factory = self.row_factory
         
         return conn
     
@@ -142,6 +155,7 @@ class ConnectionPool:
         """
         timeout = timeout or self.timeout
         conn = None
+        acquired_at = None
         start_time = time.time()
         
         try:
@@ -154,6 +168,8 @@ class ConnectionPool:
                     self.stats['reused'] += 1
                     self.stats['wait_time_total'] += wait_time
                     self.stats['wait_count'] += 1
+                    if wait_time > self.stats['max_wait_time']:
+                        self.stats['max_wait_time'] = wait_time
                 
                 if wait_time > 1.0:
                     logger.warning(f"Long wait for connection: {wait_time:.2f}s")
@@ -174,6 +190,7 @@ class ConnectionPool:
                 with self.stats_lock:
                     self.stats['created'] += 1
             
+            acquired_at = time.time()
             yield conn
             
         except Exception as e:
@@ -183,6 +200,13 @@ class ConnectionPool:
         finally:
             # Возвращаем соединение в пул
             if conn is not None:
+                if acquired_at is not None:
+                    hold_time = time.time() - acquired_at
+                    with self.stats_lock:
+                        self.stats['hold_time_total'] += hold_time
+                        self.stats['hold_count'] += 1
+                        if hold_time > self.stats['max_hold_time']:
+                            self.stats['max_hold_time'] = hold_time
                 try:
                     # Rollback незакоммиченных транзакций
                     conn.rollback()
@@ -262,11 +286,15 @@ class ConnectionPool:
         with self.stats_lock:
             stats = self.stats.copy()
         
-        # Вычисляем среднее время ожидания
+        # Вычисляем среднее время ожидания и удержания соединения
         if stats['wait_count'] > 0:
             stats['avg_wait_time'] = stats['wait_time_total'] / stats['wait_count']
         else:
             stats['avg_wait_time'] = 0
+        if stats['hold_count'] > 0:
+            stats['avg_hold_time'] = stats['hold_time_total'] / stats['hold_count']
+        else:
+            stats['avg_hold_time'] = 0
         
         # Процент переиспользования
         total_requests = stats['created'] + stats['reused']
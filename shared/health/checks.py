@@ -29,6 +29,7 @@ Date: 2025-12-04
 
 import logging
 import shutil
+import sqlite3
 import os
 from typing import Tuple, Optional, Dict
 
@@ -105,21 +106,29 @@ def check_sheets_api_health() -> Tuple[bool, str, Optional[Dict]]:
     """
     try:
         from api_adapter import get_sheets_api
-        from shared.resilience.circuit_breaker import get_circuit_breaker
+        from shared.resilience.circuit_breaker import get_all_circuit_breakers
         
-        # Проверяем circuit breaker
+        # Проверяем circuit breakers по классам операций (GoogleSheetsAPI.<op>)
         try:
-            breaker = get_circuit_breaker("GoogleSheetsAPI")
-            breaker_state = breaker.state.value
-            breaker_metrics = breaker.get_metrics()
+            breakers = {
+                name.split(".", 1)[1]: b
+                for name, b in get_all_circuit_breakers().items()
+                if name.startswith("GoogleSheetsAPI.")
+            }
+            class_states = {op: b.state.value for op, b in breakers.items()}
+            write_breaker = breakers.get("append")
+            breaker_state = write_breaker.state.value if write_breaker else "unknown"
+            breaker_metrics = write_breaker.get_metrics() if write_breaker else {}
         except:
+            class_states = {}
             breaker_state = "unknown"
             breaker_metrics = {}
         
-        # Если circuit открыт, сервис недоступен
+        # Запись закрыта — сервис недоступен
         if breaker_state == "open":
             return False, f"Circuit breaker OPEN", {
                 'circuit_state': breaker_state,
+                'circuit_classes': class_states,
                 'time_until_recovery': breaker_metrics.get('time_until_recovery', 0)
             }
         
@@ -133,9 +142,16 @@ def check_sheets_api_health() -> Tuple[bool, str, Optional[Dict]]:
         
         details = {
             'circuit_state': breaker_state,
+            'circuit_classes': class_states,
             'success_rate': breaker_metrics.get('successful_calls', 0) / max(breaker_metrics.get('total_calls', 1), 1)
         }
         
+        # Чтение/метаданные отдыхают, запись идёт — деградация, не отказ
+        backing_off = [op for op, st in class_states.items() if st != "closed"]
+        if backing_off:
+            from shared.health.health_checker import HealthStatus
+            return HealthStatus.DEGRADED, f"Sheets API backing off: {', '.join(backing_off)}", details
+        
         return True, "Sheets API OK", details
     
     except Exception as e:
@@ -338,12 +354,20 @@ def check_sync_queue_health() -> Tuple[bool, str, Optional[Dict]]:
         pool = get_pool()
         
         with pool.get_connection() as conn:
-            # Считаем несинхронизированные записи
-            result = conn.execute("""
-                SELECT COUNT(*) as count
-                FROM logs
-                WHERE synced = 0
-            """).fetchone()
+            # Счётчик очереди ведут триггеры sync_outbox (user_app/db_local.py)
+            try:
+                result = conn.execute("""
+                    SELECT pending as count
+                    FROM sync_counters
+                    WHERE email = '*'
+                """).fetchone()
+            except sqlite3.OperationalError:
+                # Старая схема без sync_counters
+                result = conn.execute("""
+                    SELECT COUNT(*) as count
+                    FROM logs
+                    WHERE synced = 0
+                """).fetchone()
             
             pending_count = result['count'] if result else 0
             
@@ -373,20 +397,25 @@ def register_all_checks(checker):
     
     Args:
         checker: HealthChecker instance
+    
+    Для каждой проверки задаются TTL кэша результата и таймаут (сек):
+    сетевые проверки выполняются на каждой оценке, но не дольше таймаута,
+    дешёвые локальные (диск, память) — не чаще раза в TTL.
     """
     checks = [
-        ("database", check_database_health),
-        ("sheets_api", check_sheets_api_health),
-        ("telegram_api", check_telegram_api_health),
-        ("internet", check_internet_health),
-        ("disk_space", check_disk_space_health),
-        ("memory", check_memory_health),
-        ("sync_queue", check_sync_queue_health),
+        # (имя, функция, ttl, timeout)
+        ("database", check_database_health, 0, 5),
+        ("sheets_api", check_sheets_api_health, 0, 10),
+        ("telegram_api", check_telegram_api_health, 0, 10),
+        ("internet", check_internet_health, 0, 8),
+        ("disk_space", check_disk_space_health, 300, 5),
+        ("memory", check_memory_health, 60, 5),
+        ("sync_queue", check_sync_queue_health, 15, 5),
     ]
     
-    for name, check_func in checks:
+    for name, check_func, ttl, timeout in checks:
         try:
-            checker.register_check(name, check_func)
+            checker.register_check(name, check_func, ttl=ttl, timeout=timeout)
             logger.info(f"Registered health check: {name}")
         except Exception as e:
             logger.error(f"Failed to register health check {name}: {e}")
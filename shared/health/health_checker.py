@@ -11,6 +11,10 @@ Health Check System для WorkTimeTracker
 
 Автоматический мониторинг с алертами при проблемах.
 
+Проверки выполняются параллельно на небольшом пуле потоков, у каждой —
+жёсткий таймаут и собственный TTL кэша результата (дешёвые проверки
+вроде диска и памяти не перезапускаются на каждой оценке).
+
 Usage:
     from shared.health.health_checker import HealthChecker
     from shared.health.checks import *
@@ -18,10 +22,11 @@ Usage:
     # Создаем checker
     checker = HealthChecker()
     
-    # Регистрируем проверки
-    checker.register_check("database", check_database_health)
-    checker.register_check("sheets_api", check_sheets_api_health)
-    
+    # Регистрируем проверки (ttl — сек кэша результата, timeout — сек на проверку)
+    checker.register_check("database", check_database_health, timeout=5)
+    checker.register_check("sheets_api", check_sheets_api_health, timeout=10)
+    checker.register_check("disk_space", check_disk_space_health, ttl=300)
+
     # Запускаем мониторинг (каждую минуту)
     checker.start_monitoring(interval=60)
     
@@ -37,13 +42,18 @@ Date: 2025-12-04
 import logging
 import threading
 import time
-from typing import Dict, Callable, Tuple, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Callable, Tuple, Optional, List
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Границы корзин гистограммы длительности проверок (мс), как le в Prometheus
+DURATION_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
 
 # ============================================================================
 # ENUMS
@@ -91,7 +101,9 @@ class HealthChecker:
     Parameters:
         failure_threshold: После скольких неудач подряд отправить алерт (default: 3)
         alert_callback: Функция для отправки алертов (default: None)
-    
+        max_workers: Сколько проверок выполнять параллельно (default: 4)
+        default_timeout: Таймаут проверки по умолчанию, сек (default: 10)
+
     Example:
         >>> checker = HealthChecker(failure_threshold=3)
         >>> checker.register_check("database", check_db_health)
@@ -106,14 +118,27 @@ class HealthChecker:
     def __init__(
         self,
         failure_threshold: int = 3,
-        alert_callback: Optional[Callable] = None
+        alert_callback: Optional[Callable] = None,
+        max_workers: int = 4,
+        default_timeout: float = 10.0
     ):
         self.failure_threshold = failure_threshold
         self.alert_callback = alert_callback
+        self.max_workers = max(1, max_workers)
+        self.default_timeout = default_timeout
         
         # Зарегистрированные проверки
         self.checks: Dict[str, Callable] = {}
+        # Параметры проверок: {name: {'ttl': сек, 'timeout': сек}}
+        self.check_options: Dict[str, Dict] = {}
         
+        # Пул для параллельных проверок (создаётся при первом check_all)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Зависшие проверки: не запускаем повторно, пока не завершатся
+        self._in_flight: Dict[str, Tuple[Future, float]] = {}
+        # Гистограммы длительности {name: {'count', 'sum', 'max', 'buckets'}}
+        self._durations: Dict[str, Dict] = {}
+
         # Текущие статусы
         self.statuses: Dict[str, ComponentHealth] = {}
         
@@ -130,14 +155,23 @@ class HealthChecker:
             'healthy_checks': 0,
             'unhealthy_checks': 0,
             'alerts_sent': 0,
-            'last_check_time': None
+            'cache_hits': 0,
+            'timeouts': 0,
+            'last_check_time': None,
+            'last_evaluation_ms': 0.0
         }
         
         logger.info(
             f"HealthChecker initialized: failure_threshold={failure_threshold}"
         )
     
-    def register_check(self, name: str, check_func: Callable[[], Tuple[bool, str, Optional[Dict]]]):
+    def register_check(
+        self,
+        name: str,
+        check_func: Callable[[], Tuple[bool, str, Optional[Dict]]],
+        ttl: float = 0.0,
+        timeout: Optional[float] = None
+    ):
         """
         Зарегистрировать health check
         
@@ -147,7 +181,9 @@ class HealthChecker:
                 - bool: True = healthy, False = unhealthy
                 - str: сообщение о статусе
                 - dict (optional): дополнительные детали
-        
+            ttl: Сколько секунд результат считается свежим (0 — проверять каждый раз)
+            timeout: Жёсткий таймаут проверки, сек (None — default_timeout)
+
         Example:
             def check_database():
                 try:
@@ -160,6 +196,10 @@ class HealthChecker:
         """
         with self.lock:
             self.checks[name] = check_func
+            self.check_options[name] = {
+                'ttl': max(0.0, float(ttl or 0)),
+                'timeout': float(timeout) if timeout else self.default_timeout,
+            }
             logger.info(f"Registered health check: {name}")
     
     def unregister_check(self, name: str):
@@ -167,31 +207,41 @@ class HealthChecker:
         with self.lock:
             if name in self.checks:
                 del self.checks[name]
+                self.check_options.pop(name, None)
                 if name in self.statuses:
                     del self.statuses[name]
                 logger.info(f"Unregistered health check: {name}")
     
-    def check_all(self) -> Dict[str, ComponentHealth]:
+    def check_all(self, force: bool = False) -> Dict[str, ComponentHealth]:
         """
         Проверить все компоненты
         
+        Проверки идут параллельно; общая длительность — время самой
+        медленной проверки, но не больше её таймаута. Результаты моложе
+        TTL проверки берутся из кэша (force=True — проверить всё заново).
+        
         Returns:
             Словарь {component_name: ComponentHealth}
         """
+        start = time.monotonic()
+        with self.lock:
+            checks = list(self.checks.items())
+        
         results = {}
+        fresh = self._run_checks(checks, force=force)
         
-        for name, check_func in self.checks.items():
-            result = self._check_component(name, check_func)
-            results[name] = result
+        for name, _ in checks:
+            results[name] = fresh.get(name) or self.statuses.get(name)
         
         with self.lock:
-            self.statuses = results
+            self.statuses = {k: v for k, v in results.items() if v is not None}
             self.metrics['last_check_time'] = datetime.now()
-            self.metrics['total_checks'] += len(results)
-            self.metrics['healthy_checks'] += sum(1 for r in results.values() if r.healthy)
-            self.metrics['unhealthy_checks'] += sum(1 for r in results.values() if not r.healthy)
+            self.metrics['last_evaluation_ms'] = (time.monotonic() - start) * 1000
+            self.metrics['total_checks'] += len(fresh)
+            self.metrics['healthy_checks'] += sum(1 for r in fresh.values() if r.healthy)
+            self.metrics['unhealthy_checks'] += sum(1 for r in fresh.values() if not r.healthy)
         
-        return results
+        return self.statuses
     
     def check_component(self, name: str) -> Optional[ComponentHealth]:
         """
@@ -208,8 +258,8 @@ class HealthChecker:
             logger.warning(f"Health check not found: {name}")
             return None
         
-        result = self._check_component(name, check_func)
-        
+        result = self._run_checks([(name, check_func)], force=True).get(name)
+
         # Обновляем статус
         with self.lock:
             self.statuses[name] = result
@@ -312,6 +362,11 @@ class HealthChecker:
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=5)
         
+        if self._executor:
+            # Зависшие проверки не ждём
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
         logger.info("Health monitoring stopped")
     
     def get_metrics(self) -> Dict:
@@ -320,13 +375,125 @@ class HealthChecker:
             return {
                 **self.metrics,
                 'registered_checks': len(self.checks),
-                'monitoring_active': self.running
+                'monitoring_active': self.running,
+                'in_flight': [name for name, (f, _) in self._in_flight.items() if not f.done()],
+                'check_duration_ms': {
+                    name: {**hist, 'buckets': dict(hist['buckets'])}
+                    for name, hist in self._durations.items()
+                }
             }
     
     # ========================================================================
     # PRIVATE METHODS
     # ========================================================================
     
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="HealthCheck"
+                )
+            return self._executor
+    
+    def _run_checks(
+        self,
+        checks: List[Tuple[str, Callable]],
+        force: bool = False
+    ) -> Dict[str, ComponentHealth]:
+        """
+        Запустить проверки параллельно и дождаться их с учётом таймаутов
+        
+        Returns:
+            Свежие результаты {name: ComponentHealth} (без взятых из кэша)
+        """
+        now = datetime.now()
+        pending: Dict[str, Tuple[Future, float]] = {}
+        
+        for name, check_func in checks:
+            options = self.check_options.get(name, {})
+            ttl = options.get('ttl', 0.0)
+            timeout = options.get('timeout', self.default_timeout)
+            
+            prev = self.statuses.get(name)
+            if not force and ttl and prev and (now - prev.last_check).total_seconds() < ttl:
+                with self.lock:
+                    self.metrics['cache_hits'] += 1
+                continue
+            
+            with self.lock:
+                running = self._in_flight.get(name)
+            if running and not running[0].done():
+                # Прошлый запуск ещё висит — не занимаем второй поток
+                pending[name] = running
+                continue
+            
+            future = self._get_executor().submit(self._check_component, name, check_func)
+            entry = (future, time.monotonic() + timeout)
+            with self.lock:
+                self._in_flight[name] = entry
+            pending[name] = entry
+        
+        results = {}
+        for name, (future, deadline) in pending.items():
+            try:
+                result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                timeout = self.check_options.get(name, {}).get('timeout', self.default_timeout)
+                with self.lock:
+                    self.metrics['timeouts'] += 1
+                self._observe_duration(name, timeout * 1000)
+                results[name] = self._failed_health(
+                    name, f"Check timed out after {timeout:.0f}s", timeout * 1000
+                )
+            except Exception as e:
+                results[name] = self._failed_health(name, f"Check failed: {e}", 0.0)
+            else:
+                with self.lock:
+                    self._in_flight.pop(name, None)
+                # Длительность пишем здесь: опоздавший результат после таймаута не учитываем дважды
+                self._observe_duration(name, result.check_duration_ms)
+                results[name] = result
+        
+        return results
+    
+    def _observe_duration(self, name: str, duration_ms: float):
+        """Добавить длительность проверки в гистограмму"""
+        with self.lock:
+            hist = self._durations.get(name)
+            if hist is None:
+                hist = {
+                    'count': 0,
+                    'sum': 0.0,
+                    'max': 0.0,
+                    'buckets': {le: 0 for le in DURATION_BUCKETS_MS + (float('inf'),)}
+                }
+                self._durations[name] = hist
+            hist['count'] += 1
+            hist['sum'] += duration_ms
+            hist['max'] = max(hist['max'], duration_ms)
+            for le in hist['buckets']:
+                if duration_ms <= le:
+                    hist['buckets'][le] += 1
+    
+    def _failed_health(self, name: str, message: str, duration_ms: float) -> ComponentHealth:
+        """UNHEALTHY-результат с учётом счётчика неудач и алертов"""
+        prev = self.statuses.get(name)
+        consecutive_failures = (prev.consecutive_failures + 1) if prev else 1
+        
+        # Отправляем алерт если превышен порог
+        if consecutive_failures >= self.failure_threshold:
+            self._send_alert(name, message, consecutive_failures)
+        
+        return ComponentHealth(
+            component=name,
+            status=HealthStatus.UNHEALTHY,
+            message=message,
+            last_check=datetime.now(),
+            check_duration_ms=duration_ms,
+            consecutive_failures=consecutive_failures
+        )
+    
     def _check_component(self, name: str, check_func: Callable) -> ComponentHealth:
         """Выполнить проверку компонента"""
         start = time.time()
@@ -391,21 +558,7 @@ class HealthChecker:
             duration_ms = (time.time() - start) * 1000
             logger.error(f"Health check [{name}] failed: {e}", exc_info=True)
             
-            prev = self.statuses.get(name)
-            consecutive_failures = (prev.consecutive_failures + 1) if prev else 1
-            
-            # Отправляем алерт если превышен порог
-            if consecutive_failures >= self.failure_threshold:
-                self._send_alert(name, f"Check failed: {e}", consecutive_failures)
-            
-            return ComponentHealth(
-                component=name,
-                status=HealthStatus.UNHEALTHY,
-                message=f"Check failed: {e}",
-                last_check=datetime.now(),
-                check_duration_ms=duration_ms,
-                consecutive_failures=consecutive_failures
-            )
+            return self._failed_health(name, f"Check failed: {e}", duration_ms)
     
     def _send_alert(self, component: str, message: str, failures: int):
         """Отправить алерт о проблеме"""
@@ -450,7 +603,9 @@ _checker_lock = threading.Lock()
 
 def get_health_checker(
     failure_threshold: int = 3,
-    alert_callback: Optional[Callable] = None
+    alert_callback: Optional[Callable] = None,
+    max_workers: int = 4,
+    default_timeout: float = 10.0
 ) -> HealthChecker:
     """
     Получить глобальный health checker (singleton)
@@ -458,7 +613,9 @@ def get_health_checker(
     Args:
         failure_threshold: После скольких неудач отправить алерт
         alert_callback: Функция для алертов
-    
+        max_workers: Сколько проверок выполнять параллельно
+        default_timeout: Таймаут проверки по умолчанию, сек
+
     Returns:
         Глобальный экземпляр HealthChecker
     """
@@ -469,7 +626,9 @@ def get_health_checker(
             if _global_health_checker is None:
                 _global_health_checker = HealthChecker(
                     failure_threshold=failure_threshold,
-                    alert_callback=alert_callback
+                    alert_callback=alert_callback,
+                    max_workers=max_workers,
+                    default_timeout=default_timeout
                 )
     
     return _global_health_checker
@@ -0,0 +1,57 @@
+"""
+Метрики WorkTimeTracker
+
+Компоненты:
+- MetricsRegistry: счётчики, gauge и гистограммы с фиксированными корзинами
+- collectors: перевод stats-словарей компонентов в метрики при сборе
+- Tracer: span'ы этапов (сводка p50/p95 по этапам, Chrome trace JSON)
+- Экспорт: /metrics на localhost (Prometheus) или периодический дамп в файл
+"""
+
+from .registry import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    LATENCY_BUCKETS,
+    SIZE_BUCKETS,
+    families_from_dict,
+    get_metrics_registry,
+)
+
+from .collectors import register_default_collectors
+
+from .tracing import Tracer, get_tracer, traced
+
+from .exporter import (
+    MetricsHTTPServer,
+    MetricsFileExporter,
+    render_prometheus,
+    start_metrics_exporter,
+    stop_metrics_exporter,
+)
+
+__all__ = [
+    # Registry
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'MetricsRegistry',
+    'LATENCY_BUCKETS',
+    'SIZE_BUCKETS',
+    'families_from_dict',
+    'get_metrics_registry',
+    'register_default_collectors',
+
+    # Tracing
+    'Tracer',
+    'get_tracer',
+    'traced',
+
+    # Export
+    'MetricsHTTPServer',
+    'MetricsFileExporter',
+    'render_prometheus',
+    'start_metrics_exporter',
+    'stop_metrics_exporter',
+]
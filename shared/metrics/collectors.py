@@ -0,0 +1,161 @@
+"""
+Collectors: перевод stats-словарей компонентов в метрики реестра
+
+Компоненты хранят статистику в собственных словарях; collector читает их
+только в момент сбора (scrape / дамп в файл), поэтому горячие пути не
+платят за метрики. Синглтоны (circuit breakers, планировщики повторов,
+health checker, degradation manager, локальная БД, монитор сети) читаются
+через модульные переменные — collector не создаёт их сам.
+
+SyncManager и ImprovedSyncQueue регистрируют свои collectors в __init__.
+"""
+
+import logging
+import sys
+from typing import Dict, List, Optional
+
+from .registry import MetricsRegistry, families_from_dict, get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+_BREAKER_STATE = {'closed': 0, 'half_open': 1, 'open': 2}
+_SYSTEM_MODE = {'full': 0, 'degraded': 1, 'offline': 2, 'emergency': 3}
+_REACHABILITY = {'offline': 0, 'suspect': 1, 'online': 2, 'unknown': -1}
+
+
+def _loaded(module_name: str):
+    """Модуль, только если он уже импортирован (collector не тянет зависимости)"""
+    return sys.modules.get(module_name)
+
+
+def collect_circuit_breakers() -> List[Dict]:
+    module = _loaded("shared.resilience.circuit_breaker")
+    if module is None:
+        return []
+    families = []
+    for name, breaker in module.get_all_circuit_breakers().items():
+        metrics = breaker.get_metrics()
+        metrics['state'] = _BREAKER_STATE.get(metrics.get('state'), -1)
+        families.extend(families_from_dict(
+            "wtt_circuit_breaker", metrics, labels={'name': name},
+            counters=('total_calls', 'successful_calls', 'failed_calls',
+                      'rejected_calls', 'state_changes'),
+        ))
+    return families
+
+
+def collect_retry_schedulers() -> List[Dict]:
+    module = _loaded("shared.resilience.retry_scheduler")
+    if module is None:
+        return []
+    families = []
+    counters = ('submitted', 'succeeded', 'failed', 'retries', 'throttled',
+                'acquired', 'errors', 'decreases')
+    for name, scheduler in module.get_all_retry_schedulers().items():
+        stats = scheduler.get_stats()
+        endpoints = stats.pop('endpoints', {}) or {}
+        families.extend(families_from_dict(
+            "wtt_retry_scheduler", stats, labels={'scheduler': name}, counters=counters,
+        ))
+        for endpoint, snap in endpoints.items():
+            families.extend(families_from_dict(
+                "wtt_api_limiter", snap, labels={'scheduler': name, 'endpoint': endpoint},
+                counters=counters,
+            ))
+    return families
+
+
+def collect_health_checker() -> List[Dict]:
+    module = _loaded("shared.health.health_checker")
+    checker = getattr(module, "_global_health_checker", None) if module else None
+    if checker is None:
+        return []
+    metrics = checker.get_metrics()
+    durations = metrics.pop('check_duration_ms', {}) or {}
+    families = families_from_dict(
+        "wtt_health", metrics,
+        counters=('total_checks', 'healthy_checks', 'unhealthy_checks',
+                  'alerts_sent', 'cache_hits', 'timeouts'),
+    )
+
+    status_samples = [
+        ("", {'component': name}, 1.0 if status.healthy else 0.0)
+        for name, status in list(checker.statuses.items())
+    ]
+    if status_samples:
+        families.append({
+            'name': "wtt_health_component_up", 'type': "gauge",
+            'help': "1 — компонент здоров", 'samples': status_samples,
+        })
+
+    hist_samples = []
+    for name, hist in durations.items():
+        for le, count in hist['buckets'].items():
+            le_str = "+Inf" if le == float('inf') else f"{le:g}"
+            hist_samples.append(("_bucket", {'check': name, 'le': le_str}, count))
+        hist_samples.append(("_sum", {'check': name}, hist['sum']))
+        hist_samples.append(("_count", {'check': name}, hist['count']))
+    if hist_samples:
+        families.append({
+            'name': "wtt_health_check_duration_ms", 'type': "histogram",
+            'help': "Длительность health check, мс", 'samples': hist_samples,
+        })
+    return families
+
+
+def collect_degradation_manager() -> List[Dict]:
+    module = _loaded("shared.resilience.degradation_manager")
+    manager = getattr(module, "_global_degradation_manager", None) if module else None
+    if manager is None:
+        return []
+    metrics = manager.get_metrics()
+    metrics['current_mode'] = _SYSTEM_MODE.get(metrics.get('current_mode'), -1)
+    return families_from_dict(
+        "wtt_degradation", metrics,
+        counters=('mode_changes', 'evaluations', 'event_evaluations', 'events_received'),
+    )
+
+
+def collect_local_db() -> List[Dict]:
+    module = _loaded("user_app.db_local")
+    if module is None:
+        return []
+    pool = module.get_pool_metrics()
+    families = families_from_dict("wtt_localdb_writer", pool.get('writer') or {}, counters=('count',))
+    if pool.get('readers'):
+        families.extend(families_from_dict(
+            "wtt_localdb_readers", pool['readers'], counters=('created', 'reused'),
+        ))
+    if pool.get('group_commit'):
+        families.extend(families_from_dict("wtt_localdb_group_commit", pool['group_commit']))
+    return families
+
+
+def collect_reachability() -> List[Dict]:
+    module = _loaded("sync.network")
+    monitor = getattr(module, "_monitor", None) if module else None
+    if monitor is None:
+        return []
+    stats = monitor.get_stats()
+    stats['state'] = _REACHABILITY.get(stats.get('state'), -1)
+    return families_from_dict(
+        "wtt_reachability", stats,
+        counters=('probes', 'probe_failures', 'passive_success', 'passive_failures', 'transitions'),
+    )
+
+
+_DEFAULT_COLLECTORS = {
+    'circuit_breakers': collect_circuit_breakers,
+    'retry_schedulers': collect_retry_schedulers,
+    'health_checker': collect_health_checker,
+    'degradation_manager': collect_degradation_manager,
+    'local_db': collect_local_db,
+    'reachability': collect_reachability,
+}
+
+
+def register_default_collectors(registry: Optional[MetricsRegistry] = None):
+    """Зарегистрировать collectors для синглтонов приложения"""
+    registry = registry or get_metrics_registry()
+    for name, collector in _DEFAULT_COLLECTORS.items():
+        registry.register_collector(name, collector)
@@ -0,0 +1,239 @@
+"""
+Экспорт метрик
+
+- render_prometheus: текстовый формат Prometheus (exposition format 0.0.4)
+- MetricsHTTPServer: GET /metrics на localhost (для локального агента сбора)
+- MetricsFileExporter: периодический атомарный дамп в файл (.prom или .json),
+  если на машине нельзя открыть порт
+
+Usage:
+    from shared.metrics import start_metrics_exporter
+
+    # По настройкам config.METRICS_HTTP_PORT / METRICS_FILE
+    start_metrics_exporter()
+"""
+
+import json
+import logging
+import math
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Optional
+
+from .registry import MetricsRegistry, get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus(registry: Optional[MetricsRegistry] = None) -> str:
+    """Метрики реестра в текстовом формате Prometheus"""
+    registry = registry or get_metrics_registry()
+    lines: List[str] = []
+    seen = set()
+    for family in registry.collect():
+        name = family['name']
+        if name not in seen:
+            seen.add(name)
+            if family.get('help'):
+                lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+        for suffix, labels, value in family['samples']:
+            if labels:
+                label_str = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{suffix}{{{label_str}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name}{suffix} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_prometheus(self.registry).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics http: " + format % args)
+
+
+class MetricsHTTPServer:
+    """HTTP-эндпоинт /metrics (по умолчанию только 127.0.0.1)"""
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "127.0.0.1",
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        handler = type("MetricsHandler", (_MetricsHandler,), {
+            'registry': registry or get_metrics_registry()
+        })
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="MetricsHTTP", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Metrics endpoint: http://{self._server.server_address[0]}:{self.port}/metrics")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+
+class MetricsFileExporter:
+    """
+    Периодический дамп метрик в файл
+
+    Формат по расширению: .json — снимок реестра, иначе — текст Prometheus
+    (подходит для node_exporter textfile collector). Запись атомарная:
+    временный файл + os.replace.
+    """
+
+    def __init__(
+        self,
+        path,
+        interval: float = 60.0,
+        registry: Optional[MetricsRegistry] = None,
+    ):
+        self.path = Path(path)
+        self.interval = max(1.0, float(interval))
+        self.registry = registry or get_metrics_registry()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def dump(self):
+        """Записать текущие метрики в файл"""
+        if self.path.suffix.lower() == ".json":
+            content = json.dumps(self.registry.snapshot(), ensure_ascii=False, indent=1, default=str)
+        else:
+            content = render_prometheus(self.registry)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(content, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+
+        def loop():
+            while not self._stop_event.wait(self.interval):
+                try:
+                    self.dump()
+                except Exception as e:
+                    logger.warning(f"Metrics file dump failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="MetricsFile", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics file: {self.path} (every {self.interval:.0f}s)")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+        try:
+            self.dump()  # финальный снимок
+        except Exception as e:
+            logger.debug(f"Final metrics dump failed: {e}")
+
+
+_exporters: List = []
+_exporters_lock = threading.Lock()
+
+
+def start_metrics_exporter(
+    http_port: Optional[int] = None,
+    file_path: Optional[str] = None,
+    file_interval: Optional[float] = None,
+) -> List:
+    """
+    Запустить экспортёры по аргументам или настройкам config
+    (METRICS_HTTP_PORT, METRICS_FILE, METRICS_FILE_INTERVAL).
+
+    Повторный вызов ничего не делает. Returns: список запущенных экспортёров.
+    """
+    with _exporters_lock:
+        if _exporters:
+            return list(_exporters)
+
+        if http_port is None or file_path is None or file_interval is None:
+            try:
+                from config import METRICS_HTTP_PORT, METRICS_FILE, METRICS_FILE_INTERVAL
+            except Exception:
+                METRICS_HTTP_PORT, METRICS_FILE, METRICS_FILE_INTERVAL = 0, "", 60
+            http_port = METRICS_HTTP_PORT if http_port is None else http_port
+            file_path = METRICS_FILE if file_path is None else file_path
+            file_interval = METRICS_FILE_INTERVAL if file_interval is None else file_interval
+
+        from .collectors import register_default_collectors
+        register_default_collectors()
+
+        if http_port:
+            try:
+                server = MetricsHTTPServer(int(http_port))
+                server.start()
+                _exporters.append(server)
+            except (OSError, socket.error) as e:
+                logger.warning(f"Metrics HTTP endpoint not started (port {http_port}): {e}")
+        if file_path:
+            exporter = MetricsFileExporter(file_path, interval=file_interval)
+            exporter.start()
+            _exporters.append(exporter)
+        return list(_exporters)
+
+
+def stop_metrics_exporter():
+    """Остановить запущенные экспортёры"""
+    with _exporters_lock:
+        for exporter in _exporters:
+            try:
+                exporter.stop()
+            except Exception as e:
+                logger.debug(f"Metrics exporter stop failed: {e}")
+        _exporters.clear()
@@ -0,0 +1,298 @@
+"""
+Реестр метрик WorkTimeTracker
+
+Лёгкий in-process реестр: счётчики, gauge и гистограммы с фиксированными
+корзинами (без внешних зависимостей). Компоненты пишут в него напрямую
+(задержки запросов Sheets, строк на запрос, глубина очереди) или
+регистрируют collector — функцию, которая при сборе переводит их
+собственный stats-словарь в метрики (CircuitBreaker.metrics,
+ConnectionPool.stats и т.п.), чтобы горячие пути не менялись.
+
+Usage:
+    from shared.metrics import get_metrics_registry
+
+    registry = get_metrics_registry()
+    latency = registry.histogram(
+        "wtt_sheets_request_seconds", "Длительность запроса к Sheets API",
+        labelnames=("method",), buckets=LATENCY_BUCKETS,
+    )
+    latency.observe(0.42, method="append_rows")
+
+    registry.register_collector("pool", lambda: families_from_dict(
+        "wtt_db_pool", pool.get_stats(), counters=("created", "reused")
+    ))
+"""
+
+import logging
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Корзины по умолчанию: задержки в секундах и размеры пакетов
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, object]) -> LabelKey:
+    return tuple((name, str(labels.get(name, ""))) for name in labelnames)
+
+
+class _Metric:
+    """Общая часть: имя, описание, метки, блокировка"""
+    type = "untyped"
+
+    def __init__(self, name: str, help: str = "", labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def collect(self) -> Dict:
+        with self._lock:
+            samples = [("", dict(key), value) for key, value in self._values.items()]
+        return {'name': self.name, 'type': self.type, 'help': self.help, 'samples': samples}
+
+
+class Counter(_Metric):
+    """Монотонный счётчик"""
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+
+class Gauge(_Metric):
+    """Текущее значение (может уменьшаться)"""
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными корзинами (кумулятивные le, как в Prometheus)"""
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str = "",
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # {labels: [счётчики корзин (не кумулятивные) ..., +Inf, sum, count]}
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        n = len(self.buckets)
+        # Первая корзина с le >= value (бинарный поиск по отсортированным границам)
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.buckets[mid] < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [0.0] * (n + 3)
+                self._series[key] = series
+            series[lo] += 1
+            series[n + 1] += value
+            series[n + 2] += 1
+
+    def snapshot(self, **labels) -> Optional[Dict]:
+        """{'count', 'sum', 'buckets': {le: кумулятивно}} для одной серии"""
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            series = list(series) if series else None
+        if series is None:
+            return None
+        return self._series_dict(series)
+
+    def _series_dict(self, series: List[float]) -> Dict:
+        n = len(self.buckets)
+        buckets, running = {}, 0.0
+        for le, c in zip(self.buckets + (math.inf,), series[:n + 1]):
+            running += c
+            buckets[le] = int(running)
+        return {'count': int(series[n + 2]), 'sum': series[n + 1], 'buckets': buckets}
+
+    def collect(self) -> Dict:
+        with self._lock:
+            items = [(dict(key), list(series)) for key, series in self._series.items()]
+        samples = []
+        for labels, series in items:
+            data = self._series_dict(series)
+            for le, count in data['buckets'].items():
+                samples.append(("_bucket", {**labels, 'le': _format_le(le)}, count))
+            samples.append(("_sum", labels, data['sum']))
+            samples.append(("_count", labels, data['count']))
+        return {'name': self.name, 'type': self.type, 'help': self.help, 'samples': samples}
+
+
+def _format_le(le: float) -> str:
+    if le == math.inf:
+        return "+Inf"
+    return f"{le:g}"
+
+
+def families_from_dict(
+    prefix: str,
+    stats: Dict,
+    labels: Optional[Dict[str, str]] = None,
+    counters: Iterable[str] = (),
+    help: str = "",
+) -> List[Dict]:
+    """
+    Перевести плоский stats-словарь компонента в семейства метрик
+
+    Числовые значения (и bool) становятся gauge, ключи из counters — counter;
+    строки, None и вложенные словари пропускаются.
+    """
+    counters = set(counters)
+    labels = labels or {}
+    families = []
+    for key, value in stats.items():
+        if isinstance(value, bool):
+            value = int(value)
+        if not isinstance(value, (int, float)):
+            continue
+        is_counter = key in counters
+        name = f"{prefix}_{key}" + ("_total" if is_counter and not key.endswith("_total") else "")
+        families.append({
+            'name': name,
+            'type': "counter" if is_counter else "gauge",
+            'help': help,
+            'samples': [("", dict(labels), float(value))],
+        })
+    return families
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса
+
+    counter()/gauge()/histogram() идемпотентны: повторный вызов с тем же
+    именем возвращает уже созданную метрику.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Dict]]] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.type}")
+            return metric
+
+    def counter(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str = "", labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help: str = "",
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[Dict]]):
+        """
+        Зарегистрировать collector: функцию без аргументов, возвращающую
+        семейства метрик (см. families_from_dict). Повторная регистрация
+        с тем же именем заменяет прежний collector.
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def unregister_collector(self, name: str):
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def collect(self) -> List[Dict]:
+        """
+        Все семейства метрик: собственные + от collectors
+
+        Семейства с одинаковым именем (например, от нескольких circuit
+        breakers) объединяются — в выводе сэмплы одной метрики идут подряд.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        families = [m.collect() for m in metrics]
+        for name, collector in collectors:
+            try:
+                families.extend(collector() or [])
+            except Exception as e:
+                logger.debug(f"Metrics collector [{name}] failed: {e}")
+
+        merged: Dict[str, Dict] = {}
+        for family in families:
+            existing = merged.get(family['name'])
+            if existing is None:
+                merged[family['name']] = {**family, 'samples': list(family['samples'])}
+            else:
+                existing['samples'].extend(family['samples'])
+        return list(merged.values())
+
+    def snapshot(self) -> Dict[str, List]:
+        """Снимок для JSON: {имя: [{'labels': ..., 'value': ...}, ...]}"""
+        result: Dict[str, List] = {}
+        for family in self.collect():
+            for suffix, labels, value in family['samples']:
+                result.setdefault(family['name'] + suffix, []).append(
+                    {'labels': labels, 'value': value}
+                )
+        return result
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Глобальный реестр метрик (singleton)"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = MetricsRegistry()
+    return _registry
@@ -0,0 +1,257 @@
+"""
+Трассировка этапов (spans)
+
+Лёгкие span'ы с API контекстного менеджера:
+
+    from shared.metrics import get_tracer
+
+    tracer = get_tracer()
+    with tracer.span("sync.cycle"):
+        with tracer.span("sync.prepare_batch"):
+            ...
+
+    @traced("sync.batch")
+    def _sync_batch(self, batch): ...
+
+Когда трассировка выключена, span() возвращает общий no-op объект —
+цена вызова: проверка флага. Когда включена:
+- длительность каждого span попадает в скользящую сводку по имени
+  (p50/p95/p99/max за последние window вызовов) и в гистограмму
+  wtt_span_seconds реестра метрик;
+- при заданном trace_file события пишутся в Chrome trace JSON
+  (chrome://tracing, Perfetto) — файл перезаписывается не чаще
+  flush_interval секунд при закрытии корневого span.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+from .registry import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class _NoopSpan:
+    """Span выключенного трассировщика"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Активный span: замер времени, вложенность, атрибуты"""
+    __slots__ = ("tracer", "name", "attrs", "start", "parent", "depth")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.parent: Optional[Span] = None
+        self.depth = 0
+
+    def set(self, **attrs):
+        """Добавить атрибуты (попадут в args события Chrome trace)"""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self.tracer._stack()
+        if stack:
+            self.parent = stack[-1]
+            self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter() - self.start
+        stack = self.tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer._finish(self, duration)
+        return False
+
+
+class Tracer:
+    """
+    Трассировщик этапов
+
+    Parameters:
+        enabled: Включена ли трассировка
+        window: Сколько последних длительностей хранить на имя span
+        trace_file: Куда писать Chrome trace JSON (None — не писать)
+        max_events: Ограничение буфера событий Chrome trace
+        flush_interval: Как часто перезаписывать trace_file, сек
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        window: int = 500,
+        trace_file: Optional[str] = None,
+        max_events: int = 50000,
+        flush_interval: float = 10.0,
+    ):
+        self.enabled = enabled
+        self.window = max(1, window)
+        self.trace_file = Path(trace_file) if trace_file else None
+        self.flush_interval = flush_interval
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._durations: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._events: Deque[Dict] = deque(maxlen=max_events)
+        self._last_flush = time.monotonic()
+        self._epoch = time.perf_counter()
+        self._pid = os.getpid()
+        self._histogram = get_metrics_registry().histogram(
+            "wtt_span_seconds", "Длительность этапов (tracing spans)", labelnames=("span",),
+        )
+
+    def span(self, name: str, **attrs):
+        """Контекстный менеджер span'а (no-op, если трассировка выключена)"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, span: Span, duration: float):
+        self._histogram.observe(duration, span=span.name)
+        with self._lock:
+            durations = self._durations.get(span.name)
+            if durations is None:
+                durations = self._durations[span.name] = deque(maxlen=self.window)
+            durations.append(duration)
+            self._counts[span.name] = self._counts.get(span.name, 0) + 1
+            if self.trace_file is not None:
+                self._events.append({
+                    'name': span.name,
+                    'cat': span.name.split(".", 1)[0],
+                    'ph': "X",
+                    'ts': round((span.start - self._epoch) * 1e6, 1),
+                    'dur': round(duration * 1e6, 1),
+                    'pid': self._pid,
+                    'tid': threading.get_ident(),
+                    'args': {k: v if isinstance(v, (int, float, str, bool)) or v is None else str(v)
+                             for k, v in span.attrs.items()},
+                })
+        if (span.parent is None and self.trace_file is not None
+                and time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def get_summary(self) -> Dict[str, Dict]:
+        """
+        Скользящая сводка по этапам
+
+        Returns:
+            {name: {'count', 'window', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}}
+        """
+        with self._lock:
+            items = [(name, sorted(d), self._counts[name]) for name, d in self._durations.items()]
+        summary = {}
+        for name, values, count in items:
+            n = len(values)
+
+            def pct(p):
+                return values[min(n - 1, int(p * n))] * 1000
+
+            summary[name] = {
+                'count': count,
+                'window': n,
+                'mean_ms': sum(values) / n * 1000,
+                'p50_ms': pct(0.50),
+                'p95_ms': pct(0.95),
+                'p99_ms': pct(0.99),
+                'max_ms': values[-1] * 1000,
+            }
+        return summary
+
+    def flush(self, path: Optional[str] = None):
+        """Записать накопленные события в Chrome trace JSON (атомарно)"""
+        target = Path(path) if path else self.trace_file
+        if target is None:
+            return
+        with self._lock:
+            events = list(self._events)
+            self._last_flush = time.monotonic()
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(target.name + ".tmp")
+            tmp.write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': "ms"}),
+                           encoding="utf-8")
+            os.replace(tmp, target)
+        except OSError as e:
+            logger.warning(f"Trace flush failed: {e}")
+
+    def reset(self):
+        """Очистить сводку и буфер событий"""
+        with self._lock:
+            self._durations.clear()
+            self._counts.clear()
+            self._events.clear()
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Глобальный трассировщик (singleton)
+
+    Настройки из config: TRACE_ENABLED, TRACE_FILE, TRACE_WINDOW.
+    """
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                try:
+                    from config import TRACE_ENABLED, TRACE_FILE, TRACE_WINDOW
+                    options = dict(
+                        enabled=TRACE_ENABLED,
+                        trace_file=TRACE_FILE or None,
+                        window=TRACE_WINDOW,
+                    )
+                except Exception:
+                    options = {}
+                _tracer = Tracer(**options)
+    return _tracer
+
+
+def traced(name: str):
+    """Декоратор: вызов функции — span name (трассировщик берётся при вызове)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = get_tracer()
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(tracer, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
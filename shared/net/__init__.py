@@ -0,0 +1,17 @@
+"""
+Сетевой слой WorkTimeTracker
+
+Компоненты:
+- PooledHTTPAdapter: пул keep-alive соединений с таймаутами по умолчанию
+- build_authorized_session: AuthorizedSession (google-auth) поверх пула
+"""
+
+from .http_transport import (
+    PooledHTTPAdapter,
+    build_authorized_session,
+)
+
+__all__ = [
+    'PooledHTTPAdapter',
+    'build_authorized_session',
+]
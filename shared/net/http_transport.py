@@ -0,0 +1,141 @@
+"""
+HTTP-транспорт с пулом keep-alive соединений
+
+Один requests-адаптер на процесс для Google API:
+- пул соединений нужного размера (потоки синхронизации и админки
+  используют одни и те же TCP/TLS-соединения, а не открывают новые);
+- таймауты (connect, read) на каждый запрос — без глобального
+  socket.setdefaulttimeout(), который ломал соседние потоки;
+- статистика: запросы, ошибки, таймауты, время ответа и доля
+  переиспользованных соединений (keep-alive).
+
+Использование:
+    from shared.net import build_authorized_session
+
+    session = build_authorized_session(credentials, pool_size=10,
+                                       connect_timeout=5, read_timeout=30)
+    client = gspread.Client(credentials, session=session)
+    stats = session.adapters['https://'].get_stats()
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter с таймаутом по умолчанию и метриками keep-alive.
+
+    pool_block=True: при исчерпании пула поток ждёт свободное соединение,
+    а не открывает лишнее (которое потом всё равно будет закрыто).
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        pool_block: bool = True,
+    ):
+        self.default_timeout: Tuple[float, float] = (float(connect_timeout), float(read_timeout))
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'errors': 0,
+            'timeouts': 0,
+            'total_time': 0.0,
+            'max_time': 0.0,
+        }
+        # Ретраи делает вызывающий код (SheetsAPI._request_with_retry)
+        super().__init__(
+            pool_connections=max(1, int(pool_size)),
+            pool_maxsize=max(1, int(pool_size)),
+            max_retries=0,
+            pool_block=pool_block,
+        )
+
+    def send(self, request, stream=False, timeout: Optional[Timeout] = None, **kwargs):
+        if timeout is None:
+            timeout = self.default_timeout
+        start = time.perf_counter()
+        try:
+            return super().send(request, stream=stream, timeout=timeout, **kwargs)
+        except requests.exceptions.Timeout:
+            with self._stats_lock:
+                self.stats['timeouts'] += 1
+                self.stats['errors'] += 1
+            raise
+        except requests.exceptions.RequestException:
+            with self._stats_lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self.stats['requests'] += 1
+                self.stats['total_time'] += elapsed
+                self.stats['max_time'] = max(self.stats['max_time'], elapsed)
+
+    def _pool_counters(self) -> Tuple[int, int]:
+        """(открыто соединений, запросов) по живым пулам urllib3."""
+        opened = served = 0
+        pools = getattr(self.poolmanager, 'pools', None)
+        if pools is None:
+            return 0, 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += getattr(pool, 'num_connections', 0)
+            served += getattr(pool, 'num_requests', 0)
+        return opened, served
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика транспорта (для логов и health checks)."""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        opened, served = self._pool_counters()
+        n = stats['requests']
+        stats['avg_time'] = stats['total_time'] / n if n else 0.0
+        stats['pool_size'] = self._pool_maxsize
+        stats['connect_timeout'], stats['read_timeout'] = self.default_timeout
+        stats['connections_opened'] = opened
+        stats['connections_reused'] = max(0, served - opened)
+        stats['keepalive_ratio'] = (served - opened) / served if served else 0.0
+        return stats
+
+
+def build_authorized_session(
+    credentials,
+    pool_size: int = 10,
+    connect_timeout: float = 5.0,
+    read_timeout: float = 30.0,
+):
+    """
+    AuthorizedSession (google-auth) с PooledHTTPAdapter на https://.
+
+    Returns:
+        Сессия; адаптер доступен как session.adapters['https://']
+    """
+    from google.auth.transport.requests import AuthorizedSession
+
+    session = AuthorizedSession(credentials)
+    adapter = PooledHTTPAdapter(
+        pool_size=pool_size,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+    )
+    session.mount('https://', adapter)
+    logger.info(
+        f"HTTP transport: pool={pool_size}, timeouts=({connect_timeout}s, {read_timeout}s)"
+    )
+    return session
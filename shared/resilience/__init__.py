@@ -4,8 +4,7 @@
 Компоненты:
 - CircuitBreaker: защита от каскадных сбоев
 - DegradationManager: автоматическое переключение режимов работы
-- (Future) RateLimiter: ограничение частоты запросов
-- (Future) Retry: умные повторные попытки
+- RetryScheduler: повторы по HTTP-статусу/Retry-After с AIMD-лимитами по endpoint
 """
 
 from .circuit_breaker import (
@@ -15,6 +14,8 @@ from .circuit_breaker import (
     CircuitOpenError,
     get_circuit_breaker,
     get_all_circuit_breakers,
+    add_state_listener,
+    remove_state_listener,
     circuit_breaker
 )
 
@@ -24,9 +25,20 @@ from .degradation_manager import (
     ModeTransition,
     ModeCapabilities,
     get_degradation_manager,
+    notify_sync_queue_depth,
     stop_global_degradation_manager
 )
 
+from .retry_scheduler import (
+    RetryScheduler,
+    AIMDLimiter,
+    ErrorInfo,
+    classify_error,
+    parse_retry_after,
+    get_retry_scheduler,
+    get_all_retry_schedulers,
+)
+
 __all__ = [
     # Circuit Breaker
     'CircuitBreaker',
@@ -35,6 +47,8 @@ __all__ = [
     'CircuitOpenError',
     'get_circuit_breaker',
     'get_all_circuit_breakers',
+    'add_state_listener',
+    'remove_state_listener',
     'circuit_breaker',
     
     # Degradation Manager
@@ -43,5 +57,15 @@ __all__ = [
     'ModeTransition',
     'ModeCapabilities',
     'get_degradation_manager',
+    'notify_sync_queue_depth',
     'stop_global_degradation_manager',
+    
+    # Retry Scheduler
+    'RetryScheduler',
+    'AIMDLimiter',
+    'ErrorInfo',
+    'classify_error',
+    'parse_retry_after',
+    'get_retry_scheduler',
+    'get_all_retry_schedulers',
 ]
@@ -37,6 +37,7 @@ Date: 2025-12-04
 import logging
 import threading
 import time
+from collections import deque
 from enum import Enum
 from datetime import datetime, timedelta
 from typing import Optional, Callable, Any
@@ -93,6 +94,15 @@ class CircuitBreaker:
         recovery_timeout: Сколько секунд ждать перед попыткой восстановления (default: 60)
         success_threshold: Сколько успехов нужно для закрытия (default: 2)
         expected_exception: Какие исключения считать ошибками (default: Exception)
+        window_size: Скользящее окно по числу вызовов (N последних)
+        window_seconds: Скользящее окно по времени (вызовы за T секунд)
+        failure_rate_threshold: Доля ошибок в окне, при которой circuit открывается
+        min_calls: Минимум вызовов в окне для оценки доли ошибок
+        half_open_max_calls: Сколько пробных запросов одновременно пропускать в HALF_OPEN
+            (None — без ограничения)
+    
+    Если задано окно (window_size и/или window_seconds), circuit открывается
+    по доле ошибок в окне, а не по failure_threshold ошибок подряд.
     
     Example:
         >>> breaker = CircuitBreaker("GoogleAPI", failure_threshold=3, recovery_timeout=30)
@@ -115,14 +125,28 @@ class CircuitBreaker:
         failure_threshold: int = 5,
         recovery_timeout: int = 60,
         success_threshold: int = 2,
-        expected_exception: type = Exception
+        expected_exception: type = Exception,
+        window_size: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+        failure_rate_threshold: float = 0.5,
+        min_calls: int = 10,
+        half_open_max_calls: Optional[int] = None
     ):
         self.name = name
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
         self.success_threshold = success_threshold
         self.expected_exception = expected_exception
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = max(1, min_calls)
+        self.half_open_max_calls = half_open_max_calls
         
+        # Скользящее окно: (monotonic time, успех?)
+        self._window: deque = deque(maxlen=window_size) if window_size else deque()
+        self._half_open_in_flight = 0
+
         # Состояние
         self.state = CircuitState.CLOSED
         self.failure_count = 0
@@ -145,13 +169,25 @@ class CircuitBreaker:
             'time_in_closed': 0.0
         }
         
+        if self.uses_window:
+            rule = (
+                f"failure_rate>={failure_rate_threshold:.0%} "
+                f"(window={window_size or '-'} calls/{window_seconds or '-'}s, min_calls={self.min_calls})"
+            )
+        else:
+            rule = f"failure_threshold={failure_threshold}"
         logger.info(
             f"Circuit Breaker [{name}] initialized: "
-            f"failure_threshold={failure_threshold}, "
+            f"{rule}, "
             f"recovery_timeout={recovery_timeout}s, "
             f"success_threshold={success_threshold}"
         )
     
+    @property
+    def uses_window(self) -> bool:
+        """Circuit открывается по доле ошибок в скользящем окне"""
+        return bool(self.window_size or self.window_seconds)
+    
     def can_execute(self) -> bool:
         """
         Можно ли выполнить запрос?
@@ -169,7 +205,7 @@ class CircuitBreaker:
                 # Проверяем, не пора ли попробовать снова
                 if self._should_attempt_reset():
                     self._transition_to_half_open()
-                    return True
+                    return self._acquire_probe()
                 else:
                     self.metrics['rejected_calls'] += 1
                     logger.debug(
@@ -179,8 +215,8 @@ class CircuitBreaker:
                     return False
             
             elif self.state == CircuitState.HALF_OPEN:
-                # В HALF_OPEN пропускаем запросы для проверки
-                return True
+                # В HALF_OPEN пропускаем ограниченное число пробных запросов
+                return self._acquire_probe()
         
         return False
     
@@ -188,8 +224,10 @@ class CircuitBreaker:
         """Записать успешный вызов"""
         with self.lock:
             self.metrics['successful_calls'] += 1
+            self._record_window(True)
             
             if self.state == CircuitState.HALF_OPEN:
+                self._release_probe()
                 self.success_count += 1
                 logger.debug(
                     f"Circuit Breaker [{self.name}] HALF_OPEN success "
@@ -219,19 +257,30 @@ class CircuitBreaker:
             self.metrics['failed_calls'] += 1
             self.failure_count += 1
             self.last_failure_time = datetime.now()
+            self._record_window(False)
             
             exc_info = f": {type(exception).__name__}" if exception else ""
             
             if self.state == CircuitState.CLOSED:
-                logger.warning(
-                    f"Circuit Breaker [{self.name}] CLOSED failure "
-                    f"({self.failure_count}/{self.failure_threshold}){exc_info}"
-                )
-                
-                if self.failure_count >= self.failure_threshold:
-                    self._transition_to_open()
+                if self.uses_window:
+                    calls, rate = self._window_stats()
+                    logger.warning(
+                        f"Circuit Breaker [{self.name}] CLOSED failure "
+                        f"(rate {rate:.0%} of {calls} calls){exc_info}"
+                    )
+                    if calls >= self.min_calls and rate >= self.failure_rate_threshold:
+                        self._transition_to_open()
+                else:
+                    logger.warning(
+                        f"Circuit Breaker [{self.name}] CLOSED failure "
+                        f"({self.failure_count}/{self.failure_threshold}){exc_info}"
+                    )
+                    
+                    if self.failure_count >= self.failure_threshold:
+                        self._transition_to_open()
             
             elif self.state == CircuitState.HALF_OPEN:
+                self._release_probe()
                 # При ошибке в HALF_OPEN сразу обратно в OPEN
                 logger.warning(
                     f"Circuit Breaker [{self.name}] HALF_OPEN failure{exc_info}, "
@@ -247,10 +296,38 @@ class CircuitBreaker:
             self.failure_count = 0
             self.success_count = 0
     
+    def allows_requests(self) -> bool:
+        """
+        Пропустит ли circuit запрос сейчас (без учёта вызова и без
+        занятия слота пробы — для UI и проверок доступности)
+        """
+        with self.lock:
+            if self.state == CircuitState.CLOSED:
+                return True
+            if self.state == CircuitState.OPEN:
+                return self._should_attempt_reset()
+            return (
+                self.half_open_max_calls is None
+                or self._half_open_in_flight < self.half_open_max_calls
+            )
+    
+    def release(self):
+        """
+        Освободить слот пробного запроса без записи результата
+        (вызов не состоялся или исход не относится к сервису)
+        """
+        with self.lock:
+            if self.state == CircuitState.HALF_OPEN:
+                self._release_probe()
+    
     def get_metrics(self) -> dict:
         """Получить метрики circuit breaker"""
         with self.lock:
+            window_calls, window_rate = self._window_stats()
             return {
+                'window_calls': window_calls,
+                'window_failure_rate': window_rate,
+                'half_open_in_flight': self._half_open_in_flight,
                 **self.metrics,
                 'state': self.state.value,
                 'failure_count': self.failure_count,
@@ -279,14 +356,52 @@ class CircuitBreaker:
         elif isinstance(exc_val, self.expected_exception):
             # Expected failure
             self.record_failure(exc_val)
-        # Else: unexpected exception, don't record
-        
+        else:
+            # Unexpected exception, don't record (но слот пробы освобождаем)
+            self.release()
+
         return False  # Don't suppress exception
     
     # ========================================================================
     # PRIVATE METHODS
     # ========================================================================
     
+    def _record_window(self, ok: bool):
+        """Добавить исход в скользящее окно"""
+        if not self.uses_window:
+            return
+        self._window.append((time.monotonic(), ok))
+        self._trim_window()
+    
+    def _trim_window(self):
+        if self.window_seconds:
+            cutoff = time.monotonic() - self.window_seconds
+            while self._window and self._window[0][0] < cutoff:
+                self._window.popleft()
+    
+    def _window_stats(self) -> tuple:
+        """(вызовов в окне, доля ошибок)"""
+        self._trim_window()
+        calls = len(self._window)
+        if not calls:
+            return 0, 0.0
+        failures = sum(1 for _, ok in self._window if not ok)
+        return calls, failures / calls
+    
+    def _acquire_probe(self) -> bool:
+        """Занять слот пробного запроса в HALF_OPEN"""
+        if self.half_open_max_calls is None:
+            return True
+        if self._half_open_in_flight >= self.half_open_max_calls:
+            self.metrics['rejected_calls'] += 1
+            return False
+        self._half_open_in_flight += 1
+        return True
+    
+    def _release_probe(self):
+        if self._half_open_in_flight > 0:
+            self._half_open_in_flight -= 1
+    
     def _should_attempt_reset(self) -> bool:
         """Пора ли попробовать восстановление?"""
         if self.last_failure_time is None:
@@ -307,6 +422,7 @@ class CircuitBreaker:
     def _transition_to_open(self):
         """Переход в OPEN (авария)"""
         self._update_time_metrics()
+        old_state = self.state
         self.state = CircuitState.OPEN
         self.success_count = 0
         self.last_state_change = datetime.now()
@@ -318,15 +434,19 @@ class CircuitBreaker:
             f"Will retry in {self.recovery_timeout}s"
         )
         
+        self._emit_state_change(old_state)
+        
         # Отправить алерт (если настроено)
         self._send_alert("OPEN")
-    
+
     def _transition_to_half_open(self):
         """Переход в HALF_OPEN (проверка восстановления)"""
         self._update_time_metrics()
+        old_state = self.state
         self.state = CircuitState.HALF_OPEN
         self.success_count = 0
         self.failure_count = 0
+        self._half_open_in_flight = 0
         self.last_state_change = datetime.now()
         self.metrics['state_changes'] += 1
         
@@ -334,13 +454,19 @@ class CircuitBreaker:
             f"Circuit Breaker [{self.name}] transitioned to HALF_OPEN, "
             f"attempting recovery"
         )
-    
+        
+        self._emit_state_change(old_state)
+
     def _transition_to_closed(self):
         """Переход в CLOSED (восстановление)"""
         self._update_time_metrics()
+        old_state = self.state
         self.state = CircuitState.CLOSED
         self.failure_count = 0
         self.success_count = 0
+        self._half_open_in_flight = 0
+        # Окно начинаем заново: старые ошибки не должны сразу открыть circuit
+        self._window.clear()
         self.last_state_change = datetime.now()
         self.metrics['state_changes'] += 1
         
@@ -349,8 +475,23 @@ class CircuitBreaker:
             f"service recovered"
         )
         
+        self._emit_state_change(old_state)
+        
         # Отправить алерт о восстановлении
         self._send_alert("CLOSED")
+
+    def _emit_state_change(self, old_state: CircuitState):
+        """
+        Уведомить подписчиков о смене состояния
+        
+        Вызывается под self.lock: подписчик должен только зафиксировать
+        событие (без блокирующих вызовов и без обращения к этому breaker).
+        """
+        for callback in list(_state_listeners):
+            try:
+                callback(self.name, old_state, self.state)
+            except Exception as e:
+                logger.error(f"Circuit breaker state listener error: {e}")
     
     def _update_time_metrics(self):
         """Обновить метрики времени в состояниях"""
@@ -401,17 +542,23 @@ class CircuitBreaker:
 _circuit_breakers: dict[str, CircuitBreaker] = {}
 _registry_lock = threading.Lock()
 
+# Подписчики на смену состояния любого breaker: callback(name, old_state, new_state)
+_state_listeners: list = []
+
 
 def get_circuit_breaker(
     name: str,
     failure_threshold: int = 5,
     recovery_timeout: int = 60,
-    success_threshold: int = 2
+    success_threshold: int = 2,
+    **options
 ) -> CircuitBreaker:
     """
     Получить или создать circuit breaker
     
     Использует singleton pattern - один circuit breaker на имя.
+    options (window_size, window_seconds, failure_rate_threshold,
+    min_calls, half_open_max_calls) учитываются только при создании.
     """
     global _circuit_breakers
     
@@ -422,7 +569,8 @@ def get_circuit_breaker(
                     name=name,
                     failure_threshold=failure_threshold,
                     recovery_timeout=recovery_timeout,
-                    success_threshold=success_threshold
+                    success_threshold=success_threshold,
+                    **options
                 )
     
     return _circuit_breakers[name]
@@ -433,6 +581,25 @@ def get_all_circuit_breakers() -> dict[str, CircuitBreaker]:
     return _circuit_breakers.copy()
 
 
+def add_state_listener(callback: Callable[[str, CircuitState, CircuitState], None]):
+    """
+    Подписаться на смену состояния всех circuit breakers
+    
+    callback(name, old_state, new_state) вызывается в потоке, где произошёл
+    переход, под lock breaker'а — только фиксировать событие, не блокировать.
+    """
+    with _registry_lock:
+        if callback not in _state_listeners:
+            _state_listeners.append(callback)
+
+
+def remove_state_listener(callback: Callable):
+    """Отписаться от смены состояния circuit breakers"""
+    with _registry_lock:
+        if callback in _state_listeners:
+            _state_listeners.remove(callback)
+
+
 # ============================================================================
 # DECORATOR
 # ============================================================================
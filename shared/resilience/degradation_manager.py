@@ -10,7 +10,12 @@ Graceful Degradation Manager для WorkTimeTracker
 - OFFLINE: Только локальная БД (синхронизация в очередь)
 - EMERGENCY: Минимальный функционал (только логин/логаут)
 
-Автоматическое переключение на основе Health Checks.
+Автоматическое переключение на основе Health Checks и событий:
+смена состояния circuit breakers, доступность сети (ReachabilityMonitor)
+и глубина очереди синхронизации. По событию режим переоценивается сразу;
+ухудшение применяется немедленно, восстановление — после recovery_hold
+секунд стабильно лучшего состояния (гистерезис). Периодическая оценка
+остаётся страховкой.
 
 Usage:
     from shared.resilience.degradation_manager import get_degradation_manager
@@ -21,7 +26,7 @@ Usage:
         health_checker=get_health_checker()
     )
     
-    # Запускаем автоматическую оценку
+    # Запускаем автоматическую оценку (события + страховочный опрос)
     manager.start_auto_evaluation(interval=30)
     
     # Текущий режим
@@ -37,7 +42,7 @@ Date: 2025-12-04
 import logging
 import threading
 import time
-from typing import Optional, Callable, Dict, List
+from typing import Optional, Callable, Dict, List, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -57,6 +62,19 @@ class SystemMode(Enum):
     EMERGENCY = "emergency"      # Минимальная функциональность
 
 
+# Тяжесть режима: переход к большему значению — ухудшение
+_MODE_SEVERITY = {
+    SystemMode.FULL: 0,
+    SystemMode.DEGRADED: 1,
+    SystemMode.OFFLINE: 2,
+    SystemMode.EMERGENCY: 3,
+}
+
+# Circuit breakers, открытие которых означает недоступность сервиса
+_SHEETS_WRITE_BREAKERS = ("GoogleSheetsAPI.append", "GoogleSheetsAPI.update")
+_TELEGRAM_BREAKER = "TelegramAPI"
+
+
 # ============================================================================
 # DATA CLASSES
 # ============================================================================
@@ -96,7 +114,11 @@ class DegradationManager:
         health_checker: HealthChecker instance для проверки компонентов
         mode_change_callback: Функция, вызываемая при смене режима
         notification_callback: Функция для уведомлений пользователей
-    
+        recovery_hold: Сколько секунд лучший режим должен держаться,
+            прежде чем на него переключиться (default: 10)
+        queue_backlog_threshold: Глубина очереди синхронизации, при которой
+            FULL понижается до DEGRADED (default: 1000)
+
     Example:
         >>> from shared.health import get_health_checker
         >>> 
@@ -117,12 +139,28 @@ class DegradationManager:
         self,
         health_checker,
         mode_change_callback: Optional[Callable] = None,
-        notification_callback: Optional[Callable] = None
+        notification_callback: Optional[Callable] = None,
+        recovery_hold: float = 10.0,
+        queue_backlog_threshold: int = 1000
     ):
         self.health_checker = health_checker
         self.mode_change_callback = mode_change_callback
         self.notification_callback = notification_callback
-        
+        self.recovery_hold = recovery_hold
+        self.queue_backlog_threshold = queue_backlog_threshold
+        
+        # Последние сигналы от событий (перекрывают статусы health checks)
+        self.signals = {
+            'reachability': None,       # 'online' / 'offline' / 'suspect'
+            'breakers': {},             # {name: 'open' / 'half_open' / 'closed'}
+            'sync_queue_depth': None,
+        }
+        # Кандидат на восстановление: (режим, с какого момента держится)
+        self._pending_recovery: Optional[Tuple[SystemMode, float]] = None
+        self._wake = threading.Event()
+        self._subscribed = False
+        self._reachability_monitor = None
+
         # Текущий режим
         self.current_mode = SystemMode.FULL
         
@@ -143,7 +181,11 @@ class DegradationManager:
             'time_in_degraded': 0.0,
             'time_in_offline': 0.0,
             'time_in_emergency': 0.0,
-            'last_evaluation': None
+            'last_evaluation': None,
+            'evaluations': 0,
+            'event_evaluations': 0,
+            'events_received': 0,
+            'recoveries_held': 0
         }
         self.last_mode_change = datetime.now()
         
@@ -177,6 +219,22 @@ class DegradationManager:
         telegram_ok = telegram_healthy and telegram_healthy.healthy if telegram_healthy else False
         internet_ok = internet_healthy and internet_healthy.healthy if internet_healthy else False
         
+        # События свежее результатов health checks
+        with self.lock:
+            reachability = self.signals['reachability']
+            breakers = dict(self.signals['breakers'])
+            queue_depth = self.signals['sync_queue_depth']
+        
+        if reachability == 'offline':
+            internet_ok = False
+        elif reachability == 'online':
+            internet_ok = True
+        
+        if any(breakers.get(name) == 'open' for name in _SHEETS_WRITE_BREAKERS):
+            sheets_ok = False
+        if breakers.get(_TELEGRAM_BREAKER) == 'open':
+            telegram_ok = False
+
         # Определяем режим по приоритету
         if not db_ok:
             # БД недоступна - EMERGENCY режим
@@ -203,25 +261,139 @@ class DegradationManager:
             new_mode = SystemMode.OFFLINE
             reason = "No internet or all external services down"
         
+        if (new_mode == SystemMode.FULL and queue_depth is not None
+                and queue_depth >= self.queue_backlog_threshold):
+            # Синхронизация не успевает за очередью
+            new_mode = SystemMode.DEGRADED
+            reason = f"Sync queue backlog: {queue_depth} records"
+
         # Логируем оценку
         logger.debug(
             f"Mode evaluation: DB={db_ok}, Sheets={sheets_ok}, "
             f"Telegram={telegram_ok}, Internet={internet_ok} → {new_mode.value}"
         )
         
-        # Если режим изменился, переключаем
-        if new_mode != self.current_mode:
+        # Если режим изменился, переключаем (восстановление — с гистерезисом)
+        if new_mode == self.current_mode:
+            self._pending_recovery = None
+        elif self._recovery_allowed(new_mode):
             self._switch_mode(new_mode, reason, {
                 'database': db_ok,
                 'sheets_api': sheets_ok,
                 'telegram_api': telegram_ok,
-                'internet': internet_ok
+                'internet': internet_ok,
+                'sync_queue_depth': queue_depth
             })
         
         with self.lock:
             self.metrics['last_evaluation'] = datetime.now()
+            self.metrics['evaluations'] += 1
+        
+        return self.current_mode
+    
+    # ========================================================================
+    # EVENTS
+    # ========================================================================
+    
+    def subscribe_events(self):
+        """
+        Подписаться на события: circuit breakers и ReachabilityMonitor
+        
+        Глубину очереди синхронизации сообщает SyncManager через
+        notify_sync_queue_depth().
+        """
+        if self._subscribed:
+            return
         
-        return new_mode
+        from shared.resilience.circuit_breaker import add_state_listener
+        add_state_listener(self.on_breaker_state_change)
+        
+        try:
+            from sync.network import get_reachability_monitor
+            monitor = get_reachability_monitor()
+            monitor.add_listener(self.on_reachability_change)
+            self._reachability_monitor = monitor
+            if monitor.state != monitor.UNKNOWN:
+                self.on_reachability_change(None, monitor.state)
+        except Exception as e:
+            logger.warning(f"Reachability events unavailable: {e}")
+        
+        self._subscribed = True
+        logger.info("DegradationManager subscribed to breaker/reachability events")
+    
+    def unsubscribe_events(self):
+        """Отписаться от событий"""
+        if not self._subscribed:
+            return
+        
+        from shared.resilience.circuit_breaker import remove_state_listener
+        remove_state_listener(self.on_breaker_state_change)
+        if self._reachability_monitor is not None:
+            self._reachability_monitor.remove_listener(self.on_reachability_change)
+            self._reachability_monitor = None
+        self._subscribed = False
+    
+    def on_breaker_state_change(self, name: str, old_state, new_state):
+        """Событие circuit breaker (вызывается под его lock — только фиксируем)"""
+        with self.lock:
+            self.signals['breakers'][name] = getattr(new_state, 'value', new_state)
+            self.metrics['events_received'] += 1
+        self._wake.set()
+    
+    def on_reachability_change(self, old_state: Optional[str], new_state: str):
+        """Событие ReachabilityMonitor"""
+        with self.lock:
+            self.signals['reachability'] = new_state
+            self.metrics['events_received'] += 1
+        self._wake.set()
+    
+    def on_sync_queue_depth(self, depth: int):
+        """Глубина очереди синхронизации; переоценка только при пересечении порога"""
+        with self.lock:
+            prev = self.signals['sync_queue_depth']
+            self.signals['sync_queue_depth'] = depth
+            crossed = prev is None or (
+                (prev >= self.queue_backlog_threshold) != (depth >= self.queue_backlog_threshold)
+            )
+            if crossed:
+                self.metrics['events_received'] += 1
+        if crossed:
+            self._wake.set()
+    
+    def _recovery_allowed(self, new_mode: SystemMode) -> bool:
+        """
+        Гистерезис: ухудшение — сразу, восстановление — если лучший режим
+        держится не меньше recovery_hold секунд
+        """
+        now = time.monotonic()
+        if _MODE_SEVERITY[new_mode] > _MODE_SEVERITY[self.current_mode]:
+            self._pending_recovery = None
+            return True
+        if self.recovery_hold <= 0:
+            return True
+        
+        pending = self._pending_recovery
+        if pending is None or pending[0] != new_mode:
+            self._pending_recovery = (new_mode, now)
+            with self.lock:
+                self.metrics['recoveries_held'] += 1
+            logger.info(
+                f"Mode recovery to {new_mode.value} pending "
+                f"(hold {self.recovery_hold:.0f}s)"
+            )
+            return False
+        if now - pending[1] >= self.recovery_hold:
+            self._pending_recovery = None
+            return True
+        return False
+    
+    def _next_wait(self, interval: float) -> float:
+        """Сколько ждать до следующей оценки: интервал или конец удержания"""
+        pending = self._pending_recovery
+        if pending is None:
+            return interval
+        remaining = pending[1] + self.recovery_hold - time.monotonic()
+        return max(0.05, min(interval, remaining))
     
     def force_mode(self, mode: SystemMode, reason: str = "Manual override"):
         """
@@ -232,6 +404,7 @@ class DegradationManager:
             reason: Причина смены
         """
         logger.info(f"Forcing mode to {mode.value}: {reason}")
+        self._pending_recovery = None
         self._switch_mode(mode, reason, {})
     
     def get_current_mode(self) -> SystemMode:
@@ -306,32 +479,42 @@ class DegradationManager:
                 'current_mode': self.current_mode.value,
                 'time_in_current_mode': (datetime.now() - self.last_mode_change).total_seconds(),
                 'history_length': len(self.mode_history),
-                'evaluation_active': self.running
+                'evaluation_active': self.running,
+                'events_subscribed': self._subscribed,
+                'pending_recovery': self._pending_recovery[0].value if self._pending_recovery else None
             }
     
     def start_auto_evaluation(self, interval: int = 30):
         """
         Запустить автоматическую оценку режима
         
+        Оценка выполняется сразу по событию (breaker, сеть, очередь)
+        и не реже раза в interval секунд как страховка.
+        
         Args:
-            interval: Интервал оценки в секундах (default: 30)
+            interval: Страховочный интервал оценки в секундах (default: 30)
         """
         if self.running:
             logger.warning("Auto evaluation already running")
             return
         
         self.running = True
+        self.subscribe_events()
         
         def evaluation_loop():
-            logger.info(f"Auto evaluation started (interval={interval}s)")
+            logger.info(f"Auto evaluation started (events + interval={interval}s)")
             
             while self.running:
                 try:
                     # Оцениваем режим
                     self.evaluate_mode()
                     
-                    # Спим до следующей оценки
-                    time.sleep(interval)
+                    # Ждём события или страховочного интервала
+                    triggered = self._wake.wait(self._next_wait(interval))
+                    self._wake.clear()
+                    if triggered:
+                        with self.lock:
+                            self.metrics['event_evaluations'] += 1
                 
                 except Exception as e:
                     logger.error(f"Auto evaluation error: {e}", exc_info=True)
@@ -351,6 +534,8 @@ class DegradationManager:
         
         logger.info("Stopping auto evaluation...")
         self.running = False
+        self.unsubscribe_events()
+        self._wake.set()
         
         if self.evaluation_thread:
             self.evaluation_thread.join(timeout=5)
@@ -538,6 +723,18 @@ def get_degradation_manager(
     return _global_degradation_manager
 
 
+def notify_sync_queue_depth(depth: int):
+    """
+    Сообщить глубину очереди синхронизации глобальному менеджеру
+    
+    Ничего не делает, если менеджер не создан (например, в фоновом
+    процессе синхронизации без GUI).
+    """
+    manager = _global_degradation_manager
+    if manager is not None:
+        manager.on_sync_queue_depth(depth)
+
+
 def stop_global_degradation_manager():
     """Остановить глобальный degradation manager"""
     global _global_degradation_manager
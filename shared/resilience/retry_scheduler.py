@@ -0,0 +1,525 @@
+"""
+Планировщик повторных попыток для вызовов Google API
+
+Вместо time.sleep() в вызывающем потоке:
+- запрос ставится в очередь и возвращается Future;
+- ошибка разбирается структурно (HTTP-статус, заголовок Retry-After),
+  а не поиском подстрок в тексте;
+- повтор планируется не раньше Retry-After, иначе — экспоненциально
+  с джиттером;
+- на каждый endpoint (класс запросов: чтение/запись) — AIMD-лимитер:
+  темп и число одновременных запросов растут аддитивно на успехах
+  и делятся пополам на 429. Пропускная способность держится у квоты,
+  а не скачет между всплесками и блокировками circuit breaker.
+
+Использование:
+    from shared.resilience.retry_scheduler import get_retry_scheduler
+
+    scheduler = get_retry_scheduler("GoogleSheetsAPI", rate_per_minute=60)
+    future = scheduler.submit(ws.get_all_values, endpoint="sheets_read")
+    rows = future.result()
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# ERROR CLASSIFICATION
+# ============================================================================
+
+# Статусы, после которых повтор имеет смысл
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+_STATUS_IN_TEXT = re.compile(r"\[(\d{3})\]|\b(429|50[0234])\b")
+
+
+@dataclass
+class ErrorInfo:
+    """Результат разбора ошибки запроса"""
+    status: Optional[int]
+    retry_after: Optional[float]
+    retryable: bool
+    throttled: bool
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """
+    Значение Retry-After в секундах
+
+    Поддерживает оба формата RFC 9110: число секунд и HTTP-дату.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _response_of(exc: BaseException):
+    response = getattr(exc, "response", None)
+    if response is None and exc.__cause__ is not None:
+        response = getattr(exc.__cause__, "response", None)
+    return response
+
+
+def classify_error(exc: BaseException) -> ErrorInfo:
+    """
+    Разобрать ошибку: HTTP-статус, Retry-After, можно ли повторять
+
+    Источники (по убыванию надёжности): response.status_code и заголовки
+    (gspread.APIError, requests.HTTPError), атрибут code, тип сетевого
+    исключения, и только в последнюю очередь — текст сообщения.
+    """
+    status: Optional[int] = None
+    retry_after: Optional[float] = None
+
+    response = _response_of(exc)
+    if response is not None:
+        status = getattr(response, "status_code", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+        except AttributeError:
+            retry_after = None
+
+    if status is None:
+        code = getattr(exc, "code", None)
+        if isinstance(code, int) and 100 <= code < 600:
+            status = code
+
+    if status is None:
+        # Сетевые ошибки без HTTP-ответа (requests.ConnectionError/Timeout
+        # наследуются от OSError через IOError)
+        if isinstance(exc, (ConnectionError, TimeoutError)):
+            return ErrorInfo(None, None, True, False)
+        type_name = type(exc).__name__.lower()
+        if any(x in type_name for x in ("timeout", "connection", "protocol", "chunked")):
+            return ErrorInfo(None, None, True, False)
+        match = _STATUS_IN_TEXT.search(str(exc))
+        if match:
+            status = int(match.group(1) or match.group(2))
+
+    if status is None:
+        msg = str(exc).lower()
+        retryable = any(x in msg for x in (
+            "rate limit", "quota", "timeout", "timed out", "temporarily",
+            "unavailable", "socket", "connection reset", "connection aborted",
+        ))
+        throttled = "rate limit" in msg or "quota" in msg
+        return ErrorInfo(None, None, retryable, throttled)
+
+    return ErrorInfo(
+        status=status,
+        retry_after=retry_after,
+        retryable=status in RETRYABLE_STATUSES,
+        throttled=status == 429,
+    )
+
+
+# ============================================================================
+# AIMD LIMITER
+# ============================================================================
+
+class AIMDLimiter:
+    """
+    AIMD-лимитер одного endpoint
+
+    rate — разрешённый темп (запросов/мин), не выше ceiling (квота);
+    limit — допустимое число одновременных запросов.
+    Успех: rate += increase_step (по умолчанию 2% потолка), limit += 1/limit.
+    429:   rate и limit делятся пополам, endpoint блокируется до Retry-After.
+    5xx/сеть: limit делится пополам (темп не трогаем — это не квота).
+    Снижение — не чаще раза за окно паузы: пачка 429 от запросов, уже
+    ушедших в полёт, считается одним сигналом (как раз за RTT в TCP).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate_per_minute: float = 60.0,
+        min_rate_per_minute: float = 6.0,
+        max_concurrency: int = 4,
+        increase_step: Optional[float] = None,
+    ):
+        self.name = name
+        self.ceiling = float(rate_per_minute)
+        self.min_rate = min(float(min_rate_per_minute), self.ceiling)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.increase_step = (
+            float(increase_step) if increase_step is not None else max(1.0, self.ceiling * 0.02)
+        )
+
+        self.rate = self.ceiling
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self._next_slot = 0.0
+        self._blocked_until = 0.0
+        self._hold_decrease_until = 0.0
+        self.lock = threading.Lock()
+
+        self.metrics = {
+            'acquired': 0,
+            'throttled': 0,
+            'errors': 0,
+            'decreases': 0,
+        }
+
+    def try_acquire(self, now: float) -> Optional[float]:
+        """
+        Попробовать занять слот
+
+        Returns:
+            0.0 — слот занят; >0 — через сколько секунд пробовать снова;
+            None — заняты все параллельные слоты (ждать release)
+        """
+        with self.lock:
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self.in_flight >= max(1, int(self.limit)):
+                return None
+            if now < self._next_slot:
+                return self._next_slot - now
+            self._next_slot = max(self._next_slot, now) + 60.0 / self.rate
+            self.in_flight += 1
+            self.metrics['acquired'] += 1
+            return 0.0
+
+    def release(self, ok: bool, info: Optional[ErrorInfo] = None, now: Optional[float] = None) -> None:
+        """Освободить слот и скорректировать лимиты по исходу запроса"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if ok:
+                self.rate = min(self.ceiling, self.rate + self.increase_step)
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / max(1.0, self.limit))
+                return
+            if info is None or not info.retryable:
+                return
+            if info.throttled:
+                self.metrics['throttled'] += 1
+            else:
+                self.metrics['errors'] += 1
+            if now < self._hold_decrease_until:
+                return
+            self.metrics['decreases'] += 1
+            self.limit = max(1.0, self.limit / 2)
+            pause = 60.0 / self.rate
+            if info.throttled:
+                self.rate = max(self.min_rate, self.rate / 2)
+                pause = info.retry_after if info.retry_after is not None else 60.0 / self.rate
+                self._blocked_until = max(self._blocked_until, now + pause)
+                self._next_slot = max(self._next_slot, self._blocked_until)
+            self._hold_decrease_until = now + pause
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'rate_per_minute': round(self.rate, 2),
+                'ceiling': self.ceiling,
+                'concurrency_limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'blocked_for': max(0.0, self._blocked_until - time.monotonic()),
+                **self.metrics,
+            }
+
+
+# ============================================================================
+# RETRY SCHEDULER
+# ============================================================================
+
+class _Task:
+    __slots__ = ("func", "args", "kwargs", "endpoint", "future",
+                 "attempts", "throttled", "max_attempts")
+
+    def __init__(self, func, args, kwargs, endpoint, max_attempts):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.endpoint = endpoint
+        self.future: Future = Future()
+        self.attempts = 0
+        self.throttled = 0
+        self.max_attempts = max_attempts
+
+
+class RetryScheduler:
+    """
+    Центральный планировщик запросов с повторами
+
+    Один поток-диспетчер держит кучу задач по времени готовности и
+    отдаёт их в пул исполнителей, когда AIMD-лимитер endpoint даёт слот.
+    Ожидание между попытками не занимает ни одного потока.
+
+    Parameters:
+        name: Имя (для логов и реестра)
+        max_workers: Потоков-исполнителей
+        max_attempts: Попыток на задачу (429 не расходуют попытки,
+            их число ограничено max_throttled)
+        base_delay / max_delay: Параметры экспоненциального бэкоффа, сек
+        rate_per_minute: Квота одного endpoint (потолок AIMD)
+        max_concurrency: Потолок одновременных запросов на endpoint
+    """
+
+    def __init__(
+        self,
+        name: str = "GoogleAPI",
+        max_workers: int = 4,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        rate_per_minute: float = 60.0,
+        max_concurrency: int = 4,
+        max_throttled: int = 10,
+    ):
+        self.name = name
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = max(0.0, float(base_delay))
+        self.max_delay = float(max_delay)
+        self.rate_per_minute = float(rate_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_throttled = max_throttled
+
+        self._heap: List[Tuple[float, int, _Task]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._limiters: Dict[str, AIMDLimiter] = {}
+        self._stop = False
+        self._local = threading.local()
+        # Метрики
+        self.metrics = {
+            'submitted': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'retries': 0,
+            'throttled': 0,
+        }
+        self._metrics_lock = threading.Lock()
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(max_workers)),
+            thread_name_prefix=f"{name}Worker",
+            initializer=self._mark_worker,
+        )
+        self._thread = threading.Thread(
+            target=self._dispatch_loop, name=f"{name}Scheduler", daemon=True
+        )
+        self._thread.start()
+
+        logger.info(
+            f"Retry scheduler [{name}] initialized: workers={max_workers}, "
+            f"attempts={self.max_attempts}, rate={rate_per_minute}/min per endpoint"
+        )
+
+    # ----- public API -----
+
+    def limiter(self, endpoint: str) -> AIMDLimiter:
+        """AIMD-лимитер endpoint (создаётся при первом обращении)"""
+        with self._cond:
+            lim = self._limiters.get(endpoint)
+            if lim is None:
+                lim = AIMDLimiter(
+                    f"{self.name}:{endpoint}",
+                    rate_per_minute=self.rate_per_minute,
+                    min_rate_per_minute=max(1.0, self.rate_per_minute / 10),
+                    max_concurrency=self.max_concurrency,
+                )
+                self._limiters[endpoint] = lim
+            return lim
+
+    def submit(
+        self,
+        func: Callable,
+        *args,
+        endpoint: str = "default",
+        max_attempts: Optional[int] = None,
+        **kwargs,
+    ) -> Future:
+        """
+        Поставить вызов func(*args, **kwargs) в очередь
+
+        Returns:
+            Future с результатом или последним исключением
+        """
+        task = _Task(func, args, kwargs, endpoint, max_attempts or self.max_attempts)
+        self.limiter(endpoint)
+        with self._metrics_lock:
+            self.metrics['submitted'] += 1
+        self._schedule(task, 0.0)
+        return task.future
+
+    def in_worker(self) -> bool:
+        """Текущий поток — исполнитель планировщика?"""
+        return getattr(self._local, "worker", False)
+
+    def stop(self, wait: bool = True) -> None:
+        with self._cond:
+            self._stop = True
+            pending = [t for _, _, t in self._heap]
+            self._heap.clear()
+            self._cond.notify_all()
+        for task in pending:
+            task.future.cancel()
+        self._executor.shutdown(wait=wait)
+        if wait and self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            stats = dict(self.metrics)
+        with self._cond:
+            stats['queued'] = len(self._heap)
+            limiters = list(self._limiters.items())
+        stats['endpoints'] = {name: lim.snapshot() for name, lim in limiters}
+        return stats
+
+    # ----- internals -----
+
+    def _mark_worker(self) -> None:
+        self._local.worker = True
+
+    def _backoff(self, attempt: int) -> float:
+        # Экспонента с джиттером: base * 2^(n-1) + random(0..base)
+        delay = self.base_delay * (2 ** max(0, attempt - 1))
+        return min(self.max_delay, delay + random.uniform(0, self.base_delay))
+
+    def _schedule(self, task: _Task, delay: float) -> None:
+        with self._cond:
+            if self._stop:
+                task.future.cancel()
+                return
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), task))
+            self._cond.notify()
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stop and not self._heap:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                due, _, task = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+                heapq.heappop(self._heap)
+                if task.future.cancelled():
+                    continue
+                lim = self._limiters[task.endpoint]
+                wait = lim.try_acquire(now)
+                if wait is None:
+                    # Все параллельные слоты заняты — release() разбудит
+                    heapq.heappush(self._heap, (now + 0.05, next(self._seq), task))
+                    self._cond.wait(0.05)
+                    continue
+                if wait > 0:
+                    heapq.heappush(self._heap, (now + wait, next(self._seq), task))
+                    continue
+            try:
+                self._executor.submit(self._run, task, lim)
+            except RuntimeError:
+                lim.release(False)
+                task.future.cancel()
+                return
+
+    def _run(self, task: _Task, lim: AIMDLimiter) -> None:
+        try:
+            result = task.func(*task.args, **task.kwargs)
+        except BaseException as e:
+            info = classify_error(e)
+            lim.release(False, info)
+            self._on_failure(task, e, info)
+        else:
+            lim.release(True)
+            with self._metrics_lock:
+                self.metrics['succeeded'] += 1
+            self._resolve(task.future, result=result)
+        finally:
+            with self._cond:
+                self._cond.notify()
+
+    def _on_failure(self, task: _Task, exc: BaseException, info: ErrorInfo) -> None:
+        if info.throttled:
+            task.throttled += 1
+            with self._metrics_lock:
+                self.metrics['throttled'] += 1
+        else:
+            task.attempts += 1
+
+        exhausted = task.attempts >= task.max_attempts or task.throttled > self.max_throttled
+        if not info.retryable or exhausted or task.future.cancelled():
+            with self._metrics_lock:
+                self.metrics['failed'] += 1
+            self._resolve(task.future, exc=exc)
+            return
+
+        delay = self._backoff(task.attempts + task.throttled)
+        if info.retry_after is not None:
+            delay = max(delay, info.retry_after)
+        with self._metrics_lock:
+            self.metrics['retries'] += 1
+        logger.warning(
+            f"[{self.name}:{task.endpoint}] retry in {delay:.2f}s "
+            f"(status={info.status}, attempt={task.attempts}, throttled={task.throttled}): {exc}"
+        )
+        self._schedule(task, delay)
+
+    @staticmethod
+    def _resolve(future: Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        try:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass  # отменён вызывающим
+
+
+# ============================================================================
+# GLOBAL REGISTRY
+# ============================================================================
+
+_schedulers: dict[str, RetryScheduler] = {}
+_registry_lock = threading.Lock()
+
+
+def get_retry_scheduler(name: str = "GoogleAPI", **kwargs) -> RetryScheduler:
+    """
+    Получить или создать планировщик (один на имя)
+
+    kwargs учитываются только при первом вызове.
+    """
+    if name not in _schedulers:
+        with _registry_lock:
+            if name not in _schedulers:
+                _schedulers[name] = RetryScheduler(name=name, **kwargs)
+    return _schedulers[name]
+
+
+def get_all_retry_schedulers() -> dict[str, RetryScheduler]:
+    """Получить все зарегистрированные планировщики"""
+    return _schedulers.copy()
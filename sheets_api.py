@@ -5,7 +5,6 @@ import time
 import json
 import sys
 import os
-import random
 import logging
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Any
@@ -13,10 +12,15 @@ from pathlib import Path
 from google.oauth2.service_account import Credentials
 from dataclasses import dataclass
 import threading
+from concurrent.futures import Future
 from zoneinfo import ZoneInfo  # stdlib (Python 3.9+)
 
 # Circuit Breaker для отказоустойчивости
 from shared.resilience import get_circuit_breaker, CircuitOpenError, CircuitState
+from shared.resilience.retry_scheduler import get_retry_scheduler, classify_error
+from shared.net import build_authorized_session
+from sync.network import get_reachability_monitor
+from shared.metrics import get_metrics_registry, get_tracer, SIZE_BUCKETS
 
 
 logger = logging.getLogger("sheets_api")  # никаких handlers здесь — конфиг только в приложении
@@ -33,6 +37,23 @@ except ImportError:
 
 __all__ = ["SheetsAPI", "sheets_api", "get_sheets_api"]
 
+# Метрики запросов (реестр shared.metrics, экспорт — /metrics или файл)
+_metrics = get_metrics_registry()
+_REQUEST_SECONDS = _metrics.histogram(
+    "wtt_sheets_request_seconds", "Длительность одной попытки запроса к Sheets API",
+    labelnames=("method", "op"),
+)
+_REQUESTS_TOTAL = _metrics.counter(
+    "wtt_sheets_requests_total", "Попытки запросов к Sheets API по исходу",
+    labelnames=("method", "outcome"),
+)
+_ROWS_PER_REQUEST = _metrics.histogram(
+    "wtt_sheets_rows_per_request", "Строк в одном запросе записи",
+    labelnames=("method",), buckets=SIZE_BUCKETS,
+)
+# Span'ы запросов (sheets.<method>) внутри этапов синхронизации
+_tracer = get_tracer()
+
 
 @dataclass
 class QuotaInfo:
@@ -53,6 +74,46 @@ class SheetsAPIError(Exception):
         )
 
 
+def group_by_email_prefix(email: str) -> str:
+    """Группа по префиксу email из GROUP_MAPPING, иначе 'Входящие'."""
+    try:
+        from config import GROUP_MAPPING
+        email_prefix = str(email).split("@")[0].lower()
+        for k, v in GROUP_MAPPING.items():
+            if k and k.lower() in email_prefix:
+                return str(v).title()
+    except Exception as e:
+        logger.warning(f"Failed to determine group from GROUP_MAPPING for {email}: {e}")
+    return "Входящие"
+
+
+def session_status_in(table: List[Dict[str, str]], email: str, session_id: str) -> str:
+    """Статус сессии в таблице ActiveSessions: по email+session_id, иначе — по последней записи email."""
+    em = (email or "").strip().lower()
+    sid = str(session_id).strip()
+
+    def key_fn(t):
+        idx, r = t
+        ts = (r.get("LoginTime") or "").strip()
+        return (ts, idx)
+
+    exact = [(i, r) for i, r in enumerate(table, start=2)
+             if (r.get("Email", "") or "").strip().lower() == em
+             and str(r.get("SessionID", "")).strip() == sid]
+
+    if exact:
+        _, row = sorted(exact, key=key_fn)[-1]
+    else:
+        same_email = [(i, r) for i, r in enumerate(table, start=2)
+                      if (r.get("Email", "") or "").strip().lower() == em]
+        if not same_email:
+            return "unknown"
+        _, row = sorted(same_email, key=key_fn)[-1]
+
+    status = (row.get("Status", "") or "").strip().lower()
+    return status or "unknown"
+
+
 class SheetsAPI:
     """Синглтон-обёртка над gspread с ретраями, кэшем и batch-операциями."""
     _instance = None
@@ -67,21 +128,30 @@ class SheetsAPI:
         return cls._instance
 
     def _initialize(self):
-        from config import credentials_path
-        self._last_request_time = None
+        from config import credentials_source
+        self._http_session = None
+        self._credentials = None
+        self._cached_token = None
+        # Повторы и темп запросов (AIMD по чтению/записи) — в планировщике
+        self._scheduler = None
         self._sheet_cache: Dict[str, Any] = {}
         # Простейшая заглушка квоты (Drive мы не трогаем):
         self._quota_info = QuotaInfo(remaining=1000, reset_time=60, daily_used=0.0)
         self._quota_lock = threading.Lock()
         
-        # Circuit Breaker для защиты от каскадных сбоев
-        self.circuit_breaker = get_circuit_breaker(
-            name="GoogleSheetsAPI",
-            failure_threshold=3,      # 3 ошибки подряд
-            recovery_timeout=300,     # 5 минут
-            success_threshold=2       # 2 успеха для восстановления
-        )
-        logger.info("Circuit Breaker initialized for Sheets API")
+        # Circuit Breaker на каждый класс операций: сбои тяжёлых чтений
+        # не блокируют запись статусов (append/update)
+        self.circuit_breakers = {
+            op: get_circuit_breaker(
+                name=f"GoogleSheetsAPI.{op}",
+                success_threshold=2,  # 2 успеха для восстановления
+                **profile
+            )
+            for op, profile in self._BREAKER_PROFILES.items()
+        }
+        # Основной (для статуса/метрик): запись действий агентов
+        self.circuit_breaker = self.circuit_breakers["append"]
+        logger.info("Circuit Breakers initialized for Sheets API: %s", ", ".join(self.circuit_breakers))
         
         try:
             logger.debug("=== SheetsAPI Initialization Debug ===")
@@ -90,20 +160,18 @@ class SheetsAPI:
             logger.debug(f"cwd: {os.getcwd()}")
             logger.debug(f"sys.path ok, len={len(sys.path)}")
 
-            # Получаем путь к credentials через контекстный менеджер
-            with credentials_path() as creds_path:
-                self.credentials_path = Path(creds_path).resolve()
-                logger.info(f"Initializing with credentials: {self.credentials_path}")
-                logger.debug(f"Credentials exists: {os.path.exists(self.credentials_path)}")
-                if not self.credentials_path.exists():
-                    if getattr(sys, 'frozen', False):
-                        logger.error("Running in frozen mode but credentials not found!")
-                    raise FileNotFoundError(f"Credentials file missing at: {self.credentials_path}")
-                # Обязателен ID книги из .env
-                self._sheet_id = (os.getenv("GOOGLE_SHEET_ID") or "").strip()
-                if not self._sheet_id:
-                    raise RuntimeError("GOOGLE_SHEET_ID не задан в .env")
-                self._init_client()
+            # Источник credentials (ZIP или JSON); содержимое читается в память без временного файла
+            self.credentials_path = credentials_source().resolve()
+            logger.info(f"Initializing with credentials: {self.credentials_path}")
+            if not self.credentials_path.exists():
+                if getattr(sys, 'frozen', False):
+                    logger.error("Running in frozen mode but credentials not found!")
+                raise FileNotFoundError(f"Credentials file missing at: {self.credentials_path}")
+            # Обязателен ID книги из .env
+            self._sheet_id = (os.getenv("GOOGLE_SHEET_ID") or "").strip()
+            if not self._sheet_id:
+                raise RuntimeError("GOOGLE_SHEET_ID не задан в .env")
+            self._init_client()
         except Exception as e:
             logger.critical("Initialization failed", exc_info=True)
             raise SheetsAPIError(
@@ -115,15 +183,19 @@ class SheetsAPI:
     # ---------- low-level client/bootstrap ----------
 
     def _init_client(self, max_retries: int = 3) -> None:
+        """
+        Создать клиента без сетевых запросов: проверка доступа к книге —
+        в warm_up() (фоновая инициализация), токен — из кэша, если не истёк.
+        """
+        from config import credentials_info
         for attempt in range(max_retries):
             try:
                 logger.info(f"Client init attempt {attempt + 1}/{max_retries}")
-                with open(self.credentials_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    required = {'type', 'project_id', 'private_key_id', 'private_key', 'client_email', 'client_id'}
-                    if not required.issubset(data.keys()):
-                        missing = required - set(data.keys())
-                        raise ValueError(f"Missing fields in credentials: {missing}")
+                data = credentials_info()
+                required = {'type', 'project_id', 'private_key_id', 'private_key', 'client_email', 'client_id'}
+                if not required.issubset(data.keys()):
+                    missing = required - set(data.keys())
+                    raise ValueError(f"Missing fields in credentials: {missing}")
 
                 # Области доступа (scopes)
                 # Нужно иметь полный доступ к таблицам и возможность работать с файлами в Google Drive
@@ -131,10 +203,21 @@ class SheetsAPI:
                     "https://www.googleapis.com/auth/spreadsheets",
                     "https://www.googleapis.com/auth/drive"
                 ]
-                credentials = Credentials.from_service_account_file(str(self.credentials_path), scopes=SCOPES)
-                self.client = gspread.authorize(credentials)
-                self._test_connection()
-                logger.info("Google Sheets client initialized successfully (Sheets + Drive scopes)")
+                credentials = Credentials.from_service_account_info(data, scopes=SCOPES)
+                self._credentials = credentials
+                self._load_cached_token()
+                # Общий пул keep-alive соединений + таймауты на каждый запрос
+                from config import (
+                    SHEETS_HTTP_POOL_SIZE, SHEETS_HTTP_CONNECT_TIMEOUT, SHEETS_HTTP_READ_TIMEOUT,
+                )
+                self._http_session = build_authorized_session(
+                    credentials,
+                    pool_size=SHEETS_HTTP_POOL_SIZE,
+                    connect_timeout=SHEETS_HTTP_CONNECT_TIMEOUT,
+                    read_timeout=SHEETS_HTTP_READ_TIMEOUT,
+                )
+                self.client = gspread.Client(credentials, session=self._http_session)
+                logger.info("Google Sheets client initialized (Sheets + Drive scopes)")
                 return
             except Exception as e:
                 logger.error(f"Init attempt {attempt + 1} failed: {e}")
@@ -149,6 +232,66 @@ class SheetsAPI:
                 logger.warning(f"Retrying in {wait} seconds...")
                 time.sleep(wait)
 
+    def warm_up(self) -> None:
+        """
+        Проверить доступ к книге и заранее открыть её (для фоновой инициализации
+        после показа окна). Первый рабочий запрос переиспользует открытую книгу.
+        """
+        self._test_connection()
+    
+    # ---------- OAuth token cache ----------
+    
+    def _token_cache_path(self) -> Optional[Path]:
+        try:
+            from config import SHEETS_TOKEN_CACHE
+        except Exception:
+            return None
+        return Path(SHEETS_TOKEN_CACHE) if SHEETS_TOKEN_CACHE else None
+    
+    def _load_cached_token(self) -> None:
+        """Подставить сохранённый токен сервисного аккаунта, если он ещё действует"""
+        path = self._token_cache_path()
+        creds = self._credentials
+        if path is None or creds is None or not path.exists():
+            return
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("client_email") != creds.service_account_email:
+                return
+            expiry = datetime.fromisoformat(data["expiry"])
+            # google-auth хранит expiry как naive UTC; запас 5 минут на часы и сеть
+            if expiry - datetime.now(timezone.utc).replace(tzinfo=None) < timedelta(minutes=5):
+                return
+            creds.token = data["token"]
+            creds.expiry = expiry
+            self._cached_token = creds.token
+            logger.info(f"OAuth token reused from cache (valid until {expiry:%H:%M} UTC)")
+        except Exception as e:
+            logger.debug(f"Token cache ignored: {e}")
+    
+    def _persist_token(self) -> None:
+        """Сохранить обновлённый токен (вызывается после успешного запроса, пишет раз в час)"""
+        creds = self._credentials
+        if creds is None or not creds.token or creds.token == self._cached_token or creds.expiry is None:
+            return
+        self._cached_token = creds.token
+        path = self._token_cache_path()
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({
+                    "client_email": creds.service_account_email,
+                    "token": creds.token,
+                    "expiry": creds.expiry.isoformat(),
+                }, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.debug(f"Token cache write failed: {e}")
+    
     def _test_connection(self) -> None:
         """
         Проверяем доступ без обращения к Drive API:
@@ -163,6 +306,8 @@ class SheetsAPI:
             # Не используем list_spreadsheet_files() — он требует Drive API.
             ss = self.client.open_by_key(self._sheet_id)
             _ = ss.worksheets()
+            self._sheet_cache["_spreadsheet"] = ss
+            self._persist_token()
             elapsed = time.time() - start
             logger.debug(f"API test OK in {elapsed:.2f}s")
             self._update_quota_info()
@@ -205,15 +350,6 @@ class SheetsAPI:
         # Без реального учёта квот Drive — пропускаем ограничение
         return True
 
-    def _check_rate_limit(self, delay: float) -> None:
-        if self._last_request_time:
-            elapsed = time.time() - self._last_request_time
-            if elapsed < delay:
-                wait = delay - elapsed
-                logger.debug(f"Rate limit: waiting {wait:.2f}s")
-                time.sleep(wait)
-        self._last_request_time = time.time()
-
     def _coerce_values(self, values):
         """
         Нормализует значения для передачи в Google Sheets API.
@@ -228,106 +364,209 @@ class SheetsAPI:
             return [list(values)]
         return [list(row) for row in values]
 
+    # Классы операций для circuit breakers (по методу gspread)
+    _APPEND_METHODS = frozenset({
+        "append_row", "append_rows", "values_append", "insert_row", "insert_rows",
+    })
+    _UPDATE_METHODS = frozenset({
+        "update", "update_cell", "update_cells", "update_acell", "batch_update",
+        "values_update", "values_clear", "batch_clear", "clear",
+        "delete_row", "delete_rows", "format", "resize",
+    })
+    _METADATA_METHODS = frozenset({
+        "open_by_key", "open", "open_by_url", "openall", "worksheets", "worksheet",
+        "add_worksheet", "del_worksheet", "fetch_sheet_metadata", "list_spreadsheet_files",
+    })
+
+    # Окно: N последних вызовов за T секунд; открытие — по доле ошибок.
+    # Запись восстанавливается быстрее и пропускает больше проб.
+    _BREAKER_PROFILES = {
+        "read": dict(window_size=20, window_seconds=60, failure_rate_threshold=0.5,
+                     min_calls=5, recovery_timeout=120, half_open_max_calls=1),
+        "append": dict(window_size=20, window_seconds=60, failure_rate_threshold=0.5,
+                       min_calls=4, recovery_timeout=30, half_open_max_calls=2),
+        "update": dict(window_size=20, window_seconds=60, failure_rate_threshold=0.5,
+                       min_calls=4, recovery_timeout=30, half_open_max_calls=2),
+        "metadata": dict(window_size=10, window_seconds=60, failure_rate_threshold=0.5,
+                         min_calls=3, recovery_timeout=60, half_open_max_calls=1),
+    }
+
+    @staticmethod
+    def _method_names(func) -> set:
+        name = getattr(func, "__name__", "")
+        if name == "<lambda>":
+            code = getattr(func, "__code__", None)
+            return set(code.co_names) if code is not None else set()
+        return {name}
+
+    @classmethod
+    def _method_label(cls, func) -> str:
+        """Имя метода для метрик (для lambda — известный метод gspread из её тела)"""
+        name = getattr(func, "__name__", "<callable>")
+        if name != "<lambda>":
+            return name
+        known = cls._method_names(func) & (
+            cls._APPEND_METHODS | cls._UPDATE_METHODS | cls._METADATA_METHODS
+        )
+        return min(known) if known else "lambda"
+    
+    @staticmethod
+    def _rows_in(args, kwargs) -> Optional[int]:
+        """Сколько строк несёт запрос записи (None — не удалось определить)"""
+        values = args[0] if args else kwargs.get("values", kwargs.get("data"))
+        if not isinstance(values, (list, tuple)):
+            return None
+        if values and isinstance(values[0], dict):
+            # batch_update: [{'range': ..., 'values': [[...], ...]}, ...]
+            return sum(len(item.get("values") or []) for item in values)
+        if values and isinstance(values[0], (list, tuple)):
+            return len(values)
+        return 1 if values else 0
+    
+    @classmethod
+    def _operation_class(cls, func) -> str:
+        """Класс операции: append / update / metadata / read"""
+        names = cls._method_names(func)
+        if names & cls._APPEND_METHODS:
+            return "append"
+        if names & cls._UPDATE_METHODS:
+            return "update"
+        if names & cls._METADATA_METHODS:
+            return "metadata"
+        return "read"
+
+    # Методы gspread, которые расходуют квоту записи (остальное — чтение)
+    _WRITE_METHODS = frozenset({
+        "update", "update_cell", "update_cells", "update_acell", "batch_update",
+        "values_update", "values_append", "values_clear", "batch_clear",
+        "append_row", "append_rows", "insert_row", "insert_rows",
+        "delete_row", "delete_rows", "clear", "format", "resize",
+        "add_worksheet", "del_worksheet",
+    })
+
+    @classmethod
+    def _endpoint_for(cls, func) -> str:
+        """Класс квоты запроса: sheets_write / sheets_read"""
+        return "sheets_write" if cls._method_names(func) & cls._WRITE_METHODS else "sheets_read"
+
+    def _get_scheduler(self):
+        scheduler = getattr(self, "_scheduler", None)
+        if scheduler is None:
+            from config import (
+                API_MAX_RETRIES, API_DELAY_SECONDS, API_MAX_RETRY_DELAY,
+                API_MAX_CONCURRENCY, GOOGLE_API_LIMITS,
+            )
+            scheduler = get_retry_scheduler(
+                "GoogleSheetsAPI",
+                max_workers=API_MAX_CONCURRENCY,
+                max_attempts=API_MAX_RETRIES,
+                base_delay=max(1.0, float(API_DELAY_SECONDS)),
+                max_delay=API_MAX_RETRY_DELAY,
+                rate_per_minute=GOOGLE_API_LIMITS.get("max_requests_per_minute", 60),
+                max_concurrency=API_MAX_CONCURRENCY,
+            )
+            self._scheduler = scheduler
+        return scheduler
+
+    def _guarded_call(self, func, *args, **kwargs):
+        """Одна попытка: Circuit Breaker класса операции + учёт квоты. Повторы — в планировщике."""
+        op = self._operation_class(func)
+        breaker = self.circuit_breakers[op]
+        if not breaker.can_execute():
+            time_until_recovery = breaker._time_until_recovery()
+            logger.warning(
+                f"Circuit breaker [{breaker.name}] OPEN. "
+                f"Will retry in {time_until_recovery:.0f}s"
+            )
+            raise CircuitOpenError(
+                breaker.name,
+                datetime.now() + timedelta(seconds=time_until_recovery)
+            )
+        name = getattr(func, "__name__", "<callable>")
+        logger.debug(f"Request: {name} [{breaker.name}]")
+        method = self._method_label(func)
+        if op in ("append", "update"):
+            rows = self._rows_in(args, kwargs)
+            if rows is not None:
+                _ROWS_PER_REQUEST.observe(rows, method=method)
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            _REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, op=op)
+            info = classify_error(e)
+            _REQUESTS_TOTAL.inc(method=method, outcome="throttled" if info.throttled else "error")
+            # Пассивный сигнал доступности: ответ сервера есть — сеть есть
+            if info.status is not None:
+                get_reachability_monitor().report_success()
+            elif info.retryable and not info.throttled:
+                get_reachability_monitor().report_failure(e)
+            # 429 — это квота, её держит AIMD-лимитер; в breaker идут только сбои сервиса
+            if info.retryable and not info.throttled:
+                breaker.record_failure(e)
+                if breaker.state == CircuitState.OPEN:
+                    logger.error(
+                        f"Circuit breaker [{breaker.name}] OPENED "
+                        f"(failure rate {breaker.get_metrics()['window_failure_rate']:.0%})"
+                    )
+            else:
+                breaker.release()
+            raise
+        _REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, op=op)
+        _REQUESTS_TOTAL.inc(method=method, outcome="ok")
+        with self._quota_lock:
+            self._quota_info.remaining = max(0, self._quota_info.remaining - 1)
+        self._persist_token()
+        breaker.record_success()
+        get_reachability_monitor().report_success()
+        return result
+
+    def request_async(self, func, *args, **kwargs) -> Future:
+        """
+        Поставить запрос в планировщик повторов, вернуть Future.
+
+        Ожидание между попытками (Retry-After / бэкофф) не занимает поток.
+        """
+        return self._get_scheduler().submit(
+            self._guarded_call, func, *args, endpoint=self._endpoint_for(func), **kwargs
+        )
+
     def _request_with_retry(self, func, *args, **kwargs):
         """Выполнить запрос с retry логикой и Circuit Breaker защитой"""
-        from config import API_MAX_RETRIES, API_DELAY_SECONDS, GOOGLE_API_LIMITS
-        import socket
-        
-        # Устанавливаем глобальный таймаут для socket операций (защита от зависания)
-        original_timeout = socket.getdefaulttimeout()
-        socket.setdefaulttimeout(10)  # 10 секунд максимум на любую network операцию
-        
+        if _tracer.enabled:
+            # Span вызывающего потока: вкладывается в этап синхронизации, включает ожидание повторов
+            with _tracer.span(f"sheets.{self._method_label(func)}"):
+                return self._execute_request(func, *args, **kwargs)
+        return self._execute_request(func, *args, **kwargs)
+    
+    def _execute_request(self, func, *args, **kwargs):
+        if not get_reachability_monitor().allow_request():
+            # Проба сети не проходит: не тратим попытки и слоты планировщика впустую,
+            # кроме редкого пробного запроса (за прокси проба не проходит никогда)
+            raise SheetsAPIError("Network unreachable (offline)", is_retryable=True)
+        scheduler = self._get_scheduler()
         try:
-            # Проверяем Circuit Breaker ПЕРЕД попыткой запроса
-            if not self.circuit_breaker.can_execute():
-                time_until_recovery = self.circuit_breaker._time_until_recovery()
-                logger.warning(
-                    f"Circuit breaker OPEN for Sheets API. "
-                    f"Will retry in {time_until_recovery:.0f}s"
-                )
-                raise CircuitOpenError(
-                    "GoogleSheetsAPI",
-                    datetime.now() + timedelta(seconds=time_until_recovery)
+            if scheduler.in_worker():
+                # Вложенный вызов из исполнителя: не ждём сами себя
+                return self._guarded_call(func, *args, **kwargs)
+            return self.request_async(func, *args, **kwargs).result()
+        except (SheetsAPIError, CircuitOpenError):
+            raise
+        except Exception as e:
+            info = classify_error(e)
+            if info.status == 400 or "invalid json payload" in str(e).lower():
+                logger.error(f"Invalid payload format for Sheets API: {e}")
+                raise SheetsAPIError(
+                    f"Invalid data format for Google Sheets API: {e}",
+                    is_retryable=False,
+                    details="Check that all values are properly formatted strings/numbers"
                 )
-            
-            last_exc: Optional[Exception] = None
-            for attempt in range(API_MAX_RETRIES):
-                try:
-                    if not self._check_quota(required=1):
-                        raise SheetsAPIError("Insufficient API quota", is_retryable=True)
-                    self._check_rate_limit(API_DELAY_SECONDS)
-                    name = getattr(func, "__name__", "<callable>")
-                    logger.debug(f"Attempt {attempt + 1}: {name}")
-                    result = func(*args, **kwargs)
-                    with self._quota_lock:
-                        self._quota_info.remaining = max(0, self._quota_info.remaining - 1)
-                    
-                    # Записываем успех в Circuit Breaker
-                    self.circuit_breaker.record_success()
-                    
-                    return result
-                except Exception as e:
-                    last_exc = e
-                    msg = str(e).lower()
-                    
-                    # Классификация ошибок
-                    is_format_error = any(x in msg for x in (
-                        "invalid value at 'data.values'", 
-                        "invalid value at 'values'",
-                        "invalid json payload",
-                        "bad request"
-                    ))
-                    
-                    # 429/5xx/сетевые — повторимые, ошибки формата — нет
-                    retryable = not is_format_error and any(x in msg for x in (
-                        "rate limit", "quota", "429", "timeout", "temporarily", 
-                        "unavailable", "socket", "503", "500", "502"
-                    ))
-                    
-                    if is_format_error:
-                        logger.error(f"Invalid payload format for Sheets API: {e}")
-                        raise SheetsAPIError(
-                            f"Invalid data format for Google Sheets API: {e}",
-                            is_retryable=False,
-                            details="Check that all values are properly formatted strings/numbers"
-                        )
-                    
-                    # Записываем ошибку в Circuit Breaker (только retryable ошибки)
-                    if retryable:
-                        self.circuit_breaker.record_failure(e)
-                        
-                        # Проверяем, не открылся ли circuit
-                        if self.circuit_breaker.state == CircuitState.OPEN:
-                            logger.error(
-                                f"Circuit breaker OPENED after {self.circuit_breaker.failure_count} failures"
-                            )
-                    
-                    if attempt == API_MAX_RETRIES - 1 or not retryable:
-                        logger.error(f"Request failed after {API_MAX_RETRIES} attempts")
-                        if isinstance(e, SheetsAPIError):
-                            raise
-                        raise SheetsAPIError(
-                            f"API request failed: {e}",
-                            is_retryable=retryable,
-                            details=str(e)
-                        )
-                    
-                    # Full jitter: base * 2^n + random(0..base)
-                    base = max(1.0, float(API_DELAY_SECONDS))
-                    wait = base * (2 ** attempt)
-                    wait = wait + random.uniform(0, base)
-                    # мягкая нормализация под минутный лимит
-                    per_min = max(1, GOOGLE_API_LIMITS.get("max_requests_per_minute", 60))
-                    min_gap = 60.0 / per_min
-                    wait = max(wait, min_gap)
-                    logger.warning(f"Retry {attempt + 1}/{API_MAX_RETRIES} in {wait:.2f}s (error: {e})")
-                    time.sleep(wait)
-            
-            raise last_exc or Exception("Unknown request error")
-        
-        finally:
-            # Восстанавливаем оригинальный таймаут
-            socket.setdefaulttimeout(original_timeout)
+            logger.error(f"Request failed (status={info.status}): {e}")
+            raise SheetsAPIError(
+                f"API request failed: {e}",
+                is_retryable=info.retryable,
+                details=str(e)
+            )
 
     # ---------- timezone helpers ----------
 
@@ -426,9 +665,7 @@ class SheetsAPI:
 
     def list_worksheet_titles(self) -> List[str]:
         """Список названий листов книги (открытой по ID)."""
-        if "_spreadsheet" not in self._sheet_cache:
-            self._sheet_cache["_spreadsheet"] = self._request_with_retry(self.client.open_by_key, self._sheet_id)
-        sheets = self._request_with_retry(self._sheet_cache["_spreadsheet"].worksheets)
+        sheets = self._request_with_retry(self._get_spreadsheet().worksheets)
         return [ws.title for ws in sheets]
 
     def has_worksheet(self, name: str) -> bool:
@@ -450,6 +687,11 @@ class SheetsAPI:
 
     def _read_table(self, ws) -> List[Dict[str, str]]:
         rows = self._request_with_retry(lambda: ws.get_all_values())
+        return self._rows_to_table(rows)
+
+    @staticmethod
+    def _rows_to_table(rows: List[List[str]]) -> List[Dict[str, str]]:
+        """Сырые строки листа (с заголовком) -> список dict."""
         if not rows:
             return []
         header = rows[0]
@@ -459,6 +701,26 @@ class SheetsAPI:
                 out.append({header[i]: (r[i] if i < len(header) else "") for i in range(len(header))})
         return out
 
+    def _get_spreadsheet(self):
+        """Объект книги (через кэш)."""
+        if "_spreadsheet" not in self._sheet_cache:
+            self._sheet_cache["_spreadsheet"] = self._request_with_retry(self.client.open_by_key, self._sheet_id)
+        return self._sheet_cache["_spreadsheet"]
+
+    def _batch_read_tables(self, sheet_names: List[str]) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Читает несколько листов ОДНИМ запросом (values:batchGet).
+        Возвращает {имя_листа: таблица}.
+        """
+        spreadsheet = self._get_spreadsheet()
+        ranges = [f"'{name}'" for name in sheet_names]
+        resp = self._request_with_retry(spreadsheet.values_batch_get, ranges)
+        value_ranges = (resp or {}).get("valueRanges", [])
+        out: Dict[str, List[Dict[str, str]]] = {}
+        for name, vr in zip(sheet_names, value_ranges):
+            out[name] = self._rows_to_table(vr.get("values", []))
+        return out
+
     def _header_map(self, ws) -> Dict[str, int]:
         header = self._request_with_retry(lambda: ws.row_values(1))
         return {name: i + 1 for i, name in enumerate(header)}  # 1-based
@@ -604,22 +866,51 @@ class SheetsAPI:
         try:
             ws = self._get_ws(USERS_SHEET)
             table = self._read_table(ws)
-            em = (email or "").strip().lower()
-            for row in table:
-                if (row.get("Email", "") or "").strip().lower() == em:
-                    return {
-                        "email": em,
-                        "name": row.get("Name", ""),
-                        "role": row.get("Role", "специалист"),
-                        "shift_hours": row.get("ShiftHours", "8 часов"),
-                        "telegram_login": row.get("Telegram", ""),
-                        "group": row.get("Group", ""),
-                    }
-            return None
+            return self._find_user_profile(table, email)
         except Exception as e:
             logger.error(f"User lookup failed for '{email}': {e}")
             raise SheetsAPIError("Failed to lookup user", is_retryable=True, details=str(e))
 
+    @staticmethod
+    def _find_user_profile(users: List[Dict[str, str]], email: str) -> Optional[Dict[str, str]]:
+        em = (email or "").strip().lower()
+        for row in users:
+            if (row.get("Email", "") or "").strip().lower() == em:
+                return {
+                    "email": em,
+                    "name": row.get("Name", ""),
+                    "role": row.get("Role", "специалист"),
+                    "shift_hours": row.get("ShiftHours", "8 часов"),
+                    "telegram_login": row.get("Telegram", ""),
+                    "group": row.get("Group", ""),
+                }
+        return None
+
+    def get_login_snapshot(self, email: str) -> Dict[str, Optional[Dict[str, str]]]:
+        """
+        Всё, что нужно для логина, одним batchGet по Users + ActiveSessions.
+        Возвращает {"user": профиль или None, "active_session": строка или None}.
+        """
+        from config import USERS_SHEET, ACTIVE_SESSIONS_SHEET
+        try:
+            tables = self._batch_read_tables([USERS_SHEET, ACTIVE_SESSIONS_SHEET])
+        except Exception as e:
+            logger.error(f"Login snapshot failed for '{email}': {e}")
+            raise SheetsAPIError("Failed to lookup user", is_retryable=True, details=str(e))
+
+        users = tables.get(USERS_SHEET, [])
+        if _api_cache:
+            _api_cache.set('users', users)
+
+        em = (email or "").strip().lower()
+        active = None
+        for row in tables.get(ACTIVE_SESSIONS_SHEET, []):
+            if (row.get("Email", "") or "").strip().lower() == em and \
+               (row.get("Status", "") or "").strip().lower() == "active":
+                active = row
+                break
+        return {"user": self._find_user_profile(users, em), "active_session": active}
+
     # ========= ACTIVE SESSIONS =========
 
     def get_all_active_sessions(self) -> List[Dict[str, str]]:
@@ -645,35 +936,24 @@ class SheetsAPI:
         self._request_with_retry(ws.append_rows, normalized_values, value_input_option='USER_ENTERED')
         return True
 
+    def set_active_sessions(self, sessions: List[Dict[str, Any]]) -> bool:
+        """
+        Несколько записей в ActiveSessions одним append (по 50 строк на запрос).
+        sessions: [{"email", "name", "session_id", "login_time"}]
+        """
+        from config import ACTIVE_SESSIONS_SHEET
+        values = [
+            [s.get("email", ""), s.get("name", ""), s.get("session_id", ""),
+             self._ensure_local_str(s.get("login_time")), "active", ""]
+            for s in sessions
+        ]
+        return self.batch_update(ACTIVE_SESSIONS_SHEET, values)
+
     def check_user_session_status(self, email: str, session_id: str) -> str:
         """Статус по точному email+session_id, иначе — по последней записи email."""
         from config import ACTIVE_SESSIONS_SHEET
         ws = self._get_ws(ACTIVE_SESSIONS_SHEET)
-        table = self._read_table(ws)
-
-        em = (email or "").strip().lower()
-        sid = str(session_id).strip()
-
-        def key_fn(t):
-            idx, r = t
-            ts = (r.get("LoginTime") or "").strip()
-            return (ts, idx)
-
-        exact = [(i, r) for i, r in enumerate(table, start=2)
-                 if (r.get("Email", "") or "").strip().lower() == em
-                 and str(r.get("SessionID", "")).strip() == sid]
-
-        if exact:
-            _, row = sorted(exact, key=key_fn)[-1]
-        else:
-            same_email = [(i, r) for i, r in enumerate(table, start=2)
-                          if (r.get("Email", "") or "").strip().lower() == em]
-            if not same_email:
-                return "unknown"
-            _, row = sorted(same_email, key=key_fn)[-1]
-
-        status = (row.get("Status", "") or "").strip().lower()
-        return status or "unknown"
+        return session_status_in(self._read_table(ws), email, session_id)
 
     def finish_active_session(
         self,
@@ -714,6 +994,59 @@ class SheetsAPI:
         self._request_with_retry(lambda: ws.update(rng, [buf]))
         return True
 
+    def finish_active_sessions(self, items: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Завершить несколько сессий: одно чтение листа и один batchUpdate.
+        items: [{"email", "session_id", "logout_time", "reason"}];
+        результат — по флагу на item (False — активная сессия не найдена).
+        """
+        from config import ACTIVE_SESSIONS_SHEET
+        if not items:
+            return []
+        ws = self._get_ws(ACTIVE_SESSIONS_SHEET)
+        rows = self._request_with_retry(lambda: ws.get_all_values())
+        if not rows:
+            return [False] * len(items)
+
+        hmap = {name: i + 1 for i, name in enumerate(rows[0])}  # 1-based
+        need = ["Email", "SessionID", "Status", "LogoutTime"]
+        if not all(k in hmap for k in need):
+            raise RuntimeError("ActiveSessions headers missing one of: " + ", ".join(need))
+
+        def cell(row: List[str], col: str) -> str:
+            i = hmap[col] - 1
+            return row[i] if i < len(row) else ""
+
+        # Первая активная строка каждой пары (email, session_id), как в finish_active_session
+        active: Dict[tuple, int] = {}
+        for i, r in enumerate(rows[1:], start=2):
+            if (cell(r, "Status") or "").strip().lower() != "active":
+                continue
+            key = ((cell(r, "Email") or "").strip().lower(), str(cell(r, "SessionID")).strip())
+            active.setdefault(key, i)
+
+        cols = sorted([hmap["Status"], hmap["LogoutTime"], hmap.get("LogoutReason", hmap["LogoutTime"])])
+        left = self._num_to_a1_col(cols[0]); right = self._num_to_a1_col(cols[-1])
+
+        results: List[bool] = []
+        data = []
+        for item in items:
+            key = ((item.get("email") or "").strip().lower(), str(item.get("session_id", "")).strip())
+            row_idx = active.pop(key, None)
+            results.append(row_idx is not None)
+            if row_idx is None:
+                continue
+            buf = [""] * (cols[-1] - cols[0] + 1)
+            buf[hmap["Status"] - cols[0]] = "finished"
+            buf[hmap["LogoutTime"] - cols[0]] = self._ensure_local_str(item.get("logout_time"))
+            if "LogoutReason" in hmap:
+                buf[hmap["LogoutReason"] - cols[0]] = item.get("reason") or "user_exit"
+            data.append({"range": f"{left}{row_idx}:{right}{row_idx}", "values": [buf]})
+
+        if data:
+            self._request_with_retry(lambda: ws.batch_update(data))
+        return results
+
     def kick_active_session(
         self,
         email: str,
@@ -825,16 +1158,7 @@ class SheetsAPI:
         except Exception as e:
             logger.warning(f"Users lookup failed while determining group for {email}: {e}")
 
-        try:
-            from config import GROUP_MAPPING
-            email_prefix = str(email).split("@")[0].lower()
-            for k, v in GROUP_MAPPING.items():
-                if k and k.lower() in email_prefix:
-                    return str(v).title()
-        except Exception as e:
-            logger.warning(f"Failed to determine group from GROUP_MAPPING for {email}: {e}")
-
-        return "Входящие"
+        return group_by_email_prefix(email)
 
     def log_user_actions(self, actions: List[Dict[str, Any]], email: str, user_group: Optional[str] = None) -> bool:
         """
@@ -1014,17 +1338,28 @@ class SheetsAPI:
         except Exception:
             return False
     
+    def get_transport_stats(self) -> dict:
+        """Статистика HTTP-транспорта: запросы, таймауты, keep-alive"""
+        session = getattr(self, '_http_session', None)
+        if session is None:
+            return {}
+        adapter = session.adapters.get('https://')
+        return adapter.get_stats() if hasattr(adapter, 'get_stats') else {}
+
     def get_circuit_breaker_metrics(self) -> dict:
-        """Получить метрики circuit breaker"""
+        """Получить метрики circuit breaker (основной — append; по классам — в 'classes')"""
         if not hasattr(self, 'circuit_breaker'):
             return {'error': 'Circuit breaker not initialized'}
-        return self.circuit_breaker.get_metrics()
+        return {
+            **self.circuit_breaker.get_metrics(),
+            'classes': {op: b.get_metrics() for op, b in self.circuit_breakers.items()},
+        }
     
     def is_available(self) -> bool:
-        """Проверить доступность API"""
+        """Проверить доступность API (запись действий проходит?)"""
         if not hasattr(self, 'circuit_breaker'):
             return True
-        return self.circuit_breaker.can_execute()
+        return self.circuit_breaker.allows_requests()
     
     def get_status_message(self) -> str:
         """Получить человеко-читаемый статус API"""
@@ -1033,6 +1368,13 @@ class SheetsAPI:
         
         state = self.circuit_breaker.state
         
+        backing_off = [
+            op for op, b in self.circuit_breakers.items()
+            if b is not self.circuit_breaker and b.state != CircuitState.CLOSED
+        ]
+        
+        if state == CircuitState.CLOSED and backing_off:
+            return f"🟡 Google Sheets API: Available (backing off: {', '.join(backing_off)})"
         if state == CircuitState.CLOSED:
             return "✅ Google Sheets API: Available"
         elif state == CircuitState.OPEN:
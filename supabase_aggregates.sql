@@ -0,0 +1,286 @@
+-- ============================================================================
+-- WorkTimeTracker: серверные агрегаты для Supabase (PostgreSQL)
+-- Выполнять ПОСЛЕ supabase_schema.sql (в SQL Editor Supabase)
+-- Версия: 1.0
+--
+-- Дашборды и экспорт (sync_to_sheets.py) получают готовые агрегаты через
+-- RPC вместо сырых строк work_sessions / break_log / violations.
+-- Каждая таблица агрегируется отдельно (CTE), поэтому нет "размножения"
+-- строк при JOIN, как во view daily_user_stats.
+-- Период передаётся внутрь CTE: читаются только строки периода (по индексам),
+-- а не вся история.
+-- Незакрытая сессия/перерыв считается до конца своего дня (сегодня — до NOW()),
+-- иначе забытая с прошлого месяца сессия добавляла бы десятки тысяч минут.
+-- ============================================================================
+
+-- ============================================================================
+-- ИНДЕКСЫ ПОД АГРЕГАТЫ
+-- ============================================================================
+
+-- Сессии за период (диапазон login_time, затем GROUP BY user_id)
+CREATE INDEX IF NOT EXISTS idx_sessions_login_user
+    ON work_sessions(login_time, user_id)
+    INCLUDE (duration_minutes, logout_time);
+
+-- Перерывы за период по дням
+CREATE INDEX IF NOT EXISTS idx_breaklog_date_user
+    ON break_log(date, user_id)
+    INCLUDE (duration_minutes, start_time, end_time);
+
+-- Нарушения по дням (top violators, сравнение групп)
+CREATE INDEX IF NOT EXISTS idx_violations_date_user
+    ON violations(date, user_id)
+    INCLUDE (excess_minutes);
+
+-- Активные пользователи по группам
+CREATE INDEX IF NOT EXISTS idx_users_active_group
+    ON users(group_name)
+    WHERE is_active = true;
+
+-- ============================================================================
+-- open_interval_minutes(p_start)
+-- Длительность незакрытого интервала: до конца его дня, сегодня — до NOW()
+-- ============================================================================
+CREATE OR REPLACE FUNCTION open_interval_minutes(p_start TIMESTAMPTZ)
+RETURNS NUMERIC AS $$
+    SELECT GREATEST(0, EXTRACT(EPOCH FROM (
+        LEAST(NOW(), date_trunc('day', p_start) + INTERVAL '1 day') - p_start
+    )) / 60)::NUMERIC;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- user_daily_totals(p_start, p_end)
+-- Итоги по пользователю за каждый день периода (включительно).
+-- Период фильтруется в каждом CTE, до агрегации
+-- ============================================================================
+CREATE OR REPLACE FUNCTION user_daily_totals(p_start DATE, p_end DATE)
+RETURNS TABLE (
+    day DATE,
+    email VARCHAR,
+    name VARCHAR,
+    group_name VARCHAR,
+    sessions BIGINT,
+    work_minutes INTEGER,
+    breaks BIGINT,
+    break_minutes INTEGER,
+    violations BIGINT,
+    excess_minutes INTEGER
+) AS $$
+    WITH s AS (
+        SELECT user_id,
+               login_time::date AS day,
+               COUNT(*) AS sessions,
+               COALESCE(SUM(COALESCE(duration_minutes,
+                   open_interval_minutes(login_time))), 0)::INTEGER AS work_minutes
+        FROM work_sessions
+        WHERE login_time >= p_start AND login_time < p_end + 1
+        GROUP BY user_id, login_time::date
+    ),
+    b AS (
+        SELECT user_id,
+               date AS day,
+               COUNT(*) AS breaks,
+               COALESCE(SUM(COALESCE(duration_minutes,
+                   open_interval_minutes(start_time))), 0)::INTEGER AS break_minutes
+        FROM break_log
+        WHERE date BETWEEN p_start AND p_end
+        GROUP BY user_id, date
+    ),
+    v AS (
+        SELECT user_id,
+               date AS day,
+               COUNT(*) AS violations,
+               COALESCE(SUM(excess_minutes), 0)::INTEGER AS excess_minutes
+        FROM violations
+        WHERE date BETWEEN p_start AND p_end
+        GROUP BY user_id, date
+    ),
+    days AS (
+        SELECT user_id, day FROM s
+        UNION
+        SELECT user_id, day FROM b
+        UNION
+        SELECT user_id, day FROM v
+    )
+    SELECT
+        d.day,
+        u.email,
+        u.name,
+        u.group_name,
+        COALESCE(s.sessions, 0),
+        COALESCE(s.work_minutes, 0),
+        COALESCE(b.breaks, 0),
+        COALESCE(b.break_minutes, 0),
+        COALESCE(v.violations, 0),
+        COALESCE(v.excess_minutes, 0)
+    FROM days d
+    JOIN users u ON u.id = d.user_id
+    LEFT JOIN s ON s.user_id = d.user_id AND s.day = d.day
+    LEFT JOIN b ON b.user_id = d.user_id AND b.day = d.day
+    LEFT JOIN v ON v.user_id = d.user_id AND v.day = d.day;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- RPC: get_daily_stats(p_date)
+-- Статистика всех активных пользователей за день (лист DailyStats)
+-- ============================================================================
+CREATE OR REPLACE FUNCTION get_daily_stats(p_date DATE DEFAULT CURRENT_DATE)
+RETURNS TABLE (
+    email VARCHAR,
+    name VARCHAR,
+    group_name VARCHAR,
+    sessions_today BIGINT,
+    work_minutes_today INTEGER,
+    breaks_today BIGINT,
+    break_minutes_today INTEGER,
+    violations_today BIGINT
+) AS $$
+    WITH s AS (
+        SELECT user_id,
+               COUNT(*) AS cnt,
+               SUM(COALESCE(duration_minutes,
+                   open_interval_minutes(login_time)))::INTEGER AS minutes
+        FROM work_sessions
+        WHERE login_time >= p_date AND login_time < p_date + 1
+        GROUP BY user_id
+    ),
+    b AS (
+        SELECT user_id,
+               COUNT(*) AS cnt,
+               SUM(COALESCE(duration_minutes,
+                   open_interval_minutes(start_time)))::INTEGER AS minutes
+        FROM break_log
+        WHERE date = p_date
+        GROUP BY user_id
+    ),
+    v AS (
+        SELECT user_id, COUNT(*) AS cnt
+        FROM violations
+        WHERE date = p_date
+        GROUP BY user_id
+    )
+    SELECT
+        u.email,
+        u.name,
+        u.group_name,
+        COALESCE(s.cnt, 0),
+        COALESCE(s.minutes, 0),
+        COALESCE(b.cnt, 0),
+        COALESCE(b.minutes, 0),
+        COALESCE(v.cnt, 0)
+    FROM users u
+    LEFT JOIN s ON s.user_id = u.id
+    LEFT JOIN b ON b.user_id = u.id
+    LEFT JOIN v ON v.user_id = u.id
+    WHERE u.is_active = true
+    ORDER BY u.name;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- RPC: get_user_daily_totals(p_start, p_end, p_email)
+-- Итоги по дням за период; p_email = NULL -> все пользователи
+-- ============================================================================
+CREATE OR REPLACE FUNCTION get_user_daily_totals(
+    p_start DATE,
+    p_end DATE,
+    p_email VARCHAR DEFAULT NULL
+)
+RETURNS TABLE (
+    day DATE,
+    email VARCHAR,
+    name VARCHAR,
+    group_name VARCHAR,
+    sessions BIGINT,
+    work_minutes INTEGER,
+    breaks BIGINT,
+    break_minutes INTEGER,
+    violations BIGINT,
+    excess_minutes INTEGER
+) AS $$
+    SELECT *
+    FROM user_daily_totals(p_start, p_end) t
+    WHERE p_email IS NULL OR t.email = p_email
+    ORDER BY t.day, t.name;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- RPC: get_group_comparison(p_start, p_end)
+-- Сравнение групп за период
+-- ============================================================================
+CREATE OR REPLACE FUNCTION get_group_comparison(p_start DATE, p_end DATE)
+RETURNS TABLE (
+    group_name VARCHAR,
+    users_count BIGINT,
+    work_minutes BIGINT,
+    break_minutes BIGINT,
+    avg_break_minutes_per_user NUMERIC,
+    violations BIGINT,
+    violations_per_user NUMERIC
+) AS $$
+    WITH per_user AS (
+        SELECT t.email,
+               t.group_name,
+               SUM(t.work_minutes)  AS work_minutes,
+               SUM(t.break_minutes) AS break_minutes,
+               SUM(t.violations)    AS violations
+        FROM user_daily_totals(p_start, p_end) t
+        GROUP BY t.email, t.group_name
+    )
+    SELECT
+        COALESCE(p.group_name, '') AS group_name,
+        COUNT(*) AS users_count,
+        SUM(p.work_minutes)::BIGINT,
+        SUM(p.break_minutes)::BIGINT,
+        ROUND(AVG(p.break_minutes), 1),
+        SUM(p.violations)::BIGINT,
+        ROUND(SUM(p.violations)::NUMERIC / NULLIF(COUNT(*), 0), 2)
+    FROM per_user p
+    GROUP BY COALESCE(p.group_name, '')
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- RPC: get_top_violators(p_start, p_end, p_limit)
+-- Пользователи с наибольшим числом нарушений за период
+-- ============================================================================
+CREATE OR REPLACE FUNCTION get_top_violators(
+    p_start DATE,
+    p_end DATE,
+    p_limit INTEGER DEFAULT 10
+)
+RETURNS TABLE (
+    email VARCHAR,
+    name VARCHAR,
+    group_name VARCHAR,
+    violations BIGINT,
+    excess_minutes BIGINT,
+    last_violation TIMESTAMPTZ
+) AS $$
+    SELECT
+        u.email,
+        u.name,
+        u.group_name,
+        COUNT(*) AS violations,
+        COALESCE(SUM(v.excess_minutes), 0)::BIGINT AS excess_minutes,
+        MAX(v.timestamp) AS last_violation
+    FROM violations v
+    JOIN users u ON u.id = v.user_id
+    WHERE v.date BETWEEN p_start AND p_end
+    GROUP BY u.email, u.name, u.group_name
+    ORDER BY violations DESC, excess_minutes DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- ============================================================================
+-- ДОСТУП ДЛЯ API (anon / authenticated)
+-- ============================================================================
+GRANT EXECUTE ON FUNCTION open_interval_minutes(TIMESTAMPTZ) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION user_daily_totals(DATE, DATE) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_daily_stats(DATE) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_user_daily_totals(DATE, DATE, VARCHAR) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_group_comparison(DATE, DATE) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_top_violators(DATE, DATE, INTEGER) TO anon, authenticated;
+
+-- ============================================================================
+-- ГОТОВО!
+-- ============================================================================
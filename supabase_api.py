@@ -259,6 +259,72 @@ class SupabaseAPI:
         except:
             return []
 
+    # ========================================================================
+    # AGGREGATES (RPC из supabase_aggregates.sql)
+    # ========================================================================
+
+    def _rpc(self, function: str, params: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """
+        Вызвать RPC-функцию, вернуть строки результата
+
+        Ошибку пробрасывает: пустой список означал бы "данных нет",
+        и экспорт перезаписал бы лист одним заголовком.
+        """
+        try:
+            response = self.client.rpc(function, params or {}).execute()
+        except Exception as e:
+            logger.error(f"RPC {function} failed: {e}")
+            raise
+        return response.data or []
+
+    @staticmethod
+    def _iso_date(value: Optional[Any]) -> str:
+        if value is None:
+            return date.today().isoformat()
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()[:10]
+        return str(value)
+
+    def get_daily_stats(self, day: Optional[date] = None) -> List[Dict]:
+        """
+        Статистика активных пользователей за день
+
+        Поля: email, name, group_name, sessions_today, work_minutes_today,
+        breaks_today, break_minutes_today, violations_today
+        """
+        return self._rpc('get_daily_stats', {'p_date': self._iso_date(day)})
+
+    def get_user_daily_totals(self, start: Any, end: Any,
+                              email: Optional[str] = None) -> List[Dict]:
+        """
+        Итоги по пользователю за каждый день периода
+
+        Args:
+            start: Начало периода (date или 'YYYY-MM-DD')
+            end: Конец периода включительно
+            email: Только этот пользователь (None = все)
+        """
+        return self._rpc('get_user_daily_totals', {
+            'p_start': self._iso_date(start),
+            'p_end': self._iso_date(end),
+            'p_email': email,
+        })
+
+    def get_group_comparison(self, start: Any, end: Any) -> List[Dict]:
+        """Сравнение групп за период (работа, перерывы, нарушения)"""
+        return self._rpc('get_group_comparison', {
+            'p_start': self._iso_date(start),
+            'p_end': self._iso_date(end),
+        })
+
+    def get_top_violators(self, start: Any, end: Any, limit: int = 10) -> List[Dict]:
+        """Пользователи с наибольшим числом нарушений за период"""
+        return self._rpc('get_top_violators', {
+            'p_start': self._iso_date(start),
+            'p_end': self._iso_date(end),
+            'p_limit': int(limit),
+        })
+
 
 # ============================================================================
 # SINGLETON
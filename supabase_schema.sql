@@ -335,6 +335,9 @@ WHERE u.is_active = true
 GROUP BY u.email, u.name
 ORDER BY u.name;
 
+-- Агрегаты для дашбордов и экспорта (RPC get_daily_stats и др.)
+-- вынесены в supabase_aggregates.sql
+
 -- ============================================================================
 -- ROW LEVEL SECURITY (RLS)
 -- Включаем для безопасности
@@ -0,0 +1,678 @@
+
+# sync/gateway.py
+"""
+Шлюз синхронизации для локальной сети
+
+Каждый клиент синхронизируется сам: на пакет — чтение Users (группа) и append
+в WorkLog_*, плюс опрос ActiveSessions каждые 10 секунд. Сотня клиентов на
+одном сервисном аккаунте упирается в квоту 60 запросов/мин и получает 429.
+Шлюз — один процесс в офисе, который пишет за всех:
+- клиенты присылают пакеты по TCP и ждут подтверждения;
+- строки всех клиентов за окно SYNC_GATEWAY_FLUSH_MS сливаются в один append
+  на лист WorkLog_<группа> (до 50 строк на запрос), сессии — в один append
+  и один batchUpdate ActiveSessions;
+- повторно присланные строки (клиент не дождался ответа и прислал снова)
+  отбрасываются по ключу содержимого;
+- все запросы к Sheets проходят через общий AIMD-бюджет: пока шлюз ждёт
+  слот, пакеты копятся и следующий запрос уносит больше строк;
+- группы берутся из снимка Users, статусы сессий — из снимка ActiveSessions.
+
+Протокол: по строке JSON (UTF-8, '\\n') на запрос и на ответ.
+    {"op": "log_actions", "actions": [...], "email": ..., "user_group": ...}
+        -> {"ok": true, "ids": [...]}   id действий, которые есть в листе
+    {"op": "session_start", "email", "name", "session_id", "login_time"} -> {"ok": true}
+    {"op": "session_finish", "email", "session_id", "logout_time", "reason"}
+        -> {"ok": true, "finished": true}
+    {"op": "session_status", "email", "session_id"} -> {"ok": true, "status": "active"}
+    {"op": "active_sessions"} -> {"ok": true, "sessions": [...]}   снимок ActiveSessions
+    {"op": "ping"} -> {"ok": true, "stats": {...}}
+Если задан SYNC_GATEWAY_TOKEN, каждый запрос несёт "token". Без токена шлюз
+слушает только loopback и принимает запросы только с loopback: active_sessions
+отдаёт session_id всех пользователей, а с ними можно завершить чужую сессию.
+
+Запуск: SYNC_GATEWAY_TOKEN=... wtt-gateway [--listen 0.0.0.0:43340];
+клиенты — sync.gateway_client.
+"""
+from __future__ import annotations
+
+import argparse
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from shared.metrics import get_metrics_registry, families_from_dict
+from shared.resilience.retry_scheduler import AIMDLimiter, classify_error
+from sheets_api import group_by_email_prefix, session_status_in
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import (
+        SYNC_GATEWAY_LISTEN, SYNC_GATEWAY_TOKEN, SYNC_GATEWAY_FLUSH_MS,
+        SYNC_GATEWAY_WRITES_PER_MIN, SYNC_GATEWAY_TIMEOUT_SEC,
+        SYNC_GATEWAY_SESSIONS_TTL_SEC, SYNC_GATEWAY_USERS_TTL_SEC,
+    )
+except Exception:
+    SYNC_GATEWAY_LISTEN = "127.0.0.1:43340"
+    SYNC_GATEWAY_TOKEN = ""
+    SYNC_GATEWAY_FLUSH_MS = 500
+    SYNC_GATEWAY_WRITES_PER_MIN = 50
+    SYNC_GATEWAY_TIMEOUT_SEC = 30
+    SYNC_GATEWAY_SESSIONS_TTL_SEC = 10
+    SYNC_GATEWAY_USERS_TTL_SEC = 300
+
+try:
+    from config import GOOGLE_API_LIMITS
+    MAX_ROWS_PER_REQUEST = int(GOOGLE_API_LIMITS.get('max_rows_per_request', 50))
+except Exception:
+    MAX_ROWS_PER_REQUEST = 50
+
+MAX_LINE_BYTES = 8 * 1024 * 1024   # один запрос; больше — разрыв соединения
+DEDUP_WINDOW = 200_000             # ключей уже записанных строк/сессий
+
+# Поля действия, которые попадают в строку WorkLog (см. SheetsAPI.log_user_actions)
+_ROW_FIELDS = ("email", "name", "status", "action_type", "comment", "timestamp",
+               "session_id", "status_start_time", "status_end_time", "reason")
+
+
+def parse_address(value: str, default_port: int = 43340) -> Tuple[str, int]:
+    """'host:port' -> (host, port); без порта — default_port"""
+    value = (value or "").strip()
+    if ":" not in value:
+        return value or "127.0.0.1", default_port
+    host, _, port = value.rpartition(":")
+    return host.strip("[]") or "127.0.0.1", int(port)
+
+
+def is_loopback(host: str) -> bool:
+    """Адрес только для этой машины (127.0.0.0/8, ::1, localhost)"""
+    host = (host or "").strip("[]")
+    if host.lower() == "localhost":
+        return True
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    mapped = getattr(ip, "ipv4_mapped", None)
+    return (mapped or ip).is_loopback
+
+
+def _row_key(action: Dict[str, Any]) -> tuple:
+    """Ключ строки WorkLog: одинаковые строки от разных отправок — дубль"""
+    email = str(action.get("email") or "").strip().lower()
+    return (email,) + tuple(str(action.get(f) or "") for f in _ROW_FIELDS[1:])
+
+
+@dataclass
+class _Ticket:
+    """Заявка клиента: ждёт, пока её строки окажутся в листе"""
+    items: List[Dict[str, Any]]
+    done: threading.Event = field(default_factory=threading.Event)
+    ids: List[Any] = field(default_factory=list)
+    results: List[bool] = field(default_factory=list)
+    failed: bool = False
+
+
+@dataclass
+class _Row:
+    action: Dict[str, Any]
+    group: str
+    waiters: List[Tuple[_Ticket, Any]]
+
+
+class SyncGateway:
+    """
+    Единственный писатель WorkLog/ActiveSessions для клиентов локальной сети.
+
+    Args:
+        sheets: SheetsAPI (или совместимый бэкенд), через который идут все записи
+        flush_interval: Окно накопления пакета, секунды
+        writes_per_minute: Общий бюджет запросов к Sheets
+        request_timeout: Сколько заявка ждёт записи, прежде чем клиент получит отказ
+        sessions_ttl: Возраст снимка ActiveSessions для session_status
+        users_ttl: Возраст снимка Users для групп
+        token: Общий секрет клиентов (пусто — только loopback)
+    """
+
+    def __init__(
+        self,
+        sheets,
+        flush_interval: float = SYNC_GATEWAY_FLUSH_MS / 1000.0,
+        writes_per_minute: float = SYNC_GATEWAY_WRITES_PER_MIN,
+        request_timeout: float = max(1, SYNC_GATEWAY_TIMEOUT_SEC - 5),
+        sessions_ttl: float = SYNC_GATEWAY_SESSIONS_TTL_SEC,
+        users_ttl: float = SYNC_GATEWAY_USERS_TTL_SEC,
+        max_rows: int = MAX_ROWS_PER_REQUEST,
+        token: str = SYNC_GATEWAY_TOKEN,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sheets = sheets
+        self.flush_interval = flush_interval
+        self.request_timeout = request_timeout
+        self.sessions_ttl = sessions_ttl
+        self.users_ttl = users_ttl
+        self.max_rows = max(1, int(max_rows))
+        self.token = token or ""
+        self.clock = clock
+        # Поток записи плюс обновление снимков из потоков клиентов
+        self.budget = AIMDLimiter("sync-gateway", rate_per_minute=writes_per_minute,
+                                  min_rate_per_minute=min(6.0, writes_per_minute), max_concurrency=2)
+
+        self._cv = threading.Condition()
+        self._rows: List[_Ticket] = []
+        self._starts: List[_Ticket] = []
+        self._finishes: List[_Ticket] = []
+        self._pending_rows = 0
+        self._first_pending_at: Optional[float] = None
+        self._written: "OrderedDict[tuple, None]" = OrderedDict()
+
+        self._groups: Dict[str, str] = {}
+        self._groups_at: Optional[float] = None
+        self._users_lock = threading.Lock()
+        self._sessions: Optional[List[Dict[str, str]]] = None
+        self._sessions_at: Optional[float] = None
+        self._sessions_lock = threading.Lock()
+
+        self.stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server: Optional[socketserver.ThreadingTCPServer] = None
+        self._server_thread: Optional[threading.Thread] = None
+        self.stats = {
+            'requests': 0, 'connections': 0, 'rows_in': 0, 'rows_written': 0,
+            'rows_deduped': 0, 'sessions_started': 0, 'sessions_finished': 0,
+            'sheet_requests': 0, 'sheet_errors': 0, 'flushes': 0, 'timeouts': 0,
+            'status_reads': 0, 'status_refreshes': 0, 'pending_rows': 0,
+        }
+        self._stats_lock = threading.Lock()
+        get_metrics_registry().register_collector("sync_gateway", self._collect_metrics)
+
+    # ------------------------------------------------------------------
+    # Операции (вызываются из потоков соединений)
+    # ------------------------------------------------------------------
+
+    def log_actions(self, actions: List[Dict[str, Any]], email: Optional[str] = None,
+                    user_group: Optional[str] = None) -> Tuple[bool, List[Any]]:
+        """Поставить строки WorkLog в очередь и дождаться записи: (все записаны, id записанных)"""
+        items = []
+        for a in actions or ():
+            if not isinstance(a, dict):
+                continue
+            if email and not a.get("email"):
+                a = dict(a, email=email)
+            if user_group and not a.get("user_group"):
+                a = dict(a, user_group=user_group)
+            items.append(a)
+        if not items:
+            return True, []
+        ticket = _Ticket(items)
+        self._count('rows_in', len(items))
+        self._submit(self._rows, ticket, len(items))
+        if not self._wait(ticket):
+            return False, []
+        return not ticket.failed, ticket.ids
+
+    def set_active_session(self, email: str, name: str, session_id: str,
+                           login_time: Optional[str] = None) -> bool:
+        ticket = _Ticket([{"email": email, "name": name, "session_id": session_id, "login_time": login_time}])
+        self._submit(self._starts, ticket, 1)
+        return self._wait(ticket) and not ticket.failed
+
+    def finish_active_session(self, email: str, session_id: str, logout_time: Optional[str] = None,
+                              reason: str = "user_exit") -> bool:
+        ticket = _Ticket([{"email": email, "session_id": session_id,
+                           "logout_time": logout_time, "reason": reason or "user_exit"}])
+        self._submit(self._finishes, ticket, 1)
+        if not self._wait(ticket) or ticket.failed:
+            raise RuntimeError("ActiveSessions update failed")
+        return bool(ticket.results and ticket.results[0])
+
+    def check_user_session_status(self, email: str, session_id: str) -> str:
+        """Статус сессии по снимку ActiveSessions (не старше sessions_ttl)"""
+        self._count('status_reads')
+        return session_status_in(self._sessions_table(), email, session_id)
+    
+    def get_all_active_sessions(self) -> List[Dict[str, str]]:
+        self._count('status_reads')
+        return self._sessions_table()
+
+    def _submit(self, queue: List[_Ticket], ticket: _Ticket, rows: int):
+        with self._cv:
+            if self.stop_event.is_set():
+                raise RuntimeError("Gateway is stopping")
+            queue.append(ticket)
+            self._pending_rows += rows
+            if self._first_pending_at is None:
+                self._first_pending_at = self.clock()
+            self._cv.notify_all()
+
+    def _wait(self, ticket: _Ticket) -> bool:
+        if ticket.done.wait(self.request_timeout):
+            return True
+        self._count('timeouts')
+        return False
+
+    # ------------------------------------------------------------------
+    # Снимки Users / ActiveSessions
+    # ------------------------------------------------------------------
+
+    def _group_for(self, action: Dict[str, Any]) -> str:
+        """Группа как у прямой синхронизации: Users.Group, затем клиентская, затем по префиксу"""
+        email = str(action.get("email") or "").strip().lower()
+        group = self._user_groups().get(email) or str(action.get("user_group") or "").strip()
+        return group or group_by_email_prefix(email)
+
+    def _user_groups(self) -> Dict[str, str]:
+        with self._users_lock:
+            if self._groups_at is None or self.clock() - self._groups_at >= self.users_ttl:
+                try:
+                    users = self._call(self.sheets.get_users) or []
+                    self._groups = {
+                        (u.get("Email", "") or "").strip().lower(): (u.get("Group", "") or "").strip()
+                        for u in users
+                    }
+                except Exception as e:
+                    logger.warning("Gateway: Users refresh failed, using previous snapshot: %s", e)
+                self._groups_at = self.clock()
+            return self._groups
+
+    def _sessions_table(self) -> List[Dict[str, str]]:
+        # Один поток перечитывает лист, остальные ждут его результат
+        with self._sessions_lock:
+            if self._sessions is None or self._sessions_at is None \
+                    or self.clock() - self._sessions_at >= self.sessions_ttl:
+                self._sessions = self._call(self.sheets.get_all_active_sessions) or []
+                self._sessions_at = self.clock()
+                self._count('status_refreshes')
+            return self._sessions
+
+    def _invalidate_sessions(self):
+        with self._sessions_lock:
+            self._sessions_at = None
+
+    # ------------------------------------------------------------------
+    # Запись
+    # ------------------------------------------------------------------
+
+    def _acquire(self):
+        while True:
+            wait = self.budget.try_acquire(time.monotonic())
+            if wait == 0.0:
+                return
+            if self.stop_event.wait(0.05 if wait is None else wait):
+                raise RuntimeError("Gateway is stopping")
+    
+    def _call(self, func, *args, cost: int = 1, **kwargs):
+        """
+        Запрос к Sheets в пределах общего бюджета.
+        cost — сколько запросов делает func: они идут подряд, поэтому
+        темп расходуется на cost слотов, а параллельность — на один.
+        """
+        for _ in range(cost - 1):
+            self._acquire()
+            self.budget.release(True)
+        self._acquire()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.budget.release(False, classify_error(e))
+            self._count('sheet_errors')
+            raise
+        self.budget.release(True)
+        self._count('sheet_requests', cost)
+        return result
+
+    def flush(self) -> int:
+        """Записать всё накопленное сейчас; возвращает число заявок"""
+        with self._cv:
+            starts, finishes, rows = self._starts, self._finishes, self._rows
+            self._starts, self._finishes, self._rows = [], [], []
+            self._pending_rows = 0
+            self._first_pending_at = None
+        tickets = starts + finishes + rows
+        if not tickets:
+            return 0
+        try:
+            # Порядок важен: сессия, начатая и завершённая в одном окне, должна сначала появиться
+            self._flush_starts(starts)
+            self._flush_finishes(finishes)
+            self._flush_rows(rows)
+        except Exception:
+            logger.exception("Gateway flush failed")
+            for t in tickets:
+                if not t.done.is_set():
+                    t.failed = True
+        finally:
+            for t in tickets:
+                t.done.set()
+        self._count('flushes')
+        return len(tickets)
+
+    def _remember(self, key: tuple):
+        self._written[key] = None
+        self._written.move_to_end(key)
+        while len(self._written) > DEDUP_WINDOW:
+            self._written.popitem(last=False)
+
+    def _flush_rows(self, tickets: List[_Ticket]):
+        if not tickets:
+            return
+        pending: "OrderedDict[tuple, _Row]" = OrderedDict()
+        deduped = 0
+        for t in tickets:
+            for a in t.items:
+                key = _row_key(a)
+                if key in self._written:
+                    deduped += 1
+                    if a.get("id") is not None:
+                        t.ids.append(a["id"])
+                    continue
+                row = pending.get(key)
+                if row is not None:
+                    deduped += 1
+                    row.waiters.append((t, a.get("id")))
+                    continue
+                pending[key] = _Row(a, "", [(t, a.get("id"))])
+        self._count('rows_deduped', deduped)
+
+        by_group: Dict[str, List[Tuple[tuple, _Row]]] = {}
+        for key, row in pending.items():
+            row.group = self._group_for(row.action)
+            by_group.setdefault(row.group, []).append((key, row))
+
+        for group, rows in by_group.items():
+            for i in range(0, len(rows), self.max_rows):
+                chunk = rows[i:i + self.max_rows]
+                payload = [{f: r.action.get(f) for f in _ROW_FIELDS} for _, r in chunk]
+                try:
+                    ok = self._call(self.sheets.log_user_actions, payload, payload[0]["email"], user_group=group)
+                except Exception as e:
+                    logger.warning("Gateway: WorkLog_%s append failed (%d rows): %s", group, len(chunk), e)
+                    ok = False
+                for key, row in chunk:
+                    if ok:
+                        self._remember(key)
+                    for t, action_id in row.waiters:
+                        if not ok:
+                            t.failed = True
+                        elif action_id is not None:
+                            t.ids.append(action_id)
+                if ok:
+                    self._count('rows_written', len(chunk))
+
+    def _flush_starts(self, tickets: List[_Ticket]):
+        fresh: "OrderedDict[tuple, List[_Ticket]]" = OrderedDict()
+        for t in tickets:
+            s = t.items[0]
+            key = ("session", str(s.get("email") or "").strip().lower(), str(s.get("session_id") or ""))
+            if key not in self._written:
+                fresh.setdefault(key, []).append(t)
+        keys = list(fresh)
+        batch_set = getattr(self.sheets, "set_active_sessions", None)
+        for i in range(0, len(keys), self.max_rows):
+            chunk = keys[i:i + self.max_rows]
+            sessions = [fresh[k][0].items[0] for k in chunk]
+            try:
+                if batch_set is not None:
+                    ok = self._call(batch_set, sessions)
+                else:
+                    ok = all([self._call(self.sheets.set_active_session, s["email"], s["name"],
+                                         s["session_id"], s["login_time"]) for s in sessions])
+            except Exception as e:
+                logger.warning("Gateway: ActiveSessions append failed (%d rows): %s", len(chunk), e)
+                ok = False
+            for k in chunk:
+                if ok:
+                    self._remember(k)
+                for t in fresh[k]:
+                    t.failed = t.failed or not ok
+            if ok:
+                self._count('sessions_started', len(chunk))
+        if keys:
+            self._invalidate_sessions()
+
+    def _flush_finishes(self, tickets: List[_Ticket]):
+        if not tickets:
+            return
+        items = [t.items[0] for t in tickets]
+        batch_finish = getattr(self.sheets, "finish_active_sessions", None)
+        try:
+            if batch_finish is not None:
+                # Одно чтение листа и один batchUpdate
+                results = list(self._call(batch_finish, items, cost=2))
+            else:
+                results = [bool(self._call(self.sheets.finish_active_session, s["email"], s["session_id"],
+                                           s.get("logout_time"), s.get("reason") or "user_exit", cost=3))
+                           for s in items]
+        except Exception as e:
+            logger.warning("Gateway: ActiveSessions finish failed (%d sessions): %s", len(items), e)
+            for t in tickets:
+                t.failed = True
+            return
+        for t, ok in zip(tickets, results):
+            t.results.append(bool(ok))
+        self._count('sessions_finished', sum(1 for ok in results if ok))
+        self._invalidate_sessions()
+
+    # ------------------------------------------------------------------
+    # Поток записи и TCP-сервер
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            with self._cv:
+                while self._first_pending_at is None and not self.stop_event.is_set():
+                    self._cv.wait(1.0)
+                # Копим окно от первой заявки или до полного запроса
+                while not self.stop_event.is_set() and self._pending_rows < self.max_rows:
+                    left = self._first_pending_at + self.flush_interval - self.clock()
+                    if left <= 0:
+                        break
+                    self._cv.wait(left)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Gateway writer loop failed")
+        self.flush()
+
+    def start(self, listen: str = SYNC_GATEWAY_LISTEN) -> Tuple[str, int]:
+        """
+        Поднять поток записи и TCP-сервер; возвращает фактический адрес
+
+        Raises:
+            ValueError: Адрес не loopback, а токен не задан
+        """
+        if self._server is None and not self.token and not is_loopback(parse_address(listen)[0]):
+            raise ValueError(f"gateway refuses to listen on {listen} without SYNC_GATEWAY_TOKEN")
+        if self._thread is None or not self._thread.is_alive():
+            self.stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="SyncGatewayWriter", daemon=True)
+            self._thread.start()
+        if self._server is None:
+            host, port = parse_address(listen)
+            self._server = _Server((host, port), _Handler)
+            self._server.gateway = self
+            self._server_thread = threading.Thread(target=self._server.serve_forever,
+                                                   name="SyncGatewayServer", daemon=True)
+            self._server_thread.start()
+            logger.info("Sync gateway listening on %s:%s", *self.address)
+        return self.address
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2] if self._server else ("", 0)
+
+    def stop(self):
+        """Перестать принимать соединения, дописать накопленное, закрыть клиентов"""
+        server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+        with self._cv:
+            self.stop_event.set()
+            self._cv.notify_all()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        if server is not None:
+            # Клиенты увидят разрыв и перейдут на прямую запись
+            server.close_connections()
+            server.server_close()
+
+    # ------------------------------------------------------------------
+    # Запросы клиентов
+    # ------------------------------------------------------------------
+
+    def handle_request(self, req: Dict[str, Any], peer: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Выполнить запрос клиента
+
+        Args:
+            req: Запрос протокола
+            peer: IP клиента (None — вызов из процесса шлюза)
+        """
+        self._count('requests')
+        if self.token:
+            if not hmac.compare_digest(str(req.get("token") or ""), self.token):
+                return {"ok": False, "error": "unauthorized"}
+        elif peer is not None and not is_loopback(peer):
+            return {"ok": False, "error": "unauthorized"}
+        op = req.get("op")
+        if op == "log_actions":
+            ok, ids = self.log_actions(req.get("actions") or [], req.get("email"), req.get("user_group"))
+            return {"ok": ok, "ids": ids}
+        if op == "session_start":
+            return {"ok": self.set_active_session(req.get("email", ""), req.get("name", ""),
+                                                  req.get("session_id", ""), req.get("login_time"))}
+        if op == "session_finish":
+            finished = self.finish_active_session(req.get("email", ""), req.get("session_id", ""),
+                                                  req.get("logout_time"), req.get("reason") or "user_exit")
+            return {"ok": True, "finished": finished}
+        if op == "session_status":
+            return {"ok": True, "status": self.check_user_session_status(req.get("email", ""),
+                                                                         req.get("session_id", ""))}
+        if op == "active_sessions":
+            return {"ok": True, "sessions": self.get_all_active_sessions()}
+        if op == "ping":
+            return {"ok": True, "stats": self.snapshot()}
+        return {"ok": False, "error": f"unknown op: {op!r}"}
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['pending_rows'] = self._pending_rows
+        stats['budget'] = self.budget.snapshot()
+        return stats
+
+    def _collect_metrics(self):
+        return families_from_dict("wtt_gateway", self.snapshot(), counters=(
+            'requests', 'connections', 'rows_in', 'rows_written', 'rows_deduped',
+            'sessions_started', 'sessions_finished', 'sheet_requests', 'sheet_errors',
+            'flushes', 'timeouts', 'status_reads', 'status_refreshes',
+        ))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+    gateway: SyncGateway
+    
+    def __init__(self, *args, **kwargs):
+        self.connections = set()
+        self.connections_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+    
+    def close_connections(self):
+        with self.connections_lock:
+            conns, self.connections = list(self.connections), set()
+        for conn in conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Соединение клиента: запросы идут по одному, ответ — сразу после записи"""
+
+    def setup(self):
+        super().setup()
+        with self.server.connections_lock:
+            self.server.connections.add(self.connection)
+    
+    def finish(self):
+        with self.server.connections_lock:
+            self.server.connections.discard(self.connection)
+        try:
+            super().finish()
+        except OSError:
+            pass
+    
+    def handle(self):
+        gateway: SyncGateway = self.server.gateway
+        gateway._count('connections')
+        while not gateway.stop_event.is_set():
+            try:
+                line = self.rfile.readline(MAX_LINE_BYTES + 1)
+            except OSError:
+                return
+            if not line:
+                return
+            if len(line) > MAX_LINE_BYTES:
+                logger.warning("Gateway: request from %s is too large, closing", self.client_address)
+                return
+            if not line.strip():
+                continue
+            try:
+                req = json.loads(line)
+                resp = gateway.handle_request(req, peer=self.client_address[0]) if isinstance(req, dict) else \
+                    {"ok": False, "error": "bad request"}
+            except Exception as e:
+                logger.warning("Gateway: request from %s failed: %s", self.client_address, e)
+                resp = {"ok": False, "error": str(e)}
+            try:
+                self.wfile.write((json.dumps(resp, ensure_ascii=False, default=str) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            except OSError:
+                return
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Шлюз синхронизации WorkLog/ActiveSessions для локальной сети")
+    parser.add_argument("--listen", default=SYNC_GATEWAY_LISTEN, help="host:port (по умолчанию SYNC_GATEWAY_LISTEN)")
+    args = parser.parse_args(argv)
+
+    from config import LOG_DIR
+    from logging_setup import setup_logging
+    from api_adapter import get_sheets_api
+    setup_logging(app_name="wtt-gateway", log_dir=LOG_DIR)
+    if not SYNC_GATEWAY_TOKEN and not is_loopback(parse_address(args.listen)[0]):
+        logger.error("Gateway: set SYNC_GATEWAY_TOKEN to listen on %s (without it only loopback)", args.listen)
+        return 2
+
+    gateway = SyncGateway(get_sheets_api())
+    gateway.start(args.listen)
+    try:
+        while True:
+            time.sleep(60)
+            logger.info("Gateway stats: %s", gateway.snapshot())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+
+# sync/gateway_client.py
+"""
+Клиент шлюза синхронизации (sync.gateway)
+
+Если задан SYNC_GATEWAY_ADDR, записи WorkLog/ActiveSessions и опрос статуса
+сессии идут через шлюз; шлюз не отвечает — тем же вызовом напрямую в Sheets,
+и следующие SYNC_GATEWAY_RETRY_SEC секунд шлюз не трогаем.
+
+Использование:
+    from sync.gateway_client import get_routed_api
+    api = get_routed_api(get_sheets_api())   # без шлюза — тот же объект
+    api.log_user_actions([action], email, user_group=group)
+"""
+from __future__ import annotations
+
+import json
+import logging
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sync.gateway import parse_address
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config import SYNC_GATEWAY_ADDR, SYNC_GATEWAY_TOKEN, SYNC_GATEWAY_TIMEOUT_SEC, SYNC_GATEWAY_RETRY_SEC
+except Exception:
+    SYNC_GATEWAY_ADDR = ""
+    SYNC_GATEWAY_TOKEN = ""
+    SYNC_GATEWAY_TIMEOUT_SEC = 30
+    SYNC_GATEWAY_RETRY_SEC = 30
+
+
+class GatewayUnavailable(Exception):
+    """Шлюз не ответил — вызывающий пишет в Sheets сам"""
+
+
+class GatewayClient:
+    """
+    Соединение с шлюзом: один запрос за раз, соединение переиспользуется.
+
+    Args:
+        host, port: Адрес шлюза
+        token: Общий секрет (SYNC_GATEWAY_TOKEN)
+        timeout: Ожидание ответа, секунды (шлюз отвечает после записи в лист)
+        retry_after: После отказа шлюза столько секунд сразу GatewayUnavailable
+    """
+
+    def __init__(self, host: str, port: int, token: str = "", timeout: float = SYNC_GATEWAY_TIMEOUT_SEC,
+                 retry_after: float = SYNC_GATEWAY_RETRY_SEC):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _close(self):
+        for obj in (self._file, self._sock):
+            try:
+                if obj is not None:
+                    obj.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.available:
+            raise GatewayUnavailable(f"gateway {self.host}:{self.port} is marked down")
+        if self.token:
+            payload = dict(payload, token=self.token)
+        line = (json.dumps(payload, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            # Второй заход — только если шлюз закрыл старое соединение (перезапуск);
+            # повтор после таймаута не делаем: ответ мог быть в пути, а ждать дважды долго
+            for attempt in range(2):
+                reused = self._sock is not None
+                try:
+                    if self._sock is None:
+                        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                        self._file = self._sock.makefile("rwb")
+                    self._file.write(line)
+                    self._file.flush()
+                    resp = self._file.readline()
+                    if not resp:
+                        raise ConnectionError("gateway closed the connection")
+                    return json.loads(resp)
+                except (OSError, ValueError) as e:
+                    self._close()
+                    if reused and attempt == 0 and not isinstance(e, socket.timeout):
+                        continue
+                    self._down_until = time.monotonic() + self.retry_after
+                    logger.warning("Sync gateway %s:%s unavailable (%s), direct sync for %ss",
+                                   self.host, self.port, e, self.retry_after)
+                    raise GatewayUnavailable(str(e)) from e
+
+    # ---- операции ----
+
+    def log_actions(self, actions: List[Dict[str, Any]], email: Optional[str] = None,
+                    user_group: Optional[str] = None) -> Tuple[bool, List[Any]]:
+        """Строки WorkLog: (все записаны, id записанных действий)"""
+        resp = self.request({"op": "log_actions", "actions": actions, "email": email, "user_group": user_group})
+        if not resp.get("ok") and resp.get("error"):
+            logger.warning("Sync gateway rejected actions: %s", resp["error"])
+        return bool(resp.get("ok")), list(resp.get("ids") or [])
+
+    def set_active_session(self, email: str, name: str, session_id: str, login_time: Optional[str] = None) -> bool:
+        return bool(self.request({"op": "session_start", "email": email, "name": name,
+                                  "session_id": session_id, "login_time": login_time}).get("ok"))
+
+    def finish_active_session(self, email: str, session_id: str, logout_time: Optional[str] = None,
+                              reason: str = "user_exit") -> bool:
+        resp = self.request({"op": "session_finish", "email": email, "session_id": session_id,
+                             "logout_time": logout_time, "reason": reason})
+        return bool(resp.get("ok") and resp.get("finished"))
+
+    def check_user_session_status(self, email: str, session_id: str) -> str:
+        resp = self.request({"op": "session_status", "email": email, "session_id": session_id})
+        return str(resp.get("status") or "unknown") if resp.get("ok") else "unknown"
+    
+    def get_all_active_sessions(self) -> List[Dict[str, str]]:
+        resp = self.request({"op": "active_sessions"})
+        if not resp.get("ok"):
+            raise RuntimeError(f"Sync gateway: {resp.get('error') or 'ActiveSessions unavailable'}")
+        return list(resp.get("sessions") or [])
+
+
+class GatewayRoutedAPI:
+    """
+    SheetsAPI, у которого записи WorkLog/ActiveSessions и чтение ActiveSessions
+    идут через шлюз; всё остальное и фолбэк при недоступном шлюзе — напрямую.
+    """
+
+    def __init__(self, direct, gateway: GatewayClient):
+        self._direct = direct
+        self._gateway = gateway
+
+    def __getattr__(self, name):
+        return getattr(self._direct, name)
+
+    def log_user_actions(self, actions: List[Dict[str, Any]], email: str, user_group: Optional[str] = None) -> bool:
+        try:
+            ok, _ = self._gateway.log_actions(actions, email=email, user_group=user_group)
+            return ok
+        except GatewayUnavailable:
+            return self._direct.log_user_actions(actions, email, user_group=user_group)
+
+    def set_active_session(self, email: str, name: str, session_id: str, login_time: Optional[str] = None) -> bool:
+        try:
+            return self._gateway.set_active_session(email, name, session_id, login_time)
+        except GatewayUnavailable:
+            return self._direct.set_active_session(email, name, session_id, login_time)
+
+    def finish_active_session(self, email: str, session_id: str, logout_time: Optional[str] = None,
+                              reason: str = "user_exit") -> bool:
+        try:
+            return self._gateway.finish_active_session(email, session_id, logout_time, reason)
+        except GatewayUnavailable:
+            return self._direct.finish_active_session(email, session_id, logout_time, reason)
+
+    def check_user_session_status(self, email: str, session_id: str) -> str:
+        try:
+            return self._gateway.check_user_session_status(email, session_id)
+        except GatewayUnavailable:
+            return self._direct.check_user_session_status(email, session_id)
+    
+    def get_all_active_sessions(self) -> List[Dict[str, str]]:
+        try:
+            return self._gateway.get_all_active_sessions()
+        except GatewayUnavailable:
+            return self._direct.get_all_active_sessions()
+
+
+_client: Optional[GatewayClient] = None
+_client_lock = threading.Lock()
+
+
+def get_gateway_client() -> Optional[GatewayClient]:
+    """Клиент шлюза из SYNC_GATEWAY_ADDR или None, если шлюз не настроен"""
+    global _client
+    if not SYNC_GATEWAY_ADDR:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                host, port = parse_address(SYNC_GATEWAY_ADDR)
+                _client = GatewayClient(host, port, token=SYNC_GATEWAY_TOKEN)
+                logger.info("Sync gateway: %s:%s", host, port)
+    return _client
+
+
+def get_routed_api(direct):
+    """direct, обёрнутый в GatewayRoutedAPI, если шлюз настроен"""
+    gateway = get_gateway_client()
+    return GatewayRoutedAPI(direct, gateway) if gateway is not None else direct
@@ -3,6 +3,9 @@
 import urllib.request
 import socket
 import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -56,26 +59,279 @@ def is_internet_available(timeout: int = 3) -> bool:
         return False
 
 
+class ReachabilityMonitor:
+    """
+    Закэшированное состояние сети (online/offline).
+
+    Состояние обновляют:
+    - фоновый пробник: TCP connect к host:port с таймаутом на сокет
+      (глобальный socket.setdefaulttimeout не трогаем). Интервал между
+      пробами растёт экспоненциально (min_interval → max_interval), пока
+      состояние не меняется, и сбрасывается к min_interval при смене;
+    - пассивные сигналы от API: report_success() — ответ получен, сеть есть;
+      report_failure() — сетевая ошибка, состояние SUSPECT и внеочередная проба.
+
+    is_online() только читает флаг — горячие пути не ждут DNS.
+    Проба — прямой TCP connect; за HTTPS-прокси или файрволом она не проходит
+    никогда, хотя API доступен. Поэтому OFFLINE не закрывает API насовсем:
+    allow_request() раз в trial_interval пропускает пробный запрос, и его
+    успех (report_success) возвращает ONLINE.
+    """
+
+    ONLINE = "online"
+    OFFLINE = "offline"
+    SUSPECT = "suspect"
+    UNKNOWN = "unknown"
+
+    def __init__(
+        self,
+        host: str = "sheets.googleapis.com",
+        port: int = 443,
+        probe_timeout: float = 3.0,
+        min_interval: float = 2.0,
+        max_interval: float = 60.0,
+        probe: Optional[Callable[[], bool]] = None,
+        trial_interval: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.probe_timeout = probe_timeout
+        self.min_interval = max(0.01, float(min_interval))
+        self.max_interval = max(self.min_interval, float(max_interval))
+        self._probe_func = probe or self._tcp_probe
+        self.trial_interval = max(0.0, float(trial_interval))
+        self._next_trial = 0.0
+
+        self._state = self.UNKNOWN
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._interval = self.min_interval
+        self._next_probe = 0.0
+        self._listeners: List[Callable[[str, str], None]] = []
+
+        self.stats = {
+            'probes': 0,
+            'probe_failures': 0,
+            'passive_success': 0,
+            'passive_failures': 0,
+            'transitions': 0,
+            'trial_requests': 0,
+            'last_probe_ms': None,
+            'last_change': None,
+        }
+
+    # ---------- чтение состояния ----------
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def is_online(self, wait: float = 0.0) -> bool:
+        """
+        Есть ли сеть (по последнему известному состоянию).
+
+        SUSPECT считается online, пока проба не подтвердит обрыв. До первой
+        пробы ждём не дольше wait секунд, затем считаем сеть доступной:
+        первый же ответ API уточнит состояние.
+        """
+        if self._state == self.UNKNOWN and wait > 0:
+            self.start()
+            self._ready.wait(wait)
+        return self._state != self.OFFLINE
+
+    def trial_due(self) -> bool:
+        """OFFLINE, и пора пробный запрос (allow_request его пропустит)"""
+        return self._state == self.OFFLINE and time.monotonic() >= self._next_trial
+
+    def allow_request(self) -> bool:
+        """
+        Пропустить ли запрос к API.
+
+        Вне OFFLINE — всегда. В OFFLINE — один пробный запрос раз в
+        trial_interval: проба могла не пройти из-за прокси, а API отвечает.
+        """
+        if self._state != self.OFFLINE:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_trial:
+                return False
+            self._next_trial = now + self.trial_interval
+            self.stats['trial_requests'] += 1
+        logger.debug("Reachability: offline по пробе, пропускаем пробный запрос к API")
+        return True
+
+    # ---------- пассивные сигналы ----------
+
+    def report_success(self):
+        """Получен ответ от сервера: сеть есть, плановую пробу можно отложить."""
+        with self._lock:
+            self.stats['passive_success'] += 1
+            if self._state == self.ONLINE:
+                return
+            self._interval = self.max_interval
+            self._next_probe = time.monotonic() + self._interval
+        self._set_state(self.ONLINE)
+
+    def report_failure(self, error: Optional[BaseException] = None):
+        """Сетевая ошибка без ответа сервера: SUSPECT и внеочередная проба."""
+        with self._lock:
+            self.stats['passive_failures'] += 1
+            if self._state == self.OFFLINE:
+                return
+            self._interval = self.min_interval
+            self._next_probe = time.monotonic()
+        logger.debug(f"Reachability: сетевая ошибка ({type(error).__name__ if error else '-'}), проверяем")
+        self._set_state(self.SUSPECT)
+        self._wake.set()
+
+    # ---------- подписчики ----------
+
+    def add_listener(self, callback: Callable[[str, str], None]):
+        """callback(old_state, new_state) — вызывается при смене состояния."""
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, str], None]):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    # ---------- фоновый пробник ----------
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, daemon=True, name="ReachabilityProbe"
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.probe_timeout + 1)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            delay = self._next_probe - time.monotonic()
+            if delay > 0:
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+            self.probe_now()
+
+    def probe_now(self) -> bool:
+        """Выполнить пробу сейчас и обновить состояние."""
+        start = time.perf_counter()
+        try:
+            ok = bool(self._probe_func())
+        except Exception:
+            ok = False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        new_state = self.ONLINE if ok else self.OFFLINE
+        with self._lock:
+            self.stats['probes'] += 1
+            self.stats['last_probe_ms'] = round(elapsed_ms, 1)
+            if not ok:
+                self.stats['probe_failures'] += 1
+            if new_state == self._state:
+                self._interval = min(self._interval * 2, self.max_interval)
+            else:
+                self._interval = self.min_interval
+            self._next_probe = time.monotonic() + self._interval
+        self._set_state(new_state)
+        self._ready.set()  # состояние могло не измениться
+        return ok
+
+    def _tcp_probe(self) -> bool:
+        # Таймаут на сокете, а не глобальный
+        with socket.create_connection((self.host, self.port), timeout=self.probe_timeout):
+            return True
+
+    def _set_state(self, new_state: str):
+        with self._lock:
+            old_state = self._state
+            if old_state == new_state:
+                return
+            self._state = new_state
+            self.stats['transitions'] += 1
+            self.stats['last_change'] = time.time()
+            listeners = list(self._listeners)
+        self._ready.set()
+        if new_state == self.OFFLINE or old_state == self.OFFLINE:
+            logger.warning(f"Reachability: {old_state} → {new_state}")
+        else:
+            logger.info(f"Reachability: {old_state} → {new_state}")
+        for callback in listeners:
+            try:
+                callback(old_state, new_state)
+            except Exception as e:
+                logger.error(f"Reachability listener error: {e}")
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['interval'] = self._interval
+        stats['state'] = self._state
+        stats['host'] = self.host
+        return stats
+
+
+_monitor: Optional[ReachabilityMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_reachability_monitor() -> ReachabilityMonitor:
+    """Общий монитор доступности сети (создаётся и запускается при первом вызове)."""
+    global _monitor
+    if _monitor is not None:
+        return _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            try:
+                from config import (
+                    REACHABILITY_HOST,
+                    REACHABILITY_PROBE_TIMEOUT,
+                    REACHABILITY_MIN_INTERVAL,
+                    REACHABILITY_MAX_INTERVAL,
+                    REACHABILITY_TRIAL_INTERVAL,
+                )
+                options = dict(
+                    host=REACHABILITY_HOST,
+                    probe_timeout=REACHABILITY_PROBE_TIMEOUT,
+                    min_interval=REACHABILITY_MIN_INTERVAL,
+                    max_interval=REACHABILITY_MAX_INTERVAL,
+                    trial_interval=REACHABILITY_TRIAL_INTERVAL,
+                )
+            except Exception:
+                options = {}
+            monitor = ReachabilityMonitor(**options)
+            monitor.start()
+            _monitor = monitor
+    return _monitor
+
+
 def is_internet_available_fast(timeout: float = 0.5) -> bool:
     """
-    БЫСТРАЯ проверка доступности интернета (только DNS, без подключения).
-    Используется в GUI для немедленной проверки без блокировки UI.
+    БЫСТРАЯ проверка доступности интернета: чтение флага ReachabilityMonitor.
+    Используется в GUI и в цикле синхронизации без блокировки.
     
     Args:
-        timeout: Таймаут в секундах (по умолчанию 0.5 сек)
+        timeout: Сколько ждать первую пробу, если состояние ещё неизвестно
     
     Returns:
-        True если DNS работает
+        True если сеть доступна (или ещё не известно обратное), а также
+        когда пора пробный запрос: иначе за прокси, где TCP-проба не проходит,
+        синхронизация не попыталась бы никогда
     """
-    try:
-        # Только DNS резолв, БЕЗ подключения - очень быстро!
-        socket.setdefaulttimeout(timeout)
-        addr_info = socket.getaddrinfo('sheets.googleapis.com', 443, socket.AF_INET, socket.SOCK_STREAM)
-        socket.setdefaulttimeout(None)
-        return bool(addr_info)
-    except (socket.gaierror, OSError):
-        socket.setdefaulttimeout(None)
-        return False
-    except Exception:
-        socket.setdefaulttimeout(None)
-        return False
\ No newline at end of file
+    monitor = get_reachability_monitor()
+    return monitor.is_online(wait=timeout) or monitor.trial_due()
@@ -242,6 +242,17 @@ class ImprovedSyncQueue:
             'total_conflicts': 0,
             'last_sync_time': None
         }
+        try:
+            from shared.metrics import get_metrics_registry, families_from_dict
+            get_metrics_registry().register_collector(
+                "sync_queue",
+                lambda: families_from_dict(
+                    "wtt_sync_queue", self.stats,
+                    counters=('total_synced', 'total_failed', 'total_conflicts'),
+                ),
+            )
+        except ImportError:
+            pass
     
     def sync_pending_records(self) -> SyncResult:
         """
@@ -337,7 +337,177 @@ class SupabaseToSheetsSync:
             logger.error(f"Failed to sync daily stats: {e}")
             print(f"   ❌ Ошибка: {e}")
             return False
-    
+
+    def sync_group_stats(self, days_back: int = 30) -> bool:
+        """
+        Синхронизация сравнения групп за последние N дней
+
+        Args:
+            days_back: Количество дней назад
+        """
+        print(f"\n👥 Синхронизация статистики групп (последние {days_back} дней)...")
+
+        try:
+            # Агрегаты считает Supabase (RPC get_group_comparison)
+            end_date = date.today()
+            start_date = end_date - timedelta(days=days_back)
+            groups = self.supabase.get_group_comparison(start_date, end_date)
+
+            # Создаем или очищаем лист
+            try:
+                ws = self.sheets.get_worksheet('GroupStats')
+            except:
+                spreadsheet = self.sheets.client.open_by_key(self.sheets._sheet_id)
+                ws = spreadsheet.add_worksheet(title='GroupStats', rows=100, cols=10)
+
+            self.sheets._request_with_retry(lambda: ws.clear())
+
+            # Заголовки
+            headers = ['Group', 'Users', 'WorkMinutes', 'BreakMinutes',
+                       'AvgBreakMinutes', 'Violations', 'ViolationsPerUser']
+
+            # Формируем данные
+            data = [headers]
+            for group in groups:
+                row = [
+                    group.get('group_name', ''),
+                    str(group.get('users_count', 0)),
+                    str(group.get('work_minutes', 0)),
+                    str(group.get('break_minutes', 0)),
+                    str(group.get('avg_break_minutes_per_user', 0)),
+                    str(group.get('violations', 0)),
+                    str(group.get('violations_per_user', 0))
+                ]
+                data.append(row)
+
+            # Записываем
+            self.sheets._request_with_retry(
+                lambda: ws.update('A1', data, value_input_option='USER_ENTERED')
+            )
+
+            self.stats['group_stats'] = len(groups)
+            print(f"   ✅ Синхронизировано: {len(groups)} групп")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to sync group stats: {e}")
+            print(f"   ❌ Ошибка: {e}")
+            return False
+
+    def sync_top_violators(self, days_back: int = 30, limit: int = 20) -> bool:
+        """
+        Синхронизация рейтинга нарушителей за последние N дней
+
+        Args:
+            days_back: Количество дней назад
+            limit: Размер рейтинга
+        """
+        print(f"\n🚨 Синхронизация топа нарушителей (последние {days_back} дней)...")
+
+        try:
+            # Агрегаты считает Supabase (RPC get_top_violators)
+            end_date = date.today()
+            start_date = end_date - timedelta(days=days_back)
+            violators = self.supabase.get_top_violators(start_date, end_date, limit=limit)
+
+            # Создаем или очищаем лист
+            try:
+                ws = self.sheets.get_worksheet('TopViolators')
+            except:
+                spreadsheet = self.sheets.client.open_by_key(self.sheets._sheet_id)
+                ws = spreadsheet.add_worksheet(title='TopViolators', rows=100, cols=10)
+
+            self.sheets._request_with_retry(lambda: ws.clear())
+
+            # Заголовки
+            headers = ['Email', 'Name', 'Group', 'Violations', 'ExcessMinutes', 'LastViolation']
+
+            # Формируем данные
+            data = [headers]
+            for item in violators:
+                row = [
+                    item.get('email', ''),
+                    item.get('name', ''),
+                    item.get('group_name', ''),
+                    str(item.get('violations', 0)),
+                    str(item.get('excess_minutes', 0)),
+                    str(item.get('last_violation', '') or '')
+                ]
+                data.append(row)
+
+            # Записываем
+            self.sheets._request_with_retry(
+                lambda: ws.update('A1', data, value_input_option='USER_ENTERED')
+            )
+
+            self.stats['top_violators'] = len(violators)
+            print(f"   ✅ Синхронизировано: {len(violators)} пользователей")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to sync top violators: {e}")
+            print(f"   ❌ Ошибка: {e}")
+            return False
+
+    def sync_user_daily_totals(self, days_back: int = 7) -> bool:
+        """
+        Синхронизация итогов пользователей по дням за последние N дней
+
+        Args:
+            days_back: Количество дней назад
+        """
+        print(f"\n🗓️  Синхронизация итогов по дням (последние {days_back} дней)...")
+
+        try:
+            # Агрегаты считает Supabase (RPC get_user_daily_totals)
+            end_date = date.today()
+            start_date = end_date - timedelta(days=days_back)
+            totals = self.supabase.get_user_daily_totals(start_date, end_date)
+
+            # Создаем или очищаем лист
+            try:
+                ws = self.sheets.get_worksheet('UserDailyTotals')
+            except:
+                spreadsheet = self.sheets.client.open_by_key(self.sheets._sheet_id)
+                ws = spreadsheet.add_worksheet(title='UserDailyTotals', rows=1000, cols=12)
+
+            self.sheets._request_with_retry(lambda: ws.clear())
+
+            # Заголовки
+            headers = ['Date', 'Email', 'Name', 'Group', 'Sessions', 'WorkMinutes',
+                       'Breaks', 'BreakMinutes', 'Violations', 'ExcessMinutes']
+
+            # Формируем данные
+            data = [headers]
+            for item in totals:
+                row = [
+                    str(item.get('day', '')),
+                    item.get('email', ''),
+                    item.get('name', ''),
+                    item.get('group_name', ''),
+                    str(item.get('sessions', 0)),
+                    str(item.get('work_minutes', 0)),
+                    str(item.get('breaks', 0)),
+                    str(item.get('break_minutes', 0)),
+                    str(item.get('violations', 0)),
+                    str(item.get('excess_minutes', 0))
+                ]
+                data.append(row)
+
+            # Записываем
+            self.sheets._request_with_retry(
+                lambda: ws.update('A1', data, value_input_option='USER_ENTERED')
+            )
+
+            self.stats['user_daily_totals'] = len(totals)
+            print(f"   ✅ Синхронизировано: {len(totals)} строк")
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to sync user daily totals: {e}")
+            print(f"   ❌ Ошибка: {e}")
+            return False
+
     def log_sync(self, status: str, error_message: str = ""):
         """Записать лог синхронизации в Supabase"""
         try:
@@ -371,7 +541,10 @@ class SupabaseToSheetsSync:
         success = success and self.sync_daily_worklog(days_back=7)
         success = success and self.sync_break_log(days_back=7)
         success = success and self.sync_violations(days_back=30)
+        success = success and self.sync_top_violators(days_back=30)
         success = success and self.sync_daily_stats()
+        success = success and self.sync_user_daily_totals(days_back=7)
+        success = success and self.sync_group_stats(days_back=30)
         
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
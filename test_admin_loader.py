@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Тестирование фоновой загрузки данных админки (admin_app.data_loader)
+
+Фейковый репозиторий с искусственной задержкой вместо Google Sheets;
+Qt в режиме offscreen. Проверяет:
+- Цикл событий не блокируется дольше 50 мс, пока идут медленные запросы
+- Запросы выполняются параллельно
+- Устаревшие запросы (смена сотрудника/вкладки) не доставляются
+- Кэш отдаётся сразу, свежие данные приходят следом; свежий кэш не перезапрашивается
+- Обновление, вытесненное свежим кэшем, не остаётся «в работе»
+
+Без PyQt5 тесты пропускаются.
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from testing_support import SkipTest, run_tests
+
+MAX_BLOCK_MS = 50
+LATENCY = 0.3  # сек на запрос к «Sheets»
+
+
+class FakeRepo:
+    """AdminRepo/BreakManager с задержкой сети"""
+    def __init__(self, latency: float = LATENCY):
+        self.latency = latency
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _call(self, name, result, latency=None):
+        with self._lock:
+            self.calls.append(name)
+        time.sleep(self.latency if latency is None else latency)
+        return result
+
+    def list_users(self):
+        return self._call("list_users", [{"Email": f"u{i}@x.ru", "Name": f"User {i}"} for i in range(500)])
+
+    def list_groups_from_sheet(self):
+        return self._call("list_groups_from_sheet", ["Входящие", "Почта"])
+
+    def get_active_sessions(self):
+        return self._call("get_active_sessions", [{"Email": "u1@x.ru", "Status": "active"}])
+
+    def get_shift_calendar(self):
+        return self._call("get_shift_calendar", [["ФИО", "1", "2"], ["User 1", "9-18", ""]])
+
+    def list_schedule_templates(self):
+        return self._call("list_schedule_templates", [{"schedule_id": "S1", "name": "5/2"}])
+
+    def get_violations_report(self, email=None, latency=None):
+        return self._call("get_violations_report", [{"Email": email}], latency)
+
+
+class Heartbeat:
+    """Таймер 5 мс в GUI-потоке: максимальный промежуток = худшая блокировка цикла"""
+    def __init__(self):
+        from PyQt5.QtCore import QTimer
+        self.max_gap_ms = 0.0
+        self._last = time.perf_counter()
+        self.timer = QTimer()
+        self.timer.setInterval(5)
+        self.timer.timeout.connect(self._tick)
+        self.timer.start()
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.max_gap_ms = max(self.max_gap_ms, (now - self._last) * 1000)
+        self._last = now
+
+    def stop(self):
+        self.timer.stop()
+
+
+def _qt_app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+def _pump(app, until, timeout: float = 5.0):
+    """Крутить цикл событий, пока until() не станет True"""
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    return until()
+
+
+def _skip_without_qt() -> None:
+    if importlib.util.find_spec("PyQt5") is None:
+        raise SkipTest("не установлен PyQt5")
+
+
+def test_event_loop_not_blocked():
+    """Тест 1: Медленные запросы не блокируют цикл событий"""
+    print("="*60)
+    print("TEST 1: Цикл событий при медленном репозитории")
+    print("="*60)
+    _skip_without_qt()
+
+    from admin_app.data_loader import AdminDataLoader
+    app = _qt_app()
+    repo = FakeRepo()
+    loader = AdminDataLoader(max_threads=4, default_max_age=60)
+    received = {}
+    loader.loaded.connect(lambda key, data, from_cache: received.setdefault(key, data))
+
+    heartbeat = Heartbeat()
+    t0 = time.perf_counter()
+    loader.request("users", repo.list_users)
+    loader.request("groups", repo.list_groups_from_sheet)
+    loader.request("active_sessions", repo.get_active_sessions)
+    loader.request("shift_calendar", repo.get_shift_calendar)
+    request_ms = (time.perf_counter() - t0) * 1000
+    assert _pump(app, lambda: len(received) == 4)
+    elapsed = time.perf_counter() - t0
+    heartbeat.stop()
+
+    print(f"   ✓ 4 запроса поставлены за {request_ms:.1f}ms, данные пришли через {elapsed*1000:.0f}ms")
+    assert request_ms < MAX_BLOCK_MS, request_ms
+    assert elapsed < LATENCY * 2.5, elapsed  # параллельно, а не 4 × LATENCY
+    print(f"   ✓ Параллельно: {elapsed:.2f}с против {4 * LATENCY:.1f}с последовательно")
+    assert heartbeat.max_gap_ms < MAX_BLOCK_MS, heartbeat.max_gap_ms
+    print(f"   ✓ Максимальная пауза цикла событий: {heartbeat.max_gap_ms:.1f}ms (< {MAX_BLOCK_MS}ms)")
+    assert len(received["users"]) == 500
+    loader.shutdown()
+
+    print("\n✅ Цикл событий: PASSED")
+    return True
+
+
+def test_stale_requests_dropped():
+    """Тест 2: Устаревшие запросы не доставляются"""
+    print("\n" + "="*60)
+    print("TEST 2: Отмена устаревших запросов")
+    print("="*60)
+    _skip_without_qt()
+
+    from admin_app.data_loader import AdminDataLoader
+    app = _qt_app()
+    repo = FakeRepo()
+    loader = AdminDataLoader(max_threads=2, default_max_age=60)
+    delivered = []
+    loader.loaded.connect(lambda key, data, from_cache: delivered.append((key, data)))
+
+    # Быстрое переключение сотрудника: A (медленно) -> B (быстро)
+    loader.request("violations", lambda: repo.get_violations_report("a@x.ru", latency=0.3))
+    loader.request("violations", lambda: repo.get_violations_report("b@x.ru", latency=0.05))
+    assert _pump(app, lambda: not loader.is_pending("violations"))
+    _pump(app, lambda: False, timeout=0.4)  # дать ответу A прийти
+    assert delivered == [("violations", [{"Email": "b@x.ru"}])], delivered
+    # A либо снят с очереди до старта, либо выполнился и отброшен
+    how = "отброшен" if loader.get_stats()['stale_dropped'] else "снят с очереди"
+    print(f"   ✓ Запрос по прежнему сотруднику {how}, показан только последний")
+
+    # Ушли с вкладки: запрос отменён, но кэш помечен устаревшим
+    delivered.clear()
+    loader.request("templates", repo.list_schedule_templates)
+    loader.cancel(["templates"])
+    _pump(app, lambda: False, timeout=LATENCY + 0.2)
+    assert delivered == [] and not loader.is_pending("templates")
+    print("   ✓ Отменённый при смене вкладки запрос не доставлен")
+
+    # Очередь пула: не начатые задачи снимаются без вызова репозитория
+    repo.calls.clear()
+    for i in range(4):
+        loader.request(f"slow{i}", lambda: repo.get_violations_report(latency=0.2))
+    loader.cancel(["slow2", "slow3"])
+    _pump(app, lambda: not loader.is_pending("slow0") and not loader.is_pending("slow1"))
+    _pump(app, lambda: False, timeout=0.3)
+    assert len(repo.calls) == 2, repo.calls
+    print("   ✓ Не начатые задачи сняты с очереди — лишних обращений к API нет")
+    loader.shutdown()
+
+    print("\n✅ Отмена устаревших запросов: PASSED")
+    return True
+
+
+def test_cache_first():
+    """Тест 3: Кэш показывается сразу"""
+    print("\n" + "="*60)
+    print("TEST 3: Кэш, затем свежие данные")
+    print("="*60)
+    _skip_without_qt()
+
+    from admin_app.data_loader import AdminDataLoader
+    app = _qt_app()
+    repo = FakeRepo(latency=0.1)
+    loader = AdminDataLoader(max_threads=2, default_max_age=60)
+    events = []
+    loader.loaded.connect(lambda key, data, from_cache: events.append((key, from_cache)))
+
+    loader.request("templates", repo.list_schedule_templates)
+    assert _pump(app, lambda: events == [("templates", False)])
+
+    # Переключение на вкладку: кэш свежий — показан синхронно, без запроса
+    events.clear()
+    repo.calls.clear()
+    assert loader.request("templates", repo.list_schedule_templates) is True
+    assert events == [("templates", True)] and not loader.is_pending("templates")
+    assert repo.calls == []
+    print("   ✓ Свежий кэш: показан сразу, запроса нет")
+
+    # Явное обновление: кэш сразу, свежие данные следом
+    events.clear()
+    loader.request("templates", repo.list_schedule_templates, max_age=0)
+    assert events == [("templates", True)]
+    assert _pump(app, lambda: events == [("templates", True), ("templates", False)])
+    print("   ✓ Обновление: кэш сразу, свежие данные через ~100ms")
+
+    # Обновление уже выполняется, а вкладку открыли снова — ответ из свежего кэша.
+    # Результат обновления устарел и отбрасывается, но задача не висит «в работе»
+    events.clear()
+    repo.calls.clear()
+    pending = []
+    loader.pending_changed.connect(pending.append)
+    loader.request("templates", repo.list_schedule_templates, max_age=0)
+    assert _pump(app, lambda: repo.calls == ["list_schedule_templates"])  # задача стартовала
+    assert loader.request("templates", repo.list_schedule_templates) is True
+    assert loader.is_pending("templates")
+    assert _pump(app, lambda: not loader.is_pending("templates"), timeout=1.0)
+    assert events == [("templates", True), ("templates", True)], events
+    assert pending[-1] == 0 and loader.get_stats()['pending'] == 0, (pending, loader.get_stats())
+    loader.pending_changed.disconnect(pending.append)
+    print("   ✓ Обновление вытеснено свежим кэшем: ответ отброшен, is_pending снова False")
+
+    # Ошибка репозитория -> failed, кэш не портится
+    failures = []
+    loader.failed.connect(lambda key, error: failures.append((key, error)))
+
+    def broken():
+        raise RuntimeError("quota exceeded")
+    loader.request("templates", broken, max_age=0)
+    assert _pump(app, lambda: failures == [("templates", "quota exceeded")])
+    assert loader.cached("templates") == [{"schedule_id": "S1", "name": "5/2"}]
+    print("   ✓ Ошибка: сигнал failed, кэш сохранён")
+    print(f"   ✓ Статистика: {loader.get_stats()}")
+    loader.shutdown()
+
+    print("\n✅ Кэш: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Цикл событий", test_event_loop_not_blocked),
+        ("Отмена устаревших", test_stale_requests_dropped),
+        ("Кэш", test_cache_first),
+    ]
+
+    return run_tests("Admin Data Loader Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
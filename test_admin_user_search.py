@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Тестирование поиска по сотрудникам в админке (admin_app.user_index)
+
+Проверяет:
+- Совпадение результатов индекса с прежним линейным фильтром
+  (подстрока email/ФИО, группа, активность)
+- Бенчмарк: 20k синтетических пользователей, набор запроса по символу —
+  каждый символ дешевле одного кадра (16 мс)
+- Модель UsersTableModel: видимые строки, пометка 🟢, user_at
+  (без PyQt5 пропускается)
+"""
+
+import importlib.util
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from admin_app.user_index import UserSearchIndex
+from testing_support import SkipTest, run_tests
+
+N_USERS = 20000
+FRAME_MS = float(os.getenv("WTT_SEARCH_FRAME_MS", "16"))
+
+FIRST = ["Иван", "Пётр", "Анна", "Мария", "Сергей", "Ольга", "Дмитрий", "Елена", "Алексей", "Наталья"]
+LAST = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Васильев", "Новиков", "Морозов", "Волков"]
+GROUPS = ["Входящие", "Почта", "Старшие", "Стажёры", "Выход"]
+
+
+def make_users(n: int, seed: int = 42):
+    rnd = random.Random(seed)
+    users = []
+    for i in range(n):
+        first, last = rnd.choice(FIRST), rnd.choice(LAST)
+        users.append({
+            "Email": f"user{i:05d}.{rnd.choice('abcdefgh')}{i % 97}@company.ru",
+            "Name": f"{last} {first} {rnd.choice(FIRST)}ович",
+            "Group": rnd.choice(GROUPS),
+        })
+    return users
+
+
+def naive_filter(users, text, group=None, active=None):
+    """Прежняя логика refresh_users_table"""
+    q = text.strip().lower()
+    out = []
+    for uid, u in enumerate(users):
+        email = u["Email"].strip().lower()
+        if q and q not in email and q not in u["Name"].lower():
+            continue
+        if group is not None and u["Group"].strip() != group:
+            continue
+        if active is not None and email not in active:
+            continue
+        out.append(uid)
+    return out
+
+
+def test_matches_linear_filter():
+    """Тест 1: Результаты как у линейного фильтра"""
+    print("="*60)
+    print("TEST 1: Совпадение с линейным фильтром")
+    print("="*60)
+
+    users = make_users(3000, seed=1)
+    index = UserSearchIndex(users)
+    active = {users[i]["Email"].lower() for i in range(0, 3000, 7)}
+    queries = ["", "и", "ив", "иван", "ИВАНОВ", "user01", "@company", "ович", "овна",
+               "zz", "ова пётр", "user02999", " петров ", "r0"]
+
+    checked = 0
+    for q in queries:
+        for group in (None, "Почта"):
+            for act in (None, active):
+                assert index.search(q, group=group, active_emails=act) == \
+                    naive_filter(users, q, group, act), (q, group, act is not None)
+                checked += 1
+    print(f"   ✓ {checked} комбинаций запрос/группа/активность совпали")
+
+    # Инкрементальный набор и стирание дают те же результаты
+    for typed in ("петров", "user0123"):
+        for i in range(1, len(typed) + 1):
+            assert index.search(typed[:i]) == naive_filter(users, typed[:i])
+        for i in range(len(typed), 0, -1):
+            assert index.search(typed[:i]) == naive_filter(users, typed[:i])
+    print("   ✓ Набор и стирание по символу")
+
+    print("\n✅ Совпадение с линейным фильтром: PASSED")
+    return True
+
+
+def test_keystroke_benchmark():
+    """Тест 2: 20k пользователей, набор запроса по символу"""
+    print("\n" + "="*60)
+    print(f"TEST 2: Бенчмарк поиска ({N_USERS} пользователей)")
+    print("="*60)
+
+    users = make_users(N_USERS)
+    t0 = time.perf_counter()
+    index = UserSearchIndex(users)
+    build_ms = (time.perf_counter() - t0) * 1000
+    stats = index.get_stats()
+    print(f"   ✓ Индекс: {build_ms:.0f}ms, {stats['grams']} n-грамм, {stats['postings']} ссылок")
+
+    active = {users[i]["Email"].lower() for i in range(0, N_USERS, 3)}
+    typed_queries = ["иванов пётр", "user12345", "@company.ru", "смирнов", "ович"]
+    timings = []
+    for typed in typed_queries:
+        for group, act in ((None, None), ("Почта", None), (None, active)):
+            for i in range(1, len(typed) + 1):
+                t0 = time.perf_counter()
+                index.search(typed[:i], group=group, active_emails=act)
+                timings.append((time.perf_counter() - t0) * 1000)
+
+    # Для сравнения — прежний линейный проход
+    t0 = time.perf_counter()
+    for i in range(1, len("смирнов") + 1):
+        naive_filter(users, "смирнов"[:i])
+    naive_ms = (time.perf_counter() - t0) * 1000 / len("смирнов")
+
+    timings.sort()
+    p50 = timings[len(timings) // 2]
+    p95 = timings[int(len(timings) * 0.95)]
+    worst = timings[-1]
+    print(f"   ✓ {len(timings)} нажатий: p50={p50:.2f}ms p95={p95:.2f}ms max={worst:.2f}ms "
+          f"(линейный фильтр ~{naive_ms:.1f}ms)")
+    assert p95 < FRAME_MS, p95
+    assert worst < FRAME_MS * 2, worst
+    print(f"   ✓ Нажатие укладывается в кадр ({FRAME_MS:.0f}ms)")
+
+    t0 = time.perf_counter()
+    narrow = index.search("user19999")
+    narrow_ms = (time.perf_counter() - t0) * 1000
+    assert narrow == [19999]
+    assert narrow_ms < 1.0, narrow_ms
+    print(f"   ✓ Узкий запрос: {narrow_ms:.3f}ms — цена по числу совпадений")
+
+    print("\n✅ Бенчмарк поиска: PASSED")
+    return True
+
+
+def test_table_model():
+    """Тест 3: UsersTableModel"""
+    print("\n" + "="*60)
+    print("TEST 3: Модель таблицы")
+    print("="*60)
+
+    if importlib.util.find_spec("PyQt5") is None:
+        raise SkipTest("не установлен PyQt5")
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtWidgets import QApplication
+    from admin_app.users_model import UsersTableModel
+
+    app = QApplication.instance() or QApplication([])  # noqa: F841
+    users = make_users(N_USERS)
+    model = UsersTableModel(["Email", "Name", "Group"], ["Email", "ФИО", "Группа"])
+    model.set_users(users)
+    assert model.rowCount() == N_USERS and model.columnCount() == 3
+
+    target = users[12345]
+    active = {target["Email"].lower()}
+    t0 = time.perf_counter()
+    model.set_filter("user12345", active_emails=active)
+    filter_ms = (time.perf_counter() - t0) * 1000
+    assert model.rowCount() == 1
+    assert model.user_at(0) is target and model.user_at(1) is None
+    assert model.data(model.index(0, 0), Qt.DisplayRole) == "🟢 " + target["Email"]
+    assert model.data(model.index(0, 1), Qt.DisplayRole) == target["Name"]
+    print(f"   ✓ Фильтр {filter_ms:.2f}ms, user_at по видимой строке, пометка 🟢")
+
+    model.set_filter("", group="Почта")
+    assert all(model.user_at(r)["Group"] == "Почта" for r in range(model.rowCount()))
+    print(f"   ✓ Группа: {model.rowCount()} строк")
+
+    print("\n✅ Модель таблицы: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Линейный фильтр", test_matches_linear_filter),
+        ("Бенчмарк поиска", test_keystroke_benchmark),
+        ("Модель таблицы", test_table_model),
+    ]
+
+    return run_tests("Admin User Search Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
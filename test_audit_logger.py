@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Тестирование журнала аудита (admin_app.audit_logger)
+
+Проверяет:
+- Буферизованную запись: события фиксируются пачками, чтение видит всё,
+  неполная пачка записывается таймером через flush_interval
+- Синхронизацию FTS5-индекса триггерами (INSERT/UPDATE/DELETE, старый журнал)
+- Поиск через FTS5 против прежнего LIKE
+- Бенчмарк: 1 000 000 синтетических записей, поиск и фильтры — миллисекунды
+- Потоковый экспорт (JSON Lines / CSV / JSON) и архивацию старых месяцев
+- Экспорт большого журнала: память процесса не растёт с объёмом
+
+Размер бенчмарков: AUDIT_BENCH_ROWS (по умолчанию 1 000 000),
+AUDIT_EXPORT_BENCH_ROWS (по умолчанию 20 000; полный прогон — 5 000 000).
+"""
+
+import csv
+import gzip
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from testing_support import SkipTest, run_tests
+
+BENCH_ROWS = int(os.getenv("AUDIT_BENCH_ROWS", "1000000"))
+# p95 каждого запроса — во столько раз быстрее прежнего LIKE, замеренного в том же
+# прогоне (абсолютный порог зависит от машины: на 1M строк LIKE — около секунды)
+MIN_SPEEDUP_VS_LIKE = 4
+EXPORT_BENCH_ROWS = int(os.getenv("AUDIT_EXPORT_BENCH_ROWS", "20000"))
+MAX_EXPORT_RSS_MB = 32  # прежний export_to_json держал весь список в памяти
+
+ADMINS = [f"admin{i}@company.com" for i in range(20)]
+ACTIONS = ["UPDATE_USER_STATUS", "CREATE", "UPDATE", "DELETE", "LOGIN", "LOGOUT", "EXPORT", "CONFIG_CHANGE"]
+ENTITIES = ["USER", "SESSION", "CONFIG", "SCHEDULE", "NOTIFICATION", "REPORT"]
+STATUSES = ["В работе", "Обед", "Перерыв", "Тренинг", "Совещание"]
+
+
+def _fts_available() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(a)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def test_batched_writes():
+    """Тест 1: Буферизованная запись"""
+    print("="*60)
+    print("TEST 1: Запись пачками")
+    print("="*60)
+
+    from admin_app.audit_logger import AuditLogger
+    conn = sqlite3.connect(":memory:")
+    audit = AuditLogger(conn, "admin@company.com", batch_size=50, flush_interval_ms=60000)
+
+    ids = [audit.log_action("UPDATE", "USER", f"user{i}@company.com", after_state={"status": "Обед"})
+           for i in range(120)]
+    # id — только у записанных этим же вызовом событий (50-е и 100-е закрыли пачку)
+    assert [(i, x) for i, x in enumerate(ids) if x is not None] == [(49, 50), (99, 100)], ids
+    assert audit.stats['flushes'] == 2 and len(audit._buffer) == 20
+    assert conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 100
+    print("   ✓ 120 событий: 2 транзакции по 50, 20 в буфере; id — после записи")
+
+    # Любое чтение сначала сбрасывает буфер
+    history = audit.get_entity_history("USER", "user119@company.com")
+    assert len(history) == 1 and history[0].id == 120 and history[0].after_state == {"status": "Обед"}
+    print("   ✓ Чтение видит и ещё не записанные события")
+
+    ids = audit.log_actions([{"action": "DELETE", "entity_type": "USER", "entity_id": f"x{i}"} for i in range(200)])
+    assert ids == list(range(121, 321)) and audit.stats['max_batch'] == 200
+    print("   ✓ log_actions: 200 событий одной транзакцией")
+
+    # Два журнала на одном файле: возвращённый id указывает на свою строку
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "audit_shared.db")
+        db1, db2 = sqlite3.connect(path), sqlite3.connect(path)
+        a1 = AuditLogger(db1, "one@company.com", batch_size=3, flush_interval_ms=60000)
+        a2 = AuditLogger(db2, "two@company.com", batch_size=3, flush_interval_ms=60000)
+        returned = {}
+        for i in range(3):
+            for a, name in ((a1, "one"), (a2, "two")):
+                audit_id = a.log_action("CREATE", "USER", f"{name}-{i}")
+                if audit_id is not None:
+                    returned[f"{name}-{i}"] = audit_id
+        returned.update(zip(["one-x", "one-y"], a1.log_actions(
+            [{"action": "DELETE", "entity_type": "USER", "entity_id": e} for e in ("one-x", "one-y")])))
+        assert set(returned) == {"one-2", "two-2", "one-x", "one-y"}, returned
+        for entity_id, audit_id in returned.items():
+            row = db1.execute("SELECT entity_id FROM audit_log WHERE id = ?", (audit_id,)).fetchone()
+            assert row == (entity_id,), (entity_id, audit_id, row)
+        assert db1.execute("SELECT COUNT(DISTINCT id) FROM audit_log").fetchone()[0] == 8
+        db1.close()
+        db2.close()
+    print("   ✓ Два писателя в одном файле: каждый id указывает на своё событие")
+
+    # Файл БД: транзакция на событие против пачек
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = {}
+        for batch in (1, 50):
+            db = sqlite3.connect(os.path.join(tmp, f"audit{batch}.db"))
+            db.execute("PRAGMA synchronous=FULL")
+            a = AuditLogger(db, "admin@company.com", batch_size=batch, flush_interval_ms=60000)
+            t0 = time.perf_counter()
+            for i in range(500):
+                a.log_action("UPDATE", "USER", f"user{i}", {"status": "Обед"})
+            a.flush()
+            timings[batch] = (time.perf_counter() - t0) * 1000
+            db.close()
+    print(f"   ✓ 500 событий в файл: по одному {timings[1]:.0f}ms, пачками {timings[50]:.0f}ms")
+
+    # Неполная пачка не ждёт следующего события: её пишет таймер
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "audit_timer.db")
+        db = sqlite3.connect(path)
+        a = AuditLogger(db, "admin@company.com", batch_size=50, flush_interval_ms=100)
+        for i in range(3):
+            a.log_action("UPDATE", "USER", f"user{i}", {"status": "Обед"})
+        reader = sqlite3.connect(path)
+        assert reader.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 0
+        deadline = time.monotonic() + 3
+        while a._buffer and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert reader.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 3
+        assert a.stats['flushes'] == 1 and a._flush_timer is None
+        reader.close()
+        db.close()
+    print("   ✓ 3 события и тишина: таймер записал их через flush_interval (100ms)")
+
+    print("\n✅ Запись пачками: PASSED")
+    return True
+
+
+def test_fts_sync():
+    """Тест 2: FTS5-индекс и триггеры"""
+    print("\n" + "="*60)
+    print("TEST 2: FTS5 синхронизируется с audit_log")
+    print("="*60)
+    if not _fts_available():
+        raise SkipTest("SQLite без FTS5")
+
+    from admin_app.audit_logger import AuditLogger
+
+    # Журнал, заведённый прежней версией (без FTS): история индексируется
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
+            admin_email TEXT NOT NULL, action TEXT NOT NULL, entity_type TEXT NOT NULL,
+            entity_id TEXT, before_state TEXT, after_state TEXT, ip_address TEXT,
+            hostname TEXT, success INTEGER DEFAULT 1, error_message TEXT
+        )
+    """)
+    conn.execute("INSERT INTO audit_log (timestamp, admin_email, action, entity_type, entity_id) "
+                 "VALUES ('2025-11-01T10:00:00', 'old@company.com', 'DELETE', 'USER', 'ivanov@company.com')")
+    conn.commit()
+    audit = AuditLogger(conn, "admin@company.com", batch_size=1)
+    assert [e.entity_id for e in audit.search("ivanov")] == ["ivanov@company.com"]
+    print("   ✓ Записи, сделанные до индекса, найдены (rebuild)")
+
+    audit.log_action("UPDATE_USER_STATUS", "USER", "petrov@company.com",
+                     {"status": "В работе"}, {"status": "Обед"})
+    assert [e.entity_id for e in audit.search("petrov@company.com")] == ["petrov@company.com"]
+    assert audit.search("обед", search_in=["after_state"])[0].entity_id == "petrov@company.com"
+    assert audit.search("обед") == []  # по умолчанию состояния не ищутся
+    assert audit.search("Petr") and audit.search("update_user")
+    print("   ✓ Email целиком, префикс слова, кириллица в состоянии, выбор полей")
+
+    # Части email и кода действия — как прежний LIKE '%…%', но по индексу
+    audit.log_action("UPDATE_USER_STATUS", "USER", "ivanov@company.com")
+    fts, like = audit.stats['fts_queries'], audit.stats['like_queries']
+    for q in ("company", "company.com", "STATUS", "USER_STATUS", "ivanov@comp", "user_stat"):
+        found = [(e.action, e.entity_id) for e in audit.search(q)]
+        assert ("UPDATE_USER_STATUS", "ivanov@company.com") in found, (q, found)
+    assert audit.stats['fts_queries'] == fts + 6 and audit.stats['like_queries'] == like
+    print("   ✓ company, company.com, STATUS, USER_STATUS найдены через FTS")
+
+    assert {e.entity_id for e in audit.search("anov@")} == {"ivanov@company.com"}
+    assert audit.stats['like_queries'] == like + 1
+    print("   ✓ Подстрока внутри слова (anov@): FTS пуст — найдено через LIKE")
+    conn.execute("DELETE FROM audit_log WHERE entity_id = 'ivanov@company.com' AND action = 'UPDATE_USER_STATUS'")
+    conn.commit()
+
+    conn.execute("UPDATE audit_log SET entity_id = 'sidorov@company.com' WHERE entity_id = 'petrov@company.com'")
+    conn.commit()
+    assert audit.search("petrov") == [] and len(audit.search("sidorov")) == 1
+    conn.execute("DELETE FROM audit_log WHERE entity_id = 'sidorov@company.com'")
+    conn.commit()
+    assert audit.search("sidorov") == []
+    print("   ✓ UPDATE и DELETE в audit_log отражаются в индексе")
+
+    # Запрос без букв и цифр — прежний LIKE
+    before = audit.stats['like_queries']
+    assert len(audit.search("@")) == 1 and audit.stats['like_queries'] == before + 1
+    assert audit.search("x", search_in=["entity_id; DROP TABLE audit_log"]) == []
+    assert conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 1
+    print("   ✓ Запрос из символов — через LIKE; неизвестные поля отклоняются")
+
+    print("\n✅ FTS5: PASSED")
+    return True
+
+
+def _generate(conn, rows: int, seed: int = 7):
+    """Синтетический журнал: rows записей за год, вставка через триггеры FTS"""
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    step = timedelta(days=365) / rows
+    chunk = []
+    for i in range(1, rows + 1):
+        status_from, status_to = rnd.sample(STATUSES, 2)
+        admin = ADMINS[rnd.randrange(len(ADMINS))]
+        chunk.append((
+            i,
+            (start + step * i).isoformat(),
+            admin,
+            ACTIONS[rnd.randrange(len(ACTIONS))],
+            ENTITIES[rnd.randrange(len(ENTITIES))],
+            f"user{rnd.randrange(5000)}@company.com",
+            f'{{"status": "{status_from}"}}',
+            f'{{"status": "{status_to}", "comment": "ticket-{rnd.randrange(100000)}"}}',
+            "10.0.0.1",
+            "admin-pc",
+            1,
+            None,
+        ))
+        if len(chunk) == 50000:
+            conn.executemany("INSERT INTO audit_log VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", chunk)
+            chunk.clear()
+    if chunk:
+        conn.executemany("INSERT INTO audit_log VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", chunk)
+    conn.commit()
+
+
+def test_benchmark():
+    """Тест 3: Бенчмарк поиска на большом журнале"""
+    print("\n" + "="*60)
+    print(f"TEST 3: Бенчмарк, {BENCH_ROWS:,} записей")
+    print("="*60)
+    if not _fts_available():
+        raise SkipTest("SQLite без FTS5")
+
+    from admin_app.audit_logger import AuditLogger
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "audit.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        audit = AuditLogger(conn, ADMINS[0], batch_size=50)
+
+        t0 = time.perf_counter()
+        _generate(conn, BENCH_ROWS)
+        print(f"   ✓ Сгенерировано за {time.perf_counter() - t0:.1f}с (FTS ведётся триггерами)")
+
+        # Свежее событие поверх большого журнала
+        audit.log_action("DELETE", "USER", "needle.person@company.com", after_state={"comment": "уникальный"})
+
+        queries = {
+            "редкий email": lambda: audit.search("needle.person@company.com"),
+            "частый email": lambda: audit.search("user42@company.com"),
+            "частое действие": lambda: audit.search("UPDATE_USER_STATUS"),
+            "префикс": lambda: audit.search("user123"),
+            "кириллица в деталях": lambda: audit.search("обед", search_in=["before_state", "after_state"]),
+            "номер тикета": lambda: audit.search("ticket-4242", search_in=["after_state"]),
+            "админ + действие + период": lambda: audit.get_admin_actions(
+                admin_email=ADMINS[3], action_type="EXPORT",
+                start_date=datetime(2025, 6, 1), end_date=datetime(2025, 6, 30), limit=100),
+            "история сущности": lambda: audit.get_entity_history("USER", "user7@company.com"),
+        }
+        assert [e.entity_id for e in queries["редкий email"]()] == ["needle.person@company.com"]
+        assert all(e.admin_email == ADMINS[3] and e.action == "EXPORT"
+                   for e in queries["админ + действие + период"]())
+
+        results = {}
+        for name, q in queries.items():
+            q()  # прогрев кэша страниц
+            samples = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                found = q()
+                samples.append((time.perf_counter() - t0) * 1000)
+            results[name] = (_percentile(samples, 0.5), _percentile(samples, 0.95), len(found))
+            print(f"   {name:28} p50 {results[name][0]:6.2f}ms  p95 {results[name][1]:6.2f}ms  ({len(found)} строк)")
+
+        # Для сравнения — прежний LIKE по редкому запросу (медиана 3 замеров)
+        like_samples = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            conn.execute(
+                "SELECT id FROM audit_log WHERE admin_email LIKE ? OR action LIKE ? OR entity_type LIKE ? "
+                "OR entity_id LIKE ? ORDER BY timestamp DESC LIMIT 100", ["%needle.person%"] * 4
+            ).fetchall()
+            like_samples.append((time.perf_counter() - t0) * 1000)
+        like_ms = _percentile(like_samples, 0.5)
+        print(f"   ✓ Прежний LIKE по редкому email: {like_ms:.0f}ms")
+
+        budget_ms = like_ms / MIN_SPEEDUP_VS_LIKE
+        slow = {k: v[1] for k, v in results.items() if v[1] >= budget_ms}
+        assert not slow, (budget_ms, slow)
+        print(f"   ✓ Все запросы: p95 < {budget_ms:.0f}ms (в {MIN_SPEEDUP_VS_LIKE}+ раз быстрее LIKE)")
+        print(f"   ✓ Статистика: {audit.stats}")
+        conn.close()
+
+    print("\n✅ Бенчмарк: PASSED")
+    return True
+
+
+def test_export_and_retention():
+    """Тест 4: Потоковый экспорт и архив старых месяцев"""
+    print("\n" + "="*60)
+    print("TEST 4: Экспорт и хранение по месяцам")
+    print("="*60)
+
+    from admin_app.audit_logger import AuditLogger
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "audit.db"))
+        audit = AuditLogger(conn, ADMINS[0], archive_dir=os.path.join(tmp, "archive"))
+        # 6 месяцев по 100 записей; чётные — ADMINS[0]
+        rows = [
+            (i, f"2026-{i % 6 + 1:02d}-{i % 28 + 1:02d}T10:00:00.{i:06d}", ADMINS[i % 2],
+             "UPDATE", "USER", f"user{i}@company.com", json.dumps({"status": "Обед"}, ensure_ascii=False),
+             None, "10.0.0.1", "admin-pc", i % 5 != 0, None if i % 5 else "ошибка, \"кавычки\"\nперевод")
+            for i in range(1, 601)
+        ]
+        audit._insert_rows(rows)
+
+        jsonl, csv_gz, js = (os.path.join(tmp, n) for n in ("a.jsonl", "a.csv.gz", "a.json"))
+        assert audit.export(jsonl) == 600
+        lines = [json.loads(line) for line in open(jsonl, encoding="utf-8")]
+        assert [d["timestamp"] for d in lines] == sorted(r[1] for r in rows)
+        assert lines[0]["before_state"] == {"status": "Обед"} and lines[0]["success"] is True
+        assert audit.export(csv_gz, admin_email=ADMINS[1], action_type="UPDATE") == 300
+        with gzip.open(csv_gz, "rt", encoding="utf-8", newline="") as f:
+            table = list(csv.reader(f))
+        assert table[0] == list(AuditLogger.FIELDS) and len(table) == 301
+        assert any("\n" in r[11] for r in table[1:])
+        assert not any(n.endswith(".part") for n in os.listdir(tmp))
+        print("   ✓ export: JSON Lines и CSV.gz (фильтры, заголовок, многострочные поля)")
+
+        # export_to_json — как прежде: массив с отступами, текущий админ, новые первыми
+        assert audit.export_to_json(js, start_date=datetime(2026, 2, 1))
+        data = json.load(open(js, encoding="utf-8"))
+        expected = [audit._row_to_dict(r) for r in sorted(rows, key=lambda r: r[1], reverse=True)
+                    if r[2] == ADMINS[0] and r[1] >= "2026-02-01"]
+        assert data == expected
+        assert open(js, encoding="utf-8").read() == json.dumps(expected, indent=2, ensure_ascii=False)
+        assert audit.export_to_json(js, start_date=datetime(2030, 1, 1)) and json.load(open(js)) == []
+        print(f"   ✓ export_to_json: тот же файл, что json.dump ({len(data)} записей)")
+
+        # Хранение: текущий июнь + 2 месяца, январь-март — в архив
+        result = audit.run_retention(keep_months=2, now=datetime(2026, 6, 15))
+        assert result["cutoff"] == "2026-04" and result["rows"] == 300
+        assert [a["month"] for a in result["archived"]] == ["2026-01", "2026-02", "2026-03"]
+        assert conn.execute("SELECT MIN(timestamp) FROM audit_log").fetchone()[0] >= "2026-04"
+        assert sorted(os.listdir(os.path.join(tmp, "archive"))) == [
+            "audit_2026-01.jsonl.gz", "audit_2026-02.jsonl.gz", "audit_2026-03.jsonl.gz"]
+        assert audit.run_retention(keep_months=2, now=datetime(2026, 6, 15))["rows"] == 0
+        assert audit.run_retention(keep_months=0)["archived"] == []
+        # Удалённые строки ушли и из индекса поиска
+        assert not audit.search("user6@company.com") and audit.search("user4@company.com")
+        print("   ✓ run_retention: 3 месяца в архиве, в БД с 2026-04, повтор — без изменений")
+
+        # Запоздавшая запись в архивный месяц — вторая часть файла.
+        # Порядок: архив сброшен на диск (fsync) раньше, чем строки удалены из БД
+        import admin_app.audit_logger as audit_module
+        events, real_fsync = [], audit_module.os.fsync
+        audit_module.os.fsync = lambda fd: (events.append("fsync"), real_fsync(fd))[1]
+        conn.set_trace_callback(lambda sql: sql.lstrip().startswith("DELETE") and events.append("DELETE"))
+        try:
+            audit._insert_rows([(601,) + rows[5][1:]])
+            assert audit.archive_month("2026-01")["file"] == "audit_2026-01.2.jsonl.gz"
+        finally:
+            audit_module.os.fsync = real_fsync
+            conn.set_trace_callback(None)
+        assert "DELETE" in events and "fsync" in events[:events.index("DELETE")], events
+        assert [a["rows"] for a in audit.list_archives(end_date=datetime(2026, 1, 31))] == [100, 1]
+        print("   ✓ Повторная архивация месяца — отдельной частью, fsync архива до DELETE")
+
+        # Архив доступен для чтения по запросу
+        feb = list(audit.iter_archived(admin_email=ADMINS[1], start_date=datetime(2026, 2, 1),
+                                       end_date=datetime(2026, 2, 28, 23, 59)))
+        assert len(feb) == 100 and all(e.timestamp.startswith("2026-02") for e in feb)
+        assert sorted(e.id for e in audit.iter_archived()) == [r[0] for r in rows if r[1] < "2026-04"] + [601]
+        archive = audit.open_archive(start_date=datetime(2026, 1, 1), end_date=datetime(2026, 2, 28))
+        assert archive.get_statistics()["total_actions"] == 201
+        found = archive.search("user6@company.com")
+        assert [e.id for e in found] == [601, 6] and found[1].to_dict() == audit._row_to_dict(rows[5])
+        assert conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 300
+        print("   ✓ iter_archived / open_archive: фильтры, поиск и статистика по архиву")
+        print(f"   ✓ Статистика: {audit.stats}")
+        conn.close()
+
+    print("\n✅ Экспорт и хранение: PASSED")
+    return True
+
+
+def _rss_mb() -> float:
+    """Резидентная память процесса (Linux), МБ"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def test_export_memory():
+    """Тест 5: Память при экспорте большого журнала"""
+    print("\n" + "="*60)
+    print(f"TEST 5: Экспорт {EXPORT_BENCH_ROWS:,} записей")
+    print("="*60)
+    if not os.path.exists("/proc/self/statm"):
+        raise SkipTest("нет /proc (замер RSS только на Linux)")
+
+    from admin_app.audit_logger import AuditLogger
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "audit.db"))
+        conn.execute("PRAGMA journal_mode=WAL")
+        audit = AuditLogger(conn, ADMINS[0])
+
+        # Генерация в SQL; индекс поиска экспорту не нужен — вставка без триггера FTS
+        t0 = time.perf_counter()
+        conn.execute("DROP TRIGGER IF EXISTS audit_log_fts_ai")
+        conn.execute("""
+            INSERT INTO audit_log
+            WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < ?)
+            SELECT i, strftime('%Y-%m-%dT%H:%M:%f', '2024-01-01', '+' || (i * 13) || ' seconds'),
+                   'admin' || (i % 20) || '@company.com', 'UPDATE_USER_STATUS', 'USER',
+                   'user' || (i % 5000) || '@company.com', '{"status": "В работе"}',
+                   '{"status": "Обед", "comment": "ticket-' || i || '"}', '10.0.0.1', 'admin-pc', 1, NULL
+            FROM seq
+        """, (EXPORT_BENCH_ROWS,))
+        conn.commit()
+        print(f"   ✓ Сгенерировано за {time.perf_counter() - t0:.1f}с")
+
+        # Фоновый замер RSS во время экспорта
+        samples, done = [], threading.Event()
+
+        def sample():
+            while not done.is_set():
+                samples.append(_rss_mb())
+                time.sleep(0.05)
+
+        for name in ("export.jsonl", "export.csv"):
+            path = os.path.join(tmp, name)
+            samples.clear()
+            done.clear()
+            base = _rss_mb()
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            t0 = time.perf_counter()
+            count = audit.export(path)
+            elapsed = time.perf_counter() - t0
+            done.set()
+            sampler.join()
+            assert count == EXPORT_BENCH_ROWS, count
+
+            growth = max(samples) - base
+            # Плоский профиль: после первой десятой доли экспорта память уже не растёт
+            warm = max(samples[:max(1, len(samples) // 10)]) - base
+            size_mb = os.path.getsize(path) / 2**20
+            print(f"   {name:14} {elapsed:6.1f}с  {count / elapsed:9,.0f} строк/с  файл {size_mb:7.0f}МБ  "
+                  f"RSS +{growth:.1f}МБ (после 10%: +{warm:.1f}МБ)")
+            assert growth < MAX_EXPORT_RSS_MB, growth
+            assert growth - warm < MAX_EXPORT_RSS_MB / 4, (growth, warm)
+            os.remove(path)
+
+        print(f"   ✓ Прирост RSS < {MAX_EXPORT_RSS_MB}МБ и не зависит от числа строк")
+        conn.close()
+
+    print("\n✅ Экспорт большого журнала: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Запись пачками", test_batched_writes),
+        ("FTS5", test_fts_sync),
+        ("Бенчмарк", test_benchmark),
+        ("Экспорт и хранение", test_export_and_retention),
+        ("Экспорт большого журнала", test_export_memory),
+    ]
+
+    return run_tests("Audit Logger Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
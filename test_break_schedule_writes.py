@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Тестирование пакетной записи BreakManager: шаблоны графика
+(replace_schedule_block) и массовое назначение (assign_schedules_bulk)
+
+Фейковый лист BreakSchedules повторяет семантику gspread (сетка строк,
+batch_update по A1-диапазонам, batch_clear, append_rows) и считает запросы.
+Проверяет:
+- Создание, правка и удаление шаблона — один запрос записи
+- Пишутся только изменившиеся строки, соседние шаблоны не затрагиваются
+- Освободившиеся строки переиспользуются, за сеткой — append_rows
+- Ошибка записи не оставляет шаблон записанным наполовину
+- Массовое назначение: по одному чтению листов и одна запись на пакет,
+  отчёт по каждому сотруднику
+- Пустой лист назначений: заголовок пишется в строку 1
+"""
+
+import re
+import sys
+from datetime import date
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from testing_support import run_tests, skip_without_config
+
+HEADER = ["ScheduleID", "Name", "ShiftStart", "ShiftEnd", "SlotType",
+          "Duration", "WindowStart", "WindowEnd", "Order"]
+ASSIGN_HEADER = ["Email", "ScheduleID", "EffectiveDate", "AssignedBy"]
+WRITES = {"batch_update", "batch_clear", "append_rows", "append_row", "update", "clear", "delete_rows"}
+
+
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+class FakeWorksheet:
+    """Сетка row_count строк; get_all_values обрезает хвостовые пустые строки"""
+    def __init__(self, rows, row_count: int = 100):
+        self.row_count = row_count
+        self.grid = [list(r) for r in rows] + [[] for _ in range(row_count - len(rows))]
+        self.calls = []
+        self.fail_on = None
+
+    def _log(self, name):
+        self.calls.append(name)
+        if name == self.fail_on:
+            raise RuntimeError(f"{name}: quota exceeded")
+
+    def get_all_values(self):
+        self._log("get_all_values")
+        rows = [list(r) for r in self.grid]
+        while rows and not any(c for c in rows[-1]):
+            rows.pop()
+        width = max((len(r) for r in rows), default=0)
+        return [r + [""] * (width - len(r)) for r in rows]
+
+    def _write(self, a1, values):
+        m = re.fullmatch(r"([A-Z]+)(\d+):([A-Z]+)(\d+)", a1)
+        c1, r1, c2, r2 = _col_index(m[1]), int(m[2]), _col_index(m[3]), int(m[4])
+        assert r2 <= self.row_count, f"{a1} за пределами сетки"
+        for dr, r in enumerate(range(r1, r2 + 1)):
+            row = self.grid[r - 1]
+            row.extend([""] * (c2 - len(row)))
+            src = values[dr] if dr < len(values) else []
+            for dc, c in enumerate(range(c1, c2 + 1)):
+                row[c - 1] = src[dc] if dc < len(src) else ""
+
+    def batch_update(self, data, value_input_option=None):
+        self._log("batch_update")
+        for item in data:
+            self._write(item["range"], item["values"])
+
+    def batch_clear(self, ranges):
+        self._log("batch_clear")
+        for a1 in ranges:
+            self._write(a1, [])
+
+    def append_rows(self, values, value_input_option=None):
+        self._log("append_rows")
+        last = max((i + 1 for i, r in enumerate(self.grid) if any(c for c in r)), default=0)
+        for i, row in enumerate(values):
+            if last + i >= len(self.grid):
+                self.grid.append([])
+                self.row_count += 1
+            self.grid[last + i] = list(row)
+
+    def append_row(self, row, value_input_option=None):
+        self.append_rows([row])
+        self.calls[-1] = "append_row"
+
+    def writes(self):
+        return [c for c in self.calls if c in WRITES]
+
+
+class FakeSheets:
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+
+    def get_worksheet(self, name):
+        return self.worksheets[name]
+
+    def _request_with_retry(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def _read_table(self, ws):
+        rows = ws.get_all_values()
+        header = rows[0]
+        return [dict(zip(header, r)) for r in rows[1:] if any(c.strip() for c in r)]
+
+
+def _slots(n_breaks: int = 6, n_lunch: int = 3, start: str = "10:00"):
+    slots = [{"slot_type": "Перерыв", "duration": 15, "window_start": start,
+              "window_end": "12:00", "order": i + 1} for i in range(n_breaks)]
+    slots += [{"slot_type": "Обед", "duration": 60, "window_start": "13:00",
+               "window_end": "14:00", "order": i + 1} for i in range(n_lunch)]
+    return slots
+
+
+def _manager(rows=None, row_count: int = 100, assignments=None):
+    from admin_app.break_manager import BreakManager
+    other = [["OTHER", "Чужой", "08:00", "17:00", "Обед", "60", "12:00", "13:00", "1"]]
+    ws = FakeWorksheet([HEADER] + (rows if rows is not None else other), row_count=row_count)
+    assign_ws = FakeWorksheet(assignments or [ASSIGN_HEADER], row_count=1000)
+    mgr = BreakManager(FakeSheets({"BreakSchedules": ws, "UserBreakAssignments": assign_ws}))
+    return mgr, ws
+
+
+def _block(ws, sid):
+    return [r for r in ws.get_all_values()[1:] if r and r[0] == sid]
+
+
+def test_single_request_writes():
+    """Тест 1: Создание, правка и удаление — один запрос записи"""
+    print("="*60)
+    print("TEST 1: Один запрос на операцию")
+    print("="*60)
+    skip_without_config()
+
+    mgr, ws = _manager()
+    other_before = _block(ws, "OTHER")
+
+    assert mgr.create_schedule_template("S9", "9 строк", "09:00", "18:00", _slots())
+    assert ws.writes() == ["batch_update"], ws.calls
+    assert len(_block(ws, "S9")) == 9
+    print("   ✓ Создание шаблона из 9 строк: 1 запрос (раньше 9 × append_row)")
+
+    # Правка одного окна: перезаписываются только изменившиеся строки
+    ws.calls.clear()
+    slots = _slots()
+    slots[0]["window_start"] = "10:30"
+    assert mgr.update_schedule_template("S9", "9 строк", "09:00", "18:00", slots)
+    assert ws.writes() == ["batch_update"], ws.calls
+    assert _block(ws, "S9")[0][6] == "10:30"
+    print("   ✓ Правка одного окна: 1 запрос (раньше удаление + пересоздание)")
+
+    rows = mgr._build_schedule_rows("S9", "9 строк", "09:00", "18:00",
+                                    [{"break_type": "Перерыв", "time_minutes": 15}],
+                                    [{"break_type": "Перерыв", "start": "10:30", "end": "12:00", "priority": 1}])
+    ws.calls.clear()
+    stats = mgr.replace_schedule_block("S9", rows)
+    assert stats == {"updated": 0, "cleared": 8, "appended": 0, "unchanged": 1, "requests": 1}, stats
+    assert ws.writes() == ["batch_update"] and len(_block(ws, "S9")) == 1
+    print(f"   ✓ Сокращение до 1 строки: {stats}")
+
+    # Рост обратно: очищенные строки переиспользуются
+    ws.calls.clear()
+    assert mgr.create_schedule_template("S9", "9 строк", "09:00", "18:00", _slots())
+    assert ws.writes() == ["batch_update"] and len(_block(ws, "S9")) == 9
+    assert len(ws.get_all_values()) == 11  # заголовок + OTHER + 9, без дыр в конце
+    print("   ✓ Рост до 9 строк: 1 запрос, пустые строки переиспользованы")
+
+    ws.calls.clear()
+    assert mgr.delete_schedule_template("S9")
+    assert ws.writes() == ["batch_clear"] and _block(ws, "S9") == []
+    assert _block(ws, "OTHER") == other_before
+    assert [s["schedule_id"] for s in mgr.list_schedules()] == ["OTHER"]
+    print("   ✓ Удаление: 1 batch_clear, соседний шаблон не тронут")
+
+    print("\n✅ Один запрос на операцию: PASSED")
+    return True
+
+
+def test_roundtrip_and_grid():
+    """Тест 2: Чтение после записи и конец сетки"""
+    print("\n" + "="*60)
+    print("TEST 2: Чтение после записи, append_rows за сеткой")
+    print("="*60)
+    skip_without_config()
+
+    # Сетка впритык: новые строки можно только дописать
+    mgr, ws = _manager(row_count=2)
+    assert mgr.create_schedule_template("S9", "9 строк", "09:00", "18:00", _slots())
+    assert ws.writes() == ["append_rows"], ws.calls
+    schedule = mgr.get_schedule("S9")
+    assert schedule.name == "9 строк" and len(schedule.windows) == 9
+    assert {l.break_type: l.time_minutes for l in schedule.limits} == {"Перерыв": 15, "Обед": 60}
+    print("   ✓ Сетка кончилась: 1 append_rows; get_schedule читает шаблон")
+
+    # Кэш шаблона сбрасывается записью
+    slots = _slots()
+    for s in slots:
+        s["duration"] = 20 if s["slot_type"] == "Перерыв" else 45
+    ws.calls.clear()
+    assert mgr.update_schedule_template("S9", "9 строк", "09:00", "18:00", slots)
+    assert ws.writes() == ["batch_update"]
+    assert {l.break_type: l.time_minutes for l in mgr.get_schedule("S9").limits} == {"Перерыв": 20, "Обед": 45}
+    print("   ✓ После правки get_schedule видит новые лимиты")
+
+    # Повторная запись без изменений — ни одного запроса записи
+    ws.calls.clear()
+    stats = mgr.replace_schedule_block("S9", [r for r in _block(ws, "S9")])
+    assert ws.writes() == [] and stats["unchanged"] == 9 and stats["requests"] == 0
+    print("   ✓ Без изменений: 0 запросов записи")
+
+    print("\n✅ Чтение после записи: PASSED")
+    return True
+
+
+def test_failure_is_atomic():
+    """Тест 3: Ошибка записи не оставляет полузаписанный шаблон"""
+    print("\n" + "="*60)
+    print("TEST 3: Атомарность при ошибке")
+    print("="*60)
+    skip_without_config()
+
+    mgr, ws = _manager()
+    assert mgr.create_schedule_template("S9", "9 строк", "09:00", "18:00", _slots())
+    before = ws.get_all_values()
+
+    ws.fail_on = "batch_update"
+    slots = _slots(n_breaks=4, n_lunch=1, start="11:00")
+    assert mgr.update_schedule_template("S9", "9 строк", "09:00", "18:00", slots) is False
+    assert ws.get_all_values() == before
+    print("   ✓ Ошибка batch_update: лист не изменён, update вернул False")
+
+    ws.fail_on = "batch_clear"
+    assert mgr.delete_schedule("S9") is False
+    assert len(_block(ws, "S9")) == 9
+    print("   ✓ Ошибка batch_clear: шаблон цел, delete вернул False")
+
+    print("\n✅ Атомарность: PASSED")
+    return True
+
+
+def test_bulk_assign():
+    """Тест 4: Массовое назначение графиков"""
+    print("\n" + "="*60)
+    print("TEST 4: Массовое назначение (300 сотрудников)")
+    print("="*60)
+    skip_without_config()
+
+    from admin_app.break_manager import ScheduleAssignment
+    existing = [ASSIGN_HEADER]
+    existing += [[f"u{i}@x.ru", "OTHER", "2026-01-01", "boss"] for i in range(50)]    # сменят шаблон
+    existing += [[f"u{i}@x.ru", "S9", "2026-01-01", "boss"] for i in range(50, 100)]  # уже назначен
+    mgr, ws = _manager(assignments=existing)
+    assert mgr.create_schedule_template("S9", "9 строк", "09:00", "18:00", _slots())
+    assign_ws = mgr.sheets.get_worksheet("UserBreakAssignments")
+    ws.calls.clear()
+
+    batch = [ScheduleAssignment(f"U{i}@x.ru ", "S9") for i in range(300)]
+    batch += [
+        ScheduleAssignment("broken", "S9"),
+        ScheduleAssignment("z1@x.ru", "NOPE"),
+        ScheduleAssignment("z2@x.ru", "S9", "2026-13-01"),
+        ScheduleAssignment("z3@x.ru", "S9", "2026-02-10", "2026-02-01"),
+        ("u299@x.ru", "OTHER", "2026-03-01"),  # повтор: действует последняя запись
+    ]
+    report = mgr.assign_schedules_bulk(batch, "admin@x.ru")
+
+    assert len(report) == len(batch)
+    statuses = {}
+    for r in report:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    assert statuses == {"updated": 50, "unchanged": 50, "created": 200, "skipped": 1, "error": 4}, statuses
+    assert report[299]["status"] == "skipped" and report[-1]["status"] == "created"
+    assert [r["status"] for r in report[300:304]] == ["error"] * 4
+    print(f"   ✓ Отчёт по каждому: {statuses}")
+
+    assert ws.calls == ["get_all_values"], ws.calls  # лист шаблонов — одно чтение
+    assert assign_ws.calls == ["get_all_values", "batch_update"], assign_ws.calls
+    print("   ✓ 2 чтения листов и 1 запись на пакет из 305 строк")
+
+    rows = assign_ws.get_all_values()[1:]
+    by_email = {}
+    for r in rows:
+        by_email.setdefault(r[0], []).append(r)
+    assert len(by_email) == 300 and all(len(v) == 1 for v in by_email.values())
+    assert by_email["u10@x.ru"][0][1:] == ["S9", date.today().isoformat(), "admin@x.ru"]
+    assert by_email["u60@x.ru"][0][1:] == ["S9", "2026-01-01", "boss"]   # не тронут
+    assert by_email["u299@x.ru"][0][1:] == ["OTHER", "2026-03-01", "admin@x.ru"]
+    print("   ✓ По одной строке на сотрудника, неизменённые строки не переписаны")
+
+    # Повтор того же пакета: записывать нечего
+    assign_ws.calls.clear()
+    again = mgr.assign_schedules_bulk(batch[:299], "admin@x.ru")
+    assert {r["status"] for r in again} == {"unchanged"} and assign_ws.writes() == []
+    print("   ✓ Повторный пакет: всё unchanged, 0 запросов записи")
+
+    # Для сравнения — прежний путь по одному сотруднику
+    assign_ws.calls.clear()
+    for i in range(20):
+        assert mgr.assign_schedule(f"new{i}@x.ru", "S9", "admin@x.ru")
+    reads = sum(1 for c in assign_ws.calls if c == "get_all_values")
+    print(f"   ✓ assign_schedule × 20: {reads} чтений листа и {len(assign_ws.writes())} записей")
+
+    print("\n✅ Массовое назначение: PASSED")
+    return True
+
+
+def test_bulk_assign_dates_and_errors():
+    """Тест 5: Период назначения и ошибки записи"""
+    print("\n" + "="*60)
+    print("TEST 5: Период назначения и ошибки записи")
+    print("="*60)
+    skip_without_config()
+
+    from admin_app.break_manager import ScheduleAssignment
+    mgr, _ = _manager()
+    assign_ws = mgr.sheets.get_worksheet("UserBreakAssignments")
+
+    report = mgr.assign_schedules_bulk([ScheduleAssignment("a@x.ru", "OTHER", "2026-02-01", "2026-02-28")], "adm")
+    assert report[0]["status"] == "created" and "EndDate" in report[0]["message"]
+    print("   ✓ Нет колонки EndDate: назначение записано, в отчёте предупреждение")
+
+    mgr, _ = _manager(assignments=[ASSIGN_HEADER + ["EndDate"]])
+    assign_ws = mgr.sheets.get_worksheet("UserBreakAssignments")
+    report = mgr.assign_schedules_bulk([ScheduleAssignment("a@x.ru", "OTHER", "2026-02-01", "2026-02-28")], "adm")
+    assert report[0] == {"email": "a@x.ru", "schedule_id": "OTHER", "status": "created", "message": ""}
+    assert assign_ws.get_all_values()[1] == ["a@x.ru", "OTHER", "2026-02-01", "adm", "2026-02-28"]
+    print("   ✓ Есть колонка EndDate: период записан целиком")
+
+    assign_ws.fail_on = "batch_update"
+    report = mgr.assign_schedules_bulk([("a@x.ru", "OTHER", "2026-03-01"), ("b@x.ru", "OTHER")], "adm")
+    assert [r["status"] for r in report] == ["error", "error"]
+    assert "quota exceeded" in report[0]["message"]
+    assert len(assign_ws.get_all_values()) == 2
+    print("   ✓ Ошибка записи: все изменения пакета помечены error, лист не изменён")
+
+    print("\n✅ Период и ошибки: PASSED")
+    return True
+
+
+def test_bulk_assign_empty_sheet():
+    """Тест 6: Массовое назначение в пустой лист"""
+    print("\n" + "="*60)
+    print("TEST 6: Пустой лист назначений")
+    print("="*60)
+    skip_without_config()
+
+    mgr, _ = _manager()
+    assign_ws = FakeWorksheet([], row_count=1000)
+    mgr.sheets.worksheets["UserBreakAssignments"] = assign_ws
+
+    report = mgr.assign_schedules_bulk([("a@x.ru", "OTHER", "2026-02-01"), ("b@x.ru", "OTHER")], "adm")
+    assert [r["status"] for r in report] == ["created", "created"], report
+    assert assign_ws.writes() == ["batch_update"], assign_ws.calls
+    rows = assign_ws.get_all_values()
+    assert rows[0] == ASSIGN_HEADER, rows[:2]
+    assert [r[0] for r in rows[1:]] == ["a@x.ru", "b@x.ru"], rows
+    print("   ✓ Заголовок в строке 1, назначения со строки 2, без пустой первой строки")
+
+    # Лист снова читается как таблица
+    again = mgr.assign_schedules_bulk([("a@x.ru", "OTHER", "2026-02-01")], "adm")
+    assert again[0]["status"] == "unchanged", again
+    print("   ✓ Повторное назначение видит записанные строки")
+
+    print("\n✅ Пустой лист: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Один запрос", test_single_request_writes),
+        ("Чтение после записи", test_roundtrip_and_grid),
+        ("Атомарность", test_failure_is_atomic),
+        ("Массовое назначение", test_bulk_assign),
+        ("Период и ошибки", test_bulk_assign_dates_and_errors),
+        ("Пустой лист", test_bulk_assign_empty_sheet),
+    ]
+
+    return run_tests("Break Schedule Write Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -22,7 +22,9 @@ from shared.resilience.circuit_breaker import (
     CircuitBreaker,
     CircuitState,
     CircuitOpenError,
-    circuit_breaker
+    circuit_breaker,
+    get_circuit_breaker,
+    get_all_circuit_breakers
 )
 
 # Счетчики для тестов
@@ -329,6 +331,126 @@ def test_metrics():
     return True
 
 
+def test_sliding_window():
+    """Тест 6: Доля ошибок в скользящем окне"""
+    print("\n" + "="*60)
+    print("TEST 6: Скользящее окно (N вызовов / T секунд)")
+    print("="*60)
+    
+    breaker = CircuitBreaker(
+        name="WindowService",
+        recovery_timeout=1,
+        window_size=10,
+        window_seconds=60,
+        failure_rate_threshold=0.5,
+        min_calls=4
+    )
+    
+    # Чередуем: ошибок 3 подряд не бывает, но доля ниже порога
+    print("\n1. 6 успехов + 4 ошибки вперемешку (40%)...")
+    for ok in (True, False, True, True, False, True, False, True, True, False):
+        breaker.record_success() if ok else breaker.record_failure()
+    metrics = breaker.get_metrics()
+    assert breaker.state == CircuitState.CLOSED, breaker.state
+    print(f"   ✓ CLOSED, failure_rate={metrics['window_failure_rate']:.0%}")
+    
+    print("\n2. Ещё 2 ошибки — доля в последних 10 вызовах >= 50%...")
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN, breaker.state
+    print(f"   ✓ OPEN, failure_rate={breaker.get_metrics()['window_failure_rate']:.0%}")
+    
+    print("\n3. min_calls: 3 ошибки из 3 вызовов не открывают (min_calls=4)...")
+    fresh = CircuitBreaker("WindowFresh", window_size=10, min_calls=4)
+    for _ in range(3):
+        fresh.record_failure()
+    assert fresh.state == CircuitState.CLOSED
+    print("   ✓ CLOSED")
+    
+    print("\n4. Окно по времени: старые ошибки выпадают...")
+    timed = CircuitBreaker("WindowTimed", window_seconds=0.3, min_calls=3)
+    timed.record_failure()
+    timed.record_failure()
+    time.sleep(0.4)
+    timed.record_failure()
+    assert timed.state == CircuitState.CLOSED
+    assert timed.get_metrics()['window_calls'] == 1
+    print("   ✓ В окне 1 вызов, CLOSED")
+    
+    print("\n✅ Скользящее окно: PASSED")
+    return True
+
+
+def test_half_open_probes():
+    """Тест 7: Ограничение пробных запросов в HALF_OPEN"""
+    print("\n" + "="*60)
+    print("TEST 7: HALF_OPEN probes")
+    print("="*60)
+    
+    breaker = CircuitBreaker(
+        name="ProbeService",
+        failure_threshold=1,
+        recovery_timeout=0.2,
+        success_threshold=2,
+        half_open_max_calls=2
+    )
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    time.sleep(0.3)
+    
+    print("\n1. После recovery_timeout пропускаем ровно 2 пробы...")
+    assert breaker.allows_requests()
+    allowed = [breaker.can_execute() for _ in range(4)]
+    assert allowed == [True, True, False, False], allowed
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert not breaker.allows_requests()
+    print(f"   ✓ can_execute: {allowed}")
+    
+    print("\n2. Проба освободилась (release) — следующая проходит...")
+    breaker.release()
+    assert breaker.can_execute()
+    print("   ✓ Слот освобождён")
+    
+    print("\n3. 2 успеха — CLOSED...")
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.get_metrics()['half_open_in_flight'] == 0
+    print("   ✓ CLOSED, слотов в полёте: 0")
+    
+    print("\n✅ HALF_OPEN probes: PASSED")
+    return True
+
+
+def test_operation_classes():
+    """Тест 8: Отдельные breakers на класс операций"""
+    print("\n" + "="*60)
+    print("TEST 8: Breakers по классам операций")
+    print("="*60)
+    
+    profile = dict(window_size=10, window_seconds=60, min_calls=3, recovery_timeout=60)
+    breakers = {
+        op: get_circuit_breaker(f"ClassTest.{op}", **profile)
+        for op in ("read", "append", "update", "metadata")
+    }
+    
+    print("\n1. Чтения падают — открывается только read...")
+    for _ in range(3):
+        breakers["read"].record_failure()
+    assert breakers["read"].state == CircuitState.OPEN
+    assert breakers["append"].can_execute()
+    assert breakers["update"].can_execute()
+    print("   ✓ read OPEN, append/update пропускают запросы")
+    
+    print("\n2. Все классы в реестре...")
+    registered = [n for n in get_all_circuit_breakers() if n.startswith("ClassTest.")]
+    assert sorted(registered) == sorted(f"ClassTest.{op}" for op in breakers), registered
+    print(f"   ✓ {sorted(registered)}")
+    
+    print("\n✅ Классы операций: PASSED")
+    return True
+
+
 def main():
     """Запуск всех тестов"""
     print("╔" + "="*58 + "╗")
@@ -341,6 +463,9 @@ def main():
         ("Декоратор", test_decorator),
         ("Concurrent Access", test_concurrent_access),
         ("Метрики", test_metrics),
+        ("Скользящее окно", test_sliding_window),
+        ("HALF_OPEN probes", test_half_open_probes),
+        ("Классы операций", test_operation_classes),
     ]
     
     results = []
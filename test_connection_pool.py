@@ -236,6 +236,67 @@ def test_error_handling():
     print("\n✅ Error handling: PASSED")
     return True
 
+def test_read_only_pool_and_metrics():
+    """Тест пула читателей (query_only) и метрик ожидания/удержания"""
+    print("\n" + "="*60)
+    print("TEST 5: Пул читателей + метрики")
+    print("="*60)
+    
+    import tempfile
+    import sqlite3
+    tmp_dir = tempfile.mkdtemp()
+    db_path = str(Path(tmp_dir) / 'readers.db')
+    
+    writer = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    writer.execute("PRAGMA journal_mode=WAL")
+    writer.execute("CREATE TABLE logs (id INTEGER PRIMARY KEY, synced INTEGER DEFAULT 0)")
+    writer.execute("INSERT INTO logs (synced) VALUES (0)")
+    
+    readers = ConnectionPool(db_path, pool_size=3, read_only=True, row_factory=None)
+    
+    # 1. Строки — обычные tuple
+    print("\n1. row_factory=None...")
+    row = readers.execute_query("SELECT id, synced FROM logs", fetch='one')
+    assert row == (1, 0), row
+    print(f"   ✓ Строка: {row}")
+    
+    # 2. Запись через читателя запрещена
+    print("\n2. Запись через читателя...")
+    try:
+        readers.execute_query("DELETE FROM logs", fetch='none')
+        print("   ❌ Запись НЕ запрещена!")
+        return False
+    except sqlite3.OperationalError as e:
+        print(f"   ✓ Запрещено: {e}")
+    
+    # 3. Чтение не ждет открытую транзакцию писателя (WAL)
+    print("\n3. Чтение во время записи...")
+    writer.execute("BEGIN IMMEDIATE")
+    writer.execute("INSERT INTO logs (synced) VALUES (0)")
+    start = time.time()
+    cnt = readers.execute_query("SELECT COUNT(*) FROM logs", fetch='one')[0]
+    elapsed = time.time() - start
+    writer.execute("COMMIT")
+    assert cnt == 1, cnt
+    assert elapsed < 1.0, elapsed
+    print(f"   ✓ Прочитано {cnt} (снимок до COMMIT) за {elapsed*1000:.1f}ms")
+    
+    # 4. Метрики удержания
+    print("\n4. Метрики...")
+    with readers.get_connection() as conn:
+        time.sleep(0.05)
+    stats = readers.get_stats()
+    assert stats['hold_count'] >= 4, stats
+    assert stats['max_hold_time'] >= 0.05, stats
+    print(f"   ✓ avg_hold={stats['avg_hold_time']*1000:.1f}ms, "
+          f"max_hold={stats['max_hold_time']*1000:.1f}ms, "
+          f"max_wait={stats['max_wait_time']*1000:.2f}ms")
+    
+    readers.close_all()
+    writer.close()
+    print("\n✅ Read-only pool: PASSED")
+    return True
+
 def main():
     """Запуск всех тестов"""
     print("╔" + "="*58 + "╗")
@@ -247,6 +308,7 @@ def main():
         ("Concurrent Access", test_concurrent_access),
         ("Производительность", test_performance_comparison),
         ("Обработка ошибок", test_error_handling),
+        ("Пул читателей", test_read_only_pool_and_metrics),
     ]
     
     results = []
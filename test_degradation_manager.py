@@ -354,6 +354,89 @@ def test_all_capabilities():
     return True
 
 
+def test_event_driven():
+    """Тест 8: Переоценка по событиям и гистерезис"""
+    print("\n" + "="*60)
+    print("TEST 8: События и гистерезис")
+    print("="*60)
+    
+    import sync.network as network
+    from sync.network import ReachabilityMonitor
+    from shared.resilience.circuit_breaker import CircuitBreaker
+    
+    # Монитор сети с управляемой пробой вместо реального TCP
+    probe_ok = [True]
+    monitor = ReachabilityMonitor(probe=lambda: probe_ok[0], min_interval=0.05, max_interval=0.05)
+    network._monitor = monitor
+    monitor.probe_now()
+    monitor.start()
+    
+    health_checker = HealthChecker()
+    for name in ('database', 'sheets_api', 'telegram_api', 'internet'):
+        health_checker.statuses[name] = ComponentHealth(
+            component=name,
+            status=HealthStatus.HEALTHY,
+            message="OK",
+            last_check=datetime.now(),
+            check_duration_ms=0
+        )
+    manager = DegradationManager(health_checker=health_checker, recovery_hold=0.5)
+    
+    print("\n1. Страховочный интервал 30 сек, ждём только события...")
+    manager.start_auto_evaluation(interval=30)
+    time.sleep(0.2)
+    assert manager.get_current_mode() == SystemMode.FULL
+    
+    print("\n2. Сеть пропала...")
+    probe_ok[0] = False
+    start = time.time()
+    while manager.get_current_mode() != SystemMode.OFFLINE and time.time() - start < 2:
+        time.sleep(0.01)
+    elapsed = time.time() - start
+    assert manager.get_current_mode() == SystemMode.OFFLINE
+    print(f"   ✓ OFFLINE через {elapsed:.2f}s (health checks не менялись)")
+    
+    print("\n3. Сеть вернулась — восстановление с удержанием...")
+    probe_ok[0] = True
+    start = time.time()
+    while manager.get_current_mode() != SystemMode.FULL and time.time() - start < 3:
+        time.sleep(0.01)
+    elapsed = time.time() - start
+    assert manager.get_current_mode() == SystemMode.FULL
+    assert elapsed >= 0.5, elapsed
+    print(f"   ✓ FULL через {elapsed:.2f}s (recovery_hold=0.5s)")
+    
+    print("\n4. Circuit breaker записи открылся...")
+    breaker = CircuitBreaker("GoogleSheetsAPI.append", failure_threshold=1)
+    breaker.record_failure(Exception("503"))
+    start = time.time()
+    while manager.get_current_mode() == SystemMode.FULL and time.time() - start < 2:
+        time.sleep(0.01)
+    assert manager.get_current_mode() == SystemMode.DEGRADED
+    print(f"   ✓ DEGRADED через {time.time() - start:.2f}s")
+    
+    print("\n5. Большая очередь синхронизации...")
+    with breaker.lock:
+        breaker._transition_to_closed()
+    time.sleep(0.8)
+    assert manager.get_current_mode() == SystemMode.FULL
+    manager.on_sync_queue_depth(5000)
+    time.sleep(0.2)
+    assert manager.get_current_mode() == SystemMode.DEGRADED
+    print("   ✓ Очередь выше порога → DEGRADED")
+    
+    metrics = manager.get_metrics()
+    assert metrics['event_evaluations'] >= 3
+    print(f"   ✓ Событий: {metrics['events_received']}, оценок по событию: {metrics['event_evaluations']}")
+    
+    manager.stop_auto_evaluation()
+    monitor.stop()
+    network._monitor = None
+    
+    print("\n✅ TEST 8: PASSED")
+    return True
+
+
 def main():
     """Запуск всех тестов"""
     print("╔" + "="*58 + "╗")
@@ -368,6 +451,7 @@ def main():
         ("Автоматическая оценка", test_auto_evaluation),
         ("Метрики", test_metrics),
         ("Все Capabilities", test_all_capabilities),
+        ("События и гистерезис", test_event_driven),
     ]
     
     results = []
@@ -28,10 +28,10 @@ try:
     sheets_checks = [
         ('Circuit Breaker импорт', 'from shared.resilience import get_circuit_breaker'),
         ('timedelta импорт', 'timedelta'),
-        ('Инициализация CB', 'self.circuit_breaker = get_circuit_breaker'),
-        ('Проверка can_execute', 'if not self.circuit_breaker.can_execute():'),
-        ('Запись успеха', 'self.circuit_breaker.record_success()'),
-        ('Запись ошибки', 'self.circuit_breaker.record_failure(e)'),
+        ('Инициализация CB', 'self.circuit_breakers = {'),
+        ('Проверка can_execute', 'if not breaker.can_execute():'),
+        ('Запись успеха', 'breaker.record_success()'),
+        ('Запись ошибки', 'breaker.record_failure(e)'),
         ('Метод check_credentials', 'def check_credentials(self)'),
         ('Метод get_circuit_breaker_metrics', 'def get_circuit_breaker_metrics(self)'),
         ('Метод is_available', 'def is_available(self)'),
@@ -297,6 +297,65 @@ def test_metrics():
     return True
 
 
+def test_parallel_timeouts_and_ttl():
+    """Тест 7: Параллельные проверки, таймауты, TTL, гистограммы"""
+    print("\n" + "="*60)
+    print("TEST 7: Параллельность, таймауты, TTL")
+    print("="*60)
+    
+    checker = HealthChecker(max_workers=4, default_timeout=2)
+    calls = {'disk': 0}
+    
+    def slow_check():
+        time.sleep(0.3)
+        return True, "Slow OK", None
+    
+    def hanging_check():
+        time.sleep(2)
+        return True, "Too late", None
+    
+    def disk_check():
+        calls['disk'] += 1
+        return True, "Disk OK", None
+    
+    print("\n1. Регистрация проверок...")
+    checker.register_check("slow_a", slow_check)
+    checker.register_check("slow_b", slow_check)
+    checker.register_check("hanging", hanging_check, timeout=0.5)
+    checker.register_check("disk", disk_check, ttl=60)
+    
+    print("\n2. Полная оценка...")
+    start = time.time()
+    results = checker.check_all()
+    elapsed = time.time() - start
+    print(f"   Время: {elapsed:.2f}s (последовательно было бы ≥ 2.6s)")
+    assert elapsed < 0.9, elapsed
+    assert results['slow_a'].healthy and results['slow_b'].healthy
+    assert results['hanging'].status == HealthStatus.UNHEALTHY
+    assert "timed out" in results['hanging'].message
+    print("   ✓ Проверки идут параллельно, зависшая ограничена таймаутом")
+    
+    print("\n3. Повторная оценка (TTL)...")
+    checker.check_all()
+    assert calls['disk'] == 1, calls
+    assert checker.get_status('disk').healthy
+    checker.check_all(force=True)
+    assert calls['disk'] == 2, calls
+    print("   ✓ Результат disk взят из кэша, force=True перепроверяет")
+    
+    print("\n4. Метрики...")
+    metrics = checker.get_metrics()
+    hist = metrics['check_duration_ms']['slow_a']
+    assert hist['count'] == 3 and hist['buckets'][500] == 3 and hist['buckets'][250] == 0
+    assert metrics['timeouts'] >= 1 and metrics['cache_hits'] == 1
+    print(f"   ✓ slow_a: count={hist['count']}, max={hist['max']:.0f}ms")
+    print(f"   ✓ timeouts={metrics['timeouts']}, cache_hits={metrics['cache_hits']}")
+    
+    checker.stop_monitoring()
+    print("\n✅ TEST 7: PASSED")
+    return True
+
+
 def main():
     """Запуск всех тестов"""
     print("╔" + "="*58 + "╗")
@@ -310,6 +369,7 @@ def main():
         ("Мониторинг", test_monitoring),
         ("Реальные проверки", test_real_checks),
         ("Метрики", test_metrics),
+        ("Параллельность и TTL", test_parallel_timeouts_and_ttl),
     ]
     
     results = []
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Тестирование HTTP-транспорта (shared.net.http_transport)
+
+Локальный HTTP/1.1-сервер считает TCP-соединения и одновременные запросы.
+Проверяет:
+- Размер пула: параллельных соединений не больше pool_size, лишние потоки ждут
+- Одна сессия переиспользует соединение (keep-alive) и считает это в get_stats()
+- Таймаут по умолчанию применяется к каждому запросу, явный — имеет приоритет
+- build_authorized_session: адаптер на https://, gspread работает через ту же сессию
+"""
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+import requests
+
+from shared.net import PooledHTTPAdapter, build_authorized_session
+from testing_support import SkipTest, run_tests
+
+
+class _Server:
+    """HTTP/1.1 с keep-alive: ?sleep=сек задерживает ответ"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.auth_headers = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server.lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                with server.lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    server.auth_headers.append(self.headers.get("Authorization"))
+                try:
+                    delay = float(parse_qs(urlparse(self.path).query).get("sleep", ["0"])[0])
+                    time.sleep(delay)
+                    body = b"ok"
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _session(adapter: PooledHTTPAdapter) -> requests.Session:
+    session = requests.Session()
+    session.mount("http://", adapter)
+    return session
+
+
+def test_pool_size():
+    """Тест 1: Параллельных соединений не больше pool_size"""
+    print("="*60)
+    print("TEST 1: Размер пула")
+    print("="*60)
+
+    server = _Server()
+    try:
+        adapter = PooledHTTPAdapter(pool_size=3)
+        session = _session(adapter)
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(2):
+                    assert session.get(server.url + "?sleep=0.1").text == "ok"
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+
+        assert not errors, errors
+        assert server.max_in_flight == 3, server.max_in_flight
+        assert server.connections == 3, server.connections
+        stats = adapter.get_stats()
+        assert stats["pool_size"] == 3 and stats["requests"] == 16, stats
+        assert stats["connections_opened"] == 3 and stats["connections_reused"] == 13, stats
+        print(f"   ✓ 8 потоков x 2 запроса: одновременно {server.max_in_flight}, "
+              f"соединений {server.connections} (pool_size=3)")
+
+        assert PooledHTTPAdapter(pool_size=0).get_stats()["pool_size"] == 1
+        print("   ✓ pool_size=0 приводится к 1")
+    finally:
+        server.close()
+
+    print("\n✅ Размер пула: PASSED")
+    return True
+
+
+def test_session_reuse():
+    """Тест 2: Одна сессия — одно соединение"""
+    print("\n" + "="*60)
+    print("TEST 2: Переиспользование соединения")
+    print("="*60)
+
+    server = _Server()
+    try:
+        adapter = PooledHTTPAdapter(pool_size=5)
+        session = _session(adapter)
+        for _ in range(20):
+            assert session.get(server.url).status_code == 200
+
+        assert server.connections == 1, server.connections
+        stats = adapter.get_stats()
+        assert stats["requests"] == 20 and stats["errors"] == 0, stats
+        assert stats["connections_opened"] == 1 and stats["connections_reused"] == 19, stats
+        assert abs(stats["keepalive_ratio"] - 0.95) < 1e-9, stats
+        assert 0 < stats["avg_time"] <= stats["max_time"], stats
+        print(f"   ✓ 20 последовательных запросов: 1 TCP-соединение, keep-alive {stats['keepalive_ratio']:.0%}")
+
+        # Новая сессия — новый пул: именно поэтому SheetsAPI держит одну сессию
+        other = _session(PooledHTTPAdapter(pool_size=5))
+        other.get(server.url)
+        assert server.connections == 2, server.connections
+        print("   ✓ Вторая сессия открывает своё соединение")
+    finally:
+        server.close()
+
+    print("\n✅ Переиспользование: PASSED")
+    return True
+
+
+def test_default_timeout():
+    """Тест 3: Таймаут на каждый запрос без socket.setdefaulttimeout()"""
+    print("\n" + "="*60)
+    print("TEST 3: Таймауты")
+    print("="*60)
+
+    import socket
+    server = _Server()
+    try:
+        adapter = PooledHTTPAdapter(pool_size=2, connect_timeout=1, read_timeout=0.2)
+        session = _session(adapter)
+
+        start = time.perf_counter()
+        try:
+            session.get(server.url + "?sleep=1")
+            raise AssertionError("ожидался таймаут")
+        except requests.exceptions.ReadTimeout:
+            pass
+        assert time.perf_counter() - start < 0.8
+        stats = adapter.get_stats()
+        assert stats["timeouts"] == 1 and stats["errors"] == 1, stats
+        assert (stats["connect_timeout"], stats["read_timeout"]) == (1.0, 0.2), stats
+        print("   ✓ read_timeout=0.2 с по умолчанию: ReadTimeout, учтён в timeouts")
+
+        assert session.get(server.url + "?sleep=0.4", timeout=2).text == "ok"
+        print("   ✓ Явный timeout запроса важнее таймаута адаптера")
+
+        assert socket.getdefaulttimeout() is None
+        print("   ✓ Глобальный таймаут сокетов не тронут")
+    finally:
+        server.close()
+
+    print("\n✅ Таймауты: PASSED")
+    return True
+
+
+def test_authorized_session():
+    """Тест 4: build_authorized_session и gspread на одной сессии"""
+    print("\n" + "="*60)
+    print("TEST 4: AuthorizedSession")
+    print("="*60)
+
+    try:
+        import gspread
+        from google.oauth2.credentials import Credentials
+    except ImportError as e:
+        raise SkipTest(str(e)) from e
+
+    credentials = Credentials(token="test-token")
+    session = build_authorized_session(credentials, pool_size=4, connect_timeout=2, read_timeout=7)
+    adapter = session.adapters["https://"]
+    assert isinstance(adapter, PooledHTTPAdapter)
+    assert adapter.get_stats()["pool_size"] == 4 and adapter.default_timeout == (2.0, 7.0)
+    print("   ✓ PooledHTTPAdapter смонтирован на https:// с размером пула и таймаутами")
+
+    client = gspread.Client(credentials, session=session)
+    assert client.http_client.session is session
+    print("   ✓ gspread.Client использует переданную сессию, а не создаёт свою")
+
+    server = _Server()
+    try:
+        session.mount("http://", adapter)
+        for _ in range(5):
+            session.get(server.url)
+        assert server.connections == 1, server.connections
+        assert server.auth_headers == ["Bearer test-token"] * 5, server.auth_headers
+        assert adapter.get_stats()["connections_reused"] == 4
+        print("   ✓ Запросы с токеном идут через один пул: 5 запросов, 1 соединение")
+    finally:
+        server.close()
+
+    print("\n✅ AuthorizedSession: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Размер пула", test_pool_size),
+        ("Переиспользование", test_session_reuse),
+        ("Таймауты", test_default_timeout),
+        ("AuthorizedSession", test_authorized_session),
+    ]
+
+    return run_tests("HTTP Transport Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
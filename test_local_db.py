@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Тестирование локальной БД (user_app.db_local)
+
+Локальная БД — временный файл. Проверяет:
+- GroupCommitWriter: записи из разных потоков в пределах окна коммита
+  фиксируются одной транзакцией; max_rows делит поток на пакеты
+- Ошибка одной операции пакета не откатывает остальные
+- stop()/close_connection() дописывают очередь, не дожидаясь окна
+- sync_outbox и sync_counters ведутся триггерами на logs: запись, подтверждение,
+  возврат в очередь, удаление
+- Заполнение outbox из старого logs выполняется один раз, при создании таблицы
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from testing_support import run_tests, skip_without_config
+
+_TMP = tempfile.TemporaryDirectory()
+
+
+def _use_temp_db():
+    """Общий коннект db_local — на временный файл, а не local_backup.db"""
+    from user_app import db_local
+    if db_local._DB_SINGLETON is None:
+        db_local.close_connection()
+        db_local._DB_SINGLETON = db_local.LocalDB(str(Path(_TMP.name) / "local_backup.db"))
+    with db_local.write_tx() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS gc_probe (id INTEGER PRIMARY KEY, v TEXT UNIQUE)")
+        conn.execute("DELETE FROM gc_probe")
+    return db_local
+
+
+def _insert(value):
+    def op(conn):
+        return conn.execute("INSERT INTO gc_probe (v) VALUES (?)", (value,)).lastrowid
+    return op
+
+
+def _transactions(db_local) -> int:
+    return db_local.get_pool_metrics()["writer"]["count"]
+
+
+def _submit_all(writer, ops):
+    """Отправить ops из отдельных потоков одновременно; [(результат, ошибка)]"""
+    results = [None] * len(ops)
+    barrier = threading.Barrier(len(ops))
+
+    def worker(i, op):
+        barrier.wait()
+        try:
+            results[i] = (writer.submit(op), None)
+        except Exception as e:
+            results[i] = (None, e)
+
+    threads = [threading.Thread(target=worker, args=(i, op)) for i, op in enumerate(ops)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def _rows(db_local):
+    with db_local.read_cursor() as cur:
+        cur.execute("SELECT v FROM gc_probe ORDER BY id")
+        return [r[0] for r in cur.fetchall()]
+
+
+def test_group_commit_window():
+    """Тест 1: Записи в пределах окна — одна транзакция"""
+    print("="*60)
+    print("TEST 1: Group commit — одна транзакция на окно")
+    print("="*60)
+    skip_without_config()
+
+    db_local = _use_temp_db()
+    # synchronous=FULL (fsync на каждый COMMIT) — только по явной настройке
+    expected = 2 if db_local.LOCAL_DB_SYNCHRONOUS == "FULL" else 1
+    assert db_local.get_conn().execute("PRAGMA synchronous").fetchone()[0] == expected
+    print(f"   ✓ PRAGMA synchronous={db_local.LOCAL_DB_SYNCHRONOUS} (по умолчанию NORMAL)")
+    writer = db_local.GroupCommitWriter(interval_ms=300, max_rows=64)
+    writer.start()
+    try:
+        before = _transactions(db_local)
+        threads, results = _submit_all(writer, [_insert(f"w{i}") for i in range(20)])
+        for t in threads:
+            t.join()
+
+        assert all(err is None for _, err in results), results
+        ids = [rid for rid, _ in results]
+        assert len(set(ids)) == 20, ids
+        assert sorted(_rows(db_local)) == sorted(f"w{i}" for i in range(20))
+        assert writer.stats["batches"] == 1 and writer.stats["max_batch"] == 20, writer.stats
+        assert _transactions(db_local) - before == 1
+        print(f"   ✓ 20 потоков: 1 транзакция, каждый получил свой lastrowid ({writer.stats})")
+    finally:
+        writer.stop()
+
+    writer = db_local.GroupCommitWriter(interval_ms=300, max_rows=8)
+    writer.start()
+    try:
+        threads, results = _submit_all(writer, [_insert(f"m{i}") for i in range(20)])
+        for t in threads:
+            t.join()
+        assert all(err is None for _, err in results), results
+        assert writer.stats["batches"] >= 3 and writer.stats["max_batch"] == 8, writer.stats
+        print(f"   ✓ max_rows=8: 20 записей в {writer.stats['batches']} пакетах")
+    finally:
+        writer.stop()
+
+    print("\n✅ Окно коммита: PASSED")
+    return True
+
+
+def test_group_commit_errors():
+    """Тест 2: Ошибка одной операции не откатывает пакет"""
+    print("\n" + "="*60)
+    print("TEST 2: Изоляция ошибок в пакете")
+    print("="*60)
+    skip_without_config()
+
+    db_local = _use_temp_db()
+    writer = db_local.GroupCommitWriter(interval_ms=300, max_rows=64)
+    writer.start()
+    try:
+        ops = [_insert("a"), _insert("dup"), _insert("dup"), _insert("b")]
+        threads, results = _submit_all(writer, ops)
+        for t in threads:
+            t.join()
+
+        errors = [err for _, err in results if err is not None]
+        assert len(errors) == 1 and "UNIQUE" in str(errors[0]), results
+        assert sorted(_rows(db_local)) == ["a", "b", "dup"]
+        assert writer.stats["batches"] == 1 and writer.stats["errors"] == 0, writer.stats
+        print("   ✓ Дубликат получил свою ошибку, остальные 3 записи зафиксированы")
+    finally:
+        writer.stop()
+
+    print("\n✅ Изоляция ошибок: PASSED")
+    return True
+
+
+def test_group_commit_flush_on_close():
+    """Тест 3: stop() и close_connection() дописывают очередь"""
+    print("\n" + "="*60)
+    print("TEST 3: Сброс очереди при закрытии")
+    print("="*60)
+    skip_without_config()
+
+    db_local = _use_temp_db()
+    writer = db_local.GroupCommitWriter(interval_ms=5000, max_rows=64)
+    writer.start()
+    threads, results = _submit_all(writer, [_insert(f"c{i}") for i in range(10)])
+    time.sleep(0.2)  # все 10 ждут в окне коммита
+    assert _rows(db_local) == []
+
+    t0 = time.perf_counter()
+    writer.stop()
+    for t in threads:
+        t.join(timeout=2)
+    elapsed = time.perf_counter() - t0
+    assert all(r is not None and r[1] is None for r in results), results
+    assert sorted(_rows(db_local)) == sorted(f"c{i}" for i in range(10))
+    assert elapsed < 1.0, elapsed
+    print(f"   ✓ stop(): 10 ожидающих записей зафиксированы за {elapsed*1000:.0f} мс (окно 5 с)")
+
+    before = _transactions(db_local)
+    assert writer.submit(_insert("after-stop")) is not None
+    assert _transactions(db_local) - before == 1 and "after-stop" in _rows(db_local)
+    print("   ✓ После stop() submit пишет сразу своей транзакцией")
+
+    # Общий writer процесса: close_connection() при выходе тоже дописывает очередь
+    shared = db_local.GroupCommitWriter(interval_ms=5000, max_rows=64)
+    shared.start()
+    db_local._WRITER = shared
+    threads, results = _submit_all(shared, [_insert(f"x{i}") for i in range(5)])
+    time.sleep(0.2)
+    path = db_local._DB_PATH
+    db_local.close_connection()
+    for t in threads:
+        t.join(timeout=2)
+    assert all(r is not None and r[1] is None for r in results), results
+    assert not shared.running and db_local._WRITER is None
+
+    import sqlite3
+    conn = sqlite3.connect(path)
+    try:
+        saved = [r[0] for r in conn.execute("SELECT v FROM gc_probe WHERE v LIKE 'x%'")]
+    finally:
+        conn.close()
+    assert sorted(saved) == [f"x{i}" for i in range(5)], saved
+    print("   ✓ close_connection(): очередь общего writer зафиксирована до закрытия коннекта")
+
+    db_local._DB_SINGLETON = None  # следующий тест откроет БД заново
+    print("\n✅ Сброс при закрытии: PASSED")
+    return True
+
+
+def _outbox(db_local):
+    with db_local.read_cursor() as cur:
+        cur.execute("SELECT log_id, email, priority FROM sync_outbox ORDER BY log_id")
+        return [tuple(r) for r in cur.fetchall()]
+
+
+def _log(db, email, **kwargs):
+    return db.log_action(email=email, name="Тест", status="В работе", action_type="STATUS_CHANGE",
+                         session_id=f"{email}-s", **kwargs)
+
+
+def test_outbox_triggers():
+    """Тест 4: Очередь отправки и счётчики"""
+    print("\n" + "="*60)
+    print("TEST 4: sync_outbox и sync_counters")
+    print("="*60)
+    skip_without_config()
+
+    db_local = _use_temp_db()
+    db = db_local._DB_SINGLETON
+    with db_local.write_tx() as conn:
+        conn.execute("DELETE FROM logs")
+    assert _outbox(db_local) == [] and db.count_unsynced_actions() == 0
+
+    a1 = _log(db, "a@x.ru")
+    a2 = _log(db, "a@x.ru", priority=3)
+    b1 = _log(db, "b@x.ru")
+    assert _outbox(db_local) == [(a1, "a@x.ru", 1), (a2, "a@x.ru", 3), (b1, "b@x.ru", 1)]
+    assert (db.count_unsynced_actions(), db.count_unsynced_actions("a@x.ru"),
+            db.count_unsynced_actions("b@x.ru")) == (3, 2, 1)
+    assert [r[0] for r in db.get_unsynced_actions()] == [a2, a1, b1]
+    print("   ✓ INSERT в logs: строки в outbox, счётчики 3 / a:2 / b:1, выборка по приоритету")
+
+    db.mark_actions_synced([a1, b1])
+    assert _outbox(db_local) == [(a2, "a@x.ru", 3)]
+    assert (db.count_unsynced_actions(), db.count_unsynced_actions("a@x.ru"),
+            db.count_unsynced_actions("b@x.ru")) == (1, 1, 0)
+    db.mark_actions_synced([a1])  # повторное подтверждение счётчики не уводит в минус
+    assert db.count_unsynced_actions() == 1
+    print("   ✓ Подтверждение: строки ушли из outbox, счётчики уменьшились")
+
+    with db_local.write_tx() as conn:
+        conn.execute("UPDATE logs SET synced = 0 WHERE id = ?", (b1,))
+    assert [r[0] for r in _outbox(db_local)] == [a2, b1] and db.count_unsynced_actions("b@x.ru") == 1
+    print("   ✓ synced=1 -> 0: запись вернулась в очередь")
+
+    with db_local.write_tx() as conn:
+        conn.execute("DELETE FROM logs WHERE id = ?", (a2,))
+        conn.execute(
+            "INSERT INTO logs (session_id, email, name, action_type, timestamp, synced) "
+            "VALUES ('s', 'c@x.ru', 'Тест', 'LOGIN', '2026-01-01T00:00:00', 1)"
+        )
+    assert _outbox(db_local) == [(b1, "b@x.ru", 1)]
+    assert (db.count_unsynced_actions(), db.count_unsynced_actions("a@x.ru"),
+            db.count_unsynced_actions("c@x.ru")) == (1, 0, 0)
+    print("   ✓ DELETE из logs убирает из очереди; уже отправленная запись в очередь не попадает")
+
+    with db_local.read_cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM logs WHERE synced = 0")
+        assert cur.fetchone()[0] == db.count_unsynced_actions()
+    print("   ✓ Счётчик совпадает с COUNT(*) по logs")
+
+    print("\n✅ Очередь отправки: PASSED")
+    return True
+
+
+def test_outbox_backfill_once():
+    """Тест 5: Заполнение outbox из старого журнала — один раз"""
+    print("\n" + "="*60)
+    print("TEST 5: Однократное заполнение outbox")
+    print("="*60)
+    skip_without_config()
+
+    import sqlite3
+    db_local = _use_temp_db()
+    with db_local.read_cursor() as cur:
+        cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='logs'")
+        logs_ddl = cur.fetchone()[0]
+
+    # БД прежней версии: logs есть, outbox нет
+    conn = sqlite3.connect(str(Path(_TMP.name) / "legacy.db"))
+    try:
+        conn.execute(logs_ddl)
+        conn.executemany(
+            "INSERT INTO logs (session_id, email, name, action_type, timestamp, synced, priority) "
+            "VALUES ('s', ?, 'Тест', 'STATUS_CHANGE', ?, ?, ?)",
+            [(f"u{i % 3}@x.ru", f"2026-01-01T10:00:{i:02d}.123456+00:00", i % 2, 1 + i % 3) for i in range(10)],
+        )
+        cur = conn.cursor()
+        db_local.LocalDB._ensure_outbox(cur)
+        conn.commit()
+
+        queued = conn.execute("SELECT log_id, ts FROM sync_outbox ORDER BY log_id").fetchall()
+        unsynced = conn.execute("SELECT id FROM logs WHERE synced = 0 ORDER BY id").fetchall()
+        assert [r[0] for r in queued] == [r[0] for r in unsynced] and len(queued) == 5
+        assert all(len(ts) == 19 for _, ts in queued), queued
+        counters = dict(conn.execute("SELECT email, pending FROM sync_counters").fetchall())
+        assert counters["*"] == 5 and sum(v for k, v in counters.items() if k != "*") == 5, counters
+        print("   ✓ Первый запуск: 5 неотправленных записей в outbox, счётчики заполнены")
+
+        # Очередь уже ведётся триггерами; повторный запуск не должен её «дополнять»
+        conn.execute("DELETE FROM sync_outbox WHERE log_id = ?", (queued[0][0],))
+        conn.commit()
+        db_local.LocalDB._ensure_outbox(cur)
+        conn.commit()
+        again = [r[0] for r in conn.execute("SELECT log_id FROM sync_outbox ORDER BY log_id")]
+        assert again == [r[0] for r in queued[1:]], again
+        assert conn.execute("SELECT pending FROM sync_counters WHERE email='*'").fetchone()[0] == 4
+        print("   ✓ Повторный запуск: заполнение не повторяется, счётчик не удваивается")
+    finally:
+        conn.close()
+
+    print("\n✅ Однократное заполнение: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Окно коммита", test_group_commit_window),
+        ("Изоляция ошибок", test_group_commit_errors),
+        ("Сброс при закрытии", test_group_commit_flush_on_close),
+        ("Очередь отправки", test_outbox_triggers),
+        ("Однократное заполнение", test_outbox_backfill_once),
+    ]
+
+    return run_tests("Local DB Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
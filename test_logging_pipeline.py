@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Тестирование асинхронного конвейера логирования (logging_setup)
+
+Проверяет:
+- Маскирование PII в потоке QueueListener (с подставленными args)
+- Неблокирующую запись: медленный handler не тормозит вызывающий поток
+- Ограниченную очередь: переполнение отбрасывает записи, а не копит память
+- Ограничение частоты записей с одного места вызова
+"""
+
+import logging
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+import logging_setup
+from logging_setup import (
+    PIIMaskingFormatter,
+    get_log_pipeline_stats,
+    start_queue_logging,
+    stop_queue_logging,
+)
+
+
+class CollectingHandler(logging.Handler):
+    """Собирает отформатированные записи; delay — имитация медленного диска"""
+    def __init__(self, delay: float = 0.0, gate: threading.Event = None):
+        super().__init__()
+        self.delay = delay
+        self.gate = gate
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        if self.delay:
+            time.sleep(self.delay)
+        self.threads.add(threading.current_thread().name)
+        self.lines.append(self.format(record))
+
+
+def _root_snapshot():
+    root = logging.getLogger()
+    return list(root.handlers), root.level
+
+
+def _restore_root(snapshot):
+    stop_queue_logging()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    handlers, level = snapshot
+    for h in handlers:
+        root.addHandler(h)
+    root.setLevel(level)
+
+
+def test_pii_masking():
+    """Тест 1: Маскирование на этапе вывода"""
+    print("="*60)
+    print("TEST 1: Маскирование PII")
+    print("="*60)
+
+    snapshot = _root_snapshot()
+    try:
+        handler = CollectingHandler()
+        handler.setFormatter(PIIMaskingFormatter("%(asctime)s %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+        start_queue_logging([handler], level=logging.INFO, queue_size=100, hot_path_limit=0)
+        log = logging.getLogger("test.pii")
+        log.info("Вход пользователя %s, телефон %s", "ivan.petrov@example.com", "+7 (912) 345-67-89")
+        stop_queue_logging()
+
+        line = handler.lines[0]
+        assert "ivan.petrov" not in line and "***@example.com" in line, line
+        assert "345-67-89" not in line and "***PHONE***" in line, line
+        assert line[:4].isdigit(), line  # asctime не тронут
+        print(f"   ✓ {line}")
+        assert threading.current_thread().name not in handler.threads
+        print(f"   ✓ Форматирование в потоке {handler.threads}")
+    finally:
+        _restore_root(snapshot)
+
+    print("\n✅ Маскирование PII: PASSED")
+    return True
+
+
+def test_non_blocking():
+    """Тест 2: Медленный handler не блокирует вызывающий поток"""
+    print("\n" + "="*60)
+    print("TEST 2: Неблокирующая запись")
+    print("="*60)
+
+    snapshot = _root_snapshot()
+    try:
+        handler = CollectingHandler(delay=0.005)
+        start_queue_logging([handler], level=logging.INFO, queue_size=1000, hot_path_limit=0)
+        log = logging.getLogger("test.slow")
+        n = 200
+        t0 = time.perf_counter()
+        for i in range(n):
+            log.info("status change %d", i)
+        caller_ms = (time.perf_counter() - t0) * 1000
+        print(f"   ✓ {n} записей из вызывающего потока за {caller_ms:.1f}ms "
+              f"(синхронно было бы ≥{n * 5}ms)")
+        assert caller_ms < n * 5 / 4, caller_ms
+
+        stop_queue_logging()
+        assert len(handler.lines) == n
+        print(f"   ✓ Все {n} записей дописаны при остановке")
+    finally:
+        _restore_root(snapshot)
+
+    print("\n✅ Неблокирующая запись: PASSED")
+    return True
+
+
+def test_bounded_queue():
+    """Тест 3: Переполнение очереди"""
+    print("\n" + "="*60)
+    print("TEST 3: Ограниченная очередь")
+    print("="*60)
+
+    snapshot = _root_snapshot()
+    gate = threading.Event()
+    try:
+        handler = CollectingHandler(gate=gate)
+        start_queue_logging([handler], level=logging.INFO, queue_size=50, hot_path_limit=0)
+        log = logging.getLogger("test.flood")
+        for i in range(500):
+            log.info("flood %d", i)
+        stats = get_log_pipeline_stats()
+        assert stats['queue_capacity'] == 50
+        assert stats['queue_depth'] <= 50
+        assert stats['dropped'] >= 500 - 51, stats
+        print(f"   ✓ Очередь {stats['queue_depth']}/{stats['queue_capacity']}, "
+              f"отброшено {stats['dropped']}")
+
+        t0 = time.perf_counter()
+        log.error("ошибка при полной очереди")
+        waited = time.perf_counter() - t0
+        assert waited < 0.5, waited
+        print(f"   ✓ ERROR при полной очереди ждёт ограниченно ({waited*1000:.0f}ms)")
+    finally:
+        gate.set()
+        _restore_root(snapshot)
+
+    print("\n✅ Ограниченная очередь: PASSED")
+    return True
+
+
+def test_hot_path_rate_limit():
+    """Тест 4: Ограничение частоты с одного места вызова"""
+    print("\n" + "="*60)
+    print("TEST 4: Ограничение горячих путей")
+    print("="*60)
+
+    snapshot = _root_snapshot()
+    try:
+        handler = CollectingHandler()
+        handler.setFormatter(PIIMaskingFormatter("%(levelname)s %(message)s"))
+        start_queue_logging([handler], level=logging.DEBUG, queue_size=1000, hot_path_limit=10)
+        log = logging.getLogger("test.hot")
+
+        def sync_action(i):
+            log.debug("action %d", i)  # одно место вызова
+
+        for i in range(100):
+            sync_action(i)
+        for i in range(5):
+            log.warning("warn %d", i)
+        suppressed = get_log_pipeline_stats()['suppressed']
+        assert suppressed == 90, suppressed
+        print(f"   ✓ DEBUG из цикла: 10 записано, {suppressed} подавлено")
+
+        window = next(iter(logging_setup._rate_filter._windows.values()))
+        window[0] -= 1.0  # следующее окно
+        sync_action(100)
+        stop_queue_logging()
+
+        warnings = [l for l in handler.lines if l.startswith("WARNING")]
+        assert len(warnings) == 5
+        print("   ✓ WARNING не ограничиваются")
+        assert "пропущено похожих: 90" in handler.lines[-1], handler.lines[-1]
+        print(f"   ✓ Новое окно: {handler.lines[-1]}")
+    finally:
+        _restore_root(snapshot)
+
+    print("\n✅ Ограничение горячих путей: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    print("╔" + "="*58 + "╗")
+    print("║" + " Logging Pipeline Tests ".center(58) + "║")
+    print("╚" + "="*58 + "╝")
+
+    tests = [
+        ("Маскирование PII", test_pii_masking),
+        ("Неблокирующая запись", test_non_blocking),
+        ("Ограниченная очередь", test_bounded_queue),
+        ("Горячие пути", test_hot_path_rate_limit),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((test_name, result))
+        except Exception as e:
+            print(f"\n❌ {test_name}: FAILED with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((test_name, False))
+
+    # Итоги
+    print("\n" + "="*60)
+    print("ИТОГИ ТЕСТИРОВАНИЯ")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for test_name, result in results:
+        status = "✅ PASSED" if result else "❌ FAILED"
+        print(f"  {test_name:30} {status}")
+
+    print("\n" + "="*60)
+    print(f"Пройдено: {passed}/{total}")
+    print("="*60)
+
+    if passed == total:
+        print("\n🎉 ВСЕ ТЕСТЫ УСПЕШНО ПРОЙДЕНЫ!")
+        return 0
+    else:
+        print(f"\n⚠️  {total - passed} тест(ов) НЕ прошли")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
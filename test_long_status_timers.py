@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Тестирование дедлайнов длительных статусов (notifications.timer_wheel, notifications.long_status)
+
+Симулированные часы. Проверяет:
+- Колесо: срабатывание ровно на тике дедлайна на всех уровнях и в переполнении,
+  отмена, пропуск пустых участков
+- Планировщик: порог, повторы, смена статуса и LOGOUT снимают дедлайн
+- Рабочий день 10 000 сотрудников: каждое уведомление — точно на пороге,
+  ни одного лишнего; работа ~ числу смен статусов, а не сотрудникам × минутам
+- Фоновый поток просыпается к дедлайну
+- Движок уведомлений: пороги из лимитов и правил, опрос не дублирует колесо
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from testing_support import run_tests, skip_without_config
+
+N_USERS = 10000
+DAY0 = 1_767_225_600  # 2026-01-01 00:00 UTC
+STATUSES = {  # статус: (мин, макс) длительность в минутах
+    "В работе": (20, 120),
+    "Перерыв": (5, 25),
+    "Обед": (40, 80),
+    "Совещание": (15, 60),
+}
+
+
+class FakeClock:
+    def __init__(self, t: float = DAY0):
+        self.t = t
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _thresholds(status):
+    """Как в движке: лимиты 15/60 мин (срабатывание с 16/61), правило «Обед ≥ 30 мин» раз в 10 мин"""
+    from notifications.long_status import Threshold
+    if status == "Перерыв":
+        return [Threshold(16, 1800)]
+    if status == "Обед":
+        return [Threshold(61, 1800), Threshold(30, 600)]
+    return []
+
+
+def test_wheel_precision():
+    """Тест 1: Колесо таймеров"""
+    print("="*60)
+    print("TEST 1: Колесо таймеров")
+    print("="*60)
+
+    from notifications.timer_wheel import HierarchicalTimerWheel
+    wheel = HierarchicalTimerWheel(tick=1.0, slots=(8, 8, 8), start=1000)
+    fired = []
+    delays = [1, 7, 8, 9, 63, 64, 65, 511, 512, 513, 5000, 100000]  # все уровни и переполнение
+    handles = {d: wheel.schedule_at(1000 + d, lambda d=d: fired.append((d, wheel.now))) for d in delays}
+    late = wheel.schedule_at(1000 + 70.2, lambda: fired.append((70.2, wheel.now)))
+    assert len(wheel) == len(delays) + 1
+    assert handles[65].cancel() and not handles[65].cancel() and not handles[65].active
+
+    rnd = random.Random(1)
+    t = 1000
+    while t < 1000 + 100001:
+        t += rnd.choice([0.3, 1, 5, 17, 250, 3000])  # неровные шаги
+        wheel.advance(t)
+    expected = [(d, 1000 + d) for d in delays if d != 65] + [(70.2, 1071)]
+    assert sorted(fired) == sorted(expected), fired
+    assert not late.active and len(wheel) == 0
+    print(f"   ✓ {len(fired)} таймеров: каждый ровно на тике дедлайна (дробный — на следующем)")
+    print(f"   ✓ Отмена снимает таймер; статистика: {wheel.stats}")
+
+    # Дедлайн в прошлом — на ближайшем тике; callback может ставить новые таймеры
+    chain = []
+    def again(n):
+        chain.append(wheel.now)
+        if n:
+            wheel.schedule(10, again, n - 1)
+    wheel.schedule_at(0, again, 3)
+    assert wheel.next_deadline() == wheel.now + 1
+    wheel.advance(wheel.now + 100)
+    assert [c - chain[0] for c in chain] == [0, 10, 20, 30]
+    print("   ✓ Прошедший дедлайн и цепочка таймеров из callback")
+
+    # Пустые участки пропускаются: год с редкими таймерами — мгновенно
+    big = HierarchicalTimerWheel(tick=1.0, start=0)
+    hits = []
+    for day in range(0, 365, 30):
+        big.schedule_at(day * 86400 + 12345, hits.append, day)
+    assert big.next_deadline() <= 12345
+    t0 = time.perf_counter()
+    big.advance(366 * 86400)
+    ms = (time.perf_counter() - t0) * 1000
+    assert len(hits) == 13 and ms < 200, (len(hits), ms)
+    print(f"   ✓ Год симулированного времени (31.6M тиков) за {ms:.1f}ms")
+
+    print("\n✅ Колесо таймеров: PASSED")
+    return True
+
+
+def test_scheduler_semantics():
+    """Тест 2: Пороги, повторы, смена статуса"""
+    print("\n" + "="*60)
+    print("TEST 2: Планировщик длительных статусов")
+    print("="*60)
+
+    from notifications.long_status import LongStatusScheduler
+    clock = FakeClock()
+    sent = []
+    timers = LongStatusScheduler(
+        fire=lambda email, status, started, elapsed: sent.append((email, status, elapsed, timers.wheel.now)),
+        thresholds=_thresholds, clock=clock
+    )
+
+    # Перерыв: первое уведомление на 16-й минуте, затем раз в 30 минут
+    assert timers.status_started("A@company.com", "Перерыв", DAY0) == DAY0 + 16 * 60
+    assert timers.status_started("b@company.com", "В работе", DAY0) is None and len(timers) == 1
+    for minute in range(0, 80):
+        clock.t = DAY0 + minute * 60 + 30
+        timers.advance()
+    assert sent == [
+        ("a@company.com", "Перерыв", 16, DAY0 + 16 * 60),
+        ("a@company.com", "Перерыв", 46, DAY0 + 46 * 60),
+        ("a@company.com", "Перерыв", 76, DAY0 + 76 * 60),
+    ], sent
+    print("   ✓ Порог 16 мин и повторы через 30 мин — точно в срок")
+
+    # Смена статуса снимает дедлайн, новый статус считается от своего начала
+    sent.clear()
+    timers.status_started("a@company.com", "Обед", clock.t)
+    lunch_start = clock.t
+    clock.t += 25 * 60
+    timers.advance()
+    timers.status_started("a@company.com", "В работе", clock.t)
+    clock.t += 3600
+    timers.advance()
+    assert sent == [] and timers.deadline_for("a@company.com") is None
+    print("   ✓ Смена статуса до порога — уведомлений нет")
+
+    # Обед: правило на 30-й и далее раз в 10 минут + лимит на 61-й
+    start = clock.t
+    timers.status_started("a@company.com", "Обед", start)
+    for minute in range(1, 76):
+        clock.t = start + minute * 60
+        timers.advance()
+    assert [s[2] for s in sent] == [30, 40, 50, 60, 61, 70], sent
+    assert all(s[3] == start + s[2] * 60 for s in sent)
+    assert timers.status_ended("a@company.com") and timers.deadline_for("a@company.com") is None
+    clock.t += 3600
+    assert timers.advance() == 0 and lunch_start < start
+    print("   ✓ Несколько порогов одного статуса; LOGOUT снимает дедлайн")
+
+    # Машина «спала»: одно уведомление с фактической длительностью, пропущенные повторы не догоняются
+    sent.clear()
+    timers.status_started("c@company.com", "Перерыв", clock.t)
+    clock.t += 3 * 3600
+    assert timers.advance() == 1 and sent[0][2] == 180
+    # Следующий повтор — по сетке порог + k·30 мин, уже в будущем
+    assert timers.deadline_for("c@company.com") == clock.t - 3 * 3600 + 16 * 60 + 6 * 1800
+    print(f"   ✓ После простоя — одно уведомление ({sent[0][2]} мин); статистика: {timers.stats}")
+
+    print("\n✅ Планировщик: PASSED")
+    return True
+
+
+def _simulate_day(n_users: int, seed: int = 42):
+    """События рабочего дня: (время, порядок, email, статус | None для LOGOUT) и эпизоды статусов"""
+    rnd = random.Random(seed)
+    names = list(STATUSES)
+    events, episodes = [], []
+    for u in range(n_users):
+        email = f"user{u}@company.com"
+        t = DAY0 + 8 * 3600 + rnd.randrange(7200)
+        shift_end = t + 9 * 3600
+        status = "В работе"
+        while t < shift_end:
+            lo, hi = STATUSES[status]
+            end = min(shift_end, t + rnd.randrange(lo * 60, hi * 60 + 1))
+            events.append((t, len(events), email, status))
+            episodes.append((email, status, t, end))
+            t = end
+            status = rnd.choice([s for s in names if s != status])
+        events.append((shift_end, len(events), email, None))
+    events.sort()
+    return events, episodes
+
+
+def _expected_fires(episodes):
+    """Эталон: каждый порог и повтор, наступивший не позже конца эпизода"""
+    expected = set()
+    for email, status, start, end in episodes:
+        for th in _thresholds(status):
+            at = start + th.minutes * 60
+            while at <= end:
+                expected.add((email, start, at))
+                if not th.repeat_sec:
+                    break
+                at += th.repeat_sec
+    return expected
+
+
+def test_simulated_day():
+    """Тест 3: Рабочий день 10 000 сотрудников"""
+    print("\n" + "="*60)
+    print(f"TEST 3: Симуляция дня, {N_USERS:,} сотрудников")
+    print("="*60)
+
+    from notifications.long_status import LongStatusScheduler
+    events, episodes = _simulate_day(N_USERS)
+    expected = _expected_fires(episodes)
+    changes = sum(1 for e in events if e[3] is not None)
+    print(f"   Событий: {len(events):,} (смен статуса {changes:,}), ожидается уведомлений: {len(expected):,}")
+
+    clock = FakeClock()
+    fires = []
+    timers = LongStatusScheduler(
+        fire=lambda email, status, started, elapsed: fires.append(
+            (email, started.timestamp(), timers.wheel.now, elapsed)),
+        thresholds=_thresholds, clock=clock
+    )
+
+    t0 = time.perf_counter()
+    for t, _, email, status in events:
+        clock.t = t
+        timers.advance()          # всё, что наступило к моменту события
+        if status is None:
+            timers.status_ended(email)
+        else:
+            timers.status_started(email, status, t)
+    clock.t = events[-1][0] + 3600
+    timers.advance()
+    elapsed = time.perf_counter() - t0
+
+    got = [(email, started, at) for email, started, at, _ in fires]
+    assert len(got) == len(set(got)), "повторное уведомление"
+    assert set(got) == expected, (len(set(got) - expected), len(expected - set(got)))
+    assert all(elapsed_min == int((at - started) // 60) for _, started, at, elapsed_min in fires)
+    assert len(timers) == 0 and len(timers.wheel) == 0
+    print(f"   ✓ {len(fires):,} уведомлений: все точно на пороге, лишних и пропущенных нет")
+
+    ops = sum(timers.wheel.stats[k] for k in ("scheduled", "cancelled", "fired", "cascaded"))
+    shift_minutes = sum(end - start for _, _, start, end in episodes) // 60
+    print(f"   ✓ Колесо: {ops:,} операций за {elapsed:.2f}с симуляции "
+          f"({elapsed / changes * 1e6:.1f}µs на смену статуса); {timers.wheel.stats}")
+    print(f"   ✓ Ежеминутный опрос сделал бы {shift_minutes:,} пересчётов длительности "
+          f"(и запусков LocalDB) — в {shift_minutes / ops:.0f} раз больше")
+    assert ops < 4 * (changes + len(fires)), ops
+
+    print("\n✅ Симуляция дня: PASSED")
+    return True
+
+
+def test_background_thread():
+    """Тест 4: Фоновый поток просыпается к дедлайну"""
+    print("\n" + "="*60)
+    print("TEST 4: Фоновый поток")
+    print("="*60)
+
+    from notifications.long_status import LongStatusScheduler, Threshold
+    sent = []
+    timers = LongStatusScheduler(
+        fire=lambda *args: sent.append(time.time()),
+        thresholds=lambda status: [Threshold(1)], tick=0.01, max_sleep=5
+    ).start()
+    try:
+        time.sleep(0.05)
+        # Статус начался 59.8с назад: до порога в 1 минуту — 0.2с, поток спит до 5с
+        deadline = timers.status_started("u@company.com", "Обед", time.time() - 59.8)
+        for _ in range(100):
+            if sent:
+                break
+            time.sleep(0.02)
+        assert sent, "уведомление не пришло"
+        lag_ms = (sent[0] - deadline) * 1000
+        assert 0 <= lag_ms < 200, lag_ms
+        print(f"   ✓ Поток разбужен новым дедлайном, опоздание {lag_ms:.0f}ms")
+    finally:
+        timers.stop()
+    assert not timers.running
+    print("   ✓ stop() завершает поток")
+
+    print("\n✅ Фоновый поток: PASSED")
+    return True
+
+
+def test_engine_integration():
+    """Тест 5: Движок уведомлений"""
+    print("\n" + "="*60)
+    print("TEST 5: Интеграция с notifications.engine")
+    print("="*60)
+    skip_without_config()
+
+    import notifications.engine as engine
+    from notifications.long_status import LongStatusScheduler, Threshold
+    from notifications.rules_manager import Rule
+    from config import BREAK_LIMIT_MINUTES, LUNCH_LIMIT_MINUTES
+
+    rule = Rule(1, True, "long_status", "personal", "", ["Обед"], 30, None, None, 0, False, "")
+    saved = engine._rules_cache, engine._timers
+    try:
+        engine._rules_cache = (time.monotonic(), [rule])  # без обращения к Sheets
+        assert engine.long_status_thresholds("Перерыв") == [Threshold(BREAK_LIMIT_MINUTES + 1, 1800)]
+        assert engine.long_status_thresholds("Обед") == [
+            Threshold(LUNCH_LIMIT_MINUTES + 1, 1800), Threshold(30, 60)]
+        assert engine.long_status_thresholds("В работе") == []
+        print("   ✓ Пороги: лимиты перерыва/обеда и правило long_status (повтор не чаще минуты)")
+
+        # Колесо запущено: опрос из цикла синхронизации ничего не делает
+        engine._timers = LongStatusScheduler(fire=lambda *a: None, thresholds=lambda s: []).start()
+        t0 = time.perf_counter()
+        engine.poll_long_running_remote()
+        assert (time.perf_counter() - t0) < 0.01
+        engine._timers.stop()
+        print("   ✓ poll_long_running_remote при работающем колесе — без LocalDB и Sheets")
+    finally:
+        engine._rules_cache, engine._timers = saved
+
+    print("\n✅ Интеграция: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Колесо таймеров", test_wheel_precision),
+        ("Планировщик", test_scheduler_semantics),
+        ("Симуляция дня", test_simulated_day),
+        ("Фоновый поток", test_background_thread),
+        ("Интеграция", test_engine_integration),
+    ]
+
+    return run_tests("Long Status Timer Wheel Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
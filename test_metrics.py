@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Тестирование реестра метрик и экспорта
+
+Проверяет:
+- Counter / Gauge / Histogram с метками
+- Collectors из stats-словарей компонентов
+- Текстовый формат Prometheus
+- HTTP /metrics на localhost и дамп в файл
+"""
+
+import sys
+import json
+import tempfile
+import urllib.request
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from shared.metrics import (
+    MetricsRegistry,
+    MetricsHTTPServer,
+    MetricsFileExporter,
+    SIZE_BUCKETS,
+    families_from_dict,
+    render_prometheus,
+)
+
+
+def test_instruments():
+    """Тест 1: Counter, Gauge, Histogram"""
+    print("="*60)
+    print("TEST 1: Инструменты")
+    print("="*60)
+
+    registry = MetricsRegistry()
+    requests = registry.counter("t_requests_total", "Запросы", labelnames=("method", "outcome"))
+    requests.inc(method="append_rows", outcome="ok")
+    requests.inc(2, method="append_rows", outcome="ok")
+    requests.inc(method="append_rows", outcome="error")
+    assert requests.value(method="append_rows", outcome="ok") == 3
+    assert registry.counter("t_requests_total") is requests
+    print("   ✓ Counter с метками, повторная регистрация возвращает тот же объект")
+
+    depth = registry.gauge("t_queue_depth")
+    depth.set(120)
+    depth.dec(20)
+    assert depth.value() == 100
+    print("   ✓ Gauge: set/dec")
+
+    rows = registry.histogram("t_rows", labelnames=("method",), buckets=SIZE_BUCKETS)
+    for n in (1, 3, 10, 11, 400, 5000):
+        rows.observe(n, method="append_rows")
+    snap = rows.snapshot(method="append_rows")
+    assert snap['count'] == 6 and snap['sum'] == 5425
+    assert snap['buckets'][1.0] == 1 and snap['buckets'][10.0] == 3
+    assert snap['buckets'][500.0] == 5 and snap['buckets'][float('inf')] == 6
+    print(f"   ✓ Histogram: кумулятивные корзины {snap['buckets']}")
+
+    try:
+        registry.gauge("t_requests_total")
+        return False
+    except ValueError:
+        print("   ✓ Конфликт типов метрики отклонён")
+
+    print("\n✅ Инструменты: PASSED")
+    return True
+
+
+def test_prometheus_format():
+    """Тест 2: Формат Prometheus и collectors"""
+    print("\n" + "="*60)
+    print("TEST 2: Формат Prometheus + collectors")
+    print("="*60)
+
+    registry = MetricsRegistry()
+    latency = registry.histogram("t_latency_seconds", "Задержка", labelnames=("method",),
+                                 buckets=(0.1, 1.0))
+    latency.observe(0.05, method="get")
+    latency.observe(0.5, method="get")
+
+    # Два "компонента" с одинаковой формой stats — сэмплы должны идти подряд
+    breakers = {
+        "A": {'total_calls': 10, 'failed_calls': 1, 'state': 'closed', 'window_failure_rate': 0.1},
+        "B": {'total_calls': 4, 'failed_calls': 4, 'state': 'open', 'window_failure_rate': 1.0},
+    }
+    registry.register_collector("breakers", lambda: [
+        family
+        for name, stats in breakers.items()
+        for family in families_from_dict("t_cb", stats, labels={'name': name},
+                                         counters=('total_calls', 'failed_calls'))
+    ])
+    registry.register_collector("broken", lambda: 1 / 0)
+
+    text = render_prometheus(registry)
+    print("   " + "\n   ".join(text.strip().splitlines()[:12]))
+
+    assert '# TYPE t_latency_seconds histogram' in text
+    assert 't_latency_seconds_bucket{method="get",le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{method="get",le="+Inf"} 2' in text
+    assert 't_latency_seconds_count{method="get"} 2' in text
+    assert text.count('# TYPE t_cb_total_calls_total counter') == 1
+    assert 't_cb_total_calls_total{name="B"} 4' in text
+    assert 't_cb_state' not in text  # строки пропускаются
+    lines = text.splitlines()
+    idx = [i for i, l in enumerate(lines) if l.startswith('t_cb_total_calls_total{')]
+    assert idx == list(range(idx[0], idx[0] + 2)), idx
+    print("   ✓ Гистограмма, counters с _total, сэмплы семейства подряд, ошибка collector не ломает сбор")
+
+    print("\n✅ Формат Prometheus: PASSED")
+    return True
+
+
+def test_exporters():
+    """Тест 3: HTTP /metrics и дамп в файл"""
+    print("\n" + "="*60)
+    print("TEST 3: Экспорт")
+    print("="*60)
+
+    registry = MetricsRegistry()
+    registry.gauge("t_queue_depth").set(42)
+
+    server = MetricsHTTPServer(0, registry=registry)
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.port}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            body = response.read().decode("utf-8")
+            assert response.headers["Content-Type"].startswith("text/plain")
+        assert "t_queue_depth 42" in body
+        print(f"   ✓ GET {url}: {len(body)} байт")
+    finally:
+        server.stop()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prom = MetricsFileExporter(Path(tmp) / "wtt.prom", registry=registry)
+        prom.dump()
+        assert "t_queue_depth 42" in (Path(tmp) / "wtt.prom").read_text(encoding="utf-8")
+        js = MetricsFileExporter(Path(tmp) / "wtt.json", registry=registry)
+        js.dump()
+        data = json.loads((Path(tmp) / "wtt.json").read_text(encoding="utf-8"))
+        assert data["t_queue_depth"][0]["value"] == 42
+        assert not list(Path(tmp).glob("*.tmp"))
+        print("   ✓ Дамп в .prom и .json (атомарная замена)")
+
+    print("\n✅ Экспорт: PASSED")
+    return True
+
+
+def test_default_collectors():
+    """Тест 4: Collectors синглтонов приложения"""
+    print("\n" + "="*60)
+    print("TEST 4: Collectors компонентов")
+    print("="*60)
+
+    from shared.metrics import register_default_collectors
+    from shared.resilience.circuit_breaker import get_circuit_breaker
+    from shared.health.health_checker import get_health_checker, stop_global_health_checker
+
+    breaker = get_circuit_breaker("MetricsTestBreaker")
+    breaker.record_success()
+    checker = get_health_checker()
+    checker.register_check("metrics_test", lambda: (True, "OK"))
+    checker.check_all()
+
+    registry = MetricsRegistry()
+    register_default_collectors(registry)
+    text = render_prometheus(registry)
+    assert 'wtt_circuit_breaker_successful_calls_total{name="MetricsTestBreaker"}' in text
+    assert 'wtt_circuit_breaker_state{name="MetricsTestBreaker"} 0' in text
+    assert 'wtt_health_component_up{component="metrics_test"} 1' in text
+    assert 'wtt_health_check_duration_ms_count{check="metrics_test"} 1' in text
+    print("   ✓ Circuit breakers и HealthChecker видны в /metrics")
+
+    stop_global_health_checker()
+    print("\n✅ Collectors: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    print("╔" + "="*58 + "╗")
+    print("║" + " Metrics Registry Tests ".center(58) + "║")
+    print("╚" + "="*58 + "╝")
+
+    tests = [
+        ("Инструменты", test_instruments),
+        ("Формат Prometheus", test_prometheus_format),
+        ("Экспорт", test_exporters),
+        ("Collectors", test_default_collectors),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((test_name, result))
+        except Exception as e:
+            print(f"\n❌ {test_name}: FAILED with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((test_name, False))
+
+    # Итоги
+    print("\n" + "="*60)
+    print("ИТОГИ ТЕСТИРОВАНИЯ")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for test_name, result in results:
+        status = "✅ PASSED" if result else "❌ FAILED"
+        print(f"  {test_name:30} {status}")
+
+    print("\n" + "="*60)
+    print(f"Пройдено: {passed}/{total}")
+    print("="*60)
+
+    if passed == total:
+        print("\n🎉 ВСЕ ТЕСТЫ УСПЕШНО ПРОЙДЕНЫ!")
+        return 0
+    else:
+        print(f"\n⚠️  {total - passed} тест(ов) НЕ прошли")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
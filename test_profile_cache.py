@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Тестирование подписанного кэша профилей (user_app.profile_cache)
+и фоновой сверки входа по кэшу (LoginWindow._reconcile_worker)
+
+Локальная БД — временный файл. Проверяет:
+- Запись с подменённым payload/cached_at или чужим ключом отвергается (HMAC)
+- Запись старше TTL считается отсутствующей
+- Сверка не нашла пользователя в Users: кэш сброшен, испущен profile_revoked,
+  приложение завершает сессию (force_logout_by_admin, reason="revoked")
+"""
+
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from testing_support import run_tests, skip_without_config
+
+EMAIL = "Ivan.Petrov@x.ru"
+PROFILE = {"email": "ivan.petrov@x.ru", "name": "Иван Петров", "role": "специалист",
+           "shift_hours": "8 часов", "telegram_login": "", "group": "Входящие"}
+
+_TMP = tempfile.TemporaryDirectory()
+
+
+def _use_temp_db():
+    """Общий коннект db_local — на временный файл, а не local_backup.db"""
+    from user_app import db_local
+    if db_local._DB_SINGLETON is None:
+        db_local.close_connection()
+        db_local._DB_SINGLETON = db_local.LocalDB(str(Path(_TMP.name) / "local_backup.db"))
+    return db_local
+
+
+def _cache(**kwargs):
+    _use_temp_db()
+    from user_app.profile_cache import ProfileCache
+    kwargs.setdefault("key", b"k" * 32)
+    return ProfileCache(**kwargs)
+
+
+def _stored(email: str):
+    from user_app.db_local import read_cursor
+    with read_cursor() as cur:
+        cur.execute("SELECT payload, signature, cached_at FROM user_profiles WHERE email=?", (email,))
+        return cur.fetchone()
+
+
+def _set(email: str, **fields):
+    from user_app.db_local import write_tx
+    cols = ", ".join(f"{k}=?" for k in fields)
+    with write_tx() as conn:
+        conn.execute(f"UPDATE user_profiles SET {cols} WHERE email=?", (*fields.values(), email))
+
+
+class _Recorder:
+    """Заменяет pyqtSignal / метод окна: запоминает вызовы"""
+    def __init__(self):
+        self.calls = []
+
+    def emit(self, *args):
+        self.calls.append(args)
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+
+def test_signature():
+    """Тест 1: Подмена записи отвергается"""
+    print("="*60)
+    print("TEST 1: Подпись HMAC")
+    print("="*60)
+    skip_without_config()
+
+    cache = _cache()
+    cache.put(EMAIL, PROFILE)
+    assert cache.get(EMAIL) == PROFILE
+    assert cache.get("  ivan.petrov@X.RU ") == PROFILE
+    print("   ✓ Запись читается, email нормализуется")
+
+    em = PROFILE["email"]
+    payload, signature, cached_at = _stored(em)
+    _set(em, payload=payload.replace("специалист", "администратор"))
+    assert cache.get(EMAIL) is None
+    assert _stored(em) is None
+    print("   ✓ Роль подменена в payload: запись отвергнута и удалена")
+
+    cache.put(EMAIL, PROFILE)
+    future = (datetime.now(timezone.utc) + timedelta(days=365)).isoformat()
+    _set(em, cached_at=future)
+    assert cache.get(EMAIL) is None and _stored(em) is None
+    print("   ✓ Продлён cached_at без подписи: запись отвергнута")
+
+    cache.put(EMAIL, PROFILE)
+    other = _cache(key=b"x" * 32)
+    assert other.get(EMAIL) is None
+    print("   ✓ Чужой ключ (другая машина): запись отвергнута")
+
+    print("\n✅ Подпись: PASSED")
+    return True
+
+
+def test_ttl():
+    """Тест 2: Просроченная запись считается отсутствующей"""
+    print("\n" + "="*60)
+    print("TEST 2: TTL")
+    print("="*60)
+    skip_without_config()
+
+    cache = _cache(ttl_hours=1)
+    cache.put(EMAIL, PROFILE)
+    em = PROFILE["email"]
+    payload, _, _ = _stored(em)
+
+    # Корректно подписанная запись возрастом 59 минут ещё жива, 61 минута — нет
+    for minutes, alive in ((59, True), (61, False)):
+        cached_at = (datetime.now(timezone.utc) - timedelta(minutes=minutes)).isoformat()
+        _set(em, cached_at=cached_at, signature=cache._sign(em, cached_at, payload))
+        assert (cache.get(EMAIL) is not None) is alive, minutes
+    print("   ✓ TTL 1 ч: 59 мин — из кэша, 61 мин — промах")
+
+    cache.put(EMAIL, PROFILE)
+    assert cache.get(EMAIL) == PROFILE
+    print("   ✓ Новая запись после промаха снова читается")
+
+    assert _cache(ttl_hours=0).get(EMAIL) is None
+    print("   ✓ TTL 0: кэш не используется")
+
+    print("\n✅ TTL: PASSED")
+    return True
+
+
+def _reconcile(cache, snapshot):
+    """_reconcile_worker на окне-заглушке: API отвечает snapshot"""
+    from user_app.login_window import LoginWindow
+
+    class Window:
+        profile_revoked = _Recorder()
+        sheets_api = None
+        profile_cache = cache
+        _fetch_login_snapshot = staticmethod(lambda email: snapshot)
+        _cache_profile = LoginWindow._cache_profile
+
+    win = Window()
+    LoginWindow._reconcile_worker(win, EMAIL, "ivan.pet_20260101090000", True, None)
+    return win
+
+
+def test_reconcile_revokes():
+    """Тест 3: Сверка отзывает вход по кэшу"""
+    print("\n" + "="*60)
+    print("TEST 3: Сверка входа по кэшу")
+    print("="*60)
+    skip_without_config()
+
+    cache = _cache()
+    cache.put(EMAIL, PROFILE)
+
+    renamed = dict(PROFILE, name="Иван Петров-Сидоров")
+    win = _reconcile(cache, (renamed, None))
+    assert win.profile_revoked.calls == []
+    assert cache.get(EMAIL) == renamed
+    print("   ✓ Пользователь есть в Users: кэш обновлён, сессия продолжается")
+
+    win = _reconcile(cache, (None, None))
+    assert win.profile_revoked.calls == [(EMAIL,)], win.profile_revoked.calls
+    assert cache.get(EMAIL) is None and _stored(PROFILE["email"]) is None
+    print("   ✓ Пользователя нет в Users: кэш сброшен, испущен profile_revoked")
+
+    from user_app.main import ApplicationManager
+
+    class MainWindow:
+        email = PROFILE["email"]
+        force_logout_by_admin = _Recorder()
+
+    class Manager:
+        main_window = MainWindow()
+
+    ApplicationManager.handle_profile_revoked(Manager(), EMAIL)
+    assert MainWindow.force_logout_by_admin.calls == [((), {"reason": "revoked"})]
+    print("   ✓ Приложение завершает сессию: force_logout_by_admin(reason='revoked')")
+
+    Manager.main_window = type("Other", (), {"email": "other@x.ru", "force_logout_by_admin": _Recorder()})()
+    ApplicationManager.handle_profile_revoked(Manager(), EMAIL)
+    assert Manager.main_window.force_logout_by_admin.calls == []
+    print("   ✓ Сессия другого пользователя не затрагивается")
+
+    print("\n✅ Сверка: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Подпись HMAC", test_signature),
+        ("TTL", test_ttl),
+        ("Сверка входа по кэшу", test_reconcile_revokes),
+    ]
+
+    return run_tests("Profile Cache Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Тестирование ReachabilityMonitor
+
+Проверяет:
+- Горячий путь is_online() читает флаг без сетевых вызовов
+- Экспоненциальный интервал между пробами
+- Пассивные сигналы: успех API → online, сетевая ошибка → suspect + проба
+- Уведомление подписчиков о смене состояния
+- Offline по пробе (прокси): редкий пробный запрос к API, его успех → online
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sync.network import ReachabilityMonitor
+
+
+class FakeProbe:
+    """Управляемая проба: считает вызовы, результат задаётся тестом"""
+    def __init__(self, ok=True):
+        self.ok = ok
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls.append(time.monotonic())
+        return self.ok
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_hot_path():
+    """Тест 1: is_online() — чтение флага"""
+    print("="*60)
+    print("TEST 1: Горячий путь")
+    print("="*60)
+
+    probe = FakeProbe(ok=True)
+    monitor = ReachabilityMonitor(probe=probe, min_interval=10, max_interval=10)
+    assert monitor.is_online(wait=2.0)
+    assert monitor.state == ReachabilityMonitor.ONLINE
+    print(f"   ✓ Первая проба: {monitor.state}")
+
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        monitor.is_online(wait=0.5)
+    per_call_ns = (time.perf_counter() - start) / n * 1e9
+    assert len(probe.calls) == 1, len(probe.calls)
+    print(f"   ✓ {n} вызовов: {per_call_ns:.0f} ns/вызов, проб: {len(probe.calls)}")
+
+    monitor.stop()
+    print("\n✅ Горячий путь: PASSED")
+    return True
+
+
+def test_exponential_cadence():
+    """Тест 2: Интервал растёт, пока состояние не меняется"""
+    print("\n" + "="*60)
+    print("TEST 2: Экспоненциальный интервал")
+    print("="*60)
+
+    probe = FakeProbe(ok=False)
+    monitor = ReachabilityMonitor(probe=probe, min_interval=0.05, max_interval=0.4)
+    monitor.start()
+    assert wait_for(lambda: len(probe.calls) >= 5)
+    assert not monitor.is_online()
+    gaps = [b - a for a, b in zip(probe.calls, probe.calls[1:])]
+    print(f"   ✓ Интервалы: {', '.join(f'{g:.2f}' for g in gaps[:4])}s")
+    assert gaps[1] > gaps[0] * 1.5 and gaps[2] > gaps[1] * 1.5, gaps
+    assert monitor.get_stats()['interval'] <= 0.4
+
+    # Сеть вернулась: интервал сбрасывается к минимуму
+    probe.ok = True
+    assert wait_for(lambda: monitor.is_online(), timeout=2.0)
+    assert monitor.get_stats()['interval'] == 0.05
+    print("   ✓ Смена состояния сбрасывает интервал к минимуму")
+
+    monitor.stop()
+    print("\n✅ Экспоненциальный интервал: PASSED")
+    return True
+
+
+def test_passive_signals():
+    """Тест 3: Пассивные сигналы от API"""
+    print("\n" + "="*60)
+    print("TEST 3: Пассивные сигналы")
+    print("="*60)
+
+    probe = FakeProbe(ok=True)
+    monitor = ReachabilityMonitor(probe=probe, min_interval=0.05, max_interval=30)
+    monitor.report_success()
+    assert monitor.state == ReachabilityMonitor.ONLINE
+    monitor.start()
+    time.sleep(0.2)
+    assert len(probe.calls) == 0, len(probe.calls)
+    print("   ✓ Успех API: online, плановая проба отложена")
+
+    probe.ok = False
+    monitor.report_failure(ConnectionResetError("reset"))
+    assert monitor.is_online()  # SUSPECT — ещё не offline
+    assert wait_for(lambda: monitor.state == ReachabilityMonitor.OFFLINE)
+    print("   ✓ Сетевая ошибка: suspect → внеочередная проба → offline")
+
+    stats = monitor.get_stats()
+    assert stats['passive_success'] == 1 and stats['passive_failures'] == 1
+    monitor.stop()
+    print("\n✅ Пассивные сигналы: PASSED")
+    return True
+
+
+def test_listeners():
+    """Тест 4: Подписчики"""
+    print("\n" + "="*60)
+    print("TEST 4: Подписчики")
+    print("="*60)
+
+    monitor = ReachabilityMonitor(probe=FakeProbe(ok=False), min_interval=10)
+    events = []
+    monitor.add_listener(lambda old, new: events.append((old, new)))
+    monitor.add_listener(lambda old, new: 1 / 0)  # ошибка подписчика не ломает монитор
+    monitor.report_success()
+    monitor.report_success()
+    monitor.probe_now()
+    assert events == [("unknown", "online"), ("online", "offline")], events
+    print(f"   ✓ События: {events}")
+
+    print("\n✅ Подписчики: PASSED")
+    return True
+
+
+def test_trial_requests():
+    """Тест 5: Проба не проходит (прокси), а API отвечает"""
+    print("\n" + "="*60)
+    print("TEST 5: Пробные запросы в offline")
+    print("="*60)
+
+    monitor = ReachabilityMonitor(probe=FakeProbe(ok=False), min_interval=10, trial_interval=0.2)
+    monitor.probe_now()
+    assert monitor.state == ReachabilityMonitor.OFFLINE
+    assert monitor.trial_due()
+    allowed = [monitor.allow_request() for _ in range(100)]
+    assert not monitor.trial_due()
+    assert allowed.count(True) == 1, allowed.count(True)
+    print("   ✓ Offline: из 100 запросов пропущен один пробный")
+
+    time.sleep(0.25)
+    assert monitor.allow_request(), "по истечении trial_interval — следующий пробный"
+    assert not monitor.allow_request()
+    monitor.report_success()  # пробный запрос прошёл через прокси
+    assert monitor.state == ReachabilityMonitor.ONLINE
+    assert all(monitor.allow_request() for _ in range(100))
+    assert monitor.get_stats()['trial_requests'] == 2
+    print("   ✓ Успех пробного запроса: online, запросы идут без ограничений")
+
+    print("\n✅ Пробные запросы: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    print("╔" + "="*58 + "╗")
+    print("║" + " Reachability Monitor Tests ".center(58) + "║")
+    print("╚" + "="*58 + "╝")
+
+    tests = [
+        ("Горячий путь", test_hot_path),
+        ("Экспоненциальный интервал", test_exponential_cadence),
+        ("Пассивные сигналы", test_passive_signals),
+        ("Подписчики", test_listeners),
+        ("Пробные запросы в offline", test_trial_requests),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((test_name, result))
+        except Exception as e:
+            print(f"\n❌ {test_name}: FAILED with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((test_name, False))
+
+    # Итоги
+    print("\n" + "="*60)
+    print("ИТОГИ ТЕСТИРОВАНИЯ")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for test_name, result in results:
+        status = "✅ PASSED" if result else "❌ FAILED"
+        print(f"  {test_name:30} {status}")
+
+    print("\n" + "="*60)
+    print(f"Пройдено: {passed}/{total}")
+    print("="*60)
+
+    if passed == total:
+        print("\n🎉 ВСЕ ТЕСТЫ УСПЕШНО ПРОЙДЕНЫ!")
+        return 0
+    else:
+        print(f"\n⚠️  {total - passed} тест(ов) НЕ прошли")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Тестирование Retry Scheduler
+
+Проверяет:
+- Разбор ошибок (HTTP-статус, Retry-After)
+- Соблюдение Retry-After
+- Отсутствие повторов для неповторяемых ошибок
+- Неблокирующий submit (Future)
+- AIMD: работа под квотой без лавины 429
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from shared.resilience.retry_scheduler import (
+    RetryScheduler,
+    AIMDLimiter,
+    classify_error,
+    parse_retry_after,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeAPIError(Exception):
+    """Похож на gspread.APIError: исключение с .response"""
+    def __init__(self, status_code, retry_after=None):
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+        self.response = FakeResponse(status_code, headers)
+        super().__init__(f"APIError: [{status_code}]")
+
+
+def test_classify():
+    """Тест 1: Разбор ошибок"""
+    print("="*60)
+    print("TEST 1: Разбор ошибок")
+    print("="*60)
+
+    info = classify_error(FakeAPIError(429, retry_after=7))
+    assert info.status == 429 and info.throttled and info.retryable
+    assert info.retry_after == 7.0
+    print(f"   ✓ 429 + Retry-After: {info}")
+
+    info = classify_error(FakeAPIError(503))
+    assert info.retryable and not info.throttled
+    print(f"   ✓ 503: {info}")
+
+    info = classify_error(FakeAPIError(400))
+    assert not info.retryable
+    print(f"   ✓ 400: {info}")
+
+    info = classify_error(ConnectionResetError("reset by peer"))
+    assert info.retryable and info.status is None
+    print(f"   ✓ ConnectionResetError: {info}")
+
+    info = classify_error(Exception("APIError: [429]: Quota exceeded"))
+    assert info.status == 429 and info.throttled
+    print(f"   ✓ Статус из текста: {info}")
+
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("garbage") is None
+    print("   ✓ parse_retry_after: секунды, HTTP-дата, мусор")
+
+    print("\n✅ Разбор ошибок: PASSED")
+    return True
+
+
+def test_retry_after_respected():
+    """Тест 2: Повтор не раньше Retry-After, submit не блокирует"""
+    print("\n" + "="*60)
+    print("TEST 2: Retry-After + неблокирующий submit")
+    print("="*60)
+
+    scheduler = RetryScheduler("TestRetryAfter", max_attempts=3, base_delay=0.01)
+    calls = []
+
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise FakeAPIError(429, retry_after=0.5)
+        return "ok"
+
+    t0 = time.monotonic()
+    future = scheduler.submit(flaky, endpoint="read")
+    submit_time = time.monotonic() - t0
+    assert submit_time < 0.05, submit_time
+    print(f"   ✓ submit вернул Future за {submit_time*1000:.1f}ms")
+
+    assert future.result(timeout=5) == "ok"
+    gap = calls[1] - calls[0]
+    assert gap >= 0.5, gap
+    print(f"   ✓ Повтор через {gap:.2f}s (Retry-After=0.5)")
+
+    stats = scheduler.get_stats()
+    assert stats['throttled'] == 1 and stats['succeeded'] == 1
+    print(f"   ✓ Метрики: {stats['throttled']} throttled, {stats['retries']} retries")
+
+    scheduler.stop()
+    print("\n✅ Retry-After: PASSED")
+    return True
+
+
+def test_non_retryable():
+    """Тест 3: 400 и исчерпание попыток"""
+    print("\n" + "="*60)
+    print("TEST 3: Неповторяемые ошибки")
+    print("="*60)
+
+    scheduler = RetryScheduler("TestFatal", max_attempts=3, base_delay=0.01)
+    calls = {'bad': 0, 'down': 0}
+
+    def bad_request():
+        calls['bad'] += 1
+        raise FakeAPIError(400)
+
+    def service_down():
+        calls['down'] += 1
+        raise FakeAPIError(503)
+
+    try:
+        scheduler.submit(bad_request).result(timeout=5)
+        print("   ❌ Исключение не проброшено")
+        return False
+    except FakeAPIError:
+        pass
+    assert calls['bad'] == 1
+    print("   ✓ 400: одна попытка, исключение в Future")
+
+    try:
+        scheduler.submit(service_down).result(timeout=5)
+        return False
+    except FakeAPIError:
+        pass
+    assert calls['down'] == 3
+    print("   ✓ 503: 3 попытки (max_attempts), затем исключение")
+
+    scheduler.stop()
+    print("\n✅ Неповторяемые ошибки: PASSED")
+    return True
+
+
+def test_aimd_under_quota():
+    """Тест 4: AIMD держит темп у квоты"""
+    print("\n" + "="*60)
+    print("TEST 4: AIMD под квотой")
+    print("="*60)
+
+    # "Сервер": не больше 20 запросов в скользящую секунду, иначе 429
+    quota = 20
+    lock = threading.Lock()
+    served = []
+    rejected = [0]
+
+    def api_call(i):
+        now = time.monotonic()
+        with lock:
+            while served and now - served[0] > 1.0:
+                served.pop(0)
+            if len(served) >= quota:
+                rejected[0] += 1
+                raise FakeAPIError(429, retry_after=0.2)
+            served.append(now)
+        time.sleep(0.005)
+        return i
+
+    # Потолок клиента (40/с) выше квоты сервера (20/с)
+    scheduler = RetryScheduler(
+        "TestAIMD", max_workers=8, max_attempts=3, base_delay=0.05,
+        rate_per_minute=40 * 60, max_concurrency=8, max_throttled=50,
+    )
+    n = 80
+    start = time.monotonic()
+    futures = [scheduler.submit(api_call, i, endpoint="write") for i in range(n)]
+    results = [f.result(timeout=30) for f in futures]
+    elapsed = time.monotonic() - start
+
+    assert sorted(results) == list(range(n))
+    snap = scheduler.get_stats()['endpoints']['write']
+    print(f"   ✓ {n} запросов за {elapsed:.2f}s ({n/elapsed:.1f}/s при квоте {quota}/s)")
+    print(f"   ✓ 429 от сервера: {rejected[0]}, темп после прогона: "
+          f"{snap['rate_per_minute']/60:.1f}/s")
+    # Лавины 429 нет: отказов заметно меньше, чем запросов
+    assert rejected[0] < n / 2, rejected[0]
+    # И не "заморозили" клиента: время близко к n/quota
+    assert elapsed < 2 * n / quota, elapsed
+
+    scheduler.stop()
+    print("\n✅ AIMD: PASSED")
+    return True
+
+
+def test_limiter_unit():
+    """Тест 5: Параметры AIMDLimiter"""
+    print("\n" + "="*60)
+    print("TEST 5: AIMDLimiter")
+    print("="*60)
+
+    lim = AIMDLimiter("unit", rate_per_minute=60, max_concurrency=4)
+    now = 1000.0
+    assert lim.try_acquire(now) == 0.0
+    wait = lim.try_acquire(now)
+    assert wait is not None and abs(wait - 1.0) < 1e-6
+    print(f"   ✓ Темп 60/мин: следующий слот через {wait:.2f}s")
+
+    lim.release(False, classify_error(FakeAPIError(429, retry_after=5)), now=now)
+    assert lim.rate == 30 and lim.limit == 2
+    assert abs(lim.try_acquire(now) - 5.0) < 1e-6
+    print("   ✓ 429: темп и параллелизм /2, блок до Retry-After")
+
+    for _ in range(30):
+        lim.in_flight += 1
+        lim.release(True)
+    assert lim.rate == 60 and lim.limit == 4
+    print("   ✓ Успехи: аддитивный рост до потолка")
+
+    print("\n✅ AIMDLimiter: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    print("╔" + "="*58 + "╗")
+    print("║" + " Retry Scheduler Tests ".center(58) + "║")
+    print("╚" + "="*58 + "╝")
+
+    tests = [
+        ("Разбор ошибок", test_classify),
+        ("Retry-After", test_retry_after_respected),
+        ("Неповторяемые ошибки", test_non_retryable),
+        ("AIMD под квотой", test_aimd_under_quota),
+        ("AIMDLimiter", test_limiter_unit),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((test_name, result))
+        except Exception as e:
+            print(f"\n❌ {test_name}: FAILED with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((test_name, False))
+
+    # Итоги
+    print("\n" + "="*60)
+    print("ИТОГИ ТЕСТИРОВАНИЯ")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for test_name, result in results:
+        status = "✅ PASSED" if result else "❌ FAILED"
+        print(f"  {test_name:30} {status}")
+
+    print("\n" + "="*60)
+    print(f"Пройдено: {passed}/{total}")
+    print("="*60)
+
+    if passed == total:
+        print("\n🎉 ВСЕ ТЕСТЫ УСПЕШНО ПРОЙДЕНЫ!")
+        return 0
+    else:
+        print(f"\n⚠️  {total - passed} тест(ов) НЕ прошли")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
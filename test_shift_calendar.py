@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Тестирование кэша графика смен (admin_app.shift_calendar)
+
+Фейковая книга Sheets со счётчиком запросов. Проверяет:
+- Разбор: дневные колонки, индекс ФИО -> строка, смена на день
+- Переключение между сотрудниками не обращается к API
+- По истечении TTL лист перечитывается; ревизия книги в Drive не запрашивается
+  (её меняет каждая запись WorkLog_*/ActiveSessions)
+- force и invalidate перечитывают лист
+- BreakManager видит тот же кэшированный объект, что и админка
+- Чтение листа идёт без блокировки кэша; invalidate() во время чтения
+  не даёт устаревшему результату попасть в кэш
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from testing_support import run_tests, skip_without_config
+
+N_USERS = 300
+
+
+def _grid(n_users: int = N_USERS, marker: str = "9-18"):
+    header = ["ФИО", "Группа"] + [str(d) for d in range(1, 32)] + ["Итого"]
+    rows = [header]
+    for i in range(n_users):
+        rows.append([f"Сотрудник {i}", "Входящие"] + [marker if d % 7 else "" for d in range(1, 32)] + ["22"])
+    return rows
+
+
+class FakeSpreadsheet:
+    def __init__(self, book):
+        self.book = book
+
+    def get_lastUpdateTime(self):
+        self.book.calls.append("get_lastUpdateTime")
+        return "2026-01-01T00:00:00Z"
+
+
+class FakeWorksheet:
+    def __init__(self, book, title):
+        self.book = book
+        self.title = title
+
+    def get_all_values(self):
+        self.book.calls.append(f"get_all_values:{self.title}")
+        return [list(r) for r in self.book.sheets[self.title]]
+
+
+class FakeSheets:
+    """SheetsAPI: считает все обращения"""
+    def __init__(self):
+        self.calls = []
+        self.sheets = {"Users": [["Email"]], "ShiftCalendar": _grid()}
+
+    def list_worksheet_titles(self):
+        self.calls.append("list_worksheet_titles")
+        return list(self.sheets)
+
+    def get_worksheet(self, title):
+        self.calls.append(f"get_worksheet:{title}")
+        return FakeWorksheet(self, title)
+
+    def _get_spreadsheet(self):
+        return FakeSpreadsheet(self)
+
+    def _request_with_retry(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+
+def _fresh_cache(ttl: float):
+    """Подменить глобальный кэш новым (тесты не зависят друг от друга)"""
+    import admin_app.shift_calendar as sc
+    sc._cache = sc.ShiftCalendarCache(ttl=ttl)
+    return sc._cache
+
+
+def test_parsing():
+    """Тест 1: Разбор сетки графика"""
+    print("="*60)
+    print("TEST 1: Разбор графика")
+    print("="*60)
+
+    from admin_app.shift_calendar import ShiftCalendar, pick_schedule_title
+
+    cal = ShiftCalendar("ShiftCalendar", _grid(3))
+    assert cal and len(cal) == 3
+    assert [d for _, d in cal.day_columns] == [str(d) for d in range(1, 32)]
+    assert cal.day_columns[0] == (2, "1")
+    print(f"   ✓ Дневные колонки: {len(cal.day_columns)}, «Группа» и «Итого» пропущены")
+
+    assert cal.row_for(" Сотрудник 1 ")[0] == "Сотрудник 1"
+    assert cal.row_for("Нет такого") is None and cal.days_for("Нет такого") == []
+    days = cal.days_for("Сотрудник 2")
+    assert days[0] == ("1", "9-18") and days[6] == ("7", "")
+    assert cal.shift_on("Сотрудник 0", 1) == "9-18" and cal.shift_on("Сотрудник 0", 7) == ""
+    assert cal.shift_on("Сотрудник 0", 40) is None
+    print("   ✓ Строка по ФИО, дни и смена на дату")
+
+    # Короткая строка: недостающие дни — пустые
+    short = ShiftCalendar("S", [["ФИО", "1", "2", "3"], ["Иванов", "8-17"]])
+    assert short.days_for("Иванов") == [("1", "8-17"), ("2", ""), ("3", "")]
+    assert not ShiftCalendar(None, [])
+    assert pick_schedule_title(["Users", "График", "Schedule"]) == "Schedule"
+    assert pick_schedule_title(["Users"]) is None
+    print("   ✓ Короткие строки, пустой календарь, выбор листа")
+
+    print("\n✅ Разбор графика: PASSED")
+    return True
+
+
+def test_switch_without_api_calls():
+    """Тест 2: Смена сотрудника без запросов к API"""
+    print("\n" + "="*60)
+    print("TEST 2: Переключение сотрудников")
+    print("="*60)
+
+    from admin_app.shift_calendar import get_shift_calendar
+    cache = _fresh_cache(ttl=60)
+    sheets = FakeSheets()
+
+    t0 = time.perf_counter()
+    cal = get_shift_calendar(sheets)
+    load_ms = (time.perf_counter() - t0) * 1000
+    assert cal.title == "ShiftCalendar" and len(cal) == N_USERS
+    assert sheets.calls == [
+        "list_worksheet_titles", "get_worksheet:ShiftCalendar", "get_all_values:ShiftCalendar",
+    ], sheets.calls
+    print(f"   ✓ Первая загрузка и разбор: {load_ms:.1f}ms, {len(sheets.calls)} запроса")
+
+    # Как on_schedule_user_change: каждый раз берём календарь и строку
+    sheets.calls.clear()
+    t0 = time.perf_counter()
+    for fio in cal.fios():
+        c = get_shift_calendar(sheets)
+        assert c is cal and c.days_for(fio)
+    per_switch_us = (time.perf_counter() - t0) / N_USERS * 1e6
+    assert sheets.calls == [], sheets.calls
+    print(f"   ✓ {N_USERS} переключений: 0 запросов, {per_switch_us:.1f}µs на переключение")
+    print(f"   ✓ Статистика: {cache.get_stats()}")
+
+    print("\n✅ Переключение сотрудников: PASSED")
+    return True
+
+
+def test_ttl_and_invalidate():
+    """Тест 3: TTL, force и invalidate"""
+    print("\n" + "="*60)
+    print("TEST 3: Инвалидация по TTL")
+    print("="*60)
+
+    from admin_app.shift_calendar import get_shift_calendar
+    cache = _fresh_cache(ttl=0.05)
+    sheets = FakeSheets()
+    cal = get_shift_calendar(sheets)
+
+    # Лист изменили: до конца TTL — прежний календарь, после — одно чтение листа
+    sheets.sheets["ShiftCalendar"] = _grid(marker="10-19")
+    sheets.calls.clear()
+    assert get_shift_calendar(sheets) is cal and sheets.calls == []
+    time.sleep(0.06)
+    new = get_shift_calendar(sheets)
+    assert new is not cal and new.shift_on("Сотрудник 0", 1) == "10-19"
+    assert sheets.calls == ["list_worksheet_titles", "get_worksheet:ShiftCalendar",
+                            "get_all_values:ShiftCalendar"], sheets.calls
+    print("   ✓ TTL истёк: лист перечитан без запроса ревизии книги")
+
+    # Явный сброс после записи
+    sheets.calls.clear()
+    forced = get_shift_calendar(sheets, force=True)
+    assert forced is not new and "get_all_values:ShiftCalendar" in sheets.calls
+    cache.invalidate()
+    assert cache.peek() is None
+    sheets.calls.clear()
+    get_shift_calendar(sheets)
+    assert "get_all_values:ShiftCalendar" in sheets.calls
+    print("   ✓ force=True и invalidate() перечитывают лист")
+
+    # Помесячные листы кэшируются отдельно
+    sheets.sheets["График 2026-02"] = _grid(5)
+    feb = get_shift_calendar(sheets, title="График 2026-02")
+    assert len(feb) == 5 and cache.peek("График 2026-02") is feb and cache.peek() is not feb
+    print(f"   ✓ Отдельный ключ на лист; статистика: {cache.get_stats()}")
+
+    print("\n✅ Инвалидация: PASSED")
+    return True
+
+
+def test_shared_with_break_manager():
+    """Тест 4: Общий кэш админки и подсистемы перерывов"""
+    print("\n" + "="*60)
+    print("TEST 4: Общий кэш с BreakManager")
+    print("="*60)
+    skip_without_config()
+
+    from admin_app.shift_calendar import get_shift_calendar
+    from admin_app.break_manager import BreakManager
+    _fresh_cache(ttl=60)
+    sheets = FakeSheets()
+
+    cal = get_shift_calendar(sheets)  # админка загрузила график
+    sheets.calls.clear()
+    mgr = BreakManager(sheets)
+    assert mgr.get_shift_calendar() is cal
+    assert mgr.get_shift_calendar().shift_on("Сотрудник 3", 1) == "9-18"
+    assert sheets.calls == [], sheets.calls
+    print("   ✓ BreakManager получил тот же календарь без запросов к API")
+
+    print("\n✅ Общий кэш: PASSED")
+    return True
+
+
+def test_load_outside_lock():
+    """Тест 5: Запросы к API не держат блокировку кэша"""
+    print("\n" + "="*60)
+    print("TEST 5: Загрузка вне блокировки")
+    print("="*60)
+
+    from admin_app.shift_calendar import ShiftCalendar, ShiftCalendarCache
+    cache = ShiftCalendarCache(ttl=60)
+    cache.get("Февраль", lambda: ShiftCalendar("Февраль", _grid(3)))
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        assert release.wait(5)
+        return ShiftCalendar("Март", _grid(4))
+
+    result = {}
+    loader = threading.Thread(target=lambda: result.setdefault("cal", cache.get("Март", slow_load)))
+    loader.start()
+    assert started.wait(5)
+
+    # Пока «Март» читается, другой лист и статистика доступны сразу
+    t0 = time.perf_counter()
+    feb = cache.get("Февраль", lambda: ShiftCalendar("Февраль", []))
+    cache.get_stats()
+    assert len(feb) == 3 and time.perf_counter() - t0 < 0.5
+    print("   ✓ Чтение одного листа не блокирует кэш для остальных")
+
+    # Сброс во время чтения: прочитанное возвращается, но в кэш не попадает
+    cache.invalidate("Март")
+    release.set()
+    loader.join(5)
+    assert len(result["cal"]) == 4 and cache.peek("Март") is None
+    print("   ✓ invalidate() во время чтения: результат не сохранён в кэше")
+
+    started.clear()
+    release.clear()
+    loader = threading.Thread(target=lambda: result.update(cal=cache.get("Март", slow_load)))
+    loader.start()
+    assert started.wait(5)
+    cache.invalidate()
+    release.set()
+    loader.join(5)
+    assert cache.peek("Март") is None and cache.peek("Февраль") is None
+    assert cache.get("Март", lambda: ShiftCalendar("Март", _grid(2))) is cache.peek("Март")
+    print("   ✓ Полный invalidate() во время чтения; следующее чтение кэшируется")
+
+    print("\n✅ Загрузка вне блокировки: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Разбор графика", test_parsing),
+        ("Переключение сотрудников", test_switch_without_api_calls),
+        ("TTL и invalidate", test_ttl_and_invalidate),
+        ("Общий кэш", test_shared_with_break_manager),
+        ("Загрузка вне блокировки", test_load_outside_lock),
+    ]
+
+    return run_tests("Shift Calendar Cache Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
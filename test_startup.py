@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Тестирование холодного старта user_app
+
+Проверяет (в отдельном процессе, как при реальном запуске):
+- Бюджет импорта user_app.main по `python -X importtime`
+- Что тяжёлые модули (API бэкенда, gspread/google-auth, синхронизация,
+  health/resilience) не импортируются до показа окна
+- Бюджет первой отрисовки окна входа (Qt offscreen)
+
+Бюджеты: WTT_IMPORT_BUDGET_MS (по умолчанию 1500),
+WTT_FIRST_PAINT_BUDGET_MS (по умолчанию 2500).
+Без PyQt5/python-dotenv тесты пропускаются.
+"""
+
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).parent.resolve()
+sys.path.insert(0, str(ROOT))
+
+from testing_support import SkipTest, run_tests
+
+IMPORT_BUDGET_MS = float(os.getenv("WTT_IMPORT_BUDGET_MS", "1500"))
+FIRST_PAINT_BUDGET_MS = float(os.getenv("WTT_FIRST_PAINT_BUDGET_MS", "2500"))
+
+# Эти модули должны загружаться StartupInitializer, а не при импорте
+DEFERRED_MODULES = (
+    "api_adapter",
+    "sheets_api",
+    "supabase",
+    "supabase_api",
+    "gspread",
+    "google.auth",
+    "google.oauth2",
+    "auto_sync",
+    "notifications.engine",
+    "shared.health",
+    "shared.resilience",
+    "pyzipper",
+    "cryptography",
+)
+
+REQUIRED = ("PyQt5", "dotenv")
+
+
+def _missing_requirements():
+    return [name for name in REQUIRED if importlib.util.find_spec(name) is None]
+
+
+def _env(tmp: Path) -> dict:
+    """Окружение процесса: фиктивные credentials, offscreen Qt"""
+    creds = tmp / "service_account.json"
+    creds.write_text(json.dumps({"type": "service_account"}), encoding="utf-8")
+    env = dict(os.environ)
+    env.update({
+        "GOOGLE_CREDENTIALS_FILE": str(creds),
+        "QT_QPA_PLATFORM": "offscreen",
+        "PYTHONPATH": str(ROOT),
+    })
+    return env
+
+
+def parse_importtime(stderr: str) -> dict:
+    """{модуль: (self_us, cumulative_us)} из вывода -X importtime"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # строка заголовка
+        modules[parts[2].strip()] = (self_us, cumulative_us)
+    return modules
+
+
+def _is_deferred(module: str) -> bool:
+    return any(module == name or module.startswith(name + ".") for name in DEFERRED_MODULES)
+
+
+def test_import_budget():
+    """Тест 1: Импорт user_app.main по -X importtime"""
+    print("="*60)
+    print("TEST 1: Бюджет импорта")
+    print("="*60)
+
+    missing = _missing_requirements()
+    if missing:
+        raise SkipTest(f"не установлены {', '.join(missing)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import user_app.main"],
+            cwd=str(ROOT), env=_env(Path(tmp)), capture_output=True, text=True, timeout=120,
+        )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    modules = parse_importtime(proc.stderr)
+
+    total_ms = modules["user_app.main"][1] / 1000
+    print(f"   ✓ import user_app.main: {total_ms:.0f}ms (бюджет {IMPORT_BUDGET_MS:.0f}ms), "
+          f"{len(modules)} модулей")
+    slowest = sorted(modules.items(), key=lambda kv: kv[1][0], reverse=True)[:5]
+    for name, (self_us, _) in slowest:
+        print(f"      {self_us/1000:7.1f}ms  {name}")
+
+    eager = sorted(name for name in modules if _is_deferred(name))
+    assert not eager, f"Импортированы при старте: {eager}"
+    print("   ✓ API, синхронизация и health/resilience не импортируются до окна")
+    assert total_ms <= IMPORT_BUDGET_MS, total_ms
+
+    print("\n✅ Бюджет импорта: PASSED")
+    return True
+
+
+FIRST_PAINT_SCRIPT = r"""
+import json, os, sys, time
+t0 = time.perf_counter()
+import user_app.main as m
+
+# Модальное окно ошибки старта ждало бы нажатия до таймаута — сразу завершаемся с текстом ошибки
+def _modal(parent, title, text, *args, **kwargs):
+    sys.stderr.write(f"QMessageBox: {title}: {text}\n")
+    sys.stderr.flush()
+    os._exit(3)
+for _name in ("critical", "warning", "information", "question"):
+    setattr(m.QMessageBox, _name, staticmethod(_modal))
+
+m.db_local.init_db(sys.argv[1], sys.argv[2])
+manager = m.ApplicationManager()
+manager.show_login_window()
+manager.app.processEvents()
+elapsed = (time.perf_counter() - t0) * 1000
+print(json.dumps({
+    "first_paint_ms": elapsed,
+    "visible": bool(manager.login_window and manager.login_window.isVisible()),
+    "modules": sorted(sys.modules),
+}))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+def test_first_paint():
+    """Тест 2: Окно входа показывается до фоновой инициализации"""
+    print("\n" + "="*60)
+    print("TEST 2: Первая отрисовка")
+    print("="*60)
+
+    missing = _missing_requirements()
+    if missing:
+        raise SkipTest(f"не установлены {', '.join(missing)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        try:
+            proc = subprocess.run(
+                [sys.executable, "-c", FIRST_PAINT_SCRIPT, str(tmp / "main.db"), str(tmp / "fallback.db")],
+                cwd=str(ROOT), env=_env(tmp), capture_output=True, text=True, timeout=60,
+            )
+        except subprocess.TimeoutExpired as e:
+            stderr = e.stderr.decode(errors="replace") if isinstance(e.stderr, bytes) else (e.stderr or "")
+            raise AssertionError(f"Окно входа не показано за {e.timeout:.0f}с: {stderr[-2000:]}") from None
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert result["visible"], "Окно входа не показано"
+    print(f"   ✓ Окно входа показано за {result['first_paint_ms']:.0f}ms "
+          f"(бюджет {FIRST_PAINT_BUDGET_MS:.0f}ms)")
+    eager = [name for name in result["modules"] if _is_deferred(name)]
+    assert not eager, f"Загружены до показа окна: {eager}"
+    print("   ✓ Тяжёлые модули не загружены к моменту показа")
+    assert result["first_paint_ms"] <= FIRST_PAINT_BUDGET_MS, result["first_paint_ms"]
+
+    print("\n✅ Первая отрисовка: PASSED")
+    return True
+
+
+def test_parse_importtime():
+    """Тест 3: Разбор вывода -X importtime"""
+    print("\n" + "="*60)
+    print("TEST 3: Разбор -X importtime")
+    print("="*60)
+
+    sample = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _io\n"
+        "import time:       900 |       1500 |     gspread.client\n"
+        "import time:      2000 |       5000 | user_app.main\n"
+    )
+    modules = parse_importtime(sample)
+    assert modules == {"_io": (120, 120), "gspread.client": (900, 1500), "user_app.main": (2000, 5000)}
+    assert _is_deferred("gspread.client") and not _is_deferred("gspreadx")
+    print("   ✓ Модули, self/cumulative, вложенность по отступам")
+
+    print("\n✅ Разбор -X importtime: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Бюджет импорта", test_import_budget),
+        ("Первая отрисовка", test_first_paint),
+        ("Разбор -X importtime", test_parse_importtime),
+    ]
+
+    return run_tests("Startup Budget Tests", tests)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
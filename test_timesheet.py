@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Тестирование табеля рабочего времени (admin_app.timesheet)
+
+Проверяет:
+- Закрытие незакрытых статусов, слияние дублей, LOGOUT, журнал событий
+- Смены: задержка после полуночи и ночная смена остаются в дне начала смены
+- Сверка с поминутным построчным расчётом на случайных данных
+- Бенчмарк: год синтетических статусов для TIMESHEET_BENCH_EMPLOYEES
+  сотрудников (по умолчанию 1000) против цикла по строкам
+- BreakManager.get_timesheet: листы WorkLog_* + окна смен из графиков
+"""
+
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from admin_app.timesheet import DAY, StatusIntervals, compute_timesheet
+from testing_support import run_tests, skip_without_config
+
+BENCH_EMPLOYEES = int(os.getenv("TIMESHEET_BENCH_EMPLOYEES", "1000"))
+BENCH_DAYS = 365
+
+NOW = datetime(2025, 3, 10, 12, 0)
+
+
+def _row(email, status, start, end=None, action="STATUS_CHANGE"):
+    return {"email": email, "status": status, "action_type": action,
+            "status_start_time": start, "status_end_time": end}
+
+
+def _by_day(sheet):
+    return {(r["email"], r["date"]): r for r in sheet.rows()}
+
+
+def test_intervals():
+    """Незакрытые статусы, дубли, LOGOUT, журнал событий"""
+    print("\n" + "=" * 60)
+    print("ТЕСТ 1: Загрузка и слияние интервалов")
+    print("=" * 60)
+
+    rows = [
+        _row("A@x.ru", "В работе", "2025-03-03T09:00:00", "2025-03-03T11:00:00", "LOGIN"),
+        _row("a@x.ru", "Перерыв", "2025-03-03T11:00:00", "2025-03-03T11:15:00"),
+        _row("a@x.ru", "Чат", "2025-03-03T11:15:00"),                         # не закрыт
+        _row("a@x.ru", "Обед", "2025-03-03 13:00:00", "2025-03-03 14:00:00"),
+        _row("a@x.ru", "В работе", "2025-03-03T14:00:00.250000", "2025-03-03T18:00:00"),
+        _row("a@x.ru", "", "2025-03-03T18:00:00", "2025-03-03T18:00:00", "LOGOUT"),
+        _row("a@x.ru", "В работе", "2025-03-03T09:00:00", "2025-03-03T11:00:00", "LOGIN"),  # дубль
+        _row("b@x.ru", "В работе", "2025-03-05T09:00:00"),                    # клиент упал
+    ]
+    iv = StatusIntervals.from_records(rows, now=NOW, max_open_hours=10)
+    assert iv.emails == ["a@x.ru", "b@x.ru"], iv.emails
+    days = _by_day(compute_timesheet(iv))
+    a = days[("a@x.ru", "2025-03-03")]
+    print(f"  a@x.ru: {a}")
+    assert a["present_min"] == 9 * 60 and a["break_min"] == 15 and a["lunch_min"] == 60
+    assert a["work_min"] == 9 * 60 - 75 and a["overtime_min"] == 0
+    assert a["first_in"] == "2025-03-03T09:00:00" and a["last_out"] == "2025-03-03T18:00:00"
+    b = days[("b@x.ru", "2025-03-05")]
+    assert b["present_min"] == 10 * 60, b  # не дальше max_open_hours
+    print("  ✅ «Чат» закрыт началом обеда, дубль слит, незакрытый статус ограничен")
+
+    events = [
+        {"Email": "c@x.ru", "Status": "В работе", "Action": "LOGIN", "Timestamp": "2025-03-03 09:00:00"},
+        {"Email": "c@x.ru", "Status": "Обед", "Action": "STATUS_CHANGE", "Timestamp": "2025-03-03 13:00:00"},
+        {"Email": "c@x.ru", "Status": "Чат", "Action": "STATUS_CHANGE", "Timestamp": "2025-03-03 13:40:00"},
+        {"Email": "c@x.ru", "Status": "", "Action": "LOGOUT", "Timestamp": "2025-03-03 17:00:00"},
+        {"Email": "c@x.ru", "Status": "В работе", "Action": "LOGIN", "Timestamp": "2025-03-04 09:00:00"},
+    ]
+    c = _by_day(compute_timesheet(StatusIntervals.from_records(events, now=datetime(2025, 3, 4, 9, 30))))
+    assert c[("c@x.ru", "2025-03-03")]["present_min"] == 8 * 60
+    assert c[("c@x.ru", "2025-03-03")]["lunch_min"] == 40
+    assert c[("c@x.ru", "2025-03-04")]["present_min"] == 30
+    print("  ✅ Журнал событий: статус до следующего события, LOGOUT только закрывает")
+    return True
+
+
+def test_shifts_and_midnight():
+    """Окно смены, переработка, переход через полночь"""
+    print("\n" + "=" * 60)
+    print("ТЕСТ 2: Смены и переход через полночь")
+    print("=" * 60)
+
+    rows = [
+        # дневная смена 09-18, задержался до 00:30
+        _row("day@x.ru", "В работе", "2025-03-03T08:30:00", "2025-03-03T13:00:00", "LOGIN"),
+        _row("day@x.ru", "Обед", "2025-03-03T13:00:00", "2025-03-03T14:00:00"),
+        _row("day@x.ru", "В работе", "2025-03-03T14:00:00", "2025-03-04T00:30:00"),
+        # ночная смена 20-08
+        _row("night@x.ru", "В работе", "2025-03-03T19:45:00", "2025-03-04T02:00:00", "LOGIN"),
+        _row("night@x.ru", "Перерыв", "2025-03-04T02:00:00", "2025-03-04T02:20:00"),
+        _row("night@x.ru", "Аудио", "2025-03-04T02:20:00", "2025-03-04T08:00:00"),
+        # без смены — сутки режутся по полуночи
+        _row("free@x.ru", "В работе", "2025-03-03T22:00:00", "2025-03-04T02:00:00", "LOGIN"),
+    ]
+    shifts = {"DAY@x.ru": ("09:00", "18:00"), "night@x.ru": ("20:00", "08:00")}
+    days = _by_day(compute_timesheet(StatusIntervals.from_records(rows, now=NOW), shifts=shifts))
+    for key in sorted(days):
+        print(f"  {key}: work={days[key]['work_min']} in_shift={days[key]['in_shift_min']} "
+              f"overtime={days[key]['overtime_min']}")
+
+    day = days[("day@x.ru", "2025-03-03")]
+    assert ("day@x.ru", "2025-03-04") not in days
+    assert day["work_min"] == 15 * 60 and day["lunch_min"] == 60
+    assert day["in_shift_min"] == 8 * 60 and day["overtime_min"] == 7 * 60
+    assert day["last_out"] == "2025-03-04T00:30:00"
+
+    night = days[("night@x.ru", "2025-03-03")]
+    assert ("night@x.ru", "2025-03-04") not in days
+    assert night["work_min"] == 12 * 60 + 15 - 20 and night["break_min"] == 20
+    assert night["overtime_min"] == 15
+
+    assert days[("free@x.ru", "2025-03-03")]["work_min"] == 120
+    assert days[("free@x.ru", "2025-03-04")]["work_min"] == 120
+    assert days[("free@x.ru", "2025-03-03")]["overtime_min"] == 0
+
+    only = compute_timesheet(StatusIntervals.from_records(rows, now=NOW), shifts=shifts,
+                             date_from="2025-03-04", date_to="2025-03-04")
+    assert [r["email"] for r in only.rows()] == ["free@x.ru"]
+    print("  ✅ Ночная смена и задержка после полуночи — в дне начала смены")
+    return True
+
+
+def _reference(rows, shifts):
+    """Поминутный построчный расчёт: минута -> день ближайшего окна смены"""
+    present, pause, brk = defaultdict(set), defaultdict(set), defaultdict(set)
+    for r in rows:
+        s = datetime.fromisoformat(r["status_start_time"])
+        e = datetime.fromisoformat(r["status_end_time"])
+        minutes = range(int(s.timestamp()) // 60, int(e.timestamp()) // 60)
+        present[r["email"]].update(minutes)
+        if r["status"] in ("Перерыв", "Обед"):
+            pause[r["email"]].update(minutes)
+        if r["status"] == "Перерыв":
+            brk[r["email"]].update(minutes)
+
+    out = defaultdict(lambda: defaultdict(int))
+    for email, mins in present.items():
+        shift = shifts.get(email)
+        if shift:
+            shift = [datetime.strptime(x, "%H:%M").time() for x in shift]
+        for m in mins:
+            t = datetime.fromtimestamp(m * 60)
+            if not shift:
+                label, inside = t.date(), True
+            else:
+                best = None
+                for d in (t.date() - timedelta(days=1), t.date(), t.date() + timedelta(days=1)):
+                    w0 = datetime.combine(d, shift[0])
+                    w1 = datetime.combine(d, shift[1])
+                    if w1 <= w0:
+                        w1 += timedelta(days=1)
+                    dist = max((w0 - t).total_seconds(), (t - w1).total_seconds() + 60, 0)
+                    if best is None or dist < best[0]:
+                        best = (dist, d)
+                label, inside = best[1], best[0] == 0
+            cell = out[(email, str(label))]
+            cell["present_min"] += 1
+            is_pause = m in pause[email]
+            cell["break_min"] += m in brk[email]
+            if not is_pause:
+                cell["work_min"] += 1
+                cell["in_shift_min" if inside else "overtime_min"] += 1
+    return out
+
+
+def test_against_reference():
+    """Сверка с поминутным расчётом на случайных перекрывающихся данных"""
+    print("\n" + "=" * 60)
+    print("ТЕСТ 3: Сверка с построчным расчётом")
+    print("=" * 60)
+
+    rnd = random.Random(49)
+    statuses = ["В работе", "Чат", "Аудио", "Перерыв", "Обед"]
+    choices = [None, ("09:00", "18:00"), ("20:00", "08:00"), ("08:00", "20:00"), ("00:00", "08:00")]
+    rows, shifts = [], {}
+    for u in range(40):
+        email = f"user{u}@x.ru"
+        if choices[u % len(choices)]:
+            shifts[email] = choices[u % len(choices)]
+        t = datetime(2025, 2, 1, rnd.randrange(24), rnd.randrange(60))
+        for _ in range(200):
+            t += timedelta(minutes=rnd.choice([0, 5, 30, 120, 600]))
+            length = timedelta(minutes=rnd.randrange(1, 300))
+            rows.append(_row(email, rnd.choice(statuses), t.isoformat(), (t + length).isoformat()))
+            if rnd.random() < 0.1:  # дубль из повторной синхронизации
+                rows.append(dict(rows[-1]))
+            t += length - timedelta(minutes=rnd.choice([0, 0, 10]))
+
+    sheet = compute_timesheet(StatusIntervals.from_records(rows, now=NOW), shifts=shifts)
+    ref = _reference(rows, shifts)
+    got = _by_day(sheet)
+    assert set(got) == set(ref), (len(got), len(ref), sorted(set(got) ^ set(ref))[:5])
+    fields = ("present_min", "work_min", "break_min", "in_shift_min", "overtime_min")
+    bad = [(key, f, got[key][f], ref[key][f]) for key in ref for f in fields if got[key][f] != ref[key][f]]
+    print(f"  Строк: {len(rows)}, ячеек «сотрудник × день»: {len(got)}, расхождений: {len(bad)}")
+    assert not bad, bad[:5]
+    print("  ✅ Совпадает с поминутным расчётом (в т.ч. ночные смены и смена 00:00–08:00)")
+    return True
+
+
+def _synthetic_year(n_employees: int, n_days: int, seed: int = 49):
+    """Год статусов: ~12 статусов в рабочий день, дубли, незакрытые статусы"""
+    rng = np.random.default_rng(seed)
+    pattern = np.array(["В работе", "Чат", "Перерыв", "Аудио", "В работе", "Обед",
+                        "Запись", "Чат", "Перерыв", "Анкеты", "В работе", "Чат"])
+    minutes = np.array([60, 50, 15, 60, 40, 45, 60, 50, 15, 40, 60, 45])
+    day0 = np.datetime64("2024-01-01", "s").astype(np.int64)
+
+    user, day = np.divmod(np.arange(n_employees * n_days), n_days)
+    workday = ((day % 7) < 5) & (rng.random(len(day)) > 0.05)
+    user, day = user[workday], day[workday]
+    night = (user % 10) == 0
+    login = day0 + day * DAY + np.where(night, 20, 9) * 3600 + rng.integers(-900, 900, len(day))
+
+    lengths = minutes * 60 + rng.integers(-300, 300, (len(day), len(minutes)))
+    ends = login[:, None] + np.cumsum(lengths, axis=1)
+    starts = ends - lengths
+    n = starts.size
+    names = np.array([f"user{u}@company.com" for u in range(n_employees)], dtype=object)
+    emails = names[np.repeat(user, len(minutes))]
+    status = np.tile(pattern, len(day))
+    start_s = np.datetime_as_string(starts.ravel().astype("datetime64[s]")).astype(object)
+    end_s = np.datetime_as_string(ends.ravel().astype("datetime64[s]")).astype(object)
+    # незакрытые статусы посреди смены (потерян UPDATE конца статуса)
+    lost = rng.random(starts.shape) < 0.03
+    lost[:, -1] = False
+    end_s[lost.ravel()] = None
+    dup = np.flatnonzero(rng.random(n) < 0.02)
+    order = np.r_[np.arange(n), dup]
+    return (emails[order].tolist(), status[order].tolist(), start_s[order].tolist(), end_s[order].tolist(),
+            {f"user{u}@company.com": ("20:00", "08:00") if u % 10 == 0 else ("09:00", "18:00")
+             for u in range(n_employees)},
+            np.bincount(user, minlength=n_employees))
+
+
+def _loop_timesheet(emails, statuses, starts, ends):
+    """Прежний способ: цикл по строкам, суммы по (email, дата начала)"""
+    totals = defaultdict(lambda: [0, 0, 0])
+    for email, status, s, e in zip(emails, statuses, starts, ends):
+        if not e:
+            continue
+        dur = (datetime.fromisoformat(e) - datetime.fromisoformat(s)).total_seconds()
+        cell = totals[(email.lower(), s[:10])]
+        if status == "Перерыв":
+            cell[1] += dur
+        elif status == "Обед":
+            cell[2] += dur
+        else:
+            cell[0] += dur
+    return totals
+
+
+def test_benchmark():
+    """Год данных для BENCH_EMPLOYEES сотрудников"""
+    print("\n" + "=" * 60)
+    print(f"ТЕСТ 4: Бенчмарк — {BENCH_EMPLOYEES} сотрудников × {BENCH_DAYS} дней")
+    print("=" * 60)
+
+    emails, statuses, starts, ends, shifts, workdays = _synthetic_year(BENCH_EMPLOYEES, BENCH_DAYS)
+    print(f"  Строк статусов: {len(emails):,}")
+
+    t0 = time.perf_counter()
+    iv = StatusIntervals.from_arrays(emails, statuses, starts, ends, now=datetime(2025, 1, 1))
+    t1 = time.perf_counter()
+    sheet = compute_timesheet(iv, shifts=shifts)
+    t2 = time.perf_counter()
+    summary = sheet.by_user()
+    t3 = time.perf_counter()
+    print(f"  Загрузка в массивы:     {t1 - t0:6.2f} с")
+    print(f"  Расчёт табеля:          {t2 - t1:6.2f} с  ({len(sheet):,} ячеек «сотрудник × день»)")
+    print(f"  Итоги по сотрудникам:   {t3 - t2:6.2f} с")
+
+    t4 = time.perf_counter()
+    loop = _loop_timesheet(emails, statuses, starts, ends)
+    t5 = time.perf_counter()
+    print(f"  Цикл по строкам:        {t5 - t4:6.2f} с  (без слияния дублей, смен и полуночи)")
+    print(f"  Ускорение: ×{(t5 - t4) / (t2 - t0):.1f}")
+
+    # Каждая смена (и ночная, через полночь) — ровно один день табеля;
+    # цикл по дате начала статуса делит ночные смены на два дня
+    assert len(summary) == BENCH_EMPLOYEES
+    for r in summary:
+        assert r["days"] == workdays[int(r["email"][4:].split("@")[0])], r
+        assert r["break_min"] >= r["days"] * 20 and r["lunch_min"] >= r["days"] * 40, r
+    print(f"  Ячеек у цикла: {len(loop):,} (ночные смены разрезаны по дате начала статуса)")
+    assert (t2 - t0) < (t5 - t4), "векторный расчёт медленнее цикла"
+    print("  ✅ Векторный табель быстрее построчного цикла")
+    return True
+
+
+class FakeWorksheet:
+    def __init__(self, title, rows):
+        self.title = title
+        self.rows = rows
+
+
+class FakeSheets:
+    """Минимум SheetsAPI для BreakManager: листы как списки dict"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.reads = []     # по запросу на лист
+        self.batches = []   # batchGet: список листов на запрос
+
+    def list_worksheet_titles(self):
+        return list(self.tables)
+
+    def get_worksheet(self, name):
+        return FakeWorksheet(name, self.tables[name])
+
+    def _read_table(self, ws):
+        self.reads.append(ws.title)
+        return ws.rows
+
+    def _batch_read_tables(self, names):
+        self.batches.append(list(names))
+        return {name: self.tables[name] for name in names}
+
+
+def test_break_manager():
+    """BreakManager.get_timesheet по листам WorkLog_* и назначенным графикам"""
+    print("\n" + "=" * 60)
+    print("ТЕСТ 5: BreakManager.get_timesheet")
+    print("=" * 60)
+
+    skip_without_config()
+    
+    from admin_app.break_manager import BreakManager
+
+    def ev(email, status, action, ts):
+        return {"Email": email, "Name": "", "Status": status, "Action": action, "Timestamp": ts}
+
+    sheets = FakeSheets({
+        "Users": [],
+        "WorkLog_Входящие": [
+            ev("a@x.ru", "В работе", "LOGIN", "2025-01-10 09:00:00"),
+            ev("a@x.ru", "", "LOGOUT", "2025-01-10 18:00:00"),
+            ev("a@x.ru", "В работе", "LOGIN", "2025-03-03 08:50:00"),
+            ev("a@x.ru", "Перерыв", "STATUS_CHANGE", "2025-03-03 11:00:00"),
+            ev("a@x.ru", "В работе", "STATUS_CHANGE", "2025-03-03 11:15:00"),
+            ev("a@x.ru", "", "LOGOUT", "2025-03-03 18:30:00"),
+        ],
+        "WorkLog_Стоматология": [
+            ev("b@x.ru", "Чат", "LOGIN", "2025-03-03 21:00:00"),
+            ev("b@x.ru", "", "LOGOUT", "2025-03-04 07:00:00"),
+        ],
+        "BreakSchedules": [
+            {"ScheduleID": "D", "Name": "День", "ShiftStart": "09:00", "ShiftEnd": "18:00"},
+            {"ScheduleID": "N", "Name": "Ночь", "ShiftStart": "20:00", "ShiftEnd": "08:00"},
+        ],
+        "UserBreakAssignments": [
+            {"Email": "A@x.ru", "ScheduleID": "D"},
+            {"Email": "b@x.ru", "ScheduleID": "N"},
+        ],
+    })
+    mgr = BreakManager(sheets)
+    mgr.SCHEDULES_SHEET, mgr.ASSIGNMENTS_SHEET = "BreakSchedules", "UserBreakAssignments"
+    sheet = mgr.get_timesheet("2025-03-03", "2025-03-03")
+    rows = {r["email"]: r for r in sheet.by_user()}
+    print(f"  {rows}")
+    print(f"  Запросов чтения: {len(sheets.batches) + len(sheets.reads)} ({sheets.batches})")
+    assert rows["a@x.ru"]["work_min"] == 9 * 60 + 40 - 15 and rows["a@x.ru"]["overtime_min"] == 40
+    assert rows["b@x.ru"]["work_min"] == 10 * 60 and rows["b@x.ru"]["overtime_min"] == 0
+    assert not sheets.reads and len(sheets.batches) == 1
+    assert sorted(sheets.batches[0]) == sorted(t for t in sheets.tables if t != "Users")
+    print("  ✅ Табель по всем листам WorkLog_* одним batchGet вместе с графиками и назначениями")
+
+    # Строки вне периода (с запасом в сутки) отбрасываются до разбора времени
+    worklog = sheets.tables["WorkLog_Входящие"]
+    assert len(StatusIntervals.from_records(worklog).start) == 4
+    assert len(StatusIntervals.from_records(worklog, date_from="2025-03-03", date_to="2025-03-03").start) == 3
+    assert len(StatusIntervals.from_records(worklog, date_to="2025-01-31").start) == 1
+    logs = [
+        {"email": "a@x.ru", "status": "В работе", "status_start_time": "2025-03-01 21:00:00",
+         "status_end_time": "2025-03-02 07:00:00"},
+        {"email": "a@x.ru", "status": "В работе", "status_start_time": "2025-02-27 09:00:00",
+         "status_end_time": "2025-02-27 18:00:00"},
+        {"email": "a@x.ru", "status": "В работе", "status_start_time": "2025-03-05 09:00:00",
+         "status_end_time": ""},
+    ]
+    assert len(StatusIntervals.from_records(logs, date_from="2025-03-03", date_to="2025-03-03").start) == 1
+    print("  ✅ from_records(date_from, date_to) отсекает строки вне периода")
+
+    assert mgr.get_shift_windows() == {"a@x.ru": ("09:00", "18:00"), "b@x.ru": ("20:00", "08:00")}
+    assert sheets.batches[-1] == ["BreakSchedules", "UserBreakAssignments"]
+    print("  ✅ get_shift_windows — один batchGet")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    tests = [
+        ("Загрузка и слияние", test_intervals),
+        ("Смены и полночь", test_shifts_and_midnight),
+        ("Сверка с построчным", test_against_reference),
+        ("Бенчмарк год × сотрудники", test_benchmark),
+        ("BreakManager.get_timesheet", test_break_manager),
+    ]
+
+    return run_tests("Timesheet Engine Tests", tests)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
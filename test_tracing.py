@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Тестирование трассировки этапов (shared.metrics.tracing)
+
+Проверяет:
+- Выключенный трассировщик: общий no-op span, почти нулевая цена
+- Вложенность span'ов и скользящую сводку по этапам
+- Chrome trace JSON: события "X", вложенные интервалы, потоки
+- Декоратор traced и гистограмму wtt_span_seconds
+"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Добавляем путь к модулям
+sys.path.insert(0, str(Path(__file__).parent))
+
+from shared.metrics import Tracer, get_metrics_registry, get_tracer, traced
+
+
+def test_disabled_noop():
+    """Тест 1: Выключенная трассировка ничего не стоит"""
+    print("="*60)
+    print("TEST 1: Выключенная трассировка")
+    print("="*60)
+
+    tracer = Tracer(enabled=False)
+    assert tracer.span("a") is tracer.span("b")
+    print("   ✓ span() возвращает общий no-op объект")
+
+    n = 100000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with tracer.span("sync.cycle"):
+            pass
+    per_call_us = (time.perf_counter() - t0) / n * 1e6
+    print(f"   ✓ {per_call_us:.2f} мкс на span")
+    assert per_call_us < 5, per_call_us
+    assert tracer.get_summary() == {}
+    print("   ✓ Сводка пуста")
+
+    print("\n✅ Выключенная трассировка: PASSED")
+    return True
+
+
+def test_nesting_and_summary():
+    """Тест 2: Вложенность и сводка p50/p95"""
+    print("\n" + "="*60)
+    print("TEST 2: Вложенность и сводка")
+    print("="*60)
+
+    tracer = Tracer(enabled=True, window=50)
+    parents = []
+    for i in range(100):
+        with tracer.span("sync.cycle") as cycle:
+            with tracer.span("sync.log_user_actions", rows=i) as inner:
+                parents.append(inner.parent)
+                time.sleep(0.001 if i < 95 else 0.02)
+    assert all(p is not None and p.name == "sync.cycle" for p in parents)
+    assert cycle.parent is None and inner.depth == 1
+    print("   ✓ Вложенный span знает родителя и глубину")
+
+    summary = tracer.get_summary()
+    stage = summary["sync.log_user_actions"]
+    assert stage['count'] == 100 and stage['window'] == 50
+    assert stage['p50_ms'] < 10 <= stage['p95_ms'], stage
+    assert summary["sync.cycle"]['p50_ms'] >= stage['p50_ms']
+    print(f"   ✓ log_user_actions: p50={stage['p50_ms']:.1f}ms "
+          f"p95={stage['p95_ms']:.1f}ms max={stage['max_ms']:.1f}ms")
+
+    try:
+        with tracer.span("sync.mark_actions_synced"):
+            raise ValueError("db locked")
+    except ValueError:
+        pass
+    assert tracer._stack() == []
+    assert tracer.get_summary()["sync.mark_actions_synced"]['count'] == 1
+    print("   ✓ Исключение: span закрыт и учтён, стек чист")
+
+    print("\n✅ Вложенность и сводка: PASSED")
+    return True
+
+
+def test_chrome_trace():
+    """Тест 3: Chrome trace JSON"""
+    print("\n" + "="*60)
+    print("TEST 3: Chrome trace JSON")
+    print("="*60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "trace.json"
+        tracer = Tracer(enabled=True, trace_file=str(path), flush_interval=0)
+
+        def worker():
+            with tracer.span("sheets.append_rows"):
+                time.sleep(0.002)
+
+        with tracer.span("sync.cycle"):
+            with tracer.span("sync.get_user_by_email", email="a@b.c"):
+                time.sleep(0.002)
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+
+        # Корневой span закрыт, flush_interval=0 — файл уже записан
+        data = json.loads(path.read_text(encoding="utf-8"))
+        events = {e['name']: e for e in data['traceEvents']}
+        assert set(events) == {"sync.cycle", "sync.get_user_by_email", "sheets.append_rows"}
+        assert all(e['ph'] == "X" for e in events.values())
+        cycle, lookup = events["sync.cycle"], events["sync.get_user_by_email"]
+        assert cycle['ts'] <= lookup['ts']
+        assert lookup['ts'] + lookup['dur'] <= cycle['ts'] + cycle['dur']
+        assert lookup['args'] == {'email': "a@b.c"}
+        assert events["sheets.append_rows"]['tid'] != cycle['tid']
+        print(f"   ✓ {len(data['traceEvents'])} событий, вложенные интервалы, отдельный tid потока")
+
+    print("\n✅ Chrome trace: PASSED")
+    return True
+
+
+def test_traced_decorator():
+    """Тест 4: Декоратор traced и гистограмма реестра"""
+    print("\n" + "="*60)
+    print("TEST 4: traced + wtt_span_seconds")
+    print("="*60)
+
+    tracer = get_tracer()
+    was_enabled = tracer.enabled
+
+    @traced("test.decorated")
+    def work(x):
+        return x * 2
+
+    try:
+        tracer.enabled = False
+        assert work(2) == 4
+        assert "test.decorated" not in tracer.get_summary()
+        print("   ✓ Выключено: функция вызывается без span")
+
+        tracer.enabled = True
+        for i in range(3):
+            assert work(i) == i * 2
+        assert tracer.get_summary()["test.decorated"]['count'] == 3
+        print("   ✓ Включено: span на каждый вызов")
+
+        hist = get_metrics_registry().histogram("wtt_span_seconds", labelnames=("span",))
+        assert hist.snapshot(span="test.decorated")['count'] == 3
+        print("   ✓ Длительности в гистограмме wtt_span_seconds{span}")
+    finally:
+        tracer.enabled = was_enabled
+
+    print("\n✅ traced: PASSED")
+    return True
+
+
+def main():
+    """Запуск всех тестов"""
+    print("╔" + "="*58 + "╗")
+    print("║" + " Tracing Tests ".center(58) + "║")
+    print("╚" + "="*58 + "╝")
+
+    tests = [
+        ("Выключенная трассировка", test_disabled_noop),
+        ("Вложенность и сводка", test_nesting_and_summary),
+        ("Chrome trace", test_chrome_trace),
+        ("traced", test_traced_decorator),
+    ]
+
+    results = []
+
+    for test_name, test_func in tests:
+        try:
+            result = test_func()
+            results.append((test_name, result))
+        except Exception as e:
+            print(f"\n❌ {test_name}: FAILED with exception: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((test_name, False))
+
+    # Итоги
+    print("\n" + "="*60)
+    print("ИТОГИ ТЕСТИРОВАНИЯ")
+    print("="*60)
+
+    passed = sum(1 for _, result in results if result)
+    total = len(results)
+
+    for test_name, result in results:
+        status = "✅ PASSED" if result else "❌ FAILED"
+        print(f"  {test_name:30} {status}")
+
+    print("\n" + "="*60)
+    print(f"Пройдено: {passed}/{total}")
+    print("="*60)
+
+    if passed == total:
+        print("\n🎉 ВСЕ ТЕСТЫ УСПЕШНО ПРОЙДЕНЫ!")
+        return 0
+    else:
+        print(f"\n⚠️  {total - passed} тест(ов) НЕ прошли")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Общие помощники скриптовых тестов (test_*.py в корне проекта)
+
+- SkipTest — тест не может выполниться в этом окружении (нет config,
+  PyQt5, FTS5...). Пропуск считается отдельно и не засчитывается как
+  пройденный тест.
+- skip_without_config() — пропуск, если config не импортируется: модули
+  проекта читают его при импорте, а он требует учётные данные Google.
+- run_tests() — запуск, таблица итогов и код возврата для sys.exit().
+"""
+
+import traceback
+from typing import Callable, List, Sequence, Tuple
+
+
+class SkipTest(Exception):
+    """Тест пропущен: причина — текст исключения"""
+
+
+def skip_without_config() -> None:
+    """Пропустить тест, если config недоступен"""
+    try:
+        import config  # noqa: F401
+    except Exception as e:
+        raise SkipTest(f"config недоступен ({e})") from e
+
+
+def run_tests(title: str, tests: Sequence[Tuple[str, Callable[[], bool]]]) -> int:
+    """
+    Запускает тесты и печатает итоги
+
+    Args:
+        title: Заголовок набора
+        tests: [(название, функция)]; функция возвращает True при успехе,
+            падает исключением при ошибке или бросает SkipTest
+
+    Returns:
+        0 — упавших нет (пропуски допустимы), иначе 1
+    """
+    print("╔" + "="*58 + "╗")
+    print("║" + f" {title} ".center(58) + "║")
+    print("╚" + "="*58 + "╝")
+
+    results: List[Tuple[str, str]] = []
+
+    for test_name, test_func in tests:
+        try:
+            result = "passed" if test_func() else "failed"
+        except SkipTest as e:
+            print(f"   ⏭  Пропущен: {e}")
+            result = "skipped"
+        except Exception as e:
+            print(f"\n❌ {test_name}: FAILED with exception: {e}")
+            traceback.print_exc()
+            result = "failed"
+        results.append((test_name, result))
+
+    # Итоги
+    print("\n" + "="*60)
+    print("ИТОГИ ТЕСТИРОВАНИЯ")
+    print("="*60)
+
+    labels = {"passed": "✅ PASSED", "failed": "❌ FAILED", "skipped": "⏭  SKIPPED"}
+    for test_name, result in results:
+        print(f"  {test_name:30} {labels[result]}")
+
+    passed = sum(1 for _, result in results if result == "passed")
+    skipped = sum(1 for _, result in results if result == "skipped")
+    failed = len(results) - passed - skipped
+
+    print("\n" + "="*60)
+    print(f"Пройдено: {passed}/{len(results)}" + (f", пропущено: {skipped}" if skipped else ""))
+    print("="*60)
+
+    if failed:
+        print(f"\n⚠️  {failed} тест(ов) НЕ прошли")
+        return 1
+    if skipped:
+        print(f"\n⏭  Пропущено тестов: {skipped} — окружение неполное")
+    else:
+        print("\n🎉 ВСЕ ТЕСТЫ УСПЕШНО ПРОЙДЕНЫ!")
+    return 0
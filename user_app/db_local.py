@@ -2,17 +2,23 @@
 # user_app/db_local.py
 from __future__ import annotations
 
+import queue
 import sqlite3
 import threading
 import time
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any, Iterable, Tuple, List
+from typing import Optional, Dict, Any, Iterable, Tuple, List, Callable
 import logging
 from contextlib import contextmanager
 
-from config import LOCAL_DB_PATH, MAX_COMMENT_LENGTH, MAX_HISTORY_DAYS
+from config import (
+    LOCAL_DB_PATH, MAX_COMMENT_LENGTH, MAX_HISTORY_DAYS,
+    LOCAL_DB_COMMIT_MODE, LOCAL_DB_GROUP_COMMIT_MS, LOCAL_DB_GROUP_COMMIT_ROWS,
+    LOCAL_DB_READERS, LOCAL_DB_SYNCHRONOUS,
+)
 from user_app.db_migrations import apply_migrations
+from shared.db.connection_pool import ConnectionPool
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +28,15 @@ _LOCK = threading.RLock()
 _CONN = None
 _DB_PATH = None
 _BUSY_MS = 60000  # до 60с ждём блокировку
+_WRITER: Optional["GroupCommitWriter"] = None
+# Читатели: N соединений PRAGMA query_only в WAL — читают без _LOCK
+_READ_POOL: Optional[ConnectionPool] = None
+# Метрики писателя: ожидание и удержание _LOCK в write_tx
+_WRITE_STATS = {"count": 0, "wait_time_total": 0.0, "max_wait_time": 0.0,
+                "hold_time_total": 0.0, "max_hold_time": 0.0}
+_WRITE_STATS_LOCK = threading.Lock()
+# Ключ общего счётчика в sync_counters
+_OUTBOX_TOTAL = "*"
 
 
 class LocalDBError(Exception):
@@ -42,7 +57,9 @@ def _connect(path: str) -> sqlite3.Connection:
     # стабильность под нагрузкой
     cur.execute("PRAGMA journal_mode=WAL;")
     cur.execute(f"PRAGMA busy_timeout={_BUSY_MS};")
-    cur.execute("PRAGMA synchronous=NORMAL;")
+    # NORMAL: в WAL fsync только на checkpoint; FULL — только если задан явно
+    synchronous = LOCAL_DB_SYNCHRONOUS if LOCAL_DB_SYNCHRONOUS in ("NORMAL", "FULL") else "NORMAL"
+    cur.execute(f"PRAGMA synchronous={synchronous};")
     cur.execute("PRAGMA foreign_keys=ON;")
     cur.close()
     return conn
@@ -62,9 +79,28 @@ def _apply_migrations_once(conn: sqlite3.Connection) -> None:
         logger.warning("DB migrations failed: %s", e)
 
 
+def _open_read_pool(path: str) -> None:
+    """Пул читателей (WAL: читают параллельно с единственным писателем)."""
+    global _READ_POOL
+    if _READ_POOL is not None or LOCAL_DB_READERS <= 0:
+        return
+    try:
+        _READ_POOL = ConnectionPool(
+            path,
+            pool_size=LOCAL_DB_READERS,
+            timeout=_BUSY_MS / 1000,
+            read_only=True,
+            row_factory=None,
+        )
+    except Exception as e:
+        _READ_POOL = None
+        logger.warning("Пул читателей не создан, чтения идут через писателя: %s", e)
+
+
 def init_db(path_main: str, path_fallback: str) -> Tuple[sqlite3.Connection, str]:
     """
-    Инициализируем РОВНО ОДИН коннект на процесс и храним его в модуле.
+    Инициализируем РОВНО ОДИН пишущий коннект на процесс и храним его в модуле,
+    плюс пул из LOCAL_DB_READERS читающих соединений.
     Без переходов в :memory:.
     """
     global _CONN, _DB_PATH
@@ -78,6 +114,7 @@ def init_db(path_main: str, path_fallback: str) -> Tuple[sqlite3.Connection, str
             conn = _connect(path_main)
             _apply_migrations_once(conn)
             _CONN, _DB_PATH = conn, path_main
+            _open_read_pool(path_main)
             logger.info("Локальная БД успешно инициализирована: %s", path_main)
             return _CONN, _DB_PATH
         except Exception as e:
@@ -92,6 +129,7 @@ def init_db(path_main: str, path_fallback: str) -> Tuple[sqlite3.Connection, str
         conn = _connect(path_fallback)
         _apply_migrations_once(conn)
         _CONN, _DB_PATH = conn, path_fallback
+        _open_read_pool(path_fallback)
         logger.info("Локальная БД успешно инициализирована: %s", path_fallback)
         logger.warning("Используется резервный путь локальной БД: %s", path_fallback)
         return _CONN, _DB_PATH
@@ -123,10 +161,20 @@ def _ensure_conn_alive() -> None:
 @contextmanager
 def read_cursor():
     """
-    Короткие чтения. Под общим RLock, чтобы не столкнуться с записью.
+    Короткие чтения. Через пул читателей — без общего RLock, параллельно
+    с записью (WAL). Если пула нет — под RLock на пишущем соединении.
     """
     if not _CONN:
         raise RuntimeError("DB не инициализирована")
+    pool = _READ_POOL
+    if pool is not None:
+        with pool.get_connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+        return
     with _LOCK:
         _ensure_conn_alive()
         cur = _CONN.cursor()
@@ -136,6 +184,38 @@ def read_cursor():
             cur.close()
 
 
+@contextmanager
+def _timed_write_lock():
+    """_LOCK с учётом времени ожидания и удержания (метрики писателя)."""
+    t0 = time.perf_counter()
+    with _LOCK:
+        t1 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wait, hold = t1 - t0, time.perf_counter() - t1
+            with _WRITE_STATS_LOCK:
+                _WRITE_STATS["count"] += 1
+                _WRITE_STATS["wait_time_total"] += wait
+                _WRITE_STATS["hold_time_total"] += hold
+                _WRITE_STATS["max_wait_time"] = max(_WRITE_STATS["max_wait_time"], wait)
+                _WRITE_STATS["max_hold_time"] = max(_WRITE_STATS["max_hold_time"], hold)
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Метрики доступа к локальной БД: писатель (_LOCK) и пул читателей."""
+    with _WRITE_STATS_LOCK:
+        writer = dict(_WRITE_STATS)
+    n = writer["count"]
+    writer["avg_wait_time"] = writer["wait_time_total"] / n if n else 0.0
+    writer["avg_hold_time"] = writer["hold_time_total"] / n if n else 0.0
+    return {
+        "writer": writer,
+        "readers": _READ_POOL.get_stats() if _READ_POOL is not None else None,
+        "group_commit": dict(_WRITER.stats) if _WRITER is not None else None,
+    }
+
+
 @contextmanager
 def write_tx():
     """
@@ -143,7 +223,7 @@ def write_tx():
     """
     if not _CONN:
         raise RuntimeError("DB не инициализирована")
-    with _LOCK:
+    with _timed_write_lock():
         _ensure_conn_alive()
         try:
             _CONN.execute("BEGIN IMMEDIATE;")
@@ -165,12 +245,160 @@ def write_tx():
             raise
 
 
+class _PendingWrite:
+    __slots__ = ("op", "done", "result", "error")
+
+    def __init__(self, op: Callable[[sqlite3.Connection], Any]):
+        self.op = op
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitWriter:
+    """
+    Group commit: операции записи из любых потоков копятся в очереди и
+    фиксируются фоновым потоком ОДНОЙ транзакцией — раз в interval_ms мс
+    или по max_rows операций, что наступит раньше.
+
+    Каждая операция выполняется под своим SAVEPOINT: ошибка одной (например,
+    'Duplicate LOGOUT action') не откатывает остальные. Вызывающий поток
+    блокируется до COMMIT и получает результат своей операции (lastrowid).
+    """
+
+    def __init__(self, interval_ms: int = 20, max_rows: int = 64, timeout: float = 30.0):
+        self.interval = max(1, int(interval_ms)) / 1000.0
+        self.max_rows = max(1, int(max_rows))
+        self.timeout = timeout
+        self._queue: "queue.Queue[Optional[_PendingWrite]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self.stats = {"batches": 0, "rows": 0, "max_batch": 0, "errors": 0}
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="LocalDBGroupCommit", daemon=True)
+        self._thread.start()
+        logger.info("Group commit включён (interval=%.0fms, max_rows=%d)", self.interval * 1000, self.max_rows)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Дописывает очередь и останавливает поток."""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def submit(self, op: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Выполнить op(conn) в ближайшем групповом коммите и вернуть результат."""
+        if not self._running or threading.current_thread() is self._thread:
+            with write_tx() as conn:
+                return op(conn)
+        item = _PendingWrite(op)
+        self._queue.put(item)
+        if not item.done.wait(self.timeout):
+            raise LocalDBError("Group commit: таймаут ожидания фиксации")
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _collect(self, first: _PendingWrite) -> Tuple[List[_PendingWrite], bool]:
+        batch = [first]
+        stop = False
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        return batch, stop
+
+    def _commit(self, batch: List[_PendingWrite]) -> None:
+        try:
+            with write_tx() as conn:
+                for item in batch:
+                    conn.execute("SAVEPOINT group_item")
+                    try:
+                        item.result = item.op(conn)
+                        conn.execute("RELEASE group_item")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO group_item")
+                        conn.execute("RELEASE group_item")
+                        item.error = e
+        except Exception as e:
+            logger.error("Group commit: транзакция не зафиксирована (%d операций): %s", len(batch), e)
+            self.stats["errors"] += 1
+            for item in batch:
+                if item.error is None:
+                    item.result, item.error = None, e
+        finally:
+            self.stats["batches"] += 1
+            self.stats["rows"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            for item in batch:
+                item.done.set()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            self._commit(batch)
+            if stop:
+                break
+        # дописываем то, что успели положить после stop()
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            self._commit(leftovers)
+
+
+def get_group_writer() -> Optional[GroupCommitWriter]:
+    """Общий writer процесса (только в режиме LOCAL_DB_COMMIT_MODE=group)."""
+    global _WRITER
+    if LOCAL_DB_COMMIT_MODE != "group":
+        return None
+    with _LOCK:
+        if _WRITER is None or not _WRITER.running:
+            _WRITER = GroupCommitWriter(LOCAL_DB_GROUP_COMMIT_MS, LOCAL_DB_GROUP_COMMIT_ROWS)
+            _WRITER.start()
+        return _WRITER
+
+
 def close_connection(_conn=None):
     """
     В длительно живущем приложении не закрываем коннект каждую минуту.
     Закрывать — только при завершении процесса.
     """
-    global _CONN, _DB_PATH
+    global _CONN, _DB_PATH, _WRITER, _READ_POOL
+    if _WRITER is not None:
+        _WRITER.stop()
+        _WRITER = None
+    if _READ_POOL is not None:
+        _READ_POOL.close_all()
+        _READ_POOL = None
     if not _CONN:
         return
     try:
@@ -205,6 +433,7 @@ class LocalDB:
         try:
             self.conn, self.db_path = init_db(primary_path, str(home_fallback))
             self._opened_path = Path(self.db_path)
+            self._ensure_schema()
             
             # профилактика
             self.cleanup_old_action_logs(days=MAX_HISTORY_DAYS)
@@ -361,6 +590,8 @@ class LocalDB:
                 """
             )
 
+            self._ensure_outbox(cur)
+
             # Диагностические логи приложения
             cur.execute(
                 """
@@ -374,6 +605,124 @@ class LocalDB:
             )
             cur.execute("CREATE INDEX IF NOT EXISTS idx_app_logs_ts ON app_logs(ts);")
 
+    @staticmethod
+    def _ensure_outbox(cur: sqlite3.Cursor) -> None:
+        """
+        Очередь отправки (sync_outbox) и счётчики (sync_counters), которые
+        ведут триггеры: INSERT в logs с synced=0 кладёт id в outbox,
+        synced=1 (подтверждение) удаляет его. Счётчики по email и общий
+        (email='*') меняются триггерами outbox, поэтому подсчёт — O(1).
+        ts хранится как первые 19 символов timestamp, чтобы выборка
+        «свежих» записей шла по индексу, без substr() по logs.
+        """
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='sync_outbox';")
+        backfill = cur.fetchone() is None
+
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_outbox (
+                log_id INTEGER PRIMARY KEY,
+                email TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 1,
+                ts TEXT NOT NULL
+            );
+            """
+        )
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_outbox_head ON sync_outbox(priority DESC, ts);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_outbox_ts ON sync_outbox(ts);")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sync_counters (
+                email TEXT PRIMARY KEY,
+                pending INTEGER NOT NULL DEFAULT 0
+            );
+            """
+        )
+
+        # Счётчики
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS outbox_count_insert
+            AFTER INSERT ON sync_outbox
+            FOR EACH ROW
+            BEGIN
+                INSERT OR IGNORE INTO sync_counters (email, pending) VALUES (NEW.email, 0);
+                INSERT OR IGNORE INTO sync_counters (email, pending) VALUES ('{_OUTBOX_TOTAL}', 0);
+                UPDATE sync_counters SET pending = pending + 1
+                 WHERE email IN (NEW.email, '{_OUTBOX_TOTAL}');
+            END;
+            """
+        )
+        cur.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS outbox_count_delete
+            AFTER DELETE ON sync_outbox
+            FOR EACH ROW
+            BEGIN
+                UPDATE sync_counters SET pending = MAX(pending - 1, 0)
+                 WHERE email IN (OLD.email, '{_OUTBOX_TOTAL}');
+            END;
+            """
+        )
+
+        if backfill:
+            cur.execute(
+                """
+                INSERT OR IGNORE INTO sync_outbox (log_id, email, priority, ts)
+                SELECT id, email, COALESCE(priority, 1), substr(timestamp, 1, 19)
+                  FROM logs
+                 WHERE synced = 0
+                """
+            )
+            logger.info("sync_outbox заполнена из logs: %d записей", cur.rowcount)
+
+        # Наполнение/подтверждение очереди
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS logs_outbox_enqueue
+            AFTER INSERT ON logs
+            FOR EACH ROW
+            WHEN COALESCE(NEW.synced, 0) = 0
+            BEGIN
+                INSERT OR IGNORE INTO sync_outbox (log_id, email, priority, ts)
+                VALUES (NEW.id, NEW.email, COALESCE(NEW.priority, 1), substr(NEW.timestamp, 1, 19));
+            END;
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS logs_outbox_ack
+            AFTER UPDATE OF synced ON logs
+            FOR EACH ROW
+            WHEN NEW.synced <> 0 AND COALESCE(OLD.synced, 0) = 0
+            BEGIN
+                DELETE FROM sync_outbox WHERE log_id = NEW.id;
+            END;
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS logs_outbox_requeue
+            AFTER UPDATE OF synced ON logs
+            FOR EACH ROW
+            WHEN COALESCE(NEW.synced, 0) = 0 AND OLD.synced <> 0
+            BEGIN
+                INSERT OR IGNORE INTO sync_outbox (log_id, email, priority, ts)
+                VALUES (NEW.id, NEW.email, COALESCE(NEW.priority, 1), substr(NEW.timestamp, 1, 19));
+            END;
+            """
+        )
+        cur.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS logs_outbox_delete
+            AFTER DELETE ON logs
+            FOR EACH ROW
+            BEGIN
+                DELETE FROM sync_outbox WHERE log_id = OLD.id;
+            END;
+            """
+        )
+
     # ------------------------------------------------------------------ #
     # App logs (диагностика)
     # ------------------------------------------------------------------ #
@@ -451,33 +800,42 @@ class LocalDB:
         if self.conn is None:
             raise LocalDBError("Не удалось открыть локальную БД")
 
+        params = (
+            email.strip(),
+            name.strip(),
+            status,
+            action_type,
+            comment,
+            ts,
+            prio,
+            session_id,
+            status_start_time,
+            status_end_time,
+            reason,
+            user_group,
+        )
+
+        def _insert(conn: sqlite3.Connection) -> int:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                INSERT INTO logs
+                (email, name, status, action_type, comment, timestamp, priority,
+                 session_id, status_start_time, status_end_time, reason, user_group)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                params,
+            )
+            return int(cur.lastrowid)
+
         try:
+            writer = get_group_writer()
+            if writer is not None:
+                # group commit: без self._lock, чтобы не держать других писателей
+                return writer.submit(_insert)
             with self._lock:
                 with write_tx() as conn:
-                    cur = conn.cursor()
-                    cur.execute(
-                        """
-                        INSERT INTO logs
-                        (email, name, status, action_type, comment, timestamp, priority,
-                         session_id, status_start_time, status_end_time, reason, user_group)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            email.strip(),
-                            name.strip(),
-                            status,
-                            action_type,
-                            comment,
-                            ts,
-                            prio,
-                            session_id,
-                            status_start_time,
-                            status_end_time,
-                            reason,
-                            user_group,
-                        ),
-                    )
-                    return int(cur.lastrowid)
+                    return _insert(conn)
         except sqlite3.Error as e:
             if "Duplicate LOGOUT action" in str(e):
                 logger.warning("Попытка дублирования LOGOUT (session_id=%s)", session_id)
@@ -551,29 +909,27 @@ class LocalDB:
         self._ensure_open()
         if self.conn is None:
             return None
-        with self._lock:
-            with read_cursor() as cur:
-                cur.execute("SELECT * FROM logs WHERE id = ?", (int(action_id),))
-                return cur.fetchone()
+        with read_cursor() as cur:
+            cur.execute("SELECT * FROM logs WHERE id = ?", (int(action_id),))
+            return cur.fetchone()
 
     def get_unsynced_actions(self, limit: int = 100) -> List[Tuple]:
         self._ensure_open()
         if self.conn is None:
             return []
-        with self._lock:
-            with read_cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, email, name, status, action_type, comment, timestamp,
-                           session_id, status_start_time, status_end_time, reason, user_group
-                      FROM logs
-                     WHERE synced = 0
-                  ORDER BY priority DESC, timestamp ASC
-                     LIMIT ?
-                    """,
-                    (int(limit),),
-                )
-                return list(cur.fetchall())
+        with read_cursor() as cur:
+            cur.execute(
+                """
+                SELECT l.id, l.email, l.name, l.status, l.action_type, l.comment, l.timestamp,
+                       l.session_id, l.status_start_time, l.status_end_time, l.reason, l.user_group
+                  FROM sync_outbox o
+                  JOIN logs l ON l.id = o.log_id
+              ORDER BY o.priority DESC, o.ts ASC
+                 LIMIT ?
+                """,
+                (int(limit),),
+            )
+            return list(cur.fetchall())
 
 
     def get_fresh_unsynced_actions(self, age_minutes: int = 5, limit: int = 50) -> List[Tuple]:
@@ -591,56 +947,49 @@ class LocalDB:
         if self.conn is None:
             return []
         
-        with self._lock:
-            with read_cursor() as cur:
-                # Вычисляем timestamp для фильтрации
-                from datetime import datetime, timedelta, timezone
-                # ИСПРАВЛЕНИЕ: Используем UTC timezone для корректного сравнения
-                cutoff_time = (datetime.now(timezone.utc) - timedelta(minutes=age_minutes)).isoformat()
-                
-                # АЛЬТЕРНАТИВА: Используем strftime для извлечения даты без timezone
-                # Сравниваем по первым 19 символам (YYYY-MM-DDTHH:MM:SS)
-                cur.execute(
-                    """
-                    SELECT id, email, name, status, action_type, comment, timestamp,
-                           session_id, status_start_time, status_end_time, reason, user_group
-                      FROM logs
-                     WHERE synced = 0
-                       AND substr(timestamp, 1, 19) >= substr(?, 1, 19)
-                  ORDER BY priority DESC, timestamp DESC
-                     LIMIT ?
-                    """,
-                    (cutoff_time, int(limit)),
-                )
-                return list(cur.fetchall())
+        with read_cursor() as cur:
+            # Вычисляем timestamp для фильтрации
+            from datetime import datetime, timedelta, timezone
+            # ИСПРАВЛЕНИЕ: Используем UTC timezone для корректного сравнения
+            cutoff_time = (datetime.now(timezone.utc) - timedelta(minutes=age_minutes)).isoformat()
+            
+            # Сравниваем по первым 19 символам (YYYY-MM-DDTHH:MM:SS):
+            # sync_outbox.ts уже хранится в этом виде и проиндексирован
+            cur.execute(
+                """
+                SELECT l.id, l.email, l.name, l.status, l.action_type, l.comment, l.timestamp,
+                       l.session_id, l.status_start_time, l.status_end_time, l.reason, l.user_group
+                  FROM sync_outbox o
+                  JOIN logs l ON l.id = o.log_id
+                 WHERE o.ts >= ?
+              ORDER BY o.priority DESC, o.ts DESC
+                 LIMIT ?
+                """,
+                (cutoff_time[:19], int(limit)),
+            )
+            return list(cur.fetchall())
 
     def get_unsynced_count(self) -> int:
         """Нужен авто-синху для статистики очереди."""
         self._ensure_open()
         if self.conn is None:
             return 0
-        with self._lock:
-            with read_cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM logs WHERE synced = 0;")
-                row = cur.fetchone()
-                return int(row[0] or 0)
+        return self.count_unsynced_actions()
 
     def count_unsynced_actions(self, email: str | None = None) -> int:
         """Количество неотправленных (synced=0) записей в логе.
-        Если указан email — считаем только по нему."""
+        Если указан email — считаем только по нему.
+        Читается готовый счётчик из sync_counters (ведут триггеры)."""
         self._ensure_open()
         if self.conn is None:
             return 0
-        with self._lock:
-            with read_cursor() as cur:
-                q = "SELECT COUNT(1) FROM logs WHERE synced=0"
-                params = ()
-                if email:
-                    q += " AND email=?"
-                    params = (email,)
-                cur.execute(q, params)
-                row = cur.fetchone()
-                return int(row[0]) if row and row[0] is not None else 0
+        with read_cursor() as cur:
+            cur.execute(
+                "SELECT pending FROM sync_counters WHERE email=?",
+                (email or _OUTBOX_TOTAL,),
+            )
+            row = cur.fetchone()
+            return int(row[0]) if row and row[0] is not None else 0
 
     def mark_actions_synced(self, ids: List[int]) -> None:
         if not ids:
@@ -667,90 +1016,98 @@ class LocalDB:
         self._ensure_open()
         if self.conn is None:
             return False
-        with self._lock:
-            with read_cursor() as cur:
-                if session_id:
-                    cur.execute(
-                        "SELECT COUNT(*) FROM logs WHERE email=? AND session_id=? AND LOWER(action_type)='logout'",
-                        (email, session_id),
-                    )
-                else:
-                    cur.execute(
-                        "SELECT COUNT(*) FROM logs WHERE email=? AND LOWER(action_type)='logout'",
-                        (email,),
-                    )
-                return (cur.fetchone()[0] or 0) > 0
+        with read_cursor() as cur:
+            if session_id:
+                cur.execute(
+                    "SELECT COUNT(*) FROM logs WHERE email=? AND session_id=? AND LOWER(action_type)='logout'",
+                    (email, session_id),
+                )
+            else:
+                cur.execute(
+                    "SELECT COUNT(*) FROM logs WHERE email=? AND LOWER(action_type)='logout'",
+                    (email,),
+                )
+            return (cur.fetchone()[0] or 0) > 0
 
     def finish_last_status(self, email: str, session_id: str) -> Optional[int]:
         self._ensure_open()
         if self.conn is None:
             return None
+
+        def _finish(conn: sqlite3.Connection) -> Optional[int]:
+            cur = conn.cursor()
+            cur.execute(
+                """
+                SELECT id FROM logs
+                 WHERE email=? AND session_id=? AND status_end_time IS NULL
+                   AND (action_type='STATUS_CHANGE' OR action_type='LOGIN')
+              ORDER BY id DESC LIMIT 1
+                """,
+                (email, session_id),
+            )
+            row = cur.fetchone()
+            if not row:
+                return None
+            rid = int(row[0])
+            cur.execute(
+                "UPDATE logs SET status_end_time=? WHERE id=?", 
+                (datetime.now(timezone.utc).isoformat(), rid),
+            )
+            return rid
+
+        writer = get_group_writer()
+        if writer is not None:
+            return writer.submit(_finish)
         with self._lock:
             with write_tx() as conn:
-                cur = conn.cursor()
-                cur.execute(
-                    """
-                    SELECT id FROM logs
-                     WHERE email=? AND session_id=? AND status_end_time IS NULL
-                       AND (action_type='STATUS_CHANGE' OR action_type='LOGIN')
-                  ORDER BY id DESC LIMIT 1
-                    """,
-                    (email, session_id),
-                )
-                row = cur.fetchone()
-                if not row:
-                    return None
-                rid = int(row[0])
-                cur.execute(
-                    "UPDATE logs SET status_end_time=? WHERE id=?", 
-                    (datetime.now(timezone.utc).isoformat(), rid),
-                )
-                return rid
+                return _finish(conn)
 
     def get_last_unfinished_session(self, email: str) -> Optional[Dict[str, Any]]:
         self._ensure_open()
         if self.conn is None:
             return None
-        with self._lock:
-            with read_cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT session_id, timestamp
-                      FROM logs
-                     WHERE email=? AND action_type='LOGIN'
-                       AND session_id NOT IN (
-                            SELECT session_id FROM logs
-                             WHERE email=? AND LOWER(action_type)='logout'
-                       )
-                  ORDER BY timestamp DESC
-                     LIMIT 1
-                    """,
-                    (email, email),
-                )
-                row = cur.fetchone()
-                return {"session_id": row[0], "timestamp": row[1]} if row else None
+        with read_cursor() as cur:
+            cur.execute(
+                """
+                SELECT session_id, timestamp
+                  FROM logs
+                 WHERE email=? AND action_type='LOGIN'
+                   AND session_id NOT IN (
+                        SELECT session_id FROM logs
+                         WHERE email=? AND LOWER(action_type)='logout'
+                   )
+              ORDER BY timestamp DESC
+                 LIMIT 1
+                """,
+                (email, email),
+            )
+            row = cur.fetchone()
+            return {"session_id": row[0], "timestamp": row[1]} if row else None
 
     def get_active_session(self, email: str) -> Optional[Dict[str, Any]]:
         return self.get_last_unfinished_session(email)
 
+    def get_pool_metrics(self) -> Dict[str, Any]:
+        """Время ожидания/удержания писателя и статистика пула читателей."""
+        return get_pool_metrics()
+
     def get_current_user_email(self) -> Optional[str]:
         self._ensure_open()
         if self.conn is None:
             return None
-        with self._lock:
-            with read_cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT email
-                      FROM logs
-                     WHERE status_end_time IS NULL
-                       AND action_type IN ('LOGIN','STATUS_CHANGE')
-                  ORDER BY id DESC
-                     LIMIT 1
-                    """
-                )
-                row = cur.fetchone()
-                return row[0] if row else None
+        with read_cursor() as cur:
+            cur.execute(
+                """
+                SELECT email
+                  FROM logs
+                 WHERE status_end_time IS NULL
+                   AND action_type IN ('LOGIN','STATUS_CHANGE')
+              ORDER BY id DESC
+                 LIMIT 1
+                """
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
 
 
 # Синглтон (при необходимости)
@@ -6,12 +6,14 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Optional, Callable
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from config import STATUSES, STATUS_GROUPS, MAX_COMMENT_LENGTH
 from api_adapter import get_sheets_api
+from sync.gateway_client import get_routed_api
 from user_app.db_local import LocalDB, LocalDBError, write_tx
 from admin_app.break_manager import BreakManager
 from shared.break_status_integration import init_integration, on_status_change
@@ -79,6 +81,10 @@ class EmployeeApp(QWidget):
 
         self.login_was_performed = login_was_performed
 
+        # Один фоновый поток на отправку действий в Sheets (по порядку),
+        # вместо нового потока на каждый клик
+        self._send_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SheetsSend")
+
         self._init_db()
         self._init_ui()
         self._init_timers()
@@ -116,7 +122,29 @@ class EmployeeApp(QWidget):
         }
 
     def _send_action_to_sheets(self, record_id, user_group=None):
-        threading.Thread(target=self._send_action_to_sheets_worker, args=(record_id, user_group), daemon=True).start()
+        self._submit_send(self._send_action_to_sheets_worker, record_id, user_group)
+
+    def _submit_send(self, fn, *args):
+        """Отправка в фоне; после закрытия окна запись остаётся в локальной БД для auto_sync"""
+        try:
+            self._send_executor.submit(fn, *args)
+        except RuntimeError:
+            logger.debug("Отправка после закрытия окна пропущена, запись дождётся auto_sync")
+
+    def _shutdown_send_executor(self):
+        """Не держим процесс ради очереди отправки: записи уже в локальной БД"""
+        self._send_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _track_long_status(self, status: Optional[str] = None):
+        """Переставить дедлайн длительного статуса (None — смена завершена)"""
+        try:
+            from notifications.engine import on_status_started, on_status_ended
+            if status is None:
+                on_status_ended(self.email)
+            else:
+                on_status_started(self.email, status, self.status_start_time)
+        except Exception as e:
+            logger.debug(f"Long-status timers unavailable: {e}")
 
     def _send_action_to_sheets_worker(self, record_id, user_group=None):
         # ВАЖНО: Проверяем интернет ПЕРЕД попыткой отправки
@@ -134,7 +162,7 @@ class EmployeeApp(QWidget):
 
             action = self._make_action_payload_from_row(row)
             # ВАЖНО: сначала actions (список словарей), затем email
-            api = get_sheets_api()
+            api = get_routed_api(get_sheets_api())
             ok = api.log_user_actions([action], action["email"], user_group=user_group or self.group)
             if ok:
                 self.db.mark_actions_synced([record_id])
@@ -147,7 +175,7 @@ class EmployeeApp(QWidget):
     def _finish_and_send_previous_status(self):
         prev_id = self.db.finish_last_status(self.email, self.session_id)
         if prev_id:
-            threading.Thread(target=self._finish_and_send_previous_status_worker, args=(prev_id,), daemon=True).start()
+            self._submit_send(self._finish_and_send_previous_status_worker, prev_id)
 
     def _finish_and_send_previous_status_worker(self, prev_id):
         row = self.db.get_action_by_id(prev_id)
@@ -162,7 +190,7 @@ class EmployeeApp(QWidget):
             return
         try:
             action = self._make_action_payload_from_row(row)
-            api = get_sheets_api()
+            api = get_routed_api(get_sheets_api())
             ok = api.log_user_actions([action], action["email"], user_group=self.group)
             if ok:
                 self.db.mark_actions_synced([prev_id])
@@ -197,7 +225,7 @@ class EmployeeApp(QWidget):
                 
                 # Записываем в ActiveSessions только при LOGIN
                 if action_type == "LOGIN":
-                    api = get_sheets_api()
+                    api = get_routed_api(get_sheets_api())
                     api.set_active_session(
                         self.email,
                         self.name,
@@ -221,6 +249,7 @@ class EmployeeApp(QWidget):
                         reason=None
                     )
                 self.status_start_time = datetime.fromisoformat(now)
+                self._track_long_status(self.current_status)
                 self._send_action_to_sheets(record_id)
         except Exception as e:
             logger.error(f"Ошибка инициализации БД: {e}")
@@ -323,7 +352,7 @@ class EmployeeApp(QWidget):
         имеет статус 'finished' или 'kicked'.
         """
         try:
-            api = get_sheets_api()
+            api = get_routed_api(get_sheets_api())
             if hasattr(api, "check_user_session_status"):
                 st = str(api.check_user_session_status(self.email, self.session_id)).strip().lower()
                 logger.debug(f"[ACTIVESESSIONS] status for {self.email}/{self.session_id}: {st}")
@@ -477,25 +506,25 @@ class EmployeeApp(QWidget):
         now = datetime.now().isoformat()
         logger.info(f"🔵 НАЧАЛО: Запись STATUS_CHANGE в БД (status={new_status})")
         try:
-            with write_tx() as conn:
-                record_id = self.db.log_action_tx(
-                    conn=conn,
-                    email=self.email,
-                    name=self.name,
-                    status=new_status,
-                    action_type="STATUS_CHANGE",
-                    comment=comment,
-                    session_id=self.session_id,
-                    status_start_time=now,
-                    status_end_time=None,
-                    reason=None
-                )
+            # log_action сам выбирает режим фиксации (immediate / group commit)
+            record_id = self.db.log_action(
+                email=self.email,
+                name=self.name,
+                status=new_status,
+                action_type="STATUS_CHANGE",
+                comment=comment,
+                session_id=self.session_id,
+                status_start_time=now,
+                status_end_time=None,
+                reason=None
+            )
             logger.info(f"✅ УСПЕХ: STATUS_CHANGE записан в БД (record_id={record_id}, status={new_status})")
         except Exception as e:
             logger.error(f"❌ ОШИБКА: STATUS_CHANGE НЕ записан в БД! Exception: {e}", exc_info=True)
             Notifier.show("Ошибка", f"Не удалось записать статус в БД: {e}")
             return
 
+        self._track_long_status(new_status)
         self._update_info_text()
         self._update_button_states()
         self.status_changed.emit(new_status)
@@ -558,15 +587,16 @@ class EmployeeApp(QWidget):
             )
         
         logger.info(f"LOGOUT записан в локальную БД: record_id={record_id}")
+        self._track_long_status(None)
         
         # Отправка в фоне
         if prev_id:
-            threading.Thread(target=self._send_action_to_sheets_worker, args=(prev_id, self.group), daemon=True).start()
-        threading.Thread(target=self._send_action_to_sheets_worker, args=(record_id, self.group), daemon=True).start()
+            self._send_action_to_sheets(prev_id, self.group)
+        self._send_action_to_sheets(record_id, self.group)
 
         # Обновляем ActiveSessions
         try:
-            api = get_sheets_api()
+            api = get_routed_api(get_sheets_api())
             api.finish_active_session(self.email, self.session_id, now)
         except Exception as e:
             logger.warning(f"Не удалось обновить ActiveSessions: {e}")
@@ -593,9 +623,24 @@ class EmployeeApp(QWidget):
         logger.info("Пользователь подтвердил завершение смены через кнопку")
         self._perform_shift_finish()
 
-    def force_logout_by_admin(self):
-        """Принудительное завершение сессии администратором"""
-        logger.info(f"[ADMIN_LOGOUT] Принудительный выход для {self.email}")
+    # reason -> (комментарий LOGOUT, заголовок, текст уведомления)
+    _FORCED_LOGOUT_TEXTS = {
+        "admin": ("Принудительное завершение администратором",
+                  "Смена завершена администратором", "Вы были разлогинены администратором."),
+        "revoked": ("Доступ отозван: пользователь не найден в Users",
+                    "Доступ отозван", "Ваша учётная запись удалена или отключена администратором."),
+    }
+
+    def force_logout_by_admin(self, reason: str = "admin"):
+        """
+        Принудительное завершение сессии администратором
+
+        Args:
+            reason: "admin" — разлогин из админки (статус kicked),
+                "revoked" — пользователь удалён/отключён (вход был по кэшу профиля)
+        """
+        comment, title, text = self._FORCED_LOGOUT_TEXTS.get(reason, self._FORCED_LOGOUT_TEXTS["admin"])
+        logger.info(f"[ADMIN_LOGOUT] Принудительный выход для {self.email} (reason={reason})")
         
         if self.shift_ended:
             logger.info(f"[ADMIN_LOGOUT] Попытка принудительного выхода для уже завершённой смены: {self.email}")
@@ -645,14 +690,15 @@ class EmployeeApp(QWidget):
                 name=self.name,
                 status="Завершено",
                 action_type="LOGOUT",
-                comment="Принудительное завершение администратором",
+                comment=comment,
                 session_id=self.session_id,
                 status_start_time=now,
                 status_end_time=now,
-                reason="admin",
+                reason=reason,
                 user_group=self.group
             )
             logger.info(f"[ADMIN_LOGOUT] LOGOUT записан в локальную БД: record_id={record_id}")
+        self._track_long_status(None)
 
         # Отправляем данные в Sheets синхронно (блокирующе), чтобы гарантировать доставку
         def send_and_wait():
@@ -675,7 +721,7 @@ class EmployeeApp(QWidget):
         
         # Обновляем ActiveSessions
         try:
-            api = get_sheets_api()
+            api = get_routed_api(get_sheets_api())
             api.finish_active_session(self.email, self.session_id, now)
             logger.info(f"[ADMIN_LOGOUT] ActiveSessions обновлён для {self.email}")
         except Exception as e:
@@ -683,9 +729,9 @@ class EmployeeApp(QWidget):
 
         # Немодальное уведомление с обратным отсчётом
         self._admin_msg = QMessageBox(self)
-        self._admin_msg.setWindowTitle("Смена завершена администратором")
+        self._admin_msg.setWindowTitle(title)
         self._admin_msg.setWindowModality(Qt.WindowModal)
-        self._admin_msg.setText("Вы были разлогинены администратором.")
+        self._admin_msg.setText(text)
         self._admin_msg.setInformativeText("Приложение закроется через 10 секунд.")
         self._admin_msg.setIcon(QMessageBox.Information)
         self._admin_msg.setStandardButtons(QMessageBox.NoButton)
@@ -780,12 +826,14 @@ class EmployeeApp(QWidget):
         
         if self._closing_reason == "admin_logout":
             logger.info("closeEvent: admin_logout - закрытие без подтверждения")
+            self._shutdown_send_executor()
             event.accept()
             self._closing_reason = None
             return
 
         if self._closing_reason == "auto_logout":
             logger.info("closeEvent: auto_logout - закрытие без подтверждения")
+            self._shutdown_send_executor()
             event.accept()
             self._closing_reason = None
             return
@@ -815,6 +863,7 @@ class EmployeeApp(QWidget):
                 event.ignore()
         else:
             # Смена уже завершена
+            self._shutdown_send_executor()
             event.accept()
 
 if __name__ == "__main__":
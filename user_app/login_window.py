@@ -2,6 +2,7 @@
 import re
 import logging
 import sys
+import threading
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QLabel,
@@ -12,26 +13,37 @@ from PyQt5.QtGui import QIcon, QPixmap, QFont
 
 try:
     from config import validate_config
-    from api_adapter import SheetsAPI
     from user_app.db_local import LocalDB
     from user_app import session as session_state
+    from user_app.profile_cache import ProfileCache
 except ImportError:
     try:
         from roma.config import validate_config
-        from roma.sheets_api import SheetsAPI
         from roma.user_app.db_local import LocalDB
         from roma.user_app import session as session_state
+        from roma.user_app.profile_cache import ProfileCache
     except ImportError:
         from config import validate_config
-        from api_adapter import SheetsAPI
         from user_app.db_local import LocalDB
         from user_app import session as session_state
+        from user_app.profile_cache import ProfileCache
 
 logger = logging.getLogger(__name__)
 
+
+def _get_sheets_api():
+    """API бэкенда импортируется при первом обращении, а не при показе окна"""
+    try:
+        from api_adapter import get_sheets_api
+    except ImportError:
+        from roma.sheets_api import get_sheets_api
+    return get_sheets_api()
+
 class LoginWindow(QDialog):
     login_success = pyqtSignal(dict)
     login_failed = pyqtSignal(str)
+    # Фоновая сверка: вошедшего из кэша пользователя больше нет в Users (email)
+    profile_revoked = pyqtSignal(str)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -39,15 +51,36 @@ class LoginWindow(QDialog):
         self.setWindowIcon(QIcon(self._resource_path("user_app/sberhealf.png")))
         self.setFixedSize(440, 360)
         self.user_data = None
-        self.sheets_api = SheetsAPI()
+        self._sheets_api = None
         self.auth_in_progress = False
         self._success_emitted = False
         self._showing_error = False
         self.main_window = None  # Добавляем ссылку на главное окно
+        self.profile_cache = self._init_profile_cache()
         logger.debug("LoginWindow: инициализация окна входа")
         self._init_ui()
         self._setup_shortcuts()
 
+    @property
+    def sheets_api(self):
+        """
+        Клиент API. Создаётся фоновым инициализатором приложения; если вход
+        нажат раньше (и профиля нет в кэше) — здесь, при первом обращении.
+        """
+        if self._sheets_api is None:
+            self._sheets_api = _get_sheets_api()
+        return self._sheets_api
+    
+    def _init_profile_cache(self):
+        try:
+            from config import PROFILE_CACHE_ENABLED
+            if not PROFILE_CACHE_ENABLED:
+                return None
+            return ProfileCache()
+        except Exception as e:
+            logger.warning(f"LoginWindow: кэш профилей недоступен: {e}")
+            return None
+
     def _resource_path(self, relative_path):
         if hasattr(sys, '_MEIPASS'):
             base_path = Path(sys._MEIPASS)
@@ -182,22 +215,29 @@ class LoginWindow(QDialog):
         try:
             logger.debug("LoginWindow: вызов validate_config")
             validate_config()
-            logger.debug("LoginWindow: вызов get_user_by_email")
-            user_data = self.sheets_api.get_user_by_email(email)
+
+            # 1) Локальный подписанный кэш — вход без сети
+            user_data = self._get_cached_profile(email)
+            from_cache = user_data is not None
+            active_session = None
+            if from_cache:
+                logger.info("LoginWindow: профиль взят из локального кэша")
+            else:
+                # 2) Один batch-запрос Users + ActiveSessions
+                logger.debug("LoginWindow: загрузка профиля из API")
+                user_data, active_session = self._fetch_login_snapshot(email)
+                if user_data:
+                    self._cache_profile(email, user_data)
 
             if user_data:
                 logger.info("LoginWindow: пользователь найден, продолжаем")
-                
-                # Проверяем наличие активной сессии
-                active_session = self.sheets_api.get_active_session(email)
-                if active_session:
-                    session_id = active_session.get("SessionID")
-                    logout_time = QDateTime.currentDateTime().toString(Qt.ISODate)
-                    self.sheets_api.finish_active_session(email, session_id, logout_time)
-                
+
                 session_id = f"{email[:8]}_{QDateTime.currentDateTime().toString('yyyyMMddHHmmss')}"
                 login_was_performed = True
-                
+
+                # Сверка с удалённой стороной и закрытие старой сессии — в фоне
+                self._start_background_reconcile(email, session_id, from_cache, active_session)
+
                 # Формируем данные для передачи в GUI
                 self.user_data = {
                     "email": user_data["email"],
@@ -240,6 +280,71 @@ class LoginWindow(QDialog):
             self._set_loading_state(False)
             self.auth_in_progress = False
 
+    # ---------- профиль: кэш + API ----------
+
+    def _get_cached_profile(self, email: str):
+        if not self.profile_cache:
+            return None
+        try:
+            return self.profile_cache.get(email)
+        except Exception as e:
+            logger.warning(f"LoginWindow: ошибка чтения кэша профиля: {e}")
+            return None
+
+    def _cache_profile(self, email: str, user_data: dict) -> None:
+        if not self.profile_cache:
+            return
+        try:
+            self.profile_cache.put(email, user_data)
+        except Exception as e:
+            logger.warning(f"LoginWindow: ошибка записи кэша профиля: {e}")
+
+    def _fetch_login_snapshot(self, email: str):
+        """(профиль, активная сессия) — одним batch-чтением, если API это умеет."""
+        if hasattr(self.sheets_api, "get_login_snapshot"):
+            snap = self.sheets_api.get_login_snapshot(email)
+            return snap.get("user"), snap.get("active_session")
+        user_data = self.sheets_api.get_user_by_email(email)
+        active_session = self.sheets_api.get_active_session(email) if user_data else None
+        return user_data, active_session
+
+    def _start_background_reconcile(self, email: str, session_id: str,
+                                    from_cache: bool, active_session) -> None:
+        threading.Thread(
+            target=self._reconcile_worker,
+            args=(email, session_id, from_cache, active_session),
+            name="LoginReconcile",
+            daemon=True,
+        ).start()
+
+    def _reconcile_worker(self, email: str, session_id: str, from_cache: bool, active_session) -> None:
+        """
+        Фоновая сверка: обновляет кэш профиля по данным API и закрывает
+        зависшую активную сессию (если она есть и это не текущая).
+
+        Если вход был по кэшу, а пользователя в Users уже нет (удалён или
+        деактивирован), испускает profile_revoked — приложение завершает сессию.
+        """
+        try:
+            if from_cache:
+                user_data, active_session = self._fetch_login_snapshot(email)
+                if user_data:
+                    self._cache_profile(email, user_data)
+                else:
+                    logger.warning(f"LoginWindow: {email} не найден в Users, кэш профиля сброшен, сессия будет завершена")
+                    if self.profile_cache:
+                        self.profile_cache.invalidate(email)
+                    self.profile_revoked.emit(email)
+
+            if active_session:
+                old_sid = str(active_session.get("SessionID", "")).strip()
+                if old_sid and old_sid != session_id:
+                    logout_time = QDateTime.currentDateTime().toString(Qt.ISODate)
+                    self.sheets_api.finish_active_session(email, old_sid, logout_time)
+                    logger.info(f"LoginWindow: предыдущая сессия {old_sid} закрыта")
+        except Exception as e:
+            logger.warning(f"LoginWindow: фоновая сверка профиля не удалась: {e}")
+
     def _set_loading_state(self, loading: bool):
         logger.debug(f"LoginWindow: установка состояния loading={loading}")
         self.login_btn.setDisabled(loading)
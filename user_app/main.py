@@ -1,11 +1,24 @@
 
 # user_app/main.py
+"""
+Точка входа пользовательского приложения.
+
+Старт в два этапа:
+1. Модуль импортирует только Qt, config, логирование и локальную БД —
+   окно входа показывается сразу.
+2. StartupInitializer в фоне поднимает API бэкенда (gspread/google-auth или
+   Supabase), системы отказоустойчивости, экспорт метрик, синхронизацию и
+   опрос уведомлений. Бюджет импорта и первой отрисовки — test_startup.py.
+"""
+import time
+_PROCESS_START = time.perf_counter()
+
 import sys
 import logging
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, TYPE_CHECKING
 from PyQt5.QtWidgets import QApplication, QMessageBox, QMainWindow
-from PyQt5.QtCore import QObject, pyqtSignal, QThread
+from PyQt5.QtCore import QObject, pyqtSignal, QThread, QTimer
 import traceback
 import atexit
 
@@ -15,26 +28,17 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 # Инициализация логирования через единый модуль
-from config import LOG_DIR, get_credentials_file, DB_MAIN_PATH, DB_FALLBACK_PATH
+from config import LOG_DIR, credentials_source, DB_MAIN_PATH, DB_FALLBACK_PATH
 from logging_setup import setup_logging
 from user_app.signals import SyncSignals
-from api_adapter import get_sheets_api  # ← изменено: используем функцию вместо прямого импорта
-from auto_sync import SyncManager  # ← добавили
-from notifications.engine import start_background_poller
 from user_app import db_local  # ← добавили импорт
 atexit.register(db_local.close_connection)
 
-# Системы отказоустойчивости
-from shared.health import (
-    get_health_checker,
-    register_all_checks,
-    HealthChecker
-)
-from shared.resilience import (
-    get_degradation_manager,
-    SystemMode,
-    DegradationManager
-)
+# api_adapter, auto_sync, notifications.engine, shared.health/resilience/metrics
+# (и через них gspread/google-auth) импортируются в StartupInitializer — после показа окна
+if TYPE_CHECKING:
+    from shared.health import HealthChecker
+    from shared.resilience import DegradationManager
 
 # ----- Сигналы приложения -----
 class ApplicationSignals(QObject):
@@ -47,6 +51,35 @@ class ApplicationSignals(QObject):
     sync_progress = pyqtSignal(int, int)
     sync_finished = pyqtSignal(bool)
 
+# ----- Фоновая инициализация -----
+class StartupInitializer(QThread):
+    """
+    Этапы старта после показа окна входа, по порядку.
+    Сбой критичного этапа прекращает инициализацию, некритичного — логируется.
+    """
+    stage_finished = pyqtSignal(str, float)      # (этап, секунд)
+    stage_failed = pyqtSignal(str, str, bool)    # (этап, ошибка, критичный)
+    
+    def __init__(self, stages, parent=None):
+        super().__init__(parent)
+        self.stages = stages  # [(имя, функция, критичный)]
+    
+    def run(self):
+        logger = logging.getLogger(__name__)
+        for name, func, critical in self.stages:
+            started = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                logger.error(f"Startup stage [{name}] failed: {e}", exc_info=True)
+                self.stage_failed.emit(name, str(e), critical)
+                if critical:
+                    return
+                continue
+            elapsed = time.perf_counter() - started
+            logger.info(f"✓ Startup stage [{name}]: {elapsed:.2f}s")
+            self.stage_finished.emit(name, elapsed)
+
 # ----- Менеджер приложения -----
 class ApplicationManager(QObject):
     def __init__(self):
@@ -71,47 +104,76 @@ class ApplicationManager(QObject):
         self.signals = ApplicationSignals()
 
         self.sync_thread: QThread | None = None
-        self.sync_worker: SyncManager | None = None
+        self.sync_worker = None
+        self.sync_manager = None
         self.sync_signals = SyncSignals()  # сигналы доступны и для GUI, и для SyncManager
-
-        # Системы отказоустойчивости
+        self.sheets_api = None
+        self.poller_stop = None
+        self.startup: StartupInitializer | None = None
+        self.first_paint_ms: float | None = None
+        
+        # Системы отказоустойчивости (поднимаются в StartupInitializer)
         self.health_checker: HealthChecker = None
         self.degradation_manager: DegradationManager = None
-        self.current_system_mode = SystemMode.FULL
-
+        self.current_system_mode = None
+        
         sys.excepthook = self.handle_uncaught_exception
-
+        
         try:
-            self._initialize_resources()
-            self._start_sync_service()
-            self.signals.app_started.emit()
-            
-            # Регистрация cleanup после успешной инициализации
-            # Используем lambda для отложенного вызова
-            atexit.register(lambda: self._cleanup() if hasattr(self, '_cleanup') else None)
+            creds_path = credentials_source()
+            if not creds_path.exists():
+                raise FileNotFoundError(f"Credentials file not found: {creds_path}")
         except Exception as e:
             self._show_error("Initialization Error", f"Failed to initialize: {e}")
             sys.exit(1)
-
-    # --- Инициализация ресурсов ---
-    def _initialize_resources(self):
-        creds_path = get_credentials_file()
-        if not creds_path.exists():
-            raise FileNotFoundError(f"Credentials file not found: {creds_path}")
         
-        # Инициализация клиента Google Sheets
-        try:
-            # ← изменено: используем функцию get_sheets_api() вместо прямого создания экземпляра
-            api = get_sheets_api()
-            self.sheets_api = api
-        except Exception as e:
-            logging.getLogger(__name__).error("SheetsAPI init failed: %s", e)
-            raise
+        # Регистрация cleanup; сами системы стартуют в фоне после показа окна
+        atexit.register(self._cleanup)
+    
+    # --- Фоновая инициализация ---
+    def _start_background_init(self):
+        self.startup = StartupInitializer([
+            ("sheets_api", self._init_sheets_api, True),
+            ("resilience", self._init_resilience, False),
+            ("sync", self._start_sync_service, False),
+            ("notifications", self._start_notifications, False),
+        ])
+        self.startup.stage_failed.connect(self._on_startup_stage_failed)
+        self.startup.finished.connect(self._on_startup_finished)
+        self.startup.start()
+    
+    def _on_startup_stage_failed(self, stage: str, message: str, critical: bool):
+        if critical:
+            self._show_error("Initialization Error", f"Failed to initialize: {message}")
+            self.quit_application()
+    
+    def _on_startup_finished(self):
+        logger = logging.getLogger(__name__)
+        logger.info(f"Startup complete in {time.perf_counter() - _PROCESS_START:.2f}s")
+        self.signals.app_started.emit()
+    
+    def _init_sheets_api(self):
+        from api_adapter import get_sheets_api
+        
+        api = get_sheets_api()
+        self.sheets_api = api
         
         # ← изменено: проверяем credentials через полученный API
         if not api.check_credentials():
             raise RuntimeError("Invalid Google Sheets credentials")
+        # Проверка доступа к книге (и её открытие) — здесь, а не в конструкторе API
+        if hasattr(api, "warm_up"):
+            try:
+                api.warm_up()
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"API warm-up failed (will retry on demand): {e}")
+    
+    def _init_resilience(self):
+        from shared.health import get_health_checker, register_all_checks
+        from shared.resilience import get_degradation_manager, SystemMode
+        from shared.metrics import start_metrics_exporter
         
+        self.current_system_mode = SystemMode.FULL
         # Инициализация систем отказоустойчивости
         try:
             logger = logging.getLogger(__name__)
@@ -132,6 +194,10 @@ class ApplicationManager(QObject):
             self.degradation_manager.start_auto_evaluation(interval=30)
             logger.info("✓ Degradation Manager запущен (interval=30s)")
             
+            # 3. Экспорт метрик (METRICS_HTTP_PORT / METRICS_FILE)
+            if start_metrics_exporter():
+                logger.info("✓ Экспорт метрик запущен")
+            
             logger.info("=== СИСТЕМЫ ОТКАЗОУСТОЙЧИВОСТИ ГОТОВЫ ===")
         
         except Exception as e:
@@ -142,6 +208,8 @@ class ApplicationManager(QObject):
 
     # --- Фоновая синхронизация ---
     def _start_sync_service(self):
+        from auto_sync import SyncManager
+        
         try:
             logger = logging.getLogger(__name__)
             logger.info("=== ЗАПУСК СЕРВИСА СИНХРОНИЗАЦИИ ===")
@@ -165,6 +233,12 @@ class ApplicationManager(QObject):
             logger.info("Sync service started")
         except Exception as e:
             logger.error(f"Failed to start sync service: {e}")
+    
+    def _start_notifications(self):
+        from notifications.engine import start_background_poller
+        
+        # Запускаем фоновый опросчик уведомлений
+        self.poller_stop = start_background_poller(60)
 
     # --- UI потоки ---
     def show_login_window(self):
@@ -173,7 +247,10 @@ class ApplicationManager(QObject):
             self.login_window = LoginWindow()
             self.login_window.login_success.connect(self.handle_login_success)
             self.login_window.login_failed.connect(self.handle_login_failed)
+            self.login_window.profile_revoked.connect(self.handle_profile_revoked)
             self.login_window.show()
+            self.first_paint_ms = (time.perf_counter() - _PROCESS_START) * 1000
+            logging.getLogger(__name__).info(f"Login window shown in {self.first_paint_ms:.0f}ms")
         except Exception as e:
             self._show_error("Login Error", f"Cannot show login window: {e}")
             self.quit_application()
@@ -231,6 +308,13 @@ class ApplicationManager(QObject):
     def handle_login_failed(self, message: str):
         self._show_error("Login Failed", message)
 
+    def handle_profile_revoked(self, email: str):
+        """Вход был по кэшу профиля, а сверка не нашла пользователя в Users"""
+        logger = logging.getLogger(__name__)
+        logger.warning(f"Доступ {email} отозван, завершаем сессию")
+        if self.main_window and (self.main_window.email or "").lower() == (email or "").lower():
+            self.main_window.force_logout_by_admin(reason="revoked")
+
     # --- Общее ---
     def _show_error(self, title: str, message: str):
         QMessageBox.critical(None, title, message)
@@ -270,17 +354,71 @@ class ApplicationManager(QObject):
         try:
             if self.sync_worker:
                 self.sync_worker.stop()
+            if self.sync_manager:
+                self.sync_manager.stop()
         except Exception:
             pass
+        if self.poller_stop:
+            self.poller_stop.set()
+        if self.startup and self.startup.isRunning():
+            self.startup.wait(2000)
         if self.sync_thread and self.sync_thread.isRunning():
             self.sync_thread.quit()
             self.sync_thread.wait()
 
         self.app.quit()
 
+    # --- Обработчики систем отказоустойчивости ---
+    def _on_system_mode_change(self, old_mode, new_mode, reason: str):
+        """Обработчик смены режима работы системы"""
+        from shared.resilience import SystemMode
+
+        logger = logging.getLogger(__name__)
+        logger.warning(f"🔄 Режим: {old_mode.value} → {new_mode.value} ({reason})")
+        
+        self.current_system_mode = new_mode
+        
+        if new_mode == SystemMode.FULL:
+            logger.info("✅ FULL mode: все функции доступны")
+        elif new_mode == SystemMode.DEGRADED:
+            logger.warning("⚠️  DEGRADED mode: ограниченный функционал")
+        elif new_mode == SystemMode.OFFLINE:
+            logger.warning("📴 OFFLINE mode: только локальная работа")
+        elif new_mode == SystemMode.EMERGENCY:
+            logger.error("🚨 EMERGENCY mode: только просмотр")
+    
+    def _on_system_notification(self, message: str):
+        """Обработчик уведомлений о смене режима"""
+        logger = logging.getLogger(__name__)
+        logger.info(f"📢 {message}")
+    
+    def _cleanup(self):
+        """Очистка ресурсов при завершении"""
+        logger = logging.getLogger(__name__)
+        logger.info("=== CLEANUP СИСТЕМ ОТКАЗОУСТОЙЧИВОСТИ ===")
+        
+        if self.health_checker:
+            try:
+                self.health_checker.stop_monitoring()
+                logger.info("✓ Health Checker остановлен")
+            except Exception as e:
+                logger.error(f"Ошибка: {e}")
+        
+        if self.degradation_manager:
+            try:
+                self.degradation_manager.stop_auto_evaluation()
+                logger.info("✓ Degradation Manager остановлен")
+            except Exception as e:
+                logger.error(f"Ошибка: {e}")
+        
+        from shared.metrics import stop_metrics_exporter
+        stop_metrics_exporter()
+
     # точка входа UI
     def run(self):
         self.show_login_window()
+        # Фоновая инициализация — после первой отрисовки окна
+        QTimer.singleShot(0, self._start_background_init)
         sys.exit(self.app.exec_())
 
 # ----- Базовый класс MainWindow с обработкой закрытия -----
@@ -306,6 +444,7 @@ class MainWindow(QMainWindow):
                 email = self.session_manager.email
                 session_id = self.session_manager.session_id
                 # ← изменено: используем функцию get_sheets_api() вместо прямого импорта
+                from api_adapter import get_sheets_api
                 api = get_sheets_api()
                 api.finish_active_session(email, session_id)
                 self.session_manager.finish_local_session()
@@ -321,51 +460,9 @@ class MainWindow(QMainWindow):
                 super().closeEvent(event)
         else:
             event.ignore()
-    
-    # --- Обработчики систем отказоустойчивости ---
-    def _on_system_mode_change(self, old_mode: SystemMode, new_mode: SystemMode, reason: str):
-        """Обработчик смены режима работы системы"""
-        logger = logging.getLogger(__name__)
-        logger.warning(f"🔄 Режим: {old_mode.value} → {new_mode.value} ({reason})")
-        
-        self.current_system_mode = new_mode
-        
-        if new_mode == SystemMode.FULL:
-            logger.info("✅ FULL mode: все функции доступны")
-        elif new_mode == SystemMode.DEGRADED:
-            logger.warning("⚠️  DEGRADED mode: ограниченный функционал")
-        elif new_mode == SystemMode.OFFLINE:
-            logger.warning("📴 OFFLINE mode: только локальная работа")
-        elif new_mode == SystemMode.EMERGENCY:
-            logger.error("🚨 EMERGENCY mode: только просмотр")
-    
-    def _on_system_notification(self, message: str):
-        """Обработчик уведомлений о смене режима"""
-        logger = logging.getLogger(__name__)
-        logger.info(f"📢 {message}")
-    
-    def _cleanup(self):
-        """Очистка ресурсов при завершении"""
-        logger = logging.getLogger(__name__)
-        logger.info("=== CLEANUP СИСТЕМ ОТКАЗОУСТОЙЧИВОСТИ ===")
-        
-        if self.health_checker:
-            try:
-                self.health_checker.stop_monitoring()
-                logger.info("✓ Health Checker остановлен")
-            except Exception as e:
-                logger.error(f"Ошибка: {e}")
-        
-        if self.degradation_manager:
-            try:
-                self.degradation_manager.stop_auto_evaluation()
-                logger.info("✓ Degradation Manager остановлен")
-            except Exception as e:
-                logger.error(f"Ошибка: {e}")
 
 # ----- CLI -----
 def main():
-    poller_stop = None
     try:
         # единый логгер
         log_path = setup_logging(app_name="wtt-user", log_dir=LOG_DIR)
@@ -393,9 +490,7 @@ def main():
         # один раз при старте
         db_local.init_db(DB_MAIN_PATH, DB_FALLBACK_PATH)
         
-        # Запускаем фоновый опросчик уведомлений
-        poller_stop = start_background_poller(60)
-        
+        # Опросчик уведомлений, API и синхронизация стартуют в фоне после показа окна
         app_manager = ApplicationManager()
         app_manager.run()
     except Exception as e:
@@ -404,8 +499,6 @@ def main():
         sys.exit(1)
     finally:
         logger.info("Shutting down application.")
-        if poller_stop:
-            poller_stop.set()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
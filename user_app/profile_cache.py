@@ -0,0 +1,134 @@
+
+# user_app/profile_cache.py
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from user_app.db_local import get_db, read_cursor, write_tx
+
+logger = logging.getLogger(__name__)
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS user_profiles (
+    email TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    cached_at TEXT NOT NULL
+);
+"""
+
+
+def _load_signing_key() -> bytes:
+    """
+    Ключ HMAC: PROFILE_CACHE_KEY из .env, иначе — случайный ключ,
+    созданный при первом запуске в ~/WorkTimeTracker/.profile_key.
+    """
+    from config import PROFILE_CACHE_KEY, PROFILE_CACHE_KEY_FILE
+
+    if PROFILE_CACHE_KEY:
+        try:
+            return bytes.fromhex(PROFILE_CACHE_KEY)
+        except ValueError:
+            return PROFILE_CACHE_KEY.encode("utf-8")
+
+    path = Path(PROFILE_CACHE_KEY_FILE)
+    try:
+        key = bytes.fromhex(path.read_text(encoding="ascii").strip())
+        if len(key) >= 32:
+            return key
+    except (OSError, ValueError):
+        pass
+
+    key = os.urandom(32)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(key.hex(), encoding="ascii")
+    try:
+        os.chmod(path, 0o600)
+    except OSError:
+        pass
+    logger.info("Создан ключ подписи кэша профилей: %s", path)
+    return key
+
+
+class ProfileCache:
+    """
+    Подписанный кэш профилей пользователей в локальной SQLite.
+
+    Логин берёт профиль отсюда без обращения к сети; запись с неверной
+    подписью или старше TTL считается отсутствующей.
+    """
+
+    def __init__(self, ttl_hours: Optional[int] = None, key: Optional[bytes] = None) -> None:
+        from config import PROFILE_CACHE_TTL_HOURS
+
+        self.ttl = timedelta(hours=ttl_hours if ttl_hours is not None else PROFILE_CACHE_TTL_HOURS)
+        self._key = key or _load_signing_key()
+        get_db()  # гарантирует, что общий коннект открыт
+        with write_tx() as conn:
+            conn.execute(_DDL)
+
+    def _sign(self, email: str, cached_at: str, payload: str) -> str:
+        msg = "\n".join((email, cached_at, payload)).encode("utf-8")
+        return hmac.new(self._key, msg, hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _norm(email: str) -> str:
+        return (email or "").strip().lower()
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        """Профиль из кэша или None (нет, просрочен, подпись не сошлась)."""
+        em = self._norm(email)
+        with read_cursor() as cur:
+            cur.execute(
+                "SELECT payload, signature, cached_at FROM user_profiles WHERE email=?",
+                (em,),
+            )
+            row = cur.fetchone()
+        if not row:
+            return None
+
+        payload, signature, cached_at = row
+        if not hmac.compare_digest(signature, self._sign(em, cached_at, payload)):
+            logger.warning("Кэш профиля %s: неверная подпись, запись удалена", em)
+            self.invalidate(em)
+            return None
+        try:
+            age = datetime.now(timezone.utc) - datetime.fromisoformat(cached_at)
+        except ValueError:
+            return None
+        if age > self.ttl:
+            logger.debug("Кэш профиля %s просрочен (%s)", em, age)
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    def put(self, email: str, profile: Dict[str, Any]) -> None:
+        em = self._norm(email)
+        payload = json.dumps(profile, ensure_ascii=False, sort_keys=True)
+        cached_at = datetime.now(timezone.utc).isoformat()
+        signature = self._sign(em, cached_at, payload)
+        with write_tx() as conn:
+            conn.execute(
+                """
+                INSERT INTO user_profiles (email, payload, signature, cached_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(email) DO UPDATE SET
+                    payload=excluded.payload,
+                    signature=excluded.signature,
+                    cached_at=excluded.cached_at
+                """,
+                (em, payload, signature, cached_at),
+            )
+
+    def invalidate(self, email: str) -> None:
+        with write_tx() as conn:
+            conn.execute("DELETE FROM user_profiles WHERE email=?", (self._norm(email),))